@@ -78,6 +78,7 @@ class CWRConfiguration(object):
         self._record_configs = {}
         self._transaction_configs = {}
         self._acknowledge_configs = {}
+        self._validation_rules = {}
 
     def _load_cwr_defaults(self):
         """
@@ -146,6 +147,19 @@ class CWRConfiguration(object):
 
         return self._transaction_configs[file_id]
 
+    def load_validation_rules(self, file_id):
+        """
+        Loads the validation rules file for the id.
+
+        :param file_id: the id for the rules
+        :return: the list of rules configurations
+        """
+        if file_id not in self._validation_rules:
+            self._validation_rules[file_id] = self._reader.read_yaml_file(
+                'validation_rules_%s.yml' % file_id)['rules']
+
+        return self._validation_rules[file_id]
+
     def default_version(self):
         """
         The current version of the CWR standard.
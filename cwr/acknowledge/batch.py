@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cwr.acknowledge.file import AcknowledgeFile
+from cwr.parser.decoder.archive import CWRSource, path_sources
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.parser.encoder.stream import default_stream_writer, \
+    default_record_encoder_factory
+
+"""
+Acknowledgement of batches of CWR files.
+
+The files are decoded and acknowledged as streams, each acknowledgement being
+written to a file with the same path as the original plus the '.ack' suffix.
+
+Building the grammar and the encoders takes much longer than acknowledging a
+small file, so they are created only once for each worker process, and reused
+for all the files the process receives.
+
+Compressed files and the files inside zip archives are acknowledged without
+extracting them, each acknowledgement being written next to the original, as
+if it had been extracted. The files of an archive are distributed among the
+processes as any other file.
+
+Acknowledgements are first written to a temporary file, which is renamed once
+it is complete. This way any file with an acknowledgement can be skipped when
+running the batch again after a crash.
+
+The sequence number given to each file can be stored on a state file, so a
+file keeps its number when the batch is run again, even if new files have
+been added to it.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_TEMPORARY_SUFFIX = '.tmp'
+
+# Output files are written in large chunks
+_BUFFER_SIZE = 1024 * 1024
+
+# Acknowledger used by each worker process, and the arguments it was created
+# with
+_worker = None
+_worker_args = None
+
+
+def batch_paths(source, suffix='.ack'):
+    """
+    Finds the CWR files on a directory, or matching a glob pattern.
+
+    Acknowledgements and temporary files are not included.
+
+    :param source: path to a directory, or glob pattern
+    :param suffix: suffix of the acknowledgement files
+    :return: sorted list with the paths
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+
+    return sorted(path for path in paths
+                  if os.path.isfile(path) and
+                  not path.endswith(suffix) and
+                  not path.endswith(suffix + _TEMPORARY_SUFFIX))
+
+
+class FileResult(object):
+    """
+    Result of acknowledging a single file.
+    """
+
+    def __init__(self, path, output, transactions, seconds, error=None,
+                 sequence_n=None):
+        """
+        Constructs a FileResult.
+
+        :param path: path to the acknowledged file
+        :param output: path to the acknowledgement, None if it failed
+        :param transactions: number of acknowledged transactions
+        :param seconds: time spent on the file
+        :param error: description of the error, if it failed
+        :param sequence_n: sequence number of the acknowledgement file
+        """
+        self._path = path
+        self._output = output
+        self._transactions = transactions
+        self._seconds = seconds
+        self._error = error
+        self._sequence_n = sequence_n
+
+    def __str__(self):
+        if self._error is not None:
+            return '%s: failed, %s' % (self._path, self._error)
+        return '%s: %d transactions, %.3f sec' % (
+            self._path, self._transactions, self._seconds)
+
+    @property
+    def path(self):
+        """
+        Path to the acknowledged file.
+
+        :return: the file path
+        """
+        return self._path
+
+    @property
+    def output(self):
+        """
+        Path to the acknowledgement file. None if the file failed.
+
+        :return: the acknowledgement path
+        """
+        return self._output
+
+    @property
+    def sequence_n(self):
+        """
+        Sequence number of the acknowledgement file.
+
+        :return: the sequence number
+        """
+        return self._sequence_n
+
+    @property
+    def transactions(self):
+        """
+        Number of transactions acknowledged.
+
+        :return: the number of transactions
+        """
+        return self._transactions
+
+    @property
+    def seconds(self):
+        """
+        Time spent decoding and acknowledging the file.
+
+        :return: the time in seconds
+        """
+        return self._seconds
+
+    @property
+    def error(self):
+        """
+        Description of the error which stopped the acknowledgement. None if
+        the file was acknowledged.
+
+        :return: the error
+        """
+        return self._error
+
+
+class BatchReport(object):
+    """
+    Results for all the files in a batch, and throughput for the whole batch.
+    """
+
+    def __init__(self):
+        self._results = []
+        self._skipped = []
+        self._seconds = 0
+
+    def __str__(self):
+        lines = [str(result) for result in self._results]
+        lines.append('%d files acknowledged, %d failed, %d skipped' % (
+            len(self.acknowledged), len(self.failed), len(self._skipped)))
+        lines.append('%d transactions in %.3f sec: %.1f files/sec, '
+                     '%.0f transactions/sec' % (
+                         self.transactions, self._seconds,
+                         self.files_per_second,
+                         self.transactions_per_second))
+        return '\n'.join(lines)
+
+    @property
+    def results(self):
+        """
+        The FileResult for each processed file, in the order they finished.
+
+        :return: list of FileResult
+        """
+        return self._results
+
+    @property
+    def acknowledged(self):
+        """
+        The files which were acknowledged.
+
+        :return: list of FileResult
+        """
+        return [result for result in self._results if result.error is None]
+
+    @property
+    def failed(self):
+        """
+        The files which could not be acknowledged.
+
+        :return: list of FileResult
+        """
+        return [result for result in self._results
+                if result.error is not None]
+
+    @property
+    def skipped(self):
+        """
+        The files skipped because they already had an acknowledgement.
+
+        :return: list of paths
+        """
+        return self._skipped
+
+    @property
+    def seconds(self):
+        """
+        Time spent on the whole batch.
+
+        :return: the time in seconds
+        """
+        return self._seconds
+
+    @seconds.setter
+    def seconds(self, value):
+        self._seconds = value
+
+    @property
+    def transactions(self):
+        """
+        Number of transactions acknowledged on all the files.
+
+        :return: the number of transactions
+        """
+        return sum(result.transactions for result in self._results)
+
+    @property
+    def files_per_second(self):
+        """
+        Files processed per second.
+
+        :return: the files throughput
+        """
+        if self._seconds <= 0:
+            return 0
+        return len(self._results) / self._seconds
+
+    @property
+    def transactions_per_second(self):
+        """
+        Transactions acknowledged per second.
+
+        :return: the transactions throughput
+        """
+        if self._seconds <= 0:
+            return 0
+        return self.transactions / self._seconds
+
+    def add(self, result):
+        """
+        Adds the result for a file.
+
+        :param result: the FileResult
+        """
+        self._results.append(result)
+
+    def skip(self, path):
+        """
+        Adds a file which was skipped.
+
+        :param path: path to the file
+        """
+        self._skipped.append(path)
+
+
+class FileAcknowledger(object):
+    """
+    Acknowledges single files, reusing the same decoder and encoders for all
+    of them.
+    """
+
+    def __init__(self, config, receiver, encoding='latin-1', suffix='.ack'):
+        """
+        Constructs a FileAcknowledger.
+
+        :param config: the acknowledgement configuration
+        :param receiver: code of the receiver of the acknowledgements
+        :param encoding: encoding of the original and acknowledgement files,
+        if None the character set on the header of each file is used
+        :param suffix: suffix added to the original path for the output
+        """
+        self._config = config
+        self._receiver = receiver
+        self._encoding = encoding
+        self._suffix = suffix
+        self._decoder = default_file_stream_decoder()
+        self._encoder_factory = default_record_encoder_factory()
+
+    def output(self, source):
+        """
+        Path to the acknowledgement of a file.
+
+        :param source: path to the file, or its CWRSource
+        :return: the acknowledgement path
+        """
+        if not isinstance(source, CWRSource):
+            source = CWRSource(source)
+        return source.extracted_path + self._suffix
+
+    def acknowledge(self, path, sequence_n):
+        """
+        Acknowledges a file.
+
+        Errors are not raised, but stored in the result, and no
+        acknowledgement is kept for the file.
+
+        :param path: path to the file, or its CWRSource
+        :param sequence_n: sequence number for the acknowledgement file
+        :return: the FileResult
+        """
+        start = time.perf_counter()
+        if isinstance(path, CWRSource):
+            source = path
+        else:
+            source = CWRSource(path)
+        path = str(source)
+        output = self.output(source)
+        temporary = output + _TEMPORARY_SUFFIX
+
+        try:
+            # The acknowledgement uses the character set of the original
+            encoding = self._encoding or source.detect_encoding()
+            with source.open(self._encoding) as contents, \
+                    open(temporary, 'wt', encoding=encoding,
+                         newline='', buffering=_BUFFER_SIZE) as out:
+                writer = default_stream_writer(out, self._encoder_factory)
+                events = self._decoder.decode(source.data(contents))
+
+                acknowledge = AcknowledgeFile(self._config, sequence_n,
+                                              self._receiver)
+                acknowledge.acknowledge_stream(events, writer)
+
+            os.replace(temporary, output)
+        except Exception as e:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return FileResult(path, None, 0, time.perf_counter() - start,
+                              '%s: %s' % (e.__class__.__name__, e),
+                              sequence_n)
+
+        return FileResult(path, output, writer.transaction_count,
+                          time.perf_counter() - start, sequence_n=sequence_n)
+
+
+class BatchAcknowledger(object):
+    """
+    Acknowledges many files, using a pool of processes.
+
+    Files which already have an acknowledgement are skipped.
+
+    Without a state file, the sequence number for each acknowledgement file
+    is its position on the batch, which only stays the same when the batch is
+    run again on the same files. With a state file, each file is given the
+    next free number the first time it is found, and the numbers are stored
+    before acknowledging the files, so they are kept after a crash.
+
+    Each file in a zip archive counts as a file of the batch.
+    """
+
+    def __init__(self, config, receiver, workers=None, encoding='latin-1',
+                 suffix='.ack', state_path=None):
+        """
+        Constructs a BatchAcknowledger.
+
+        With a single worker the files are acknowledged on the current
+        process.
+
+        :param config: the acknowledgement configuration
+        :param receiver: code of the receiver of the acknowledgements
+        :param workers: number of processes, by default one per CPU
+        :param encoding: encoding of the original and acknowledgement files,
+        if None the character set on the header of each file is used
+        :param suffix: suffix added to the original path for the output
+        :param state_path: JSON file storing the sequence number of each
+        file, if any
+        """
+        self._config = config
+        self._receiver = receiver
+        self._workers = workers
+        self._encoding = encoding
+        self._suffix = suffix
+        self._state_path = state_path
+
+    def run(self, paths, first_sequence_n=1):
+        """
+        Acknowledges the files.
+
+        :param paths: paths to the files, or a directory or glob pattern
+        :param first_sequence_n: sequence number for the first file
+        :return: a BatchReport
+        """
+        if isinstance(paths, str):
+            paths = batch_paths(paths, self._suffix)
+        if self._state_path is not None:
+            # The state file may be stored along with the files
+            state = os.path.abspath(self._state_path)
+            paths = [path for path in paths
+                     if os.path.abspath(path) not in
+                     (state, state + _TEMPORARY_SUFFIX)]
+
+        report = BatchReport()
+        start = time.perf_counter()
+
+        sources = [source for path in paths for source in path_sources(path)]
+
+        if self._state_path is None:
+            sequences = None
+        else:
+            sequences = self._assign_sequences(sources, first_sequence_n)
+
+        pending = []
+        for i, source in enumerate(sources):
+            if os.path.exists(source.extracted_path + self._suffix):
+                report.skip(str(source))
+            elif sequences is None:
+                pending.append((source, first_sequence_n + i))
+            else:
+                pending.append((source, sequences[_state_key(source)]))
+
+        if self._workers == 1:
+            acknowledger = FileAcknowledger(self._config, self._receiver,
+                                            self._encoding, self._suffix)
+            for source, sequence_n in pending:
+                report.add(acknowledger.acknowledge(source, sequence_n))
+        elif pending:
+            args = (self._config, self._receiver, self._encoding,
+                    self._suffix)
+            with ProcessPoolExecutor(max_workers=self._workers) as executor:
+                futures = [executor.submit(_acknowledge, args, source,
+                                           sequence_n)
+                           for source, sequence_n in pending]
+                for future in as_completed(futures):
+                    report.add(future.result())
+
+        report.seconds = time.perf_counter() - start
+
+        return report
+
+    def _assign_sequences(self, sources, first_sequence_n):
+        """
+        Gives a sequence number to each file without one on the state file,
+        storing the new numbers.
+
+        Files already acknowledged but missing from the state file, such as
+        those from a batch run without it, are not given a number.
+        """
+        sequences = {}
+        if os.path.exists(self._state_path):
+            with open(self._state_path, 'rt') as state:
+                sequences = json.load(state)['sequences']
+
+        next_n = max([first_sequence_n - 1] + list(sequences.values())) + 1
+        changed = False
+        for source in sources:
+            key = _state_key(source)
+            if key in sequences or \
+                    os.path.exists(source.extracted_path + self._suffix):
+                continue
+            sequences[key] = next_n
+            next_n += 1
+            changed = True
+
+        if changed:
+            temporary = self._state_path + _TEMPORARY_SUFFIX
+            with open(temporary, 'wt') as state:
+                json.dump({'sequences': sequences}, state, indent=2,
+                          sort_keys=True)
+            os.replace(temporary, self._state_path)
+
+        return sequences
+
+
+def _state_key(source):
+    """
+    Identifies a file on the state file by its absolute path.
+    """
+    key = os.path.abspath(source.path)
+    if source.member is not None:
+        key += ':' + source.member
+    return key
+
+
+def _worker_acknowledger(args):
+    """
+    Returns the acknowledger for a worker process, creating it on the first
+    file it receives.
+
+    Pools can't run an initializer before Python 3.7, so the acknowledger is
+    created by the first task, and reused by the next ones.
+    """
+    global _worker, _worker_args
+    if _worker is None or _worker_args != args:
+        _worker = FileAcknowledger(*args)
+        _worker_args = args
+    return _worker
+
+
+def _acknowledge(args, source, sequence_n):
+    return _worker_acknowledger(args).acknowledge(source, sequence_n)
@@ -1,18 +1,22 @@
 # -*- coding: utf-8 -*-
 
 import codecs
+import copy
 from datetime import date
-import sys
 from config_cwr.accessor import CWRConfiguration
 from cwr.acknowledgement import AcknowledgementRecord, MessageRecord
 from cwr.file import CWRFile, FileTag
 from cwr.group import Group, GroupHeader, GroupTrailer
-from cwr.interested_party import IPTerritoryOfControlRecord
+from cwr.parser.decoder.charset import charset_encoding
+from cwr.parser.decoder.stream import TRANSMISSION_HEADER, GROUP_HEADER, \
+    TRANSACTION, GROUP_TRAILER
 from cwr.parser.encoder.file import default_file_encoder
 
 from cwr.record import TransactionRecord
 from cwr.transmission import Transmission, TransmissionTrailer, TransmissionHeader
 from cwr.utils.printer import CWRPrinter
+from cwr.utils.progress import ACKNOWLEDGE, Instrumented
+from cwr.utils.territory import default_territory_hierarchy
 from cwr.validation.common import ValidationStatus, NPValidationStatus
 from cwr.validation.transaction import ValidationTransaction
 
@@ -24,8 +28,19 @@ __author__ = 'Yaroslav O. Golub'
 __license__ = 'MIT'
 __status__ = 'Development'
 
+# Records read by the territories validation
+_TERRITORY_RECORD_TYPES = frozenset(('SPT', 'SWT'))
+
 
 class SequenceGenerator:
+    """
+    Consecutive numbers, starting at the received value.
+
+    Generators can't be shared between threads, so each file, group and
+    transaction being acknowledged keeps its own sequences. As nothing is
+    shared, files can be acknowledged concurrently without locks.
+    """
+
     def __init__(self, start=0):
         self._sequence = self.generator(start)
 
@@ -40,13 +55,24 @@ class SequenceGenerator:
         return self._sequence.__next__()
 
 
-class AcknowledgeFile(object):
+class AcknowledgeFile(Instrumented):
+    """
+    Acknowledgement for a CWR file.
+
+    The progress is reported to the hooks added to it after each transaction
+    and group is acknowledged, along with the time spent validating and, for
+    streams, writing.
+    """
+
     _acknowledge = None
 
     config = None
 
     def __init__(self, config, sequence_n, reciver):
         self.config = config
+        self._tis_hierarchy = None
+        self._tis_mask = None
+        self._validation = None
         tag = FileTag(self._year(), sequence_n, self._sender(), reciver, self._version())
         transmission = AcknowledgeTransmission(self.config['sender_id'],
                                                self.config['sender_name'],
@@ -64,17 +90,57 @@ class AcknowledgeFile(object):
     def _version():
         return "2.1"
 
+    def _territories(self):
+        """
+        Returns the territory hierarchy and the bitset for the territories in
+        the configuration, which are created only once.
+        """
+        if self._tis_mask is None:
+            self._tis_hierarchy = default_territory_hierarchy()
+            self._tis_mask = self._tis_hierarchy.mask(
+                self.config['tis'].values())
+        return self._tis_hierarchy, self._tis_mask
+
     def validate_tis(self, transaction):
-        tis_number = self.config['tis'].values()
-        for record in transaction:
-            if isinstance(record, IPTerritoryOfControlRecord):
-                if record.tis_numeric_code in tis_number:
-                    return True
-        return False
+        """
+        Indicates if the territories covered by the transaction include any
+        of the territories in the configuration.
+
+        Included territories cover all the territories they contain, and the
+        excluded ones are removed from them.
+
+        :param transaction: list with the records of the transaction
+        :return: True if any configured territory is covered
+        """
+        hierarchy, mask = self._territories()
+        return hierarchy.covers(transaction, mask)
+
+    @property
+    def validation(self):
+        """
+        The validation applied to the transactions, which is created only
+        once.
+
+        :return: the ValidationTransaction
+        """
+        if self._validation is None:
+            self._validation = ValidationTransaction(self.config)
+        return self._validation
+
+    @property
+    def record_types(self):
+        """
+        Types of the records read when validating a transaction, besides the
+        transaction header.
+
+        :return: set with the record types
+        """
+        if self.validation.rules is None:
+            return _TERRITORY_RECORD_TYPES
+        return _TERRITORY_RECORD_TYPES | self.validation.rules.record_types
 
     def validate(self, transaction):
-        validation = ValidationTransaction(self.config)
-        return validation.validate(transaction)
+        return self.validation.validate(transaction)
 
     def validate_transaction(self, transaction):
         if self.validate_tis(transaction):
@@ -82,33 +148,127 @@ class AcknowledgeFile(object):
         else:
             return NPValidationStatus()
 
-    def acknowledge_cwr_file(self, cwr_file):
+    def acknowledge_stream(self, events, writer):
+        """
+        Acknowledges the transactions received from a FileStreamDecoder,
+        writing the acknowledgement file as they are received.
+
+        Each transaction is validated and written, along with its ACK record,
+        as soon as it is decoded, so neither the original file nor the
+        acknowledgement are kept in memory.
+
+        :param events: iterable of (event type, value) tuples
+        :param writer: CwrStreamWriter for the acknowledgement file
+        """
+        tracker = self._tracker(ACKNOWLEDGE)
+        if tracker is not None:
+            tracker.start()
+
+        header = self._acknowledge.transmission.header
+
+        group_id = None
+        for event, value in events:
+            if event == TRANSMISSION_HEADER:
+                # The acknowledgement keeps the character set of the original
+                header.character_set = value.character_set
+                writer.write_header(header)
+            elif event == GROUP_HEADER:
+                group_id = value.group_id
+                writer.open_group('ACK',
+                                  batch_request_id=value.batch_request_id)
+            elif event == TRANSACTION:
+                if tracker is None:
+                    status = self.validate_transaction(value)
+                    ack = acknowledgement_record(group_id, value, status.code)
+                    writer.write_transaction([ack] + list(value))
+                else:
+                    with tracker.stage('validate'):
+                        status = self.validate_transaction(value)
+                    with tracker.stage('write'):
+                        ack = acknowledgement_record(group_id, value,
+                                                     status.code)
+                        writer.write_transaction([ack] + list(value))
+                    tracker.transaction(len(value))
+            elif event == GROUP_TRAILER:
+                writer.close_group()
+                if tracker is not None:
+                    tracker.group()
+
+        writer.close()
+        if tracker is not None:
+            tracker.end()
+
+    def acknowledge_cwr_file(self, cwr_file, statuses=None):
+        """
+        Acknowledges all the transactions of a file.
+
+        The statuses may be received already validated, such as from a
+        ParallelValidation, in the order the transactions have on the file.
+        Otherwise each transaction is validated here.
+
+        :param cwr_file: the CWRFile to acknowledge
+        :param statuses: list with the ValidationStatus of each transaction
+        """
         assert isinstance(cwr_file, CWRFile)
+        self._acknowledge.transmission.header.character_set = \
+            cwr_file.transmission.header.character_set
+
+        tracker = self._tracker(ACKNOWLEDGE)
+        if tracker is not None:
+            tracker.start()
+
+        if statuses is not None:
+            statuses = iter(statuses)
         for group in cwr_file.transmission.groups:
             ack_group = AcknowledgeGroup(group)
             for transaction in group.transactions:
-                status = self.validate_transaction(transaction)
+                if statuses is not None:
+                    status = next(statuses)
+                elif tracker is None:
+                    status = self.validate_transaction(transaction)
+                else:
+                    with tracker.stage('validate'):
+                        status = self.validate_transaction(transaction)
                 ack_transaction = AcknowledgeTransaction(group.group_header.group_id, transaction, status.code, status.message)
                 ack_group.append_transaction(ack_transaction)
+                if tracker is not None:
+                    tracker.transaction(len(transaction))
             self._acknowledge.transmission.append_group(ack_group)
+            if tracker is not None:
+                tracker.group()
 
-    def print(self, path):
-        output = codecs.open(path + '.ack.parsed', 'w', 'latin-1')
-        printer = CWRPrinter()
-        printer.print_file(self._acknowledge, output)
+        if tracker is not None:
+            tracker.end()
 
-    def encode(self, path):
-        output = codecs.open(path + '.ack', 'w', 'latin-1')
-        out_old = sys.stdout
-        sys.stdout = output
+    @property
+    def encoding(self):
+        """
+        Codec for the acknowledgement files, from the character set on the
+        transmission header.
+
+        :return: the codec name
+        """
+        return charset_encoding(
+            self._acknowledge.transmission.header.character_set)
+
+    def print(self, path, encoding=None):
+        if encoding is None:
+            encoding = self.encoding
+        with codecs.open(path + '.ack.parsed', 'w', encoding) as output:
+            printer = CWRPrinter()
+            printer.print_file(self._acknowledge, output)
+
+    def encode(self, path, encoding=None):
+        if encoding is None:
+            encoding = self.encoding
         file_encoder = default_file_encoder()
         result = file_encoder.encode(self._acknowledge.transmission)
-        print(result)
-        sys.stdout = out_old
+        with codecs.open(path + '.ack', 'w', encoding) as output:
+            output.write(result)
+            output.write('\n')
 
 
 class AcknowledgeTransmission(Transmission):
-    group_sequence = SequenceGenerator(0)
 
     def __init__(self, sender_id, sender_name, sender_type):
         record_type = 'HDR'
@@ -122,13 +282,16 @@ class AcknowledgeTransmission(Transmission):
                                     transmission_date=transmission_date)
         trailer = TransmissionTrailer(record_type='TRL')
         super(AcknowledgeTransmission, self).__init__(header=header, trailer=trailer)
+        # Group ids are consecutive through the file, starting at 1
+        self._group_sequence = SequenceGenerator(1)
 
     def append_group(self, group):
         assert isinstance(group, AcknowledgeGroup)
         if self.groups is None:
             self.groups = []
-        group.group_header.group_id = self.group_sequence.get()
-        group.group_trailer.group_id = self.group_sequence.get()
+        group_id = self._group_sequence.get()
+        group.group_header.group_id = group_id
+        group.group_trailer.group_id = group_id
         self.groups.append(group)
         self.trailer.group_count += 1
         self.trailer.transaction_count += group.group_trailer.transaction_count
@@ -136,7 +299,6 @@ class AcknowledgeTransmission(Transmission):
 
 
 class AcknowledgeGroup(Group):
-    transactions_sequence = SequenceGenerator(0)
 
     def __init__(self, original_group):
         header = GroupHeader(record_type='GRH',
@@ -144,39 +306,33 @@ class AcknowledgeGroup(Group):
                              batch_request_id=original_group.group_header.batch_request_id)
         trailer = GroupTrailer(record_type='GRT')
         super(AcknowledgeGroup, self).__init__(group_header=header, group_trailer=trailer)
+        # Transaction sequence numbers begin again on each group
+        self._transactions_sequence = SequenceGenerator(0)
 
     def append_transaction(self, transaction):
         assert isinstance(transaction, AcknowledgeTransaction)
-        transaction.transaction_sequence_n = self.transactions_sequence.get()
+        transaction.transaction_sequence_n = self._transactions_sequence.get()
         self.transactions.append(transaction.records)
         self.group_trailer.transaction_count += 1
         self.group_trailer.record_count += len(transaction.records)
 
 
 class AcknowledgeTransaction(object):
-    record_sequence = SequenceGenerator(0)
-
     _transaction_sequence_n = 0
 
     def __init__(self, original_group_id, transaction, status, message=''):
         self._records = []
-        original_transaction = transaction[0]
-        ack = AcknowledgementRecord(record_type='ACK',
-                                    record_sequence_n=self.record_sequence.get(),
-                                    original_group_id=original_group_id,
-                                    original_transaction_sequence_n=original_transaction.transaction_sequence_n,
-                                    original_transaction_type=original_transaction.record_type,
-                                    transaction_status=status,
-                                    creation_date_time=date.today(),
-                                    processing_date=date.today(),
-                                    creation_title=original_transaction.title,
-                                    submitter_creation_n='',
-                                    recipient_creation_n='')
+        ack = acknowledgement_record(original_group_id, transaction, status)
         self._records.append(ack)
         #if message:
         #    records.append(MessageRecord())
+        # The original records are copied, as they are numbered again
         for rec in transaction:
-            self._records.append(rec)
+            self._records.append(copy.copy(rec))
+        # The ACK record is the first one of the transaction, followed by the
+        # acknowledged records, numbered the same as the CwrStreamWriter does
+        for record_sequence_n, record in enumerate(self._records):
+            record.record_sequence_n = record_sequence_n
 
     @property
     def transaction_sequence_n(self):
@@ -197,6 +353,29 @@ class AcknowledgeTransaction(object):
         self._records = value
 
 
+def acknowledgement_record(original_group_id, transaction, status, record_sequence_n=0):
+    """
+    Creates the ACK record for a transaction
+    :param original_group_id: id of the group containing the transaction
+    :param transaction: the acknowledged transaction
+    :param status: the transaction status code
+    :param record_sequence_n: sequence number for the record
+    :return: the AcknowledgementRecord
+    """
+    original_transaction = transaction[0]
+    return AcknowledgementRecord(record_type='ACK',
+                                 record_sequence_n=record_sequence_n,
+                                 original_group_id=original_group_id,
+                                 original_transaction_sequence_n=original_transaction.transaction_sequence_n,
+                                 original_transaction_type=original_transaction.record_type,
+                                 transaction_status=status,
+                                 creation_date_time=date.today(),
+                                 processing_date=date.today(),
+                                 creation_title=getattr(original_transaction, 'title', ''),
+                                 submitter_creation_n='',
+                                 recipient_creation_n='')
+
+
 def example_acknowledge_file(sequence_n, reciver):
     config = CWRConfiguration()
     return AcknowledgeFile(config.load_acknowledge_config('example'), sequence_n, reciver)
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from cwr.acknowledge.file import AcknowledgeFile
+from cwr.validation.common import ValidationStatus
+
+"""
+Validation of the transactions of a file on a pool of processes.
+
+Each transaction is validated independently, so the transactions are split
+into chunks, validated on worker processes, and the statuses are merged back
+in the same order the transactions have on the file.
+
+To keep the inter-process traffic low:
+- The validator is created only once for each worker, on its first chunk
+- Transactions are sent in chunks, so each message carries many of them, and
+  the classes of the records are pickled once for each chunk
+- Only the records read by the validation are sent, along with the
+  transaction header
+- Only the status code and message are sent back, as a tuple, along with
+  the statistics of the edit rules for the chunk, which are merged into the
+  rules of the current process
+
+The statuses can then be used to generate the acknowledgement, with
+AcknowledgeFile.acknowledge_cwr_file.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Validator used by each worker process, and the configuration it was
+# created with
+_validator = None
+_validator_config = None
+
+
+def file_transactions(cwr_file):
+    """
+    Returns the transactions of a file, in the order they have on it.
+
+    :param cwr_file: the CWRFile
+    :return: list with the transactions of all the groups
+    """
+    transactions = []
+    for group in cwr_file.transmission.groups:
+        transactions.extend(group.transactions)
+    return transactions
+
+
+def project(transaction, record_types):
+    """
+    Keeps only the header of a transaction and the records of the received
+    types.
+
+    :param transaction: list with the records of the transaction
+    :param record_types: set with the types of the records to keep
+    :return: list with the kept records
+    """
+    return [transaction[0]] + [record for record in transaction[1:]
+                               if record.record_type in record_types]
+
+
+def chunks(values, size):
+    """
+    Splits a list into consecutive chunks.
+
+    :param values: the list to split
+    :param size: maximum length of each chunk
+    :return: generator for the chunks
+    """
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class ParallelValidation(object):
+    """
+    Validates the transactions of files on a pool of processes.
+
+    The pool is kept open between files, so the workers are created only
+    once. It should be closed with close(), or by using the validation as a
+    context manager.
+    """
+
+    def __init__(self, config, jobs=None, chunk_size=256):
+        """
+        Constructs a ParallelValidation.
+
+        With a single job the transactions are validated on the current
+        process.
+
+        :param config: the acknowledgement configuration
+        :param jobs: number of processes, by default one per CPU
+        :param chunk_size: number of transactions sent on each message
+        """
+        self._config = config
+        self._jobs = jobs
+        self._chunk_size = chunk_size
+        self._executor = None
+        self._validator = AcknowledgeFile(config, 0, '')
+        self._record_types = self._validator.record_types
+
+        # Time spent on the last file
+        self._seconds = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def jobs(self):
+        """
+        Number of processes used, None for one per CPU.
+
+        :return: the number of processes
+        """
+        return self._jobs
+
+    @property
+    def chunk_size(self):
+        """
+        Number of transactions sent on each message to the workers.
+
+        :return: the chunk size
+        """
+        return self._chunk_size
+
+    @property
+    def rules(self):
+        """
+        The edit rules validation, with the statistics of all the
+        transactions validated, on any of the processes.
+
+        :return: the RuleValidation, or None if there are no rules
+        """
+        return self._validator.validation.rules
+
+    @property
+    def seconds(self):
+        """
+        Time spent validating the last file.
+
+        :return: the time in seconds
+        """
+        return self._seconds
+
+    def validate(self, transactions):
+        """
+        Validates a list of transactions.
+
+        :param transactions: list with the transactions
+        :return: list with the ValidationStatus for each transaction, in the
+        same order
+        """
+        start = time.perf_counter()
+
+        if self._jobs == 1:
+            statuses = [self._validator.validate_transaction(transaction)
+                        for transaction in transactions]
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._jobs)
+
+            transactions = [project(transaction, self._record_types)
+                            for transaction in transactions]
+
+            rules = self.rules
+            statuses = []
+            # Map returns the results in the order the chunks were sent
+            for results, counters in self._executor.map(
+                    _validate_chunk, repeat(self._config),
+                    chunks(transactions, self._chunk_size)):
+                statuses.extend(ValidationStatus(code, message)
+                                for code, message in results)
+                if rules is not None:
+                    rules.merge(counters)
+
+        self._seconds = time.perf_counter() - start
+
+        return statuses
+
+    def validate_file(self, cwr_file):
+        """
+        Validates the transactions of a file.
+
+        :param cwr_file: the CWRFile
+        :return: list with the ValidationStatus for each transaction, in the
+        order they have on the file
+        """
+        return self.validate(file_transactions(cwr_file))
+
+    def close(self):
+        """
+        Shuts down the pool of processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def validate_file(cwr_file, config, jobs=None, chunk_size=256):
+    """
+    Validates the transactions of a file on a pool of processes.
+
+    :param cwr_file: the CWRFile
+    :param config: the acknowledgement configuration
+    :param jobs: number of processes, by default one per CPU
+    :param chunk_size: number of transactions sent on each message
+    :return: list with the ValidationStatus for each transaction, in the
+    order they have on the file
+    """
+    with ParallelValidation(config, jobs, chunk_size) as validation:
+        return validation.validate_file(cwr_file)
+
+
+def _worker_validator(config):
+    """
+    Returns the validator for a worker process, creating it on the first
+    chunk it receives.
+
+    Pools can't run an initializer before Python 3.7, so the validator is
+    created by the first task, and reused by the next ones.
+    """
+    global _validator, _validator_config
+    if _validator is None or _validator_config != config:
+        _validator = AcknowledgeFile(config, 0, '')
+        _validator_config = config
+    return _validator
+
+
+def _validate_chunk(config, transactions):
+    validator = _worker_validator(config)
+    # Only the statistics of this chunk are sent back
+    rules = validator.validation.rules
+    if rules is not None:
+        rules.reset()
+
+    results = []
+    for transaction in transactions:
+        status = validator.validate_transaction(transaction)
+        results.append((status.code, status.message))
+
+    counters = rules.counters() if rules is not None else None
+    return results, counters
@@ -0,0 +1,748 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import sys
+import time
+from collections import OrderedDict
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.grammar.factory.profiler import RuleProfiler
+from cwr.acknowledge.batch import BatchAcknowledger, batch_paths
+from cwr.parser.decoder.archive import open_text
+from cwr.parser.decoder.charset import charset_encoding
+from cwr.parser.decoder.dictionary import FileDictionaryDecoder
+from cwr.parser.decoder.diagnosis import FailureLocator
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import FILE_TAG, TRANSMISSION_HEADER, \
+    GROUP_HEADER, TRANSACTION, GROUP_TRAILER, TRANSMISSION_TRAILER, \
+    default_file_stream_decoder, events_file, file_events, read_blocks, \
+    read_lines
+from cwr.parser.decoder.tolerant import ERROR, default_tolerant_file_decoder
+from cwr.parser.encoder.cwrjson import JSONEncoder
+from cwr.parser.encoder.dictionary import FileTagDictionaryEncoder, \
+    GroupHeaderDictionaryEncoder, GroupTrailerDictionaryEncoder, \
+    TransactionRecordDictionaryEncoder, TransmissionHeaderDictionaryEncoder, \
+    TransmissionTrailerDictionaryEncoder
+from cwr.parser.encoder.file import default_file_encoder
+from cwr.utils.benchmark import DEFAULT_THRESHOLD, BenchmarkSuite, \
+    load_report, save_report
+from cwr.utils.generator import default_generator
+from cwr.utils.index import TransmissionIndex, index_events
+from cwr.utils.integrity import default_integrity_checker
+from cwr.utils.printer import CWRPrinter
+from cwr.utils.splitter import default_splitter
+from cwr.validation.rules import default_rule_validation
+
+"""
+Command line tool for working with CWR files.
+
+It is installed as the 'cwr' command, with the following subcommands:
+- decode: prints a file as JSON, JSON lines, CSV, TSV or text
+- encode: creates a CWR file from its JSON
+- validate: checks the structure of a file, the records which can't be
+  decoded, and optionally the edit rules
+- ack: acknowledges files
+- stats: counts the groups, transactions and records of a file
+- index: finds the transactions of a file by their codes
+- generate: creates a synthetic file, for load testing
+- split: splits a file into smaller ones, with a limit of transactions or
+  bytes on each of them
+- benchmark: measures the throughput of the library, comparing it with a
+  baseline
+
+Files compressed with gzip, bzip2 or xz, and zip archives with a single file,
+are read without extracting them. The ack command accepts archives with any
+number of files.
+
+The validate and ack commands accept --jobs, the number of processes used
+for locating the records which can't be decoded, or for acknowledging the
+files. As the edit rules are checked while decoding the file, --jobs can't be
+used along with --rules.
+
+All of them accept these options:
+- --engine: decoder used, 'pyparsing' for the whole file at once, 'stream'
+  for one transaction at a time, or 'tolerant' for skipping the
+  transactions which can't be decoded
+- --encoding: codec of the files, or 'auto' for the character set declared
+  on their header; the files created use the same codec, except for the
+  decoded files, which are UTF-8 with 'auto'
+- --profile: file where the cProfile statistics are stored
+- --timings: prints the time spent on each stage
+- --profile-rules: prints the time spent on each grammar rule
+- --rules-stats: file where the grammar rules statistics are stored
+
+The exit codes are meant for batch schedulers:
+- 0: success
+- 1: the files have errors, such as validation issues, the index found
+  nothing, or the benchmarks have regressions
+- 2: wrong arguments
+- 3: the command could not be run, such as when a file can't be read
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Exit codes
+EXIT_OK = 0
+EXIT_INVALID = 1
+EXIT_USAGE = 2
+EXIT_ERROR = 3
+
+# Decoders
+PYPARSING = 'pyparsing'
+STREAM = 'stream'
+TOLERANT = 'tolerant'
+
+_FORMATS = ('json', 'jsonl', 'csv', 'tsv', 'text')
+
+# Encoding option for reading the character set from the file header
+AUTO = 'auto'
+
+# Encoding of the text created from the files, with the automatic encoding
+_TEXT_ENCODING = 'utf-8'
+
+# Formats used by isoformat, and the conversion for each of them
+_ISO_FORMATS = (('%Y-%m-%dT%H:%M:%S', lambda value: value),
+                ('%Y-%m-%d', lambda value: value.date()),
+                ('%H:%M:%S', lambda value: value.time()))
+
+
+class Timings(object):
+    """
+    Time spent on each stage of a command.
+    """
+
+    def __init__(self):
+        self._stages = OrderedDict()
+
+    def __str__(self):
+        return '\n'.join('%s: %.3f sec' % (stage, seconds)
+                         for stage, seconds in self._stages.items())
+
+    @property
+    def stages(self):
+        """
+        The time for each stage, in the order they were first run.
+
+        :return: OrderedDict mapping each stage to its time in seconds
+        """
+        return self._stages
+
+    def add(self, stage, seconds):
+        """
+        Adds time to a stage.
+
+        :param stage: name of the stage
+        :param seconds: time spent on it
+        """
+        self._stages[stage] = self._stages.get(stage, 0) + seconds
+
+    def measure(self, stage, values):
+        """
+        Iterates over the values, adding the time spent producing them to a
+        stage.
+
+        This allows timing lazy stages, such as a stream decoder.
+
+        :param stage: name of the stage
+        :param values: iterable with the values
+        :return: an iterator over the same values
+        """
+        values = iter(values)
+        while True:
+            start = time.perf_counter()
+            try:
+                value = next(values)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - start)
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield value
+
+
+def create_parser():
+    """
+    Creates the parser for the command line arguments.
+
+    :return: the ArgumentParser
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--engine', choices=(PYPARSING, STREAM, TOLERANT),
+                        default=PYPARSING,
+                        help='decoder to use (default: pyparsing)')
+    common.add_argument('--encoding', default='latin-1',
+                        help="encoding of the files, or 'auto' for the "
+                             "character set on their header (default: "
+                             "latin-1)")
+    common.add_argument('--profile', metavar='PATH',
+                        help='stores the cProfile statistics on the path')
+    common.add_argument('--timings', action='store_true',
+                        help='prints the time spent on each stage')
+    common.add_argument('--profile-rules', action='store_true',
+                        help='prints the time spent on each grammar rule')
+    common.add_argument('--rules-stats', metavar='PATH',
+                        help='stores the grammar rules statistics on the '
+                             'path, in the pstats format')
+
+    parser = argparse.ArgumentParser(
+        prog='cwr', description='Tools for CWR files.')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    command = commands.add_parser('decode', parents=[common],
+                                  help='print a file as JSON, CSV or text')
+    command.add_argument('path', help='path to the CWR file')
+    command.add_argument('--format', '-f', choices=_FORMATS, default='json',
+                         help='output format (default: json)')
+    command.add_argument('--output', '-o',
+                         help='output file, or folder for a CSV or TSV '
+                              'table for each record type')
+    command.set_defaults(run=_decode)
+
+    command = commands.add_parser('encode', parents=[common],
+                                  help='create a CWR file from its JSON')
+    command.add_argument('path', help='path to the JSON file')
+    command.add_argument('--output', '-o', help='output file')
+    command.set_defaults(run=_encode)
+
+    command = commands.add_parser('validate', parents=[common],
+                                  help='check a file for errors')
+    command.add_argument('path', help='path to the CWR file')
+    options = command.add_mutually_exclusive_group()
+    options.add_argument('--rules', metavar='ID',
+                         help='id of the edit rules to apply')
+    _add_jobs(options)
+    command.set_defaults(run=_validate)
+
+    command = commands.add_parser('ack', parents=[common],
+                                  help='acknowledge files')
+    command.add_argument('paths', nargs='+',
+                         help='CWR files, folders or glob patterns')
+    command.add_argument('--config', default='example',
+                         help='id of the acknowledgement configuration')
+    command.add_argument('--receiver', required=True,
+                         help='code of the receiver of the acknowledgements')
+    command.add_argument('--first-sequence', type=int, default=1,
+                         help='sequence number of the first file')
+    command.add_argument('--state', metavar='PATH',
+                         help='JSON file keeping the sequence number of '
+                              'each file between runs')
+    _add_jobs(command)
+    command.set_defaults(run=_acknowledge)
+
+    command = commands.add_parser('stats', parents=[common],
+                                  help='count the contents of a file')
+    command.add_argument('path', help='path to the CWR file')
+    command.add_argument('--json', action='store_true',
+                         help='print the counts as JSON')
+    command.set_defaults(run=_stats)
+
+    command = commands.add_parser('index', parents=[common],
+                                  help='find transactions by their codes')
+    command.add_argument('path', help='path to the CWR file')
+    command.add_argument('--work', help='submitter work number')
+    command.add_argument('--iswc', help='ISWC')
+    command.add_argument('--agreement', help='agreement number')
+    command.add_argument('--ipi-name', help='IPI name number')
+    command.add_argument('--ipi-base', help='IPI base number')
+    command.add_argument('--ip', help='interested party number')
+    command.set_defaults(run=_index)
+
+    command = commands.add_parser('generate', parents=[common],
+                                  help='create a synthetic file')
+    command.add_argument('--works', type=int, default=1000,
+                         help='number of works (default: 1000)')
+    command.add_argument('--agreements', type=int, default=0,
+                         help='number of agreements (default: 0)')
+    command.add_argument('--seed', type=int,
+                         help='seed for the random values')
+    command.add_argument('--nra', type=float, default=0.1,
+                         help='probability of a work including non-Roman '
+                              'alphabet records (default: 0.1)')
+    command.add_argument('--output', '-o', help='output file')
+    command.set_defaults(run=_generate)
+
+    command = commands.add_parser('split', parents=[common],
+                                  help='split a file into smaller ones')
+    command.add_argument('path', help='path to the CWR file')
+    command.add_argument('--output', '-o', required=True,
+                         help='folder for the new files')
+    command.add_argument('--max-transactions', type=int,
+                         help='maximum transactions on each file')
+    command.add_argument('--max-bytes', type=int,
+                         help='maximum size of each file, in bytes')
+    command.add_argument('--first-sequence', type=int,
+                         help='sequence number of the first file (default: '
+                              'the one of the original file)')
+    command.set_defaults(run=_split)
+
+    command = commands.add_parser('benchmark', parents=[common],
+                                  help='measure the library throughput')
+    command.add_argument('--sizes', type=int, nargs='+', default=[1000],
+                         help='transactions on each synthetic file '
+                              '(default: 1000)')
+    command.add_argument('--repeat', type=int, default=3,
+                         help='runs of each benchmark (default: 3)')
+    command.add_argument('--seed', type=int, default=1,
+                         help='seed for the synthetic files (default: 1)')
+    command.add_argument('--only', nargs='+', metavar='NAME',
+                         help='prefixes of the benchmarks to run')
+    command.add_argument('--no-memory', action='store_true',
+                         help="don't trace the memory allocations")
+    command.add_argument('--save', metavar='PATH',
+                         help='stores the results as JSON')
+    command.add_argument('--baseline', metavar='PATH',
+                         help='JSON results to compare with')
+    command.add_argument('--threshold', type=float,
+                         default=DEFAULT_THRESHOLD,
+                         help='relative change allowed (default: %.2f)' %
+                              DEFAULT_THRESHOLD)
+    command.set_defaults(run=_benchmark)
+
+    return parser
+
+
+def _add_jobs(parser):
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='number of processes (default: 1)')
+
+
+def main(argv=None, out=None, err=None):
+    """
+    Runs the command line tool.
+
+    :param argv: the arguments, by default those of the process
+    :param out: output for the results, by default the standard output
+    :param err: output for the errors, by default the standard error
+    :return: the exit code
+    """
+    out = out or sys.stdout
+    err = err or sys.stderr
+
+    parser = create_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+
+    if args.encoding == AUTO:
+        # The decoders read the character set when they receive no encoding
+        args.encoding = None
+
+    timings = Timings()
+    profile = cProfile.Profile() if args.profile else None
+    if args.profile_rules or args.rules_stats:
+        args.rule_profiler = RuleProfiler()
+    else:
+        args.rule_profiler = None
+
+    try:
+        if profile:
+            profile.enable()
+        try:
+            code = args.run(args, timings, out, err)
+        finally:
+            if profile:
+                profile.disable()
+    except Exception as e:
+        err.write('cwr: %s: %s\n' % (e.__class__.__name__, e))
+        return EXIT_ERROR
+
+    if profile:
+        profile.dump_stats(args.profile)
+        pstats.Stats(profile, stream=err).sort_stats(
+            'cumulative').print_stats(20)
+    if args.rules_stats:
+        pstats.Stats(args.rule_profiler).dump_stats(args.rules_stats)
+    if args.profile_rules:
+        err.write('%s\n' % args.rule_profiler.report(limit=40))
+    if args.timings:
+        err.write('%s\n' % timings)
+
+    return code
+
+
+def _read_events(args, timings, err):
+    """
+    Decodes the file with the chosen engine, returning its events.
+
+    Errors found by the tolerant engine are written to the error output.
+    """
+    start = time.perf_counter()
+    if args.engine == PYPARSING:
+        decoder = default_file_decoder(args.rule_profiler)
+    elif args.engine == STREAM:
+        decoder = default_file_stream_decoder(args.rule_profiler)
+    else:
+        decoder = default_tolerant_file_decoder(args.rule_profiler)
+    timings.add('grammar', time.perf_counter() - start)
+
+    source, contents = open_text(args.path, args.encoding)
+    if args.engine == PYPARSING:
+        start = time.perf_counter()
+        with contents:
+            contents = contents.read()
+        timings.add('read', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        cwr_file = decoder.decode(source.data(contents))
+        timings.add('decode', time.perf_counter() - start)
+
+        for event in file_events(cwr_file):
+            yield event
+        return
+
+    with contents:
+        data = source.data(contents)
+        if args.engine == STREAM:
+            events = decoder.decode(data)
+        else:
+            events = decoder.decode_events(data)
+
+        for event, value in timings.measure('decode', events):
+            if event == ERROR:
+                args.issues += len(value)
+                for issue in value:
+                    err.write('%s\n' % issue)
+            else:
+                yield event, value
+
+
+def _open_output(args, encoding=None):
+    if args.output:
+        return open(args.output, 'wt',
+                    encoding=encoding or args.encoding or _TEXT_ENCODING,
+                    newline='')
+    return None
+
+
+def _decode(args, timings, out, err):
+    args.issues = 0
+    events = _read_events(args, timings, err)
+
+    if args.format in ('csv', 'tsv') and args.output and \
+            os.path.isdir(args.output):
+        outputs = {}
+
+        def output(record_type):
+            if record_type not in outputs:
+                outputs[record_type] = open(
+                    os.path.join(args.output, '%s.%s' % (record_type,
+                                                         args.format)),
+                    'wt', encoding=args.encoding or _TEXT_ENCODING,
+                    newline='')
+            return outputs[record_type]
+
+        try:
+            CWRPrinter(args.format).print_events(events, output)
+        finally:
+            for table in outputs.values():
+                table.close()
+    else:
+        output = _open_output(args)
+        try:
+            _write_decoded(args, events, timings, output or out)
+        finally:
+            if output:
+                output.close()
+
+    return EXIT_INVALID if args.issues else EXIT_OK
+
+
+def _write_decoded(args, events, timings, out):
+    if args.format == 'json':
+        cwr_file = events_file(events)
+        start = time.perf_counter()
+        out.write(JSONEncoder().encode(cwr_file))
+        out.write('\n')
+        timings.add('encode', time.perf_counter() - start)
+    elif args.format == 'jsonl':
+        encoders = _event_encoders()
+        for event, value in events:
+            start = time.perf_counter()
+            out.write(json.dumps({'event': event,
+                                  'value': encoders[event](value)},
+                                 ensure_ascii=False, default=_iso))
+            out.write('\n')
+            timings.add('encode', time.perf_counter() - start)
+    else:
+        CWRPrinter(args.format).print_events(events, out)
+
+
+def _event_encoders():
+    record_encoder = TransactionRecordDictionaryEncoder()
+    return {
+        FILE_TAG: FileTagDictionaryEncoder().encode,
+        TRANSMISSION_HEADER: TransmissionHeaderDictionaryEncoder().encode,
+        GROUP_HEADER: GroupHeaderDictionaryEncoder().encode,
+        TRANSACTION: lambda transaction: [record_encoder.encode(record)
+                                          for record in transaction],
+        GROUP_TRAILER: GroupTrailerDictionaryEncoder().encode,
+        TRANSMISSION_TRAILER: TransmissionTrailerDictionaryEncoder().encode
+    }
+
+
+def _iso(value):
+    try:
+        return value.isoformat()
+    except AttributeError:
+        raise TypeError('Unserializable object %r' % value)
+
+
+def _iso_dates(dictionary):
+    """
+    Parses the dates, times and durations stored as ISO strings by the
+    JSONEncoder, as the encoders require datetime instances.
+    """
+    for key, value in dictionary.items():
+        if isinstance(value, str) and ('date' in key or 'duration' in key):
+            for pattern, convert in _ISO_FORMATS:
+                try:
+                    value = convert(datetime.datetime.strptime(value,
+                                                               pattern))
+                except ValueError:
+                    continue
+                dictionary[key] = value
+                break
+    return dictionary
+
+
+def _encode(args, timings, out, err):
+    start = time.perf_counter()
+    with open(args.path, 'rt', encoding='utf-8') as source:
+        data = json.load(source, object_hook=_iso_dates)
+    cwr_file = FileDictionaryDecoder().decode(data)
+    timings.add('decode', time.perf_counter() - start)
+
+    start = time.perf_counter()
+    encoded = default_file_encoder().encode(cwr_file.transmission)
+    timings.add('encode', time.perf_counter() - start)
+
+    encoding = args.encoding
+    if encoding is None:
+        encoding = charset_encoding(
+            cwr_file.transmission.header.character_set)
+    output = _open_output(args, encoding)
+    try:
+        (output or out).write(encoded)
+        (output or out).write('\n')
+    finally:
+        if output:
+            output.close()
+
+    return EXIT_OK
+
+
+def _validate(args, timings, out, err):
+    start = time.perf_counter()
+    report = default_integrity_checker().check_file(args.path, args.encoding)
+    timings.add('integrity', time.perf_counter() - start)
+    for issue in report.issues:
+        out.write('%s\n' % issue)
+    issues = report.issue_count
+
+    if args.rules:
+        # The transactions are needed, so they are decoded on this process
+        args.engine = TOLERANT
+        args.issues = 0
+        validation = default_rule_validation(args.rules)
+
+        group_id = None
+        for event, value in _read_events(args, timings, err):
+            if event == GROUP_HEADER:
+                group_id = value.group_id
+            elif event == TRANSACTION:
+                start = time.perf_counter()
+                status = validation.validate(value)
+                timings.add('rules', time.perf_counter() - start)
+                if status.code != 'AS':
+                    issues += 1
+                    out.write('Group %s, transaction %s (%s): %s %s\n' % (
+                        group_id, value[0].transaction_sequence_n,
+                        value[0].record_type, status.code, status.message))
+        issues += args.issues
+    else:
+        contents = open_text(args.path, args.encoding)[1]
+        with contents, FailureLocator(args.jobs) as locator:
+            diagnosis = locator.locate(contents)
+        timings.add('decode', diagnosis.seconds)
+        for issue in diagnosis.issues:
+            out.write('%s\n' % issue)
+        issues += len(diagnosis.issues)
+
+    return EXIT_INVALID if issues else EXIT_OK
+
+
+def _acknowledge(args, timings, out, err):
+    paths = []
+    for source in args.paths:
+        if os.path.isfile(source):
+            paths.append(source)
+        else:
+            paths.extend(batch_paths(source))
+
+    config = CWRConfiguration().load_acknowledge_config(args.config)
+    acknowledger = BatchAcknowledger(config, args.receiver,
+                                     workers=args.jobs,
+                                     encoding=args.encoding,
+                                     state_path=args.state)
+
+    report = acknowledger.run(paths, args.first_sequence)
+    timings.add('acknowledge', report.seconds)
+
+    for result in report.failed:
+        err.write('%s\n' % result)
+    out.write('%s\n' % report)
+
+    return EXIT_INVALID if report.failed else EXIT_OK
+
+
+def _stats(args, timings, out, err):
+    start = time.perf_counter()
+    record_types = {}
+    transaction_types = {}
+    groups = 0
+    contents = open_text(args.path, args.encoding)[1]
+    with contents:
+        for block in read_blocks(read_lines(contents)):
+            if block.block_type == GROUP_HEADER:
+                groups += 1
+            elif block.block_type == TRANSACTION:
+                transaction_type = block.lines[0][:3]
+                transaction_types[transaction_type] = \
+                    transaction_types.get(transaction_type, 0) + 1
+            for line in block.lines:
+                record_type = line[:3]
+                record_types[record_type] = record_types.get(record_type,
+                                                             0) + 1
+    timings.add('read', time.perf_counter() - start)
+
+    stats = OrderedDict()
+    stats['groups'] = groups
+    stats['transactions'] = sum(transaction_types.values())
+    stats['records'] = sum(record_types.values())
+    stats['transaction_types'] = OrderedDict(sorted(
+        transaction_types.items()))
+    stats['record_types'] = OrderedDict(sorted(record_types.items()))
+
+    if args.json:
+        out.write('%s\n' % json.dumps(stats))
+    else:
+        out.write('Groups: %d\n' % stats['groups'])
+        out.write('Transactions: %d\n' % stats['transactions'])
+        for transaction_type, count in stats['transaction_types'].items():
+            out.write('  %s: %d\n' % (transaction_type, count))
+        out.write('Records: %d\n' % stats['records'])
+        for record_type, count in stats['record_types'].items():
+            out.write('  %s: %d\n' % (record_type, count))
+
+    return EXIT_OK
+
+
+def _index(args, timings, out, err):
+    args.issues = 0
+    index = TransmissionIndex()
+    for _ in index_events(index, _read_events(args, timings, err)):
+        pass
+
+    start = time.perf_counter()
+    found = []
+    if args.work:
+        found.append(index.find_work(args.work))
+    if args.iswc:
+        found.append(index.find_iswc(args.iswc))
+    if args.agreement:
+        found.append(index.find_agreement(args.agreement))
+    if args.ipi_name:
+        found.extend(index.find_ipi_name(args.ipi_name))
+    if args.ipi_base:
+        found.extend(index.find_ipi_base(args.ipi_base))
+    if args.ip:
+        found.extend(index.find_ip(args.ip))
+    timings.add('search', time.perf_counter() - start)
+
+    out.write('%d transactions indexed\n' % len(index))
+
+    # Each transaction is printed once, in the order it was found
+    printed = set()
+    for transaction in found:
+        if transaction is None or id(transaction) in printed:
+            continue
+        printed.add(id(transaction))
+
+        header = transaction[0]
+        out.write('Group %s, transaction %s: %s %s\n' % (
+            index.group_id(transaction), header.transaction_sequence_n,
+            header.record_type,
+            getattr(header, 'title', None) or
+            getattr(header, 'submitter_agreement_n', '')))
+
+    return EXIT_OK if printed else EXIT_INVALID
+
+
+def _generate(args, timings, out, err):
+    generator = default_generator(args.seed, nra=args.nra)
+
+    output = _open_output(args)
+    try:
+        start = time.perf_counter()
+        writer = generator.write(output or out, args.works, args.agreements)
+        timings.add('generate', time.perf_counter() - start)
+    finally:
+        if output:
+            output.close()
+
+    if output:
+        out.write('%d transactions, %d records\n' % (
+            writer.transaction_count, writer.record_count))
+
+    return EXIT_OK
+
+
+def _split(args, timings, out, err):
+    splitter = default_splitter(max_transactions=args.max_transactions,
+                                max_bytes=args.max_bytes)
+
+    start = time.perf_counter()
+    files = splitter.split(args.path, args.output, args.first_sequence)
+    timings.add('split', time.perf_counter() - start)
+
+    for split_file in files:
+        out.write('%s: %d transactions, %d bytes\n' % (
+            os.path.basename(split_file.path), split_file.transaction_count,
+            split_file.size))
+
+    return EXIT_OK
+
+
+def _benchmark(args, timings, out, err):
+    baseline = load_report(args.baseline) if args.baseline else None
+
+    suite = BenchmarkSuite(args.sizes, repeat=args.repeat, seed=args.seed,
+                           memory=not args.no_memory, names=args.only,
+                           out=out)
+    report = suite.run()
+    if report.max_rss is not None:
+        out.write('Peak RSS: %.1f MB\n' % (report.max_rss / 1024.0 / 1024.0))
+
+    if args.save:
+        save_report(report, args.save)
+
+    if baseline is None:
+        return EXIT_OK
+
+    regressions = report.compare(baseline, args.threshold)
+    for regression in regressions:
+        err.write('Regression on %s\n' % regression)
+
+    return EXIT_INVALID if regressions else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
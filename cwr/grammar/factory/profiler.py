@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+"""
+Profiling of the grammar rules.
+
+The RuleProfiler is attached to the rules created by the DefaultRuleFactory,
+using the pyparsing debug actions, and measures for each named rule:
+- calls, the times the rule was tried
+- successes, the times it matched
+- failures, the times it did not match, which for the alternatives of an
+  option or the repetitions of a rule means backtracking
+- own time, spent on the rule itself, and cumulative time, including the
+  rules it contains
+
+Rules are identified by their kind and name. The kinds are the rule types
+from the configuration, such as 'transaction_record' or 'group', along with
+'field' for the fields and 'option' for the alternatives between rules.
+
+The results can be printed as a sorted report, or loaded with pstats, as
+the profiler implements create_stats, like cProfile.Profile.
+
+Rules which contain themselves are counted once on each level, so their
+cumulative time includes the nested calls more than once.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Keys for sorting the report
+CALLS = 'calls'
+FAILURES = 'failures'
+OWN = 'own'
+CUMULATIVE = 'cumulative'
+
+_SORT_KEYS = {
+    CALLS: lambda stats: stats.calls,
+    FAILURES: lambda stats: stats.failures,
+    OWN: lambda stats: stats.own_time,
+    CUMULATIVE: lambda stats: stats.cumulative_time
+}
+
+
+class RuleStats(object):
+    """
+    Measures for a single rule.
+    """
+
+    def __init__(self, kind, name):
+        """
+        Constructs a RuleStats.
+
+        :param kind: kind of rule, such as 'field' or 'group'
+        :param name: name of the rule
+        """
+        self._kind = kind
+        self._name = name
+        self.calls = 0
+        self.successes = 0
+        self.own_time = 0
+        self.cumulative_time = 0
+        # Calls and times for each rule calling this one
+        self.callers = {}
+
+    def __str__(self):
+        return '%9d %9d %9d %10.4f %10.4f %9.4f  %s %s' % (
+            self.calls, self.successes, self.failures, self.own_time,
+            self.cumulative_time, self.average_time * 1000, self._kind,
+            self._name)
+
+    @property
+    def kind(self):
+        """
+        Kind of rule, such as 'field' or 'group'.
+
+        :return: the kind
+        """
+        return self._kind
+
+    @property
+    def name(self):
+        """
+        Name of the rule.
+
+        :return: the name
+        """
+        return self._name
+
+    @property
+    def failures(self):
+        """
+        Times the rule did not match.
+
+        :return: the number of failures
+        """
+        return self.calls - self.successes
+
+    @property
+    def average_time(self):
+        """
+        Average cumulative time for each call.
+
+        :return: the time in seconds
+        """
+        if not self.calls:
+            return 0
+        return self.cumulative_time / self.calls
+
+
+class RuleProfiler(object):
+    """
+    Measures the calls and the time spent on each grammar rule.
+
+    The profiler should be given to the DefaultRuleFactory before any rule is
+    created, as it is attached to the rules when building them.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        # Rules being parsed, as [element, stats, start, time on children]
+        self._stack = []
+        # Needed by pstats, filled by create_stats
+        self.stats = {}
+
+    def __str__(self):
+        return self.report()
+
+    @property
+    def rules(self):
+        """
+        The measures for each rule.
+
+        :return: dict mapping (kind, name) tuples to RuleStats
+        """
+        return self._stats
+
+    def attach(self, rule, kind, name):
+        """
+        Attaches the profiler to a rule.
+
+        :param rule: the pyparsing rule
+        :param kind: kind of rule, such as 'field' or 'group'
+        :param name: name of the rule
+        :return: the same rule
+        """
+        key = (kind, name)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = RuleStats(kind, name)
+            self._stats[key] = stats
+
+        def start(instring, loc, element):
+            self._stack.append([element, stats, time.perf_counter(), 0])
+
+        def success(instring, start_loc, end_loc, element, tokens):
+            self._end(element, True)
+
+        def failure(instring, loc, element, error):
+            self._end(element, False)
+
+        rule.setDebugActions(start, success, failure)
+        return rule
+
+    def reset(self):
+        """
+        Discards all the measures.
+        """
+        for stats in self._stats.values():
+            stats.calls = 0
+            stats.successes = 0
+            stats.own_time = 0
+            stats.cumulative_time = 0
+            stats.callers = {}
+        self._stack = []
+
+    def sorted_rules(self, sort=CUMULATIVE, kind=None):
+        """
+        The measures for the rules which were called, sorted in descending
+        order.
+
+        :param sort: key for sorting: 'cumulative', 'own', 'calls' or
+        'failures'
+        :param kind: if set, only the rules of this kind are returned
+        :return: list of RuleStats
+        """
+        if sort not in _SORT_KEYS:
+            raise ValueError('Unknown sort key %s' % sort)
+
+        rules = [stats for stats in self._stats.values()
+                 if stats.calls and (kind is None or stats.kind == kind)]
+        rules.sort(key=_SORT_KEYS[sort], reverse=True)
+        return rules
+
+    def report(self, sort=CUMULATIVE, limit=None, kind=None):
+        """
+        Creates a report with the measures for each rule.
+
+        :param sort: key for sorting: 'cumulative', 'own', 'calls' or
+        'failures'
+        :param limit: maximum number of rules to include
+        :param kind: if set, only the rules of this kind are included
+        :return: the report text
+        """
+        rules = self.sorted_rules(sort, kind)
+        if limit is not None:
+            rules = rules[:limit]
+
+        lines = ['%9s %9s %9s %10s %10s %9s  %s' % (
+            'calls', 'successes', 'failures', 'own (s)', 'cum (s)',
+            'avg (ms)', 'rule')]
+        lines.extend(str(stats) for stats in rules)
+        return '\n'.join(lines)
+
+    def create_stats(self):
+        """
+        Creates the statistics in the format used by pstats.
+
+        Each rule is shown as a function, named after the rule, in a file
+        named after its kind. This allows using pstats.Stats(profiler) to
+        sort, print and store the results.
+        """
+        self.stats = {}
+        for stats in self._stats.values():
+            if not stats.calls:
+                continue
+            callers = {}
+            for caller, (calls, own, cumulative) in stats.callers.items():
+                callers[_function(caller)] = (calls, calls, own, cumulative)
+            self.stats[_function(stats)] = (stats.calls, stats.calls,
+                                            stats.own_time,
+                                            stats.cumulative_time, callers)
+
+    def _end(self, element, matched):
+        now = time.perf_counter()
+
+        # Rules whose end was not received, because of an error which is not
+        # a parsing one, are discarded
+        stack = self._stack
+        while stack and stack[-1][0] is not element:
+            stack.pop()
+        if not stack:
+            return
+
+        element, stats, start, children = stack.pop()
+        elapsed = now - start
+        own = elapsed - children
+
+        stats.calls += 1
+        if matched:
+            stats.successes += 1
+        stats.own_time += own
+        stats.cumulative_time += elapsed
+
+        if stack:
+            parent = stack[-1]
+            parent[3] += elapsed
+
+            caller = stats.callers.get(parent[1])
+            if caller is None:
+                stats.callers[parent[1]] = (1, own, elapsed)
+            else:
+                stats.callers[parent[1]] = (caller[0] + 1, caller[1] + own,
+                                            caller[2] + elapsed)
+
+
+def _function(stats):
+    return stats.kind, 0, stats.name
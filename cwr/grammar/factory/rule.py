@@ -101,9 +101,12 @@ class FieldRuleFactory(RuleFactory):
 
 class DefaultRuleFactory(RuleFactory):
     def __init__(self, record_configs, field_rule_factory,
-                 optional_terminal_rule_decorator, decorators=None):
+                 optional_terminal_rule_decorator, decorators=None,
+                 profiler=None):
         super(DefaultRuleFactory, self).__init__()
         self._debug = False
+        # RuleProfiler attached to the rules, if any
+        self._profiler = profiler
 
         # Rules already created
         self._rules = {}
@@ -147,8 +150,7 @@ class DefaultRuleFactory(RuleFactory):
 
         rule.setName(rule_id)
 
-        if self._debug:
-            rule.setDebug()
+        self._trace(rule, rule_type, rule_id)
         return rule
 
     def _process_rules(self, rules_data, strategy):
@@ -160,7 +162,7 @@ class DefaultRuleFactory(RuleFactory):
             else:
                 rule = self._build_terminal_rule(rule)
 
-                if self._debug:
+                if self._debug and self._profiler is None:
                     rule.setDebug()
 
             sequence.append(rule)
@@ -180,6 +182,13 @@ class DefaultRuleFactory(RuleFactory):
         elif group_type == 'optional':
             group = pp.Optional(self._process_rules(data, pp.And))
 
+        if group is not None and self._profiler is not None:
+            # The name changes the error messages, so it is only set when
+            # profiling
+            name = _config_name(rules)
+            group.setName(name)
+            self._profiler.attach(group, group_type, name)
+
         return group
 
     def _build_terminal_rule(self, rule):
@@ -201,6 +210,8 @@ class DefaultRuleFactory(RuleFactory):
                                                                     rule_id)
 
             rule.setName(rule_id)
+            if self._profiler is not None:
+                self._profiler.attach(rule, 'field', rule_id)
         else:
             rule = self.get_rule(rule_id)
 
@@ -209,6 +220,15 @@ class DefaultRuleFactory(RuleFactory):
 
         return rule
 
+    def _trace(self, rule, kind, name):
+        """
+        Attaches the profiler to a rule, or enables its debug messages.
+        """
+        if self._profiler is not None:
+            self._profiler.attach(rule, kind, name)
+        elif self._debug:
+            rule.setDebug()
+
     @staticmethod
     def _apply_modifiers(rule, modifiers):
         if 'grouped' in modifiers:
@@ -229,3 +249,21 @@ class DefaultRuleFactory(RuleFactory):
                         rule = pp.Optional(pp.ZeroOrMore(rule))
 
         return rule
+
+
+def _config_name(rule_config):
+    """
+    Name for a rule on a configuration, which is its id for single rules. For
+    groups of rules it contains the names of the rules, between parenthesis
+    for sequences and brackets for optional rules.
+    """
+    if not rule_config.rules:
+        return rule_config.rule_name
+
+    names = [_config_name(rule) for rule in rule_config.rules]
+    if rule_config.list_type == 'option':
+        return '(%s)' % '|'.join(names)
+    elif rule_config.list_type == 'optional':
+        return '[%s]' % ' '.join(names)
+    else:
+        return '(%s)' % ' '.join(names)
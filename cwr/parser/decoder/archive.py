@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from cwr.parser.decoder.charset import CharsetReader, detect_encoding
+
+"""
+Reading of compressed CWR files and zip archives.
+
+CWR files are usually exchanged compressed. Instead of extracting them to
+disk, the functions on this module open them as text streams, which are
+decompressed as they are read, and so can be given directly to the
+FileStreamDecoder or the TolerantFileDecoder.
+
+Files compressed with gzip, bzip2 or xz are recognized by their suffix, which
+is removed from the name given to the filename decoder. Zip archives may
+contain several CWR files, each of them being read as a separate source, with
+the name of the member as filename.
+
+If no encoding is given, the files are decoded with the character set
+declared on their header, through a CharsetReader.
+
+The files in an archive can also be decoded on a pool of processes, with
+map_members.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Suffixes of the compressed files
+GZIP = '.gz'
+BZIP2 = '.bz2'
+XZ = '.xz'
+ZIP = '.zip'
+
+_OPENERS = {
+    GZIP: gzip.open,
+    BZIP2: bz2.open,
+    XZ: lzma.open
+}
+
+# Stream decoder used by each worker process
+_worker = None
+
+
+class CWRSource(object):
+    """
+    A CWR file, which may be compressed or inside a zip archive.
+    """
+
+    def __init__(self, path, member=None):
+        """
+        Constructs a CWRSource.
+
+        :param path: path to the file or archive
+        :param member: name of the file inside the zip archive, if any
+        """
+        self._path = path
+        self._member = member
+
+    def __str__(self):
+        if self._member is None:
+            return self._path
+        return '%s:%s' % (self._path, self._member)
+
+    def __repr__(self):
+        return '<class %s>(path=%r, member=%r)' % ('CWRSource', self._path,
+                                                   self._member)
+
+    @property
+    def path(self):
+        """
+        Path to the file or the archive containing it.
+
+        :return: the path
+        """
+        return self._path
+
+    @property
+    def member(self):
+        """
+        Name of the file inside the zip archive.
+
+        :return: the member name, or None if it is not on an archive
+        """
+        return self._member
+
+    @property
+    def filename(self):
+        """
+        Name of the CWR file, to be parsed by the filename decoder.
+
+        :return: the file name, without compression suffix
+        """
+        if self._member is not None:
+            return os.path.basename(self._member)
+
+        name = os.path.basename(self._path)
+        root, suffix = os.path.splitext(name)
+        if suffix.lower() in _OPENERS:
+            return root
+        return name
+
+    @property
+    def extracted_path(self):
+        """
+        Path the file would have if extracted next to the original.
+
+        This is the base for the paths of files created from it, such as its
+        acknowledgement.
+
+        :return: the path
+        """
+        return os.path.join(os.path.dirname(self._path), self.filename)
+
+    def open(self, encoding='latin-1'):
+        """
+        Opens the file as a text stream, decompressing it as it is read.
+
+        Line endings are not translated.
+
+        :param encoding: encoding of the file, if None the character set on
+        the header is used
+        :return: the text stream, which should be closed
+        """
+        raw = self.open_binary()
+        if encoding is None:
+            return CharsetReader(raw)
+        return io.TextIOWrapper(raw, encoding=encoding, newline='')
+
+    def detect_encoding(self):
+        """
+        Finds the codec for the file from the character set on its header.
+
+        :return: the codec name
+        """
+        with self.open_binary() as raw:
+            return detect_encoding(raw.readline())
+
+    def open_binary(self):
+        """
+        Opens the file as a binary stream, decompressing it as it is read.
+
+        :return: the binary stream, which should be closed
+        """
+        if self._member is not None:
+            # The archive stays open until the member is closed
+            with zipfile.ZipFile(self._path) as archive:
+                return archive.open(self._member)
+
+        suffix = os.path.splitext(self._path)[1].lower()
+        opener = _OPENERS.get(suffix, open)
+        return opener(self._path, 'rb')
+
+    def data(self, contents):
+        """
+        Creates the dictionary expected by the decoders.
+
+        :param contents: the file contents, as a string or text stream
+        :return: dictionary with the filename and the contents
+        """
+        return {'filename': self.filename, 'contents': contents}
+
+
+def is_archive(path):
+    """
+    Indicates if a path is a zip archive.
+
+    :param path: the path to check
+    :return: True if it is a zip archive
+    """
+    return path.lower().endswith(ZIP) or (os.path.isfile(path) and
+                                          zipfile.is_zipfile(path))
+
+
+def path_sources(path):
+    """
+    The CWR files on a path, which are all the files in a zip archive, or
+    the file itself otherwise.
+
+    Directories in the archive are ignored.
+
+    :param path: path to the file or archive
+    :return: list of CWRSource
+    """
+    if not is_archive(path):
+        return [CWRSource(path)]
+
+    with zipfile.ZipFile(path) as archive:
+        return [CWRSource(path, info.filename) for info in archive.infolist()
+                if not info.filename.endswith('/')]
+
+
+def open_text(path, encoding='latin-1'):
+    """
+    Opens a single CWR file as a text stream, decompressing it if needed.
+
+    :param path: path to the file, or to an archive with a single file
+    :param encoding: encoding of the file, if None the character set on the
+    header is used
+    :return: tuple with the CWRSource and the opened text stream
+    """
+    sources = path_sources(path)
+    if len(sources) != 1:
+        raise ValueError('%s contains %d files, expected one' %
+                         (path, len(sources)))
+    return sources[0], sources[0].open(encoding)
+
+
+def read_path(path, encoding='latin-1'):
+    """
+    Iterates over the CWR files on a path, returning for each one the
+    dictionary expected by the decoders.
+
+    The contents are a text stream, which is closed when the next file is
+    requested, so each file should be decoded before moving to the next one.
+
+    :param path: path to the file or archive
+    :param encoding: encoding of the files, if None the character set on the
+    header is used
+    :return: an iterator over dictionaries with the filename and contents
+    """
+    for source in path_sources(path):
+        with source.open(encoding) as contents:
+            yield source.data(contents)
+
+
+def map_members(function, path, jobs=None, encoding='latin-1'):
+    """
+    Decodes each of the CWR files on a path, applying a function to its
+    events.
+
+    Files are decoded with a FileStreamDecoder, on a pool of processes, so
+    the function and its results should be picklable. The grammar is built
+    only once for each process.
+
+    :param function: function receiving the CWRSource and an iterator over
+    the events of the file
+    :param path: path to the file or archive
+    :param jobs: number of processes, by default one per CPU
+    :param encoding: encoding of the files, if None the character set on the
+    header is used
+    :return: list with the results for each file, in the archive order
+    """
+    sources = path_sources(path)
+
+    if jobs == 1 or len(sources) < 2:
+        return [_apply(function, source, encoding) for source in sources]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_apply, function, source, encoding)
+                   for source in sources]
+        return [future.result() for future in futures]
+
+
+def _worker_decoder():
+    """
+    Returns the decoder for the current process, creating it on the first
+    file it receives.
+
+    Pools can't run an initializer before Python 3.7, so the decoder is
+    created by the first task, and reused by the next ones.
+    """
+    global _worker
+    if _worker is None:
+        # Imported here, as the stream decoder imports this module
+        from cwr.parser.decoder.stream import default_file_stream_decoder
+        _worker = default_file_stream_decoder()
+    return _worker
+
+
+def _apply(function, source, encoding):
+    with source.open(encoding) as contents:
+        return function(source,
+                        _worker_decoder().decode(source.data(contents)))
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import io
+import re
+
+from cwr.utils.layout import default_record_layouts
+
+"""
+Decoding of CWR files according to the character set on their header.
+
+CWR files are fixed-width, with the columns counted in bytes. Most files are
+ASCII or latin-1, where each character takes a single byte, but the header
+may declare a multi-byte character set, such as UTF-8 or Big5, for the text
+on the non-Roman alphabet records.
+
+Decoding those files as text would shift the columns after each multi-byte
+character, so instead each line is decoded keeping its byte positions:
+- lines with only ASCII bytes, which are most of them, are decoded at once
+- on other lines only the fields containing non-ASCII bytes are decoded with
+  the character set, being padded with spaces up to their size in bytes
+
+This way the grammar, which reads the columns as characters, finds each field
+where expected, and the trailing spaces are removed by the fields as usual.
+
+The CharsetReader reads a binary stream this way, detecting the character set
+from the HDR record.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Encoding used when the header does not declare a character set
+DEFAULT_ENCODING = 'latin-1'
+
+# Python codecs for the CWR character sets
+_CHARACTER_SETS = {
+    'UTF-8': 'utf-8',
+    'BIG5': 'big5',
+    'GB': 'gbk'
+}
+
+_BOM = codecs.BOM_UTF8
+
+# Any byte outside of ASCII
+_NON_ASCII = re.compile(b'[^\x00-\x7f]')
+
+# Transcoder used when none is received, created only once
+_transcoder = None
+
+
+def charset_encoding(character_set, default=DEFAULT_ENCODING):
+    """
+    Python codec for a CWR character set.
+
+    Unicode code points, such as 'U+0400', declare a Unicode text, which is
+    read as UTF-8.
+
+    :param character_set: the character set on the header
+    :param default: codec to use if there is no character set
+    :return: the codec name
+    """
+    if not character_set:
+        return default
+
+    character_set = character_set.strip().upper()
+    if not character_set:
+        return default
+    if character_set.startswith('U+'):
+        return 'utf-8'
+    return _CHARACTER_SETS.get(character_set, default)
+
+
+def detect_encoding(header, default=DEFAULT_ENCODING):
+    """
+    Finds the codec for a file from its first line.
+
+    :param header: the first line of the file, as bytes
+    :param default: codec to use if there is no character set
+    :return: the codec name
+    """
+    start = header.find(b'HDR')
+    if start < 0:
+        return default
+
+    layout = default_transcoder().layouts['HDR']
+    field = layout.field('character_set')
+    value = header[start + field.start:start + field.end]
+    return charset_encoding(value.decode('ascii', 'replace'), default)
+
+
+def default_transcoder():
+    """
+    The FieldTranscoder for the records in the CWR standard.
+
+    It is created only once, as building the layouts reads the
+    configuration.
+
+    :return: the FieldTranscoder
+    """
+    global _transcoder
+    if _transcoder is None:
+        _transcoder = FieldTranscoder(default_record_layouts())
+    return _transcoder
+
+
+class FieldTranscoder(object):
+    """
+    Decodes lines keeping each field on its byte columns.
+    """
+
+    def __init__(self, layouts):
+        """
+        Constructs a FieldTranscoder.
+
+        :param layouts: dict mapping record types to their RecordLayout
+        """
+        self._layouts = layouts
+        # Columns where each field begins, for each record type
+        self._cuts = {}
+        for record_type, layout in layouts.items():
+            cuts = set()
+            for field in layout.fields:
+                if field.start is not None:
+                    cuts.add(field.start)
+                    cuts.add(field.end)
+            cuts.discard(0)
+            self._cuts[record_type.encode('ascii')] = tuple(sorted(cuts))
+
+    @property
+    def layouts(self):
+        """
+        The record layouts.
+
+        :return: dict mapping record types to their RecordLayout
+        """
+        return self._layouts
+
+    def decode(self, line, encoding):
+        """
+        Decodes a line, keeping its fields on the same columns.
+
+        Bytes which are not valid for the encoding are replaced.
+
+        :param line: the line, as bytes, without line break
+        :param encoding: the codec for the line
+        :return: the decoded line
+        """
+        if _is_ascii(line):
+            return line.decode('ascii')
+
+        cuts = self._cuts.get(line[:3])
+        if cuts is None:
+            # Unknown record, its columns can't be kept
+            return line.decode(encoding, 'replace')
+
+        parts = []
+        size = len(line)
+        previous = 0
+        for cut in cuts + (size,):
+            if cut > size:
+                cut = size
+            if cut <= previous:
+                continue
+
+            segment = line[previous:cut]
+            if _is_ascii(segment):
+                parts.append(segment.decode('ascii'))
+            else:
+                parts.append(segment.decode(encoding, 'replace').ljust(
+                    len(segment)))
+            previous = cut
+
+        return ''.join(parts)
+
+
+class CharsetReader(object):
+    """
+    Reads a binary stream as the lines of a CWR file, decoding them with the
+    character set declared on the header.
+
+    It can be iterated over, returning the lines with their line breaks, the
+    same as a text file opened without translating them, and so it can be
+    used as the contents for the decoders. It should be closed, which closes
+    the stream.
+
+    Single byte encodings are decoded directly, as their columns can't be
+    shifted.
+    """
+
+    def __init__(self, stream, encoding=None, default=DEFAULT_ENCODING,
+                 transcoder=None):
+        """
+        Constructs a CharsetReader.
+
+        :param stream: the binary stream
+        :param encoding: codec to use, if None it is read from the header
+        :param default: codec to use if the header does not declare one
+        :param transcoder: FieldTranscoder for the lines, by default the one
+        for the CWR standard
+        """
+        self._stream = stream
+        self._encoding = encoding
+        self._default = default
+        self._transcoder = transcoder
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        lines = iter(self._stream)
+
+        first = next(lines, None)
+        if first is None:
+            return
+
+        # Anything before the header, such as a byte order mark, is skipped
+        start = first.find(b'HDR')
+        if start > 0:
+            first = first[start:]
+        elif first.startswith(_BOM):
+            first = first[len(_BOM):]
+
+        if self._encoding is None:
+            self._encoding = detect_encoding(first, self._default)
+
+        if _single_byte(self._encoding):
+            encoding = self._encoding
+            yield first.decode(encoding, 'replace')
+            for line in lines:
+                yield line.decode(encoding, 'replace')
+            return
+
+        transcoder = self._transcoder
+        if transcoder is None:
+            transcoder = default_transcoder()
+        encoding = self._encoding
+        decode = transcoder.decode
+        for line in _chain(first, lines):
+            # The line break is kept, outside of the fields
+            content = line.rstrip(b'\r\n')
+            yield decode(content, encoding) + \
+                line[len(content):].decode('ascii')
+
+    @property
+    def encoding(self):
+        """
+        The codec used for the lines, which is known once the first line is
+        read.
+
+        :return: the codec name, or None if not known yet
+        """
+        return self._encoding
+
+    def read(self):
+        """
+        Reads the whole file.
+
+        :return: the file contents
+        """
+        return ''.join(self)
+
+    def close(self):
+        """
+        Closes the stream.
+        """
+        self._stream.close()
+
+
+def decode_contents(contents, encoding=None, default=DEFAULT_ENCODING):
+    """
+    Decodes the contents of a CWR file with the character set declared on
+    its header.
+
+    :param contents: the file contents, as bytes
+    :param encoding: codec to use, if None it is read from the header
+    :param default: codec to use if the header does not declare one
+    :return: the decoded contents
+    """
+    with CharsetReader(io.BytesIO(contents), encoding, default) as reader:
+        return reader.read()
+
+
+def _single_byte(encoding):
+    return codecs.lookup(encoding).name in ('iso8859-1', 'ascii')
+
+
+def _chain(first, lines):
+    yield first
+    for line in lines:
+        yield line
+
+
+def _is_ascii(data):
+    """
+    Indicates if the bytes are all ASCII.
+    """
+    return _NON_ASCII.search(data) is None
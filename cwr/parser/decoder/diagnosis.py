@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cwr.parser.decoder.stream import TRANSACTION, read_blocks, read_lines
+from cwr.parser.decoder.tolerant import default_tolerant_file_decoder
+
+"""
+Localization of the errors on files which can't be decoded.
+
+When the FileDecoder fails, the exception usually points to the beginning of
+the transaction or group where the grammar stopped matching, instead of to
+the wrong field. To find the actual errors the file is split into blocks,
+each of them being a control record or a full transaction, and each block is
+parsed independently with the same rules used for decoding. The blocks which
+fail are diagnosed by the TolerantFileDecoder, which finds the records and
+fields which are wrong.
+
+As the blocks are independent they are parsed on a pool of processes. They
+are sent in chunks, and only the issues are sent back, so most of the time
+is spent parsing. Only a few chunks for each worker are sent at a time, so
+the file is read as the blocks are parsed.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Decoder used by each worker process
+_decoder = None
+
+
+class DiagnosisReport(object):
+    """
+    The errors found on a file, along with the size of the file.
+    """
+
+    def __init__(self):
+        self._issues = []
+        self._blocks = 0
+        self._transactions = 0
+        self._seconds = 0
+
+    def __str__(self):
+        lines = [str(issue) for issue in self._issues]
+        lines.append('%d blocks, %d transactions, %d issues, %.3f sec' % (
+            self._blocks, self._transactions, len(self._issues),
+            self._seconds))
+        return '\n'.join(lines)
+
+    @property
+    def valid(self):
+        """
+        Indicates if all the blocks could be decoded.
+
+        :return: True if there are no issues
+        """
+        return not self._issues
+
+    @property
+    def issues(self):
+        """
+        The errors found, in the order of the file.
+
+        :return: list of DecodeIssue
+        """
+        return self._issues
+
+    @property
+    def blocks(self):
+        """
+        Number of blocks parsed.
+
+        :return: the number of blocks
+        """
+        return self._blocks
+
+    @property
+    def transactions(self):
+        """
+        Number of transactions parsed.
+
+        :return: the number of transactions
+        """
+        return self._transactions
+
+    @property
+    def seconds(self):
+        """
+        Time spent parsing the file.
+
+        :return: the time in seconds
+        """
+        return self._seconds
+
+    @seconds.setter
+    def seconds(self, value):
+        self._seconds = value
+
+    def add(self, blocks, issues):
+        """
+        Adds the results for a chunk of blocks.
+
+        :param blocks: the blocks parsed
+        :param issues: the issues found on them
+        """
+        self._blocks += len(blocks)
+        self._transactions += sum(1 for block in blocks
+                                  if block.block_type == TRANSACTION)
+        self._issues.extend(issues)
+
+
+class FailureLocator(object):
+    """
+    Finds the records and fields which can't be decoded on a file, parsing
+    its blocks on a pool of processes.
+
+    The pool is kept open between files, so the grammar is built only once
+    for each worker. It should be closed with close(), or by using the
+    locator as a context manager.
+    """
+
+    def __init__(self, jobs=None, chunk_size=500):
+        """
+        Constructs a FailureLocator.
+
+        With a single job the blocks are parsed on the current process.
+
+        :param jobs: number of processes, by default one per CPU
+        :param chunk_size: number of blocks sent on each message
+        """
+        self._jobs = jobs
+        self._chunk_size = chunk_size
+        self._executor = None
+        self._decoder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def locate(self, contents):
+        """
+        Parses all the blocks of a file, reporting the ones which fail.
+
+        :param contents: the file contents, as a string or lines iterable
+        :return: a DiagnosisReport
+        """
+        report = DiagnosisReport()
+        start = time.perf_counter()
+
+        chunks = _chunks(read_blocks(read_lines(contents)), self._chunk_size)
+
+        if self._jobs == 1:
+            if self._decoder is None:
+                self._decoder = default_tolerant_file_decoder()
+            for chunk in chunks:
+                report.add(chunk, _diagnose(self._decoder, chunk))
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._jobs)
+
+            # The chunks are sent as the workers take them, and the results
+            # are read in the same order they were sent
+            window = 2 * (self._jobs or os.cpu_count() or 1)
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, self._executor.submit(_locate,
+                                                             chunk)))
+                if len(pending) >= window:
+                    sent, future = pending.popleft()
+                    report.add(sent, future.result())
+            while pending:
+                sent, future = pending.popleft()
+                report.add(sent, future.result())
+
+        report.seconds = time.perf_counter() - start
+
+        return report
+
+    def close(self):
+        """
+        Shuts down the pool of processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def locate_failures(data, jobs=None, chunk_size=500):
+    """
+    Finds the records and fields which can't be decoded on a file.
+
+    It requires a dictionary with the filename and the contents, the same as
+    the FileDecoder.
+
+    :param data: dictionary with the data to parse
+    :param jobs: number of processes, by default one per CPU
+    :param chunk_size: number of blocks sent on each message
+    :return: a DiagnosisReport
+    """
+    with FailureLocator(jobs, chunk_size) as locator:
+        return locator.locate(data['contents'])
+
+
+def _chunks(blocks, size):
+    chunk = []
+    for block in blocks:
+        chunk.append(block)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _diagnose(decoder, blocks):
+    issues = []
+    for block in blocks:
+        issues.extend(decoder.diagnose_block(block))
+    return issues
+
+
+def _worker_decoder():
+    """
+    Returns the decoder for a worker process, creating it on the first chunk
+    it receives.
+
+    Pools can't run an initializer before Python 3.7, so the decoder is
+    created by the first task, and reused by the next ones.
+    """
+    global _decoder
+    if _decoder is None:
+        _decoder = default_tolerant_file_decoder()
+    return _decoder
+
+
+def _locate(blocks):
+    return _diagnose(_worker_decoder(), blocks)
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 import logging
+import threading
+
+import pyparsing as pp
 
 from cwr.parser.decoder.common import GrammarDecoder
 from config_cwr.accessor import CWRConfiguration
@@ -7,6 +10,8 @@ from cwr.grammar.factory.rule import FieldRuleFactory
 from data_cwr.accessor import CWRTables
 from cwr.grammar.factory.rule import DefaultRuleFactory
 from cwr.file import CWRFile, FileTag
+from cwr.utils.layout import default_field_configs
+from cwr.utils.progress import DECODE, Instrumented
 from cwr.grammar.factory.decorator import GroupRuleDecorator, \
     OptionalFieldRuleDecorator, RecordRuleDecorator, \
     TransactionRecordRuleDecorator
@@ -165,18 +170,16 @@ def default_adapters():
     return adapters
 
 
-def default_grammar_factory():
-    config = CWRConfiguration()
-
-    data = config.load_field_config('table')
-    data.update(config.load_field_config('common'))
+def default_grammar_factory(profiler=None):
+    """
+    Creates the factory for the grammar rules of the default standard.
 
-    field_values = CWRTables()
+    :param profiler: RuleProfiler to attach to the rules, if any
+    :return: the DefaultRuleFactory
+    """
+    config = CWRConfiguration()
 
-    for entry in list(data.values()):
-        if 'source' in entry:
-            values_id = entry['source']
-            entry['values'] = field_values.get_data(values_id)
+    data = default_field_configs(config)
 
     factory_field = FieldRuleFactory(data, default_adapters())
 
@@ -199,7 +202,8 @@ def default_grammar_factory():
         rules,
         factory_field,
         optional_decorator,
-        decorators
+        decorators,
+        profiler
     )
 
 
@@ -225,6 +229,11 @@ def default_filename_grammar_factory():
     )
 
 
+# Rules for the transactions, reported to the progress hooks
+_TRANSACTION_RULES = ('agreement_transaction', 'work_transaction',
+                      'acknowledgement_transaction')
+
+
 def _process_rules(rules):
     processed = {}
     for rule in rules:
@@ -234,18 +243,22 @@ def _process_rules(rules):
     return processed
 
 
-def default_file_decoder():
+def default_file_decoder(profiler=None):
     """
     Creates a decoder which parses a CWR file, creating a CWRFile class
     instance from it.
 
+    :param profiler: RuleProfiler to attach to the grammar rules, if any
     :return: a CWR file decoder for the default standard
     """
-    transmission_rule = default_grammar_factory().get_rule('transmission')
+    transmission_rule = default_grammar_factory(profiler).get_rule(
+        'transmission')
 
     return FileDecoder(
         transmission_rule,
-        default_filename_decoder()
+        default_filename_decoder(),
+        'group_info',
+        _TRANSACTION_RULES
     )
 
 
@@ -264,7 +277,7 @@ def default_filename_decoder():
     return FileNameDecoder(grammar_old, grammar_new)
 
 
-class FileDecoder(Decoder):
+class FileDecoder(Decoder, Instrumented):
     """
     Parses a CWR file, both its contents and the file name, to create a CWRFile
      instance.
@@ -273,9 +286,15 @@ class FileDecoder(Decoder):
     file's name.
 
     For this it will use a second decoder, which will take care of the filename.
+
+    If the ids of the rules for the groups and transactions are received, the
+    progress is reported to the hooks added to the decoder, after each of them
+    is parsed. The grammar may be shared with other decoders, as its rules are
+    hooked only once.
     """
 
-    def __init__(self, grammar, filename_decoder):
+    def __init__(self, grammar, filename_decoder, group_rule_id=None,
+                 transaction_rule_ids=()):
         super(FileDecoder, self).__init__()
 
         # Logger
@@ -284,18 +303,64 @@ class FileDecoder(Decoder):
         self._filename_decoder = filename_decoder
         self._file_decoder = GrammarDecoder(grammar)
 
+        # Tracker for the file being decoded, if there are hooks, and the
+        # characters removed from the start of the contents
+        self._progress = None
+        self._offset = 0
+        # Start of the last group and transaction reported
+        self._group_loc = -1
+        self._transaction_loc = -1
+        # Rules are copied when composing the grammar, so all the copies are
+        # searched for
+        _hook_rules(_find_rules(grammar, (group_rule_id,)), _parsed_group)
+        _hook_rules(_find_rules(grammar, transaction_rule_ids),
+                    _parsed_transaction)
+
     def decode(self, data):
         """
         Parses the file, creating a CWRFile from it.
 
         It requires a dictionary with two values:
         - filename, containing the filename
-        - contents, containing the file contents
+        - contents, containing the file contents, as a string or text stream
+
+        As the whole file is parsed at once, streams are read completely.
 
         :param data: dictionary with the data to parse
         :return: a CWRFile instance
         """
-        file_name = self._filename_decoder.decode(data['filename'])
+        if not isinstance(data['contents'], str):
+            data['contents'] = data['contents'].read()
+
+        size = len(data['contents'])
+        tracker = self._tracker(DECODE, size)
+        if tracker is None:
+            return self._decode(data)
+
+        tracker.start()
+        self._progress = tracker
+        self._offset = 0
+        self._group_loc = -1
+        self._transaction_loc = -1
+        previous = getattr(_decoding, 'decoder', None)
+        _decoding.decoder = self
+        try:
+            cwr_file = self._decode(data)
+        finally:
+            _decoding.decoder = previous
+            self._progress = None
+        tracker.end(size)
+
+        return cwr_file
+
+    def _decode(self, data):
+        tracker = self._progress
+
+        if tracker is None:
+            file_name = self._filename_decoder.decode(data['filename'])
+        else:
+            with tracker.stage('filename'):
+                file_name = self._filename_decoder.decode(data['filename'])
 
         file_data = data['contents']
         i = 0
@@ -304,11 +369,114 @@ class FileDecoder(Decoder):
             i += 1
         if i > 0:
             data['contents'] = file_data[i:]
+            self._offset = i
 
-        transmission = self._file_decoder.decode(data['contents'])[0]
+        if tracker is None:
+            transmission = self._file_decoder.decode(data['contents'])[0]
+        else:
+            with tracker.stage('parse'):
+                transmission = self._file_decoder.decode(data['contents'])[0]
 
         return CWRFile(file_name, transmission)
 
+    def _parsed_transaction(self, instring, loc, tokens):
+        tracker = self._progress
+        # Transactions parsed again after backtracking were already reported
+        if tracker is not None and loc > self._transaction_loc:
+            self._transaction_loc = loc
+            end = _skip_lines(instring, loc, len(tokens))
+            tracker.transaction(len(tokens), self._offset + end)
+
+    def _parsed_group(self, instring, loc, tokens):
+        tracker = self._progress
+        if tracker is not None and loc > self._group_loc:
+            self._group_loc = loc
+            # The group trailer follows the last transaction, or the header
+            start = max(loc, tracker.processed_bytes - self._offset)
+            if start == loc:
+                end = _skip_lines(instring, start, 2)
+            else:
+                end = _skip_lines(instring, start, 1)
+            tracker.group(self._offset + end)
+
+
+# Decoder reporting the progress of the file parsed on each thread
+_decoding = threading.local()
+
+
+def _parsed_group(instring, loc, tokens):
+    decoder = getattr(_decoding, 'decoder', None)
+    if decoder is not None:
+        decoder._parsed_group(instring, loc, tokens)
+
+
+def _parsed_transaction(instring, loc, tokens):
+    decoder = getattr(_decoding, 'decoder', None)
+    if decoder is not None:
+        decoder._parsed_transaction(instring, loc, tokens)
+
+
+def _hook_rules(rules, action):
+    """
+    Adds a parse action to the rules, unless it was already added.
+
+    Parse actions change the rules for good, and grammars may be shared by
+    several decoders, so the action just notifies the decoder parsing on the
+    current thread, and it is added only once to each rule.
+
+    :param rules: rules to hook
+    :param action: parse action to add
+    """
+    for rule in rules:
+        hooked = getattr(rule, '_progress_actions', ())
+        if action not in hooked:
+            rule.addParseAction(action)
+            rule._progress_actions = hooked + (action,)
+
+
+def _find_rules(grammar, rule_ids):
+    """
+    Searches the grammar for the rules with the received ids.
+
+    :param grammar: the rule to search
+    :param rule_ids: the ids of the rules to find
+    :return: list with the rules found
+    """
+    rule_ids = frozenset(rule_id for rule_id in rule_ids if rule_id)
+    found = []
+    if not rule_ids:
+        return found
+
+    visited = set()
+    pending = [grammar]
+    while pending:
+        rule = pending.pop()
+        if id(rule) in visited:
+            continue
+        visited.add(id(rule))
+
+        if getattr(rule, 'name', None) in rule_ids:
+            found.append(rule)
+
+        pending.extend(getattr(rule, 'exprs', ()))
+        contained = getattr(rule, 'expr', None)
+        if isinstance(contained, pp.ParserElement):
+            pending.append(contained)
+
+    return found
+
+
+def _skip_lines(instring, loc, lines):
+    """
+    Position after a number of lines, starting on the received one.
+    """
+    for _ in range(lines):
+        loc = instring.find('\n', loc)
+        if loc < 0:
+            return len(instring)
+        loc += 1
+    return loc
+
 
 class FileNameDecoder(Decoder):
     """
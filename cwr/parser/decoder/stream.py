@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+import io
+
+import pyparsing as pp
+
+from cwr.file import CWRFile
+from cwr.group import Group
+from cwr.parser.decoder.archive import read_path
+from cwr.parser.decoder.common import Decoder
+from cwr.parser.decoder.file import default_grammar_factory, \
+    default_filename_decoder
+from cwr.transmission import Transmission
+
+"""
+Classes for decoding a CWR file as a stream, one transaction at a time.
+
+The FileDecoder applies the grammar to the whole file at once, which means the
+complete file contents and the complete Transmission have to be kept in memory.
+The decoders on this module split the file into blocks instead, each of them
+being a control record or a full transaction, and apply the grammar to each
+block independently.
+
+The result is a sequence of events, each one being a tuple with the event type
+and the decoded value:
+- ('file_tag', FileTag)
+- ('transmission_header', TransmissionHeader)
+- ('group_header', GroupHeader)
+- ('transaction', list of TransactionRecord)
+- ('group_trailer', GroupTrailer)
+- ('transmission_trailer', TransmissionTrailer)
+
+Transactions are detected at line level. Inside a group, a new transaction
+begins with each record of the same type as the group's transaction type.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Event types
+FILE_TAG = 'file_tag'
+TRANSMISSION_HEADER = 'transmission_header'
+GROUP_HEADER = 'group_header'
+TRANSACTION = 'transaction'
+GROUP_TRAILER = 'group_trailer'
+TRANSMISSION_TRAILER = 'transmission_trailer'
+
+_control_blocks = {
+    'HDR': TRANSMISSION_HEADER,
+    'GRH': GROUP_HEADER,
+    'GRT': GROUP_TRAILER,
+    'TRL': TRANSMISSION_TRAILER
+}
+
+
+def default_file_stream_decoder(profiler=None):
+    """
+    Creates a decoder which parses a CWR file as a stream of events.
+
+    :param profiler: RuleProfiler to attach to the grammar rules, if any
+    :return: a CWR file stream decoder for the default standard
+    """
+    return FileStreamDecoder(default_grammar_factory(profiler),
+                             default_filename_decoder())
+
+
+def file_events(cwr_file):
+    """
+    Creates the same events a FileStreamDecoder would return from an already
+    decoded CWRFile.
+
+    :param cwr_file: the CWRFile to read
+    :return: an iterator over (event type, value) tuples
+    """
+    yield FILE_TAG, cwr_file.tag
+
+    transmission = cwr_file.transmission
+    yield TRANSMISSION_HEADER, transmission.header
+    for group in transmission.groups:
+        yield GROUP_HEADER, group.group_header
+        for transaction in group.transactions:
+            yield TRANSACTION, transaction
+        yield GROUP_TRAILER, group.group_trailer
+    yield TRANSMISSION_TRAILER, transmission.trailer
+
+
+def events_file(events):
+    """
+    Creates a CWRFile from the events returned by a FileStreamDecoder.
+
+    This is the opposite of file_events, and keeps the whole file in memory.
+
+    :param events: iterable of (event type, value) tuples
+    :return: the CWRFile
+    """
+    tag = None
+    header = None
+    trailer = None
+    groups = []
+    group = None
+    for event, value in events:
+        if event == FILE_TAG:
+            tag = value
+        elif event == TRANSMISSION_HEADER:
+            header = value
+        elif event == GROUP_HEADER:
+            group = Group(value, None, [])
+            groups.append(group)
+        elif event in (TRANSACTION, GROUP_TRAILER):
+            if group is None:
+                # Transactions outside of any group
+                group = Group(None, None, [])
+                groups.append(group)
+            if event == TRANSACTION:
+                group.transactions.append(value)
+            else:
+                group.group_trailer = value
+                group = None
+        elif event == TRANSMISSION_TRAILER:
+            trailer = value
+
+    return CWRFile(tag, Transmission(header, trailer, groups))
+
+
+class LineBlock(object):
+    """
+    Lines from a CWR file which are to be parsed together.
+
+    This is either a single control record, or all the records of a
+    transaction.
+    """
+
+    def __init__(self, block_type, line_n):
+        """
+        Constructs a LineBlock.
+
+        :param block_type: type of block, one of the event types
+        :param line_n: number of the block's first line, starting with 1
+        """
+        self.block_type = block_type
+        self.line_n = line_n
+        self.lines = []
+        # Number of each line, as empty lines are skipped
+        self.line_numbers = []
+
+    def append(self, line, line_n):
+        """
+        Adds a line to the block.
+
+        :param line: the line to add
+        :param line_n: number of the line on the file, starting with 1
+        """
+        self.lines.append(line)
+        self.line_numbers.append(line_n)
+
+    def __repr__(self):
+        return '<class %s>(block_type=%r, line_n=%r, lines=%r)' % (
+            self.__class__.__name__, self.block_type, self.line_n,
+            len(self.lines))
+
+    @property
+    def text(self):
+        """
+        The block lines joined into a single string.
+
+        :return: the text to parse
+        """
+        return '\n'.join(self.lines)
+
+
+def read_lines(contents):
+    """
+    Iterates over the lines of a CWR file, without the new line characters.
+
+    The contents can be a string or any iterable returning lines, such as an
+    opened file.
+
+    Carriage returns are kept, the same as when parsing the whole file with
+    the FileDecoder, as the grammar may take them as part of the last field on
+    lines which are one column short.
+
+    Any character before the 'HDR' record on the first line is skipped, as
+    some files begin with a byte order mark.
+
+    :param contents: the file contents
+    :return: an iterator over the lines
+    """
+    if isinstance(contents, str):
+        contents = io.StringIO(contents, newline='')
+
+    first = True
+    for line in contents:
+        line = line.rstrip('\n')
+        if first:
+            first = False
+            i = line.find('HDR')
+            if i > 0:
+                line = line[i:]
+        yield line
+
+
+def read_blocks(lines):
+    """
+    Splits the lines of a CWR file into blocks of lines to be parsed.
+
+    Empty lines are ignored, but they are counted when numbering the lines.
+
+    :param lines: iterable with the file lines, without new line characters
+    :return: an iterator over LineBlock instances
+    """
+    transaction_type = None
+    block = None
+    line_n = 0
+    for line in lines:
+        line_n += 1
+        if not line.strip():
+            continue
+
+        record_type = line[:3]
+        if record_type in _control_blocks:
+            if block:
+                yield block
+                block = None
+
+            control = LineBlock(_control_blocks[record_type], line_n)
+            control.append(line, line_n)
+            yield control
+
+            if record_type == 'GRH':
+                transaction_type = line[3:6]
+            elif record_type == 'GRT':
+                transaction_type = None
+        else:
+            if block is None or record_type == transaction_type:
+                if block:
+                    yield block
+                block = LineBlock(TRANSACTION, line_n)
+            block.append(line, line_n)
+
+    if block:
+        yield block
+
+
+class FileStreamDecoder(Decoder):
+    """
+    Parses a CWR file, returning an iterator over the events found on it.
+
+    As with the FileDecoder, a dictionary with the filename and the contents
+    is expected. But in this case the contents can be an opened file, or any
+    other iterable returning the lines, which will be read only as the events
+    are consumed.
+    """
+
+    def __init__(self, grammar_factory, filename_decoder):
+        super(FileStreamDecoder, self).__init__()
+
+        self._filename_decoder = filename_decoder
+
+        group_trailer = pp.MatchFirst(
+            [grammar_factory.get_rule('group_trailer_base'),
+             grammar_factory.get_rule('group_trailer_short')])
+
+        transaction = pp.MatchFirst(
+            [grammar_factory.get_rule('agreement_transaction'),
+             grammar_factory.get_rule('work_transaction'),
+             grammar_factory.get_rule('acknowledgement_transaction')])
+
+        self._rules = {
+            TRANSMISSION_HEADER: grammar_factory.get_rule(
+                'transmission_header'),
+            GROUP_HEADER: grammar_factory.get_rule('group_header'),
+            TRANSACTION: transaction,
+            GROUP_TRAILER: group_trailer,
+            TRANSMISSION_TRAILER: grammar_factory.get_rule(
+                'transmission_trailer')
+        }
+
+    def decode(self, data):
+        """
+        Parses the file, returning an iterator over its events.
+
+        It requires a dictionary with two values:
+        - filename, containing the filename
+        - contents, containing the file contents, as a string or lines iterable
+
+        The first event will always contain the FileTag. If a block can't be
+        parsed, the ParseException will be raised when reaching it.
+
+        :param data: dictionary with the data to parse
+        :return: an iterator over (event type, value) tuples
+        """
+        yield FILE_TAG, self._filename_decoder.decode(data['filename'])
+
+        for block in read_blocks(read_lines(data['contents'])):
+            yield block.block_type, self.decode_block(block)
+
+    def decode_path(self, path, encoding='latin-1'):
+        """
+        Parses the files on a path, which may be compressed or a zip archive,
+        returning an iterator over their events.
+
+        The files are decompressed as they are parsed. For archives, the
+        events of each file follow those of the previous one, each file
+        beginning with its FileTag.
+
+        :param path: path to the file or archive
+        :param encoding: encoding of the files, if None the character set on
+        the header is used
+        :return: an iterator over (event type, value) tuples
+        """
+        for data in read_path(path, encoding):
+            for event in self.decode(data):
+                yield event
+
+    def decode_block(self, block):
+        """
+        Parses a single block of lines.
+
+        For transactions a list with the records is returned, for control
+        blocks the record instance.
+
+        :param block: the LineBlock to parse
+        :return: the decoded value
+        """
+        result = self._rules[block.block_type].parseString(block.text,
+                                                           parseAll=True)
+
+        if block.block_type == TRANSACTION:
+            return list(result)
+        else:
+            return result[0]
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+
+import pyparsing as pp
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.file import CWRFile
+from cwr.group import Group
+from cwr.parser.decoder.common import Decoder
+from cwr.parser.decoder.file import default_grammar_factory, \
+    default_filename_decoder
+from cwr.parser.decoder.stream import FileStreamDecoder, FILE_TAG, \
+    TRANSMISSION_HEADER, GROUP_HEADER, TRANSACTION, GROUP_TRAILER, \
+    TRANSMISSION_TRAILER, read_blocks, read_lines
+from cwr.transmission import Transmission
+from cwr.utils.layout import default_record_layouts
+
+"""
+Error tolerant decoding of CWR files.
+
+The FileDecoder raises an exception on the first error, losing the whole
+file. The decoder on this module parses the file as a stream of blocks
+instead, each of them being a control record or a full transaction. When a
+block can't be parsed it is skipped, and decoding resumes on the next block,
+so an error loses at most one transaction.
+
+For each block which fails, its lines are parsed again one by one with the
+rule for their record type. This tells which records are wrong, and the
+column where the rule failed, which the record layout maps to a field. If
+all the records are valid, the error is in the structure of the
+transaction, such as a missing or misplaced record.
+
+The result contains the file with all the blocks which could be decoded,
+along with a DecodeIssue for each error.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Event type for the blocks which can't be decoded
+ERROR = 'error'
+
+
+def default_tolerant_file_decoder(profiler=None):
+    """
+    Creates an error tolerant decoder for the default CWR standard.
+
+    :param profiler: RuleProfiler to attach to the grammar rules, if any
+    :return: a TolerantFileDecoder for the default standard
+    """
+    record_configs = CWRConfiguration().load_record_config('common')
+
+    return TolerantFileDecoder(default_grammar_factory(profiler),
+                               default_filename_decoder(),
+                               record_rule_ids(record_configs),
+                               default_record_layouts())
+
+
+def record_rule_ids(record_configs):
+    """
+    Finds the ids of the grammar rules for each record type.
+
+    Some record types, such as GRT, have several rules.
+
+    :param record_configs: the records configuration
+    :return: a dict mapping each record type to a list with the rule ids
+    """
+    rules = {}
+    for record_config in record_configs:
+        if 'head' not in record_config:
+            continue
+        for record_type in record_config.head:
+            rules.setdefault(record_type, []).append(record_config.id)
+    return rules
+
+
+class DecodeIssue(object):
+    """
+    A record, or transaction, which could not be decoded.
+    """
+
+    def __init__(self, line_n, record_type, text, message, field=None):
+        """
+        Constructs a DecodeIssue.
+
+        :param line_n: number of the line, from 1
+        :param record_type: type of the record on the line
+        :param text: the line as it is on the file
+        :param message: description of the error
+        :param field: name of the field which failed, if it is known
+        """
+        self._line_n = line_n
+        self._record_type = record_type
+        self._text = text
+        self._message = message
+        self._field = field
+
+    def __repr__(self):
+        return '<class %s>(line_n=%r, record_type=%r, field=%r, ' \
+               'message=%r)' % (self.__class__.__name__, self._line_n,
+                                self._record_type, self._field,
+                                self._message)
+
+    def __str__(self):
+        if self._field:
+            return 'Line %d (%s), field %s: %s' % (
+                self._line_n, self._record_type, self._field, self._message)
+        return 'Line %d (%s): %s' % (self._line_n, self._record_type,
+                                     self._message)
+
+    @property
+    def line_n(self):
+        """
+        Number of the line, beginning at 1.
+
+        For errors on the structure of a transaction, this is the first line
+        of the transaction.
+
+        :return: the line number
+        """
+        return self._line_n
+
+    @property
+    def record_type(self):
+        """
+        Type of the record on the line.
+
+        :return: the record type
+        """
+        return self._record_type
+
+    @property
+    def text(self):
+        """
+        The line as it is on the file.
+
+        :return: the raw line
+        """
+        return self._text
+
+    @property
+    def message(self):
+        """
+        Description of the error.
+
+        :return: the error message
+        """
+        return self._message
+
+    @property
+    def field(self):
+        """
+        Name of the field which failed, or None if the error is not on a
+        single field.
+
+        :return: the field name
+        """
+        return self._field
+
+
+class DecodeResult(object):
+    """
+    The result of decoding a file with errors.
+    """
+
+    def __init__(self, cwr_file, issues):
+        """
+        Constructs a DecodeResult.
+
+        :param cwr_file: CWRFile with the blocks which could be decoded
+        :param issues: list of DecodeIssue
+        """
+        self._cwr_file = cwr_file
+        self._issues = issues
+
+    def __str__(self):
+        return '\n'.join(str(issue) for issue in self._issues)
+
+    @property
+    def cwr_file(self):
+        """
+        The file, containing all the blocks which could be decoded.
+
+        A group whose header or trailer could not be decoded will have None
+        in its place.
+
+        :return: the CWRFile
+        """
+        return self._cwr_file
+
+    @property
+    def issues(self):
+        """
+        The errors found, in the order of the file.
+
+        :return: list of DecodeIssue
+        """
+        return self._issues
+
+    @property
+    def valid(self):
+        """
+        Indicates if the file was decoded without errors.
+
+        :return: True if there are no issues
+        """
+        return not self._issues
+
+
+class TolerantFileDecoder(Decoder):
+    """
+    Parses a CWR file, skipping the records and transactions which can't be
+    decoded.
+
+    As with the FileDecoder, a dictionary with the filename and the contents
+    is expected. The contents can be a string, or any iterable returning the
+    lines.
+    """
+
+    def __init__(self, grammar_factory, filename_decoder, rule_ids, layouts):
+        """
+        Constructs a TolerantFileDecoder.
+
+        :param grammar_factory: factory for the grammar rules
+        :param filename_decoder: decoder for the file name
+        :param rule_ids: dict mapping each record type to its rule ids
+        :param layouts: dict mapping each record type to its RecordLayout
+        """
+        super(TolerantFileDecoder, self).__init__()
+
+        self._filename_decoder = filename_decoder
+        self._stream_decoder = FileStreamDecoder(grammar_factory,
+                                                 filename_decoder)
+        self._layouts = layouts
+
+        self._record_rules = {}
+        for record_type, ids in rule_ids.items():
+            self._record_rules[record_type] = [grammar_factory.get_rule(id)
+                                               for id in ids]
+
+    def decode(self, data):
+        """
+        Parses the file, creating a CWRFile from the blocks which can be
+        decoded.
+
+        :param data: dictionary with the data to parse
+        :return: a DecodeResult
+        """
+        tag = self._filename_decoder.decode(data['filename'])
+        header = None
+        trailer = None
+        groups = []
+        issues = []
+
+        group = None
+        for block_type, value, errors in self._decode_blocks(
+                data['contents']):
+            if errors:
+                issues.extend(errors)
+
+            if block_type == TRANSMISSION_HEADER:
+                header = value
+            elif block_type == TRANSMISSION_TRAILER:
+                trailer = value
+            elif block_type == GROUP_HEADER:
+                group = Group(value, None, [])
+                groups.append(group)
+            elif block_type == TRANSACTION:
+                if value is None:
+                    continue
+                if group is None:
+                    # Transaction outside of a group
+                    group = Group(None, None, [])
+                    groups.append(group)
+                group.transactions.append(value)
+            elif block_type == GROUP_TRAILER:
+                if group is None:
+                    group = Group(None, None, [])
+                    groups.append(group)
+                group.group_trailer = value
+                group = None
+
+        transmission = Transmission(header, trailer, groups)
+        return DecodeResult(CWRFile(tag, transmission), issues)
+
+    def decode_events(self, data):
+        """
+        Parses the file, returning an iterator over its events.
+
+        These are the same events as those of the FileStreamDecoder, but when
+        a block can't be decoded an ('error', list of DecodeIssue) event is
+        returned in its place.
+
+        :param data: dictionary with the data to parse
+        :return: an iterator over (event type, value) tuples
+        """
+        yield FILE_TAG, self._filename_decoder.decode(data['filename'])
+
+        for block_type, value, errors in self._decode_blocks(
+                data['contents']):
+            if errors:
+                yield ERROR, errors
+            else:
+                yield block_type, value
+
+    def _decode_blocks(self, contents):
+        """
+        Decodes each block of the file, returning the block type, along with
+        the value if it could be decoded, or the issues if it could not.
+        """
+        for block in read_blocks(read_lines(contents)):
+            try:
+                value = self._stream_decoder.decode_block(block)
+            except Exception as e:
+                yield block.block_type, None, self.diagnose(block, e)
+            else:
+                yield block.block_type, value, None
+
+    def diagnose_block(self, block):
+        """
+        Parses a block, returning the errors found on it.
+
+        :param block: the LineBlock to parse
+        :return: list of DecodeIssue, empty if the block is valid
+        """
+        try:
+            self._stream_decoder.decode_block(block)
+        except Exception as e:
+            return self.diagnose(block, e)
+        return []
+
+    def diagnose(self, block, error=None):
+        """
+        Finds the records of a block which can't be decoded.
+
+        Each line is parsed with the rules for its record type. If all of
+        them are valid, a single issue is created for the whole block, with
+        the error received.
+
+        :param block: the LineBlock which failed
+        :param error: the exception raised when decoding the block
+        :return: list of DecodeIssue
+        """
+        issues = []
+        line_numbers = block.line_numbers or \
+            range(block.line_n, block.line_n + len(block.lines))
+        for line_n, line in zip(line_numbers, block.lines):
+            issue = self.diagnose_line(line, line_n)
+            if issue is not None:
+                issues.append(issue)
+
+        if not issues:
+            line = block.lines[0]
+            issues.append(DecodeIssue(block.line_n, line[:3],
+                                      line.rstrip('\r'), _message(error)))
+
+        return issues
+
+    def diagnose_line(self, line, line_n):
+        """
+        Parses a single record, returning the error if it can't be decoded.
+
+        :param line: the record line
+        :param line_n: number of the line on the file, from 1
+        :return: a DecodeIssue, or None if the record is valid
+        """
+        record_type = line[:3]
+        text = line.rstrip('\r')
+
+        rules = self._record_rules.get(record_type)
+        if not rules:
+            return DecodeIssue(line_n, record_type, text,
+                               'Unknown record type %s' % record_type)
+
+        failure = None
+        for rule in rules:
+            try:
+                rule.parseString(line, parseAll=True)
+                return None
+            except pp.ParseBaseException as e:
+                # The rule which parsed the most is the closest to the line
+                if failure is None or e.loc > failure.loc:
+                    failure = e
+            except Exception as e:
+                return DecodeIssue(line_n, record_type, text, _message(e))
+
+        return DecodeIssue(line_n, record_type, text, _message(failure),
+                           self._field(record_type, failure.loc))
+
+    def _field(self, record_type, column):
+        layout = self._layouts.get(record_type)
+        if layout is None:
+            return None
+
+        for field in layout.fields:
+            if field.start is not None and field.start <= column < field.end:
+                return field.name
+
+        return None
+
+
+def _message(error):
+    if error is None:
+        return 'The block could not be decoded'
+    if isinstance(error, pp.ParseBaseException):
+        return error.msg
+    return '%s: %s' % (error.__class__.__name__, error)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+import os
+
+from cwr.parser.decoder.stream import FILE_TAG, GROUP_HEADER, TRANSACTION, \
+    GROUP_TRAILER, file_events
+from cwr.parser.encoder.tabular import TabularRecordEncoder
+from cwr.utils.layout import default_record_layouts
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+"""
+Classes for exporting CWR records into Apache Arrow formats.
+
+The records are stored as one table per record type, on a Parquet file or an
+Arrow IPC file, with typed columns derived from the fields configuration:
+- Dates, times and date-times are stored as Arrow temporal values.
+- Numeric fields are stored as integers, and percentages as floats.
+- Boolean fields are stored as booleans.
+- Lookup fields are dictionary encoded, using the lookup table as dictionary.
+
+The exporter can receive the events from a FileStreamDecoder, and writes a
+batch of rows each time enough records of a type have been received. This way
+the memory used depends on the batch size, and not on the file size.
+
+This requires the pyarrow library, which is an optional dependency.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+PARQUET = 'parquet'
+IPC = 'ipc'
+
+
+def default_arrow_exporter(path, file_format=PARQUET):
+    """
+    Creates an exporter which stores the records for the CWR standard on the
+    specified folder.
+
+    :param path: folder where the files will be created
+    :param file_format: 'parquet' or 'ipc'
+    :return: an exporter for the default standard
+    """
+    return ArrowRecordExporter(path,
+                               TabularRecordEncoder(default_record_layouts()),
+                               file_format=file_format)
+
+
+def _arrow_type(column):
+    """
+    Returns the Arrow type for a column.
+
+    :param column: FieldLayout for the column
+    :return: the Arrow type for the column
+    """
+    field_type = column.field_type
+
+    if field_type == 'date':
+        result = pyarrow.date32()
+    elif field_type == 'time':
+        result = pyarrow.time32('s')
+    elif field_type == 'date_time':
+        result = pyarrow.timestamp('s')
+    elif field_type in ('numeric', 'lookup_int', 'ipi_name_n', 'ean13'):
+        result = pyarrow.int64()
+    elif field_type in ('percentage', 'numeric_float'):
+        result = pyarrow.float64()
+    elif field_type == 'boolean':
+        result = pyarrow.bool_()
+    elif field_type == 'lookup':
+        result = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    elif field_type == 'avi':
+        result = pyarrow.struct([('society_code', pyarrow.int64()),
+                                 ('av_number', pyarrow.string())])
+    else:
+        result = pyarrow.string()
+
+    return result
+
+
+class _RecordTable(object):
+    """
+    Rows waiting to be written for a record type, and the writer for them.
+    """
+
+    def __init__(self, columns, schema, writer):
+        self.columns = columns
+        self.schema = schema
+        self.writer = writer
+        self.rows = []
+        self.count = 0
+        # Dictionaries for the lookup columns
+        self.dictionaries = {}
+
+        for column in columns:
+            if column.field_type == 'lookup':
+                # The lookup tables may contain padded values
+                values = []
+                positions = {}
+                for value in column.values or []:
+                    value = value.strip()
+                    if value and value not in positions:
+                        positions[value] = len(values)
+                        values.append(value)
+                self.dictionaries[column.name] = (values, positions)
+
+
+class ArrowRecordExporter(object):
+    """
+    Stores CWR records on Parquet or Arrow IPC files, one for each record
+    type.
+
+    Transaction records get an additional 'group_id' column, with the id of
+    the group containing them. With it and the transaction sequence number
+    the records of each transaction can be joined.
+
+    The files are created when the first record of its type is received, and
+    the rows are written in batches of the specified size. The exporter should
+    be closed once all the records have been added.
+    """
+
+    def __init__(self, path, encoder, file_format=PARQUET,
+                 batch_size=65536):
+        """
+        Constructs an ArrowRecordExporter.
+
+        :param path: folder where the files will be created
+        :param encoder: TabularRecordEncoder for creating the rows
+        :param file_format: 'parquet' or 'ipc'
+        :param batch_size: rows stored on each row group or record batch
+        """
+        if pyarrow is None:
+            raise ImportError('The pyarrow library is required for exporting '
+                              'to Arrow formats')
+        if file_format not in (PARQUET, IPC):
+            raise ValueError('Unknown file format %s' % file_format)
+
+        self._path = path
+        self._encoder = encoder
+        self._file_format = file_format
+        self._batch_size = batch_size
+
+        self._tables = {}
+        self._group_id = None
+
+    @property
+    def record_counts(self):
+        """
+        Number of rows received for each record type.
+
+        :return: dict mapping record types to the number of rows
+        """
+        return dict((record_type, table.count)
+                    for record_type, table in self._tables.items())
+
+    def export(self, events):
+        """
+        Stores all the records received from a FileStreamDecoder, and then
+        closes the files.
+
+        :param events: iterable of (event type, value) tuples
+        """
+        try:
+            for event, value in events:
+                self.add_event(event, value)
+        finally:
+            self.close()
+
+    def export_file(self, cwr_file):
+        """
+        Stores all the records from a CWRFile, and then closes the files.
+
+        :param cwr_file: the CWRFile to export
+        """
+        self.export(file_events(cwr_file))
+
+    def add_event(self, event, value):
+        """
+        Stores the records from an event of a FileStreamDecoder.
+
+        :param event: the event type
+        :param value: the event value
+        """
+        if event == TRANSACTION:
+            for record in value:
+                self.add_record(record, self._group_id)
+        elif event == GROUP_HEADER:
+            self._group_id = value.group_id
+            self.add_record(value)
+        elif event == GROUP_TRAILER:
+            self.add_record(value)
+            self._group_id = None
+        elif event != FILE_TAG:
+            self.add_record(value)
+
+    def add_record(self, record, group_id=None):
+        """
+        Adds a record to the rows waiting to be written.
+
+        :param record: the record to add
+        :param group_id: id of the group containing the record
+        """
+        table = self._get_table(record.record_type)
+
+        row = self._encoder.encode(record)
+        if self._is_transaction_table(record.record_type):
+            row = (group_id,) + row
+        table.rows.append(row)
+        table.count += 1
+
+        if len(table.rows) >= self._batch_size:
+            self._write_rows(table)
+
+    def close(self):
+        """
+        Writes the remaining rows and closes all the files.
+        """
+        for table in self._tables.values():
+            if table.rows:
+                self._write_rows(table)
+            table.writer.close()
+        self._tables = {}
+
+    def _is_transaction_table(self, record_type):
+        return record_type not in ('HDR', 'GRH', 'GRT', 'TRL')
+
+    def _get_table(self, record_type):
+        if record_type in self._tables:
+            return self._tables[record_type]
+
+        columns = self._encoder.columns(record_type)
+        fields = [pyarrow.field(column.name, _arrow_type(column))
+                  for column in columns]
+        if self._is_transaction_table(record_type):
+            fields.insert(0, pyarrow.field('group_id', pyarrow.int64()))
+        schema = pyarrow.schema(fields)
+
+        if self._file_format == PARQUET:
+            file_path = os.path.join(self._path, '%s.parquet' % record_type)
+            writer = pyarrow.parquet.ParquetWriter(file_path, schema)
+        else:
+            file_path = os.path.join(self._path, '%s.arrow' % record_type)
+            options = pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            writer = pyarrow.ipc.new_file(file_path, schema, options=options)
+
+        table = _RecordTable(columns, schema, writer)
+        self._tables[record_type] = table
+
+        return table
+
+    def _write_rows(self, table):
+        values = list(zip(*table.rows))
+        offset = len(values) - len(table.columns)
+
+        arrays = []
+        if offset:
+            arrays.append(pyarrow.array(values[0], type=pyarrow.int64()))
+        for column, column_values in zip(table.columns, values[offset:]):
+            arrays.append(self._build_array(table, column, column_values))
+
+        batch = pyarrow.RecordBatch.from_arrays(arrays, schema=table.schema)
+        if self._file_format == PARQUET:
+            table.writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            table.writer.write_batch(batch)
+
+        table.rows = []
+
+    @staticmethod
+    def _build_array(table, column, values):
+        arrow_type = _arrow_type(column)
+
+        if column.field_type == 'lookup':
+            dictionary, positions = table.dictionaries[column.name]
+            indices = []
+            for value in values:
+                if value is None or value == '':
+                    indices.append(None)
+                else:
+                    value = str(value)
+                    if value not in positions:
+                        positions[value] = len(dictionary)
+                        dictionary.append(value)
+                    indices.append(positions[value])
+            return pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(indices, type=pyarrow.int32()),
+                pyarrow.array(dictionary, type=pyarrow.string()))
+        elif arrow_type == pyarrow.string():
+            values = [None if value is None else str(value)
+                      for value in values]
+        elif column.field_type == 'avi':
+            values = [value if value and value.get('society_code') is not None
+                      else None for value in values]
+
+        return pyarrow.array(values, type=arrow_type)
@@ -3,8 +3,13 @@
 import json
 import sys
 
-from cwr.parser.encoder.dictionary import FileDictionaryEncoder
+from cwr.file import CWRFile
+from cwr.group import Group
+from cwr.parser.encoder.dictionary import FileDictionaryEncoder, \
+    GroupDictionaryEncoder, TransactionRecordDictionaryEncoder
 from cwr.parser.encoder.common import Encoder
+from cwr.transmission import Transmission
+from cwr.utils.progress import JSON, Instrumented
 
 """
 Classes for encoding CWR classes into JSON dictionaries.
@@ -18,7 +23,7 @@ __license__ = 'MIT'
 __status__ = 'Development'
 
 
-class JSONEncoder(Encoder):
+class JSONEncoder(Encoder, Instrumented):
     """
     Encodes a CWR class instance into a JSON.
 
@@ -27,11 +32,17 @@ class JSONEncoder(Encoder):
 
     A bit of additional work is done for handling the dates, which are
     transformed into the ISO format.
+
+    When encoding a CWRFile, the progress is reported to the hooks added to
+    the encoder after each transaction and group is transformed into a
+    dictionary, and once the JSON is dumped.
     """
 
     def __init__(self):
         super(JSONEncoder, self).__init__()
         self._dict_encoder = FileDictionaryEncoder()
+        self._group_encoder = GroupDictionaryEncoder()
+        self._trans_encoder = TransactionRecordDictionaryEncoder()
 
     def encode(self, entity):
         """
@@ -41,8 +52,50 @@ class JSONEncoder(Encoder):
         :param entity: the instance to encode
         :return: a JSON structure created from the received data
         """
-        encoded = self._dict_encoder.encode(entity)
+        tracker = None
+        if isinstance(entity, CWRFile):
+            tracker = self._tracker(JSON)
+
+        if tracker is None:
+            return self._dump(self._dict_encoder.encode(entity))
+
+        tracker.start()
+        with tracker.stage('dictionary'):
+            encoded = self._encode_file(entity, tracker)
+        with tracker.stage('dump'):
+            result = self._dump(encoded)
+        tracker.end(len(result))
+
+        return result
+
+    def _encode_file(self, cwr_file, tracker):
+        """
+        Transforms a file into a dictionary, one transaction at a time.
 
+        The file, and each group, are encoded without their contents, which
+        are then added to the result.
+        """
+        transmission = cwr_file.transmission
+        encoded = self._dict_encoder.encode(
+            CWRFile(cwr_file.tag, Transmission(transmission.header,
+                                               transmission.trailer, [])))
+
+        groups = encoded['transmission']['groups']
+        for group in transmission.groups:
+            encoded_group = self._group_encoder.encode(
+                Group(group.group_header, group.group_trailer, []))
+            transactions = encoded_group['transactions']
+            for transaction in group.transactions:
+                transactions.append([self._trans_encoder.encode(record)
+                                     for record in transaction])
+                tracker.transaction(len(transaction))
+            groups.append(encoded_group)
+            tracker.group()
+
+        return encoded
+
+    @staticmethod
+    def _dump(encoded):
         if sys.version_info[0] == 2:
             result = json.dumps(encoded, ensure_ascii=False,
                                 default=_iso_handler, encoding='latin1')
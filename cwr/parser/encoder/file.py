@@ -3,8 +3,8 @@ from config_cwr.accessor import CWRConfiguration
 
 from cwr.parser.encoder.common import Encoder
 from cwr.parser.encoder.standart.record import CwrRecordEncoderFactory
-from data_cwr.accessor import CWRTables
-import difflib
+from cwr.utils.layout import default_field_configs
+from cwr.utils.progress import ENCODE, Instrumented
 
 """
 Parsers for encoding CWR model classes, creating a text string for them which
@@ -145,10 +145,12 @@ class BaseCWRFileNameEncoder(Encoder):
         return rule
 
 
-class CwrFileEncoder(Encoder):
+class CwrFileEncoder(Encoder, Instrumented):
     """
     Encodes a CWR class instance into a cwr binary format.
 
+    The progress is reported to the hooks added to the encoder after each
+    transaction and group.
     """
     _counter = 0
 
@@ -172,6 +174,10 @@ class CwrFileEncoder(Encoder):
         :param entity: the instance to encode
         :return: a cwr string structure created from the received data
         """
+        tracker = self._tracker(ENCODE)
+        if tracker is not None:
+            tracker.start()
+
         data = ''
         data += self._record_encode(transmission.header)
         for group in transmission.groups:
@@ -179,8 +185,15 @@ class CwrFileEncoder(Encoder):
             for transaction in group.transactions:
                 for record in transaction:
                     data += self._record_encode(record)
+                if tracker is not None:
+                    tracker.transaction(len(transaction), len(data))
             data += self._record_encode(group.group_trailer)
+            if tracker is not None:
+                tracker.group(len(data))
         data += self._record_encode(transmission.trailer)
+
+        if tracker is not None:
+            tracker.end(len(data))
         return data
 
 
@@ -190,15 +203,5 @@ def default_file_encoder():
     :return:
     """
     config = CWRConfiguration()
-    field_configs = config.load_field_config('table')
-    field_configs.update(config.load_field_config('common'))
-
-    field_values = CWRTables()
-
-    for entry in field_configs.values():
-        if 'source' in entry:
-            values_id = entry['source']
-            entry['values'] = field_values.get_data(values_id)
-
     record_configs = config.load_record_config('common')
-    return CwrFileEncoder(record_configs, field_configs)
+    return CwrFileEncoder(record_configs, default_field_configs(config))
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+import datetime
+import time
+
+from cwr.parser.decoder.stream import FILE_TAG, GROUP_HEADER, TRANSACTION, \
+    GROUP_TRAILER, file_events
+from cwr.parser.encoder.tabular import TabularRecordEncoder
+from cwr.utils.layout import default_record_layouts
+
+"""
+Classes for loading CWR records into a SQLite database.
+
+The schema is created from the record layouts, with one table for each record
+type, named after it, and a column for each of the record fields.
+
+All the records are linked to the tables 'cwr_group' and 'cwr_transaction'
+through the 'cwr_group_id' and 'cwr_transaction_id' columns. These keys are
+assigned by the loader in the order the groups and transactions are found, so
+several files can be loaded on the same database.
+
+The rows are inserted in batches, all of them inside a single database
+transaction, and the indexes are created once the load is finished.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_CONTROL_RECORDS = ('HDR', 'GRH', 'GRT', 'TRL')
+
+_INTEGER_TYPES = ('numeric', 'lookup_int', 'ipi_name_n', 'ean13', 'boolean')
+
+_REAL_TYPES = ('percentage', 'numeric_float')
+
+
+def default_sqlite_loader(connection):
+    """
+    Creates a loader which stores the records for the CWR standard on the
+    received SQLite connection.
+
+    :param connection: a sqlite3 connection
+    :return: a loader for the default standard
+    """
+    return SQLiteRecordLoader(connection,
+                              TabularRecordEncoder(default_record_layouts()))
+
+
+class LoadReport(object):
+    """
+    Number of rows loaded into each table, and time spent on it.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._times = {}
+
+    def __str__(self):
+        lines = []
+        for table in sorted(self._rows):
+            lines.append('%s: %d rows, %.0f rows/sec' % (
+                table, self._rows[table], self.rows_per_second(table)))
+        return '\n'.join(lines)
+
+    @property
+    def tables(self):
+        """
+        The tables which received rows.
+
+        :return: the table names
+        """
+        return sorted(self._rows.keys())
+
+    def add(self, table, rows, seconds):
+        """
+        Adds rows loaded into a table.
+
+        :param table: the table name
+        :param rows: number of rows
+        :param seconds: time spent encoding and inserting the rows
+        """
+        self._rows[table] = self._rows.get(table, 0) + rows
+        self._times[table] = self._times.get(table, 0) + seconds
+
+    def rows(self, table):
+        """
+        Number of rows loaded into a table.
+
+        :param table: the table name
+        :return: the number of rows
+        """
+        return self._rows.get(table, 0)
+
+    def seconds(self, table):
+        """
+        Time spent loading a table.
+
+        :param table: the table name
+        :return: the time in seconds
+        """
+        return self._times.get(table, 0)
+
+    def rows_per_second(self, table):
+        """
+        Throughput for a table.
+
+        :param table: the table name
+        :return: rows loaded per second
+        """
+        seconds = self.seconds(table)
+        if seconds == 0:
+            return 0.0
+        return self.rows(table) / seconds
+
+
+class _TableBatch(object):
+    """
+    Rows waiting to be inserted into a table.
+    """
+
+    def __init__(self, statement, columns):
+        self.statement = statement
+        self.columns = columns
+        self.rows = []
+        self.seconds = 0
+
+
+class SQLiteRecordLoader(object):
+    """
+    Loads CWR records into a SQLite database.
+
+    The loader receives the same events returned by a FileStreamDecoder. Once
+    all the files have been loaded it should be closed, which inserts any
+    remaining row, commits the changes and creates the indexes.
+    """
+
+    def __init__(self, connection, encoder, batch_size=10000):
+        """
+        Constructs a SQLiteRecordLoader.
+
+        :param connection: a sqlite3 connection
+        :param encoder: TabularRecordEncoder for creating the rows
+        :param batch_size: rows inserted on each executemany call
+        """
+        self._connection = connection
+        self._encoder = encoder
+        self._batch_size = batch_size
+
+        self._batches = {}
+        self._report = LoadReport()
+
+        self._group_id = None
+        self._transaction_id = None
+
+        self._create_schema()
+
+        self._next_group_id = self._max_id('cwr_group', 'cwr_group_id')
+        self._next_transaction_id = self._max_id('cwr_transaction',
+                                                 'cwr_transaction_id')
+
+    @property
+    def report(self):
+        """
+        Rows loaded into each table and throughput.
+
+        :return: the LoadReport for this loader
+        """
+        return self._report
+
+    def load(self, events):
+        """
+        Loads all the records received from a FileStreamDecoder.
+
+        :param events: iterable of (event type, value) tuples
+        """
+        for event, value in events:
+            self.add_event(event, value)
+
+    def load_file(self, cwr_file):
+        """
+        Loads all the records from a CWRFile.
+
+        :param cwr_file: the CWRFile to load
+        """
+        self.load(file_events(cwr_file))
+
+    def add_event(self, event, value):
+        """
+        Loads the records from an event of a FileStreamDecoder.
+
+        :param event: the event type
+        :param value: the event value
+        """
+        if event == TRANSACTION:
+            self._next_transaction_id += 1
+            self._transaction_id = self._next_transaction_id
+            self._add_row('cwr_transaction',
+                          (self._transaction_id, self._group_id,
+                           value[0].transaction_sequence_n,
+                           value[0].record_type))
+            for record in value:
+                self.add_record(record)
+        elif event == GROUP_HEADER:
+            self._next_group_id += 1
+            self._group_id = self._next_group_id
+            self._add_row('cwr_group', (self._group_id, value.group_id,
+                                        value.transaction_type))
+            self.add_record(value)
+        elif event == GROUP_TRAILER:
+            self.add_record(value)
+            self._group_id = None
+        elif event != FILE_TAG:
+            self.add_record(value)
+
+    def add_record(self, record):
+        """
+        Adds a record to the rows waiting to be inserted.
+
+        :param record: the record to add
+        """
+        record_type = record.record_type
+        start = time.perf_counter()
+
+        batch = self._batches[record_type]
+        row = [self._group_id]
+        if record_type not in _CONTROL_RECORDS:
+            row.append(self._transaction_id)
+        for column, value in zip(batch.columns,
+                                 self._encoder.encode(record)):
+            if column.field_type == 'avi':
+                value = value or {}
+                row.append(value.get('society_code'))
+                row.append(value.get('av_number'))
+            else:
+                row.append(_sql_value(value))
+
+        batch.rows.append(row)
+        batch.seconds += time.perf_counter() - start
+
+        if len(batch.rows) >= self._batch_size:
+            self._insert(record_type, batch)
+
+    def close(self):
+        """
+        Inserts the remaining rows, commits the changes and creates the
+        indexes.
+        """
+        for table, batch in self._batches.items():
+            if batch.rows:
+                self._insert(table, batch)
+        self._connection.commit()
+
+        self._create_indexes()
+        self._connection.commit()
+
+    def _add_row(self, table, row):
+        batch = self._batches[table]
+        batch.rows.append(row)
+        if len(batch.rows) >= self._batch_size:
+            self._insert(table, batch)
+
+    def _insert(self, table, batch):
+        start = time.perf_counter()
+        self._connection.executemany(batch.statement, batch.rows)
+        seconds = batch.seconds + time.perf_counter() - start
+
+        self._report.add(table, len(batch.rows), seconds)
+
+        batch.rows = []
+        batch.seconds = 0
+
+    def _max_id(self, table, column):
+        cursor = self._connection.execute(
+            'SELECT MAX(%s) FROM %s' % (column, table))
+        value = cursor.fetchone()[0]
+        return value or 0
+
+    def _create_schema(self):
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cwr_group ('
+            'cwr_group_id INTEGER PRIMARY KEY, '
+            'group_id INTEGER, '
+            'transaction_type TEXT)')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cwr_transaction ('
+            'cwr_transaction_id INTEGER PRIMARY KEY, '
+            'cwr_group_id INTEGER REFERENCES cwr_group (cwr_group_id), '
+            'transaction_sequence_n INTEGER, '
+            'transaction_type TEXT)')
+
+        self._batches['cwr_group'] = _TableBatch(
+            'INSERT INTO cwr_group VALUES (?, ?, ?)', [])
+        self._batches['cwr_transaction'] = _TableBatch(
+            'INSERT INTO cwr_transaction VALUES (?, ?, ?, ?)', [])
+
+        for record_type in self._encoder.record_types:
+            self._create_table(record_type)
+
+    def _create_table(self, record_type):
+        columns = self._encoder.columns(record_type)
+
+        definitions = ['cwr_group_id INTEGER '
+                       'REFERENCES cwr_group (cwr_group_id)']
+        if record_type not in _CONTROL_RECORDS:
+            definitions.append('cwr_transaction_id INTEGER REFERENCES '
+                               'cwr_transaction (cwr_transaction_id)')
+        for column in columns:
+            if column.field_type == 'avi':
+                definitions.append('%s_society_code INTEGER' % column.name)
+                definitions.append('%s_av_number TEXT' % column.name)
+            else:
+                definitions.append('%s %s' % (column.name,
+                                              _sql_type(column.field_type)))
+
+        self._connection.execute('CREATE TABLE IF NOT EXISTS %s (%s)' % (
+            record_type, ', '.join(definitions)))
+
+        statement = 'INSERT INTO %s VALUES (%s)' % (
+            record_type, ', '.join(['?'] * len(definitions)))
+        self._batches[record_type] = _TableBatch(statement, columns)
+
+    def _create_indexes(self):
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS cwr_transaction_group '
+            'ON cwr_transaction (cwr_group_id)')
+
+        for record_type in self._encoder.record_types:
+            if record_type in _CONTROL_RECORDS:
+                key = 'cwr_group_id'
+            else:
+                key = 'cwr_transaction_id'
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)' % (
+                    record_type, key, record_type, key))
+
+
+def _sql_type(field_type):
+    """
+    Returns the SQLite column type for a field type.
+
+    :param field_type: the field type, as on the configuration
+    :return: the column type
+    """
+    if field_type in _INTEGER_TYPES:
+        return 'INTEGER'
+    elif field_type in _REAL_TYPES:
+        return 'REAL'
+    else:
+        return 'TEXT'
+
+
+def _sql_value(value):
+    """
+    Adapts a value from the dictionaries to one which can be stored on SQLite.
+
+    Temporal values are stored as ISO 8601 strings.
+
+    :param value: the value to adapt
+    :return: the value to store
+    """
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    elif value is None or isinstance(value, (int, float, str)):
+        return value
+    else:
+        return str(value)
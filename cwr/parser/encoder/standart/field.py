@@ -149,8 +149,8 @@ class TimeCwrFieldEncoder(DateCwrFieldEncoder):
     """
     def format(self, value):
         if value is None:
-            fmt = "{:0>%d}" % (self._rule['size'])
-            return fmt.format(0)
+            # The grammar reads times as HHMMSS, whatever the configured size
+            return "{:0>6}".format(0)
         else:
             return "{:%H%M%S}".format(value)
 
@@ -49,6 +49,7 @@ class CwrRecordEncoder(Encoder):
          super(CwrRecordEncoder, self).__init__()
          self._record_configs = record_configs
          self._field_encoder_factory = CwrFieldEncoderFactory(field_configs)
+         self._field_encoders = None
 
     @abstractmethod
     def get_record_dictionary_encoder(self, entity):
@@ -57,11 +58,11 @@ class CwrRecordEncoder(Encoder):
         """
         raise NotImplementedError('The head method must be implemented')
 
-    def head(self, entity):
+    def head(self, entity_dict):
         """
         Return head of cwr string ('HDR' for example)
         """
-        return entity.record_type
+        return entity_dict['record_type']
 
     @staticmethod
     def _get_best_result(possible_list):
@@ -99,10 +100,16 @@ class CwrRecordEncoder(Encoder):
         return field_encoders
 
     def get_record_fields_encoders(self):
-        field_encoders = []
-        for record_config in self._record_configs:
-            field_encoders += self.build_field_encoders(record_config.rules,  field_encoders=[[]],  optional=False)
-        return field_encoders
+        """
+        Return all the possible combinations of field encoders. These are built only once, and then reused for each
+        record
+        """
+        if self._field_encoders is None:
+            field_encoders = []
+            for record_config in self._record_configs:
+                field_encoders += self.build_field_encoders(record_config.rules,  field_encoders=[[]],  optional=False)
+            self._field_encoders = field_encoders
+        return self._field_encoders
 
     @staticmethod
     def try_encode(field_encoders, entity_dict):
@@ -131,21 +138,29 @@ class CwrRecordEncoder(Encoder):
         :param entity:
         :return:
         """
+        return self.encode_dictionary(self.get_entity_dict(entity))
+
+    def encode_dictionary(self, entity_dict):
+        """
+        Generate string of cwr format from the entity dictionary, as created by the dictionary encoders
+        :param entity_dict:
+        :return:
+        """
         possible_results = []
-        entity_dict = self.get_entity_dict(entity)
         record_field_encoders = self.get_record_fields_encoders()
         for field_encoders in record_field_encoders:
             result = self.try_encode(field_encoders, entity_dict)
             if result:
                 possible_results.append({'result': result, 'len': len(field_encoders)})
-        cwr = self.head(entity) + self._get_best_result(possible_results) + "\r\n"
+        cwr = self.head(entity_dict) + self._get_best_result(possible_results) + "\r\n"
         return cwr
 
 
 class TransactionCwrRecordEncoder(CwrRecordEncoder):
 
-    def head(self, entity):
-        return "{}{:0>8}{:0>8}".format(entity.record_type, entity.transaction_sequence_n, entity.record_sequence_n)
+    def head(self, entity_dict):
+        return "{}{:0>8}{:0>8}".format(entity_dict['record_type'], entity_dict['transaction_sequence_n'],
+                                       entity_dict['record_sequence_n'])
 
     def get_record_dictionary_encoder(self, entity):
         return TransactionRecordDictionaryEncoder()
@@ -178,10 +193,18 @@ class CwrRecordEncoderFactory(object):
     Factory for produce record encoders
     """
 
+    _control_encoders = {
+        'HDR': TransmissionHeaderCwrRecordEncoder,
+        'GRH': GroupHeaderCwrRecordEncoder,
+        'GRT': GroupTraileCwrRecordEncoder,
+        'TRL': TransmissionTrailerCwrRecordEncoder
+    }
+
     def __init__(self, record_configs, field_configs):
         super(CwrRecordEncoderFactory, self).__init__()
         self._record_configs = self._process_record(record_configs)
         self._field_configs = field_configs
+        self._encoders = {}
 
     @staticmethod
     def _process_record(rules):
@@ -200,19 +223,37 @@ class CwrRecordEncoderFactory(object):
         return templates
 
     def get_encoder(self, entity):
-        if entity.record_type not in self._record_configs:
-            raise NameError('The record type %s not found in config %s' % entity.record_type)
-        record_configs = self._record_configs[entity.record_type]
         if isinstance(entity, TransactionRecord):
-            return TransactionCwrRecordEncoder(record_configs, self._field_configs)
+            encoder_class = TransactionCwrRecordEncoder
         elif isinstance(entity, TransmissionHeader):
-            return TransmissionHeaderCwrRecordEncoder(record_configs, self._field_configs)
+            encoder_class = TransmissionHeaderCwrRecordEncoder
         elif isinstance(entity, GroupHeader):
-            return GroupHeaderCwrRecordEncoder(record_configs, self._field_configs)
+            encoder_class = GroupHeaderCwrRecordEncoder
         elif isinstance(entity, GroupTrailer):
-            return GroupTraileCwrRecordEncoder(record_configs, self._field_configs)
+            encoder_class = GroupTraileCwrRecordEncoder
         elif isinstance(entity, TransmissionTrailer):
-            return TransmissionTrailerCwrRecordEncoder(record_configs, self._field_configs)
+            encoder_class = TransmissionTrailerCwrRecordEncoder
         else:
             raise NameError('The encoder not found for entity %s' % entity.__class__.__name__)
-        return encoder
+        return self._get_cached_encoder(encoder_class, entity.record_type)
+
+    def get_record_type_encoder(self, record_type):
+        """
+        Return the encoder for a record type, to be used with entity dictionaries
+        :param record_type: record type code, such as 'NWR'
+        :return: the record encoder
+        """
+        encoder_class = self._control_encoders.get(record_type, TransactionCwrRecordEncoder)
+        return self._get_cached_encoder(encoder_class, record_type)
+
+    def _get_cached_encoder(self, encoder_class, record_type):
+        """
+        Encoders are kept for each record type, so their field encoders are built only once
+        """
+        key = (encoder_class, record_type)
+        if key not in self._encoders:
+            if record_type not in self._record_configs:
+                raise NameError('The record type %s not found in config' % record_type)
+            record_configs = self._record_configs[record_type]
+            self._encoders[key] = encoder_class(record_configs, self._field_configs)
+        return self._encoders[key]
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.parser.encoder.standart.record import CwrRecordEncoderFactory
+from cwr.record import TransactionRecord
+from cwr.utils.layout import default_field_configs, default_record_layouts
+
+"""
+Classes for writing CWR files as a stream, one transaction at a time.
+
+The CwrFileEncoder requires a full Transmission, which means all the records
+have to be created before the file can be written. The CwrStreamWriter instead
+writes each transaction as soon as it is received, and builds the control
+records by itself, counting the groups, transactions and records on the fly.
+
+Records can be received as instances of the model classes, or as dictionaries
+with the same keys as the ones created by the dictionary encoders. The second
+option allows creating a file directly from the rows of a database, by
+using the merge_rows function to join the rows for each record type into
+transactions.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_TEMPORAL_TYPES = ('date', 'date_time', 'time')
+
+
+def default_stream_writer(out, encoder_factory=None):
+    """
+    Creates a writer which stores a CWR file for the default standard on the
+    received file object.
+
+    Loading the configuration for the encoders takes some time, so when
+    writing several files the same encoder factory can be reused.
+
+    :param out: text file object where the lines will be written
+    :param encoder_factory: the CwrRecordEncoderFactory to use, by default a
+    new one is created
+    :return: a stream writer for the default standard
+    """
+    if encoder_factory is None:
+        encoder_factory = default_record_encoder_factory()
+
+    return CwrStreamWriter(out, encoder_factory, default_record_layouts())
+
+
+def default_record_encoder_factory():
+    """
+    Creates the factory for the record encoders of the default standard.
+
+    :return: a CwrRecordEncoderFactory for the default standard
+    """
+    config = CWRConfiguration()
+    record_configs = config.load_record_config('common')
+
+    return CwrRecordEncoderFactory(record_configs,
+                                   default_field_configs(config))
+
+
+def cursor_rows(cursor):
+    """
+    Iterates over the rows of a DB-API cursor, returning each of them as a
+    dictionary, using the column names as keys.
+
+    :param cursor: the cursor to read, after executing a query
+    :return: an iterator over dictionaries
+    """
+    names = [column[0] for column in cursor.description]
+    for row in cursor:
+        yield dict(zip(names, row))
+
+
+def merge_rows(key, sources):
+    """
+    Joins rows from several sources into transactions.
+
+    The sources are a list of (record type, rows) tuples. The first source
+    contains the transaction headers, such as the NWR rows, and each of its
+    rows begins a new transaction. The rows from the other sources are added
+    to the transaction with the same key, in the order the sources are
+    received.
+
+    All the sources should be sorted by the key, which is the name of a value
+    found on all the rows, such as the submitter work number. Rows which
+    already contain a 'record_type' key keep it, which allows a single source
+    to contain several record types, for example when they need to be
+    interleaved.
+
+    Only one row from each source is kept in memory at a time.
+
+    :param key: name of the value identifying the transaction of each row
+    :param sources: list of (record type, rows iterable) tuples
+    :return: an iterator over lists of record dictionaries
+    """
+    heads = _RowSource(sources[0][0], sources[0][1], key)
+    children = [_RowSource(record_type, rows, key)
+                for record_type, rows in sources[1:]]
+
+    previous = None
+    while heads.current is not None:
+        transaction_key = heads.current[key]
+        if previous is not None and not previous < transaction_key:
+            raise ValueError('The %s rows are not sorted by %s' %
+                             (heads.record_type, key))
+        previous = transaction_key
+
+        transaction = [heads.pop()]
+        for child in children:
+            transaction.extend(child.pop_all(transaction_key))
+
+        yield transaction
+
+    for child in children:
+        if child.current is not None:
+            raise ValueError('The %s row with %s %r has no transaction' %
+                             (child.record_type, key, child.current[key]))
+
+
+class _RowSource(object):
+    """
+    Iterator over the rows of a source, which allows peeking the next one.
+    """
+
+    def __init__(self, record_type, rows, key):
+        self.record_type = record_type
+        self._rows = iter(rows)
+        self._key = key
+        self.current = None
+        self._advance()
+
+    def _advance(self):
+        row = next(self._rows, None)
+        if row is not None:
+            row = dict(row)
+            if not row.get('record_type'):
+                row['record_type'] = self.record_type
+        self.current = row
+
+    def pop(self):
+        row = self.current
+        self._advance()
+        return row
+
+    def pop_all(self, transaction_key):
+        rows = []
+        while self.current is not None:
+            row_key = self.current[self._key]
+            if row_key == transaction_key:
+                rows.append(self.pop())
+            elif row_key < transaction_key:
+                raise ValueError('The %s row with %s %r has no transaction, '
+                                 'or the rows are not sorted' %
+                                 (self.record_type, self._key, row_key))
+            else:
+                break
+        return rows
+
+
+class CwrStreamWriter(object):
+    """
+    Writes a CWR file one transaction at a time.
+
+    The writer should be used in this order:
+    - write_header, with the transmission header
+    - For each group, write_group, or open_group followed by any number of
+      write_transaction calls and close_group
+    - close, which writes the transmission trailer
+
+    The sequence numbers of the transaction records, and the group and
+    transmission trailers, are created by the writer.
+    """
+
+    def __init__(self, out, encoder_factory, layouts):
+        """
+        Constructs a CwrStreamWriter.
+
+        :param out: text file object where the lines will be written
+        :param encoder_factory: CwrRecordEncoderFactory for the records
+        :param layouts: dict mapping each record type to its RecordLayout
+        """
+        self._out = out
+        self._encoder_factory = encoder_factory
+        self._layouts = layouts
+
+        self._group_count = 0
+        self._transaction_count = 0
+        # The transmission header and trailer are counted as records
+        self._record_count = 0
+
+        self._group_id = None
+        self._group_transactions = 0
+        self._group_records = 0
+
+    @property
+    def group_count(self):
+        """
+        Number of groups written.
+
+        :return: the number of groups
+        """
+        return self._group_count
+
+    @property
+    def transaction_count(self):
+        """
+        Number of transactions written.
+
+        :return: the number of transactions
+        """
+        return self._transaction_count
+
+    @property
+    def record_count(self):
+        """
+        Number of lines written, including the control records.
+
+        :return: the number of records
+        """
+        return self._record_count
+
+    def write_header(self, header):
+        """
+        Writes the transmission header.
+
+        :param header: TransmissionHeader or dictionary for it
+        """
+        self._write_record(header, 'HDR')
+
+    def write_encoded_header(self, line):
+        """
+        Writes a transmission header already encoded, such as one copied from
+        another file.
+
+        :param line: the HDR line, with its line break
+        """
+        self._write_line(line)
+
+    def write_group(self, transaction_type, transactions,
+                    version_number='02.10', batch_request_id=0):
+        """
+        Writes a full group, containing the received transactions.
+
+        :param transaction_type: transaction type for the group, such as 'NWR'
+        :param transactions: iterable with lists of records
+        :param version_number: CWR version for the transactions
+        :param batch_request_id: batch request id
+        """
+        self.open_group(transaction_type, version_number=version_number,
+                        batch_request_id=batch_request_id)
+        for transaction in transactions:
+            self.write_transaction(transaction)
+        self.close_group()
+
+    def open_group(self, transaction_type, version_number='02.10',
+                   batch_request_id=0):
+        """
+        Writes a group header, beginning a new group.
+
+        :param transaction_type: transaction type for the group, such as 'NWR'
+        :param version_number: CWR version for the transactions
+        :param batch_request_id: batch request id
+        """
+        if self._group_id is not None:
+            raise ValueError('The group %d has not been closed' %
+                             self._group_id)
+
+        self._group_count += 1
+        self._group_id = self._group_count
+        self._group_transactions = 0
+        self._group_records = 0
+
+        self._write_record({'record_type': 'GRH',
+                            'group_id': self._group_id,
+                            'transaction_type': transaction_type,
+                            'version_number': version_number,
+                            'batch_request_id': batch_request_id}, 'GRH')
+
+    def write_transaction(self, records, transaction_type=None):
+        """
+        Writes all the records of a transaction.
+
+        The transaction and record sequence numbers received are ignored.
+
+        :param records: list of records or record dictionaries
+        :param transaction_type: if set, replaces the first record type, for
+        example to send a work as a revision
+        """
+        if self._group_id is None:
+            raise ValueError('Transactions should be written inside a group')
+
+        for line in self.encode_transaction(records, self._group_transactions,
+                                            transaction_type):
+            self._write_line(line)
+
+        self._group_transactions += 1
+        self._transaction_count += 1
+
+    def write_encoded_transaction(self, lines, transaction_type=None):
+        """
+        Writes a transaction already encoded with encode_transaction.
+
+        The transaction sequence number on the lines is replaced with the
+        next one on the current group.
+
+        :param lines: the encoded lines
+        :param transaction_type: if set, replaces the first record type
+        """
+        if self._group_id is None:
+            raise ValueError('Transactions should be written inside a group')
+
+        sequence_n = '{:0>8}'.format(self._group_transactions)
+        for line_n, line in enumerate(lines):
+            if line_n == 0 and transaction_type is not None:
+                record_type = transaction_type
+            else:
+                record_type = line[:3]
+            self._write_line(record_type + sequence_n + line[11:])
+
+        self._group_transactions += 1
+        self._transaction_count += 1
+
+    def encode_transaction(self, records, transaction_n=0,
+                           transaction_type=None):
+        """
+        Encodes the records of a transaction, without writing them.
+
+        :param records: list of records or record dictionaries
+        :param transaction_n: transaction sequence number
+        :param transaction_type: if set, replaces the first record type
+        :return: list with the lines for the records
+        """
+        lines = []
+        for record_n, record in enumerate(records):
+            if not isinstance(record, (dict, TransactionRecord)):
+                raise ValueError('Transactions can only contain transaction '
+                                 'records, found %s' %
+                                 type(record).__name__)
+
+            if record_n == 0 and transaction_type is not None:
+                record_type = transaction_type
+            else:
+                record_type = None
+
+            lines.append(self._encode_record(record, record_type,
+                                             transaction_n, record_n))
+        return lines
+
+    def close_group(self, currency_indicator=None, total_monetary_value=None):
+        """
+        Writes the group trailer for the current group.
+
+        :param currency_indicator: currency for the monetary value
+        :param total_monetary_value: total monetary value for the group
+        """
+        if self._group_id is None:
+            raise ValueError('There is no open group')
+
+        # The trailer is included on the group's record count
+        trailer = {'record_type': 'GRT',
+                   'group_id': self._group_id,
+                   'transaction_count': self._group_transactions,
+                   'record_count': self._group_records + 1}
+
+        if currency_indicator is None and total_monetary_value is None:
+            # Without these fields only the short trailer can be encoded
+            self._write_record(trailer, 'GRT', complete=False)
+        else:
+            trailer['currency_indicator'] = currency_indicator
+            trailer['total_monetary_value'] = total_monetary_value
+            self._write_record(trailer, 'GRT')
+
+        self._group_id = None
+
+    def close(self):
+        """
+        Writes the transmission trailer.
+        """
+        if self._group_id is not None:
+            self.close_group()
+
+        self._write_record({'record_type': 'TRL',
+                            'group_count': self._group_count,
+                            'transaction_count': self._transaction_count,
+                            'record_count': self._record_count + 1}, 'TRL')
+
+    def _write_record(self, record, record_type, complete=True):
+        self._write_line(self._encode_record(record, record_type,
+                                             complete=complete))
+
+    def _write_line(self, line):
+        self._out.write(line)
+
+        self._record_count += 1
+        if self._group_id is not None:
+            self._group_records += 1
+
+    def _encode_record(self, record, record_type, transaction_n=None,
+                       record_n=None, complete=True):
+        """
+        Encodes a record. The record type received is used if the record
+        doesn't contain it, or replaces it for transaction records.
+        """
+        if isinstance(record, dict):
+            if transaction_n is None or record_type is None:
+                record_type = record.get('record_type') or record_type
+            if complete:
+                entity_dict = self._complete_dictionary(record_type, record)
+            else:
+                entity_dict = dict(record)
+        else:
+            entity_dict = self._encoder_factory.get_encoder(
+                record).get_entity_dict(record)
+            if record_type is None:
+                record_type = record.record_type
+            else:
+                entity_dict['record_type'] = record_type
+
+        if transaction_n is not None:
+            entity_dict['record_type'] = record_type
+            entity_dict['transaction_sequence_n'] = transaction_n
+            entity_dict['record_sequence_n'] = record_n
+
+        encoder = self._encoder_factory.get_record_type_encoder(record_type)
+        return encoder.encode_dictionary(entity_dict)
+
+    def _complete_dictionary(self, record_type, record):
+        """
+        Adds the missing fields to a record dictionary, and parses temporal
+        values received as ISO 8601 strings, as stored by most databases.
+        """
+        entity_dict = {'record_type': record_type}
+        for field in self._layouts[record_type].fields:
+            value = record.get(field.name)
+            if field.field_type in _TEMPORAL_TYPES and \
+                    isinstance(value, str):
+                value = _parse_temporal(field.field_type, value)
+            entity_dict[field.name] = value
+
+        for key, value in record.items():
+            if key not in entity_dict:
+                entity_dict[key] = value
+
+        return entity_dict
+
+
+def _parse_temporal(field_type, value):
+    """
+    Parses a temporal value from an ISO 8601 string.
+
+    :param field_type: the field type
+    :param value: the string to parse
+    :return: the date, datetime or time, or None for empty strings
+    """
+    if not value.strip():
+        return None
+    elif field_type == 'date':
+        return datetime.datetime.strptime(value[:10], '%Y-%m-%d').date()
+    elif field_type == 'time':
+        return datetime.time(*[int(part) for part in value[:8].split(':')])
+    else:
+        return datetime.datetime.strptime(value[:19].replace('T', ' '),
+                                          '%Y-%m-%d %H:%M:%S')
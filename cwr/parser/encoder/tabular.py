@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+from cwr.group import GroupHeader, GroupTrailer
+from cwr.parser.encoder.common import Encoder
+from cwr.parser.encoder.dictionary import TransactionRecordDictionaryEncoder, \
+    GroupHeaderDictionaryEncoder, GroupTrailerDictionaryEncoder, \
+    TransmissionHeaderDictionaryEncoder, TransmissionTrailerDictionaryEncoder
+from cwr.transmission import TransmissionHeader, TransmissionTrailer
+
+"""
+Classes for encoding CWR records into table rows.
+
+Each record type is stored in its own table, with one column for each field of
+the record. The columns are taken from the record layouts, which are built
+from the configuration files, and so they have the same names as the fields on
+the dictionaries, and a known type.
+
+This is the base for storing the records on columnar or relational formats.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TabularRecordEncoder(Encoder):
+    """
+    Encodes CWR records into rows, which are tuples containing a value for
+    each of the record type columns.
+
+    The values are the same as on the dictionaries. The sub-entities stored
+    on some records, such as the Publisher on the PublisherRecord, are merged
+    into the row.
+
+    Blank fields are not included as columns.
+    """
+
+    def __init__(self, layouts):
+        """
+        Constructs a TabularRecordEncoder.
+
+        :param layouts: dict mapping each record type to its RecordLayout
+        """
+        super(TabularRecordEncoder, self).__init__()
+        self._layouts = layouts
+        self._columns = {}
+
+        self._encoder_record = TransactionRecordDictionaryEncoder()
+        self._encoder_transmission_header = \
+            TransmissionHeaderDictionaryEncoder()
+        self._encoder_transmission_trailer = \
+            TransmissionTrailerDictionaryEncoder()
+        self._encoder_group_header = GroupHeaderDictionaryEncoder()
+        self._encoder_group_trailer = GroupTrailerDictionaryEncoder()
+
+    @property
+    def record_types(self):
+        """
+        The record types which can be encoded.
+
+        :return: the record type codes
+        """
+        return self._layouts.keys()
+
+    def columns(self, record_type):
+        """
+        Returns the columns for a record type, as FieldLayout instances.
+
+        :param record_type: the record type code
+        :return: the columns of the record type table
+        """
+        if record_type not in self._columns:
+            layout = self._layouts[record_type]
+            self._columns[record_type] = [field for field in layout.fields
+                                          if field.field_type != 'blank']
+
+        return self._columns[record_type]
+
+    def encode(self, record):
+        """
+        Encodes the record into a row.
+
+        :param record: the record to encode
+        :return: a tuple with a value for each column of the record type
+        """
+        layout = self._layouts[record.record_type]
+        encoded = self._encode_dictionary(record)
+
+        values = {}
+        for key, value in encoded.items():
+            if isinstance(value, dict) and not layout.has_field(key):
+                # Sub-entity
+                values.update(value)
+            else:
+                values[key] = value
+
+        return tuple(values.get(column.name)
+                     for column in self.columns(record.record_type))
+
+    def _encode_dictionary(self, record):
+        if isinstance(record, TransmissionHeader):
+            encoded = self._encoder_transmission_header.encode(record)
+        elif isinstance(record, TransmissionTrailer):
+            encoded = self._encoder_transmission_trailer.encode(record)
+        elif isinstance(record, GroupHeader):
+            encoded = self._encoder_group_header.encode(record)
+        elif isinstance(record, GroupTrailer):
+            encoded = self._encoder_group_trailer.encode(record)
+        else:
+            encoded = self._encoder_record.encode(record)
+
+        return encoded
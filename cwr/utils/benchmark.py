@@ -0,0 +1,744 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import pyparsing as pp
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.acknowledge.file import AcknowledgeFile
+from cwr.acknowledge.parallel import ParallelValidation, chunks, project
+from cwr.grammar.factory.adapter import NumericAdapter
+from cwr.grammar.factory.rule import FieldRuleFactory
+from cwr.interested_party import IPTerritoryOfControlRecord
+from cwr.parser.decoder.cwrjson import JSONDecoder
+from cwr.parser.decoder.dictionary import FileDictionaryDecoder
+from cwr.parser.decoder.file import default_file_decoder, \
+    default_filename_decoder, default_grammar_factory
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.parser.decoder.tolerant import record_rule_ids
+from cwr.parser.encoder.cwrjson import JSONEncoder
+from cwr.parser.encoder.dictionary import FileDictionaryEncoder
+from cwr.parser.encoder.file import default_file_encoder
+from cwr.parser.encoder.stream import default_record_encoder_factory, \
+    default_stream_writer
+from cwr.utils.generator import default_generator
+from cwr.utils.index import TransmissionIndex
+from cwr.utils.metrics import max_rss
+from data_cwr.accessor import CWRTables
+
+"""
+Benchmark suite, with stored baselines for detecting regressions.
+
+The suite measures the throughput of the main operations of the library on
+synthetic files of several sizes, created with the CWRGenerator:
+- grammar_build, import and filename_decode, which don't depend on the size
+- rule_lookup and field_rule_lookup, getting a rule already created from the
+  grammar factory and from a field rules factory
+- tis_validate, checking the territories of transactions with hundreds of
+  SPT and SWT records, which doesn't depend on the size either
+- record_decode.<record type>, applying the rule of each record type to all
+  the lines of that type
+- file_decode and stream_decode, for the whole file
+- dictionary_round_trip, json_round_trip and cwr_round_trip, encoding the
+  decoded file and decoding it back
+- index_build, indexing the transactions of the decoded file
+- validate and validate_parallel, validating the transactions with the edit
+  rules on the current process and on a pool with a process for each CPU,
+  and validate_ipc, pickling the chunks of records sent to the pool, which
+  is the main overhead of the parallel validation
+- ack, acknowledging the file as a stream
+
+Each benchmark is run several times, keeping the best time. It is then run
+once more while tracing the memory allocations, to find the peak memory it
+required. The peak resident set size of the process is stored for the whole
+suite, as the operating system only keeps the maximum reached.
+
+The results are stored as JSON, and compared with a baseline from a previous
+run. A benchmark whose throughput drops, or whose peak memory grows, more
+than the threshold is reported as a regression.
+
+The whole synthetic file is kept in memory, so the largest sizes require
+several gigabytes.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Relative change allowed before reporting a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Benchmarks faster than this are too noisy for comparing their throughput
+DEFAULT_MIN_SECONDS = 0.01
+
+_FILENAME = 'CW150001PUB_TST.V21'
+
+# Benchmarks on the decoded synthetic file
+_DECODED_CASES = ('dictionary_round_trip', 'json_round_trip',
+                  'cwr_round_trip', 'index_build', 'validate')
+
+# Transactions sent to each worker of the parallel validation
+_CHUNK_SIZE = 256
+
+# Rules got on each run of the lookup benchmarks
+_LOOKUPS = 10000
+
+# Folder containing the cwr package, for importing it on a new interpreter
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+class BenchmarkResult(object):
+    """
+    Measures for a single benchmark.
+    """
+
+    def __init__(self, name, size, items, seconds, peak_memory=None):
+        """
+        Constructs a BenchmarkResult.
+
+        :param name: name of the benchmark
+        :param size: number of transactions on the file, None if the
+        benchmark does not use a file
+        :param items: number of items processed, such as transactions
+        :param seconds: best time for processing the items
+        :param peak_memory: peak of the memory allocated, in bytes
+        """
+        self._name = name
+        self._size = size
+        self._items = items
+        self._seconds = seconds
+        self._peak_memory = peak_memory
+
+    def __str__(self):
+        line = '%s: %d items, %.4f sec, %.1f items/sec' % (
+            self.key, self._items, self._seconds, self.throughput)
+        if self._peak_memory is not None:
+            line += ', %.1f MB peak' % (self._peak_memory / 1024.0 / 1024.0)
+        return line
+
+    @property
+    def key(self):
+        """
+        Identifier of the benchmark and size, used for comparisons.
+
+        :return: the name, followed by the size if there is one
+        """
+        if self._size is None:
+            return self._name
+        return '%s@%d' % (self._name, self._size)
+
+    @property
+    def name(self):
+        """
+        Name of the benchmark.
+
+        :return: the name
+        """
+        return self._name
+
+    @property
+    def size(self):
+        """
+        Number of transactions on the file used.
+
+        :return: the size, or None
+        """
+        return self._size
+
+    @property
+    def items(self):
+        """
+        Number of items processed.
+
+        :return: the number of items
+        """
+        return self._items
+
+    @property
+    def seconds(self):
+        """
+        Best time for processing the items.
+
+        :return: the time in seconds
+        """
+        return self._seconds
+
+    @property
+    def throughput(self):
+        """
+        Items processed per second.
+
+        :return: the throughput
+        """
+        if not self._seconds:
+            return 0
+        return self._items / self._seconds
+
+    @property
+    def peak_memory(self):
+        """
+        Peak of the memory allocated while running the benchmark.
+
+        :return: the memory in bytes, or None if it was not traced
+        """
+        return self._peak_memory
+
+
+class Regression(object):
+    """
+    A benchmark which got worse than its baseline.
+    """
+
+    def __init__(self, key, metric, baseline, current):
+        """
+        Constructs a Regression.
+
+        :param key: key of the benchmark
+        :param metric: 'throughput' or 'peak_memory'
+        :param baseline: value on the baseline
+        :param current: value on the current run
+        """
+        self._key = key
+        self._metric = metric
+        self._baseline = baseline
+        self._current = current
+
+    def __str__(self):
+        return '%s: %s %.1f, baseline %.1f (%+.1f%%)' % (
+            self._key, self._metric, self._current, self._baseline,
+            100.0 * self.change)
+
+    @property
+    def key(self):
+        """
+        Key of the benchmark.
+
+        :return: the key
+        """
+        return self._key
+
+    @property
+    def metric(self):
+        """
+        The metric which got worse.
+
+        :return: 'throughput' or 'peak_memory'
+        """
+        return self._metric
+
+    @property
+    def change(self):
+        """
+        Relative change from the baseline.
+
+        :return: the change, negative for drops
+        """
+        return (self._current - self._baseline) / float(self._baseline)
+
+
+class BenchmarkReport(object):
+    """
+    Results for a run of the suite, along with the environment it ran on.
+    """
+
+    def __init__(self, results=None, max_rss=None, environment=None):
+        """
+        Constructs a BenchmarkReport.
+
+        :param results: list of BenchmarkResult
+        :param max_rss: peak resident set size of the process, in bytes
+        :param environment: dict describing the environment
+        """
+        self._results = results or []
+        self._max_rss = max_rss
+        self._environment = environment or _environment()
+
+    def __str__(self):
+        lines = [str(result) for result in self._results]
+        if self._max_rss is not None:
+            lines.append('Peak RSS: %.1f MB' % (
+                self._max_rss / 1024.0 / 1024.0))
+        return '\n'.join(lines)
+
+    @property
+    def results(self):
+        """
+        The results, in the order they were run.
+
+        :return: list of BenchmarkResult
+        """
+        return self._results
+
+    @property
+    def max_rss(self):
+        """
+        Peak resident set size of the process.
+
+        :return: the size in bytes, or None if it is unknown
+        """
+        return self._max_rss
+
+    @max_rss.setter
+    def max_rss(self, value):
+        self._max_rss = value
+
+    @property
+    def environment(self):
+        """
+        Versions of Python and pyparsing, and platform.
+
+        :return: dict describing the environment
+        """
+        return self._environment
+
+    def add(self, result):
+        """
+        Adds a result.
+
+        :param result: the BenchmarkResult
+        """
+        self._results.append(result)
+
+    def compare(self, baseline, threshold=DEFAULT_THRESHOLD,
+                min_seconds=DEFAULT_MIN_SECONDS):
+        """
+        Compares the results with a baseline.
+
+        Only the benchmarks found on both reports are compared. The
+        throughput of benchmarks which took less than the minimum time on
+        the baseline is not compared, as it is mostly noise.
+
+        :param baseline: BenchmarkReport with the baseline
+        :param threshold: relative change allowed
+        :param min_seconds: minimum time for comparing the throughput
+        :return: list of Regression, empty if there is none
+        """
+        previous = dict((result.key, result) for result in baseline.results)
+
+        regressions = []
+        for result in self._results:
+            base = previous.get(result.key)
+            if base is None:
+                continue
+
+            if base.seconds >= min_seconds and base.throughput and \
+                    result.throughput < base.throughput * (1 - threshold):
+                regressions.append(Regression(result.key, 'throughput',
+                                              base.throughput,
+                                              result.throughput))
+            if base.peak_memory and result.peak_memory is not None and \
+                    result.peak_memory > base.peak_memory * (1 + threshold):
+                regressions.append(Regression(result.key, 'peak_memory',
+                                              base.peak_memory,
+                                              result.peak_memory))
+
+        return regressions
+
+    def to_dict(self):
+        """
+        Creates a dictionary with the report, to be stored as JSON.
+
+        :return: dict with the report
+        """
+        return {'environment': self._environment,
+                'max_rss': self._max_rss,
+                'results': [OrderedDict((('name', result.name),
+                                         ('size', result.size),
+                                         ('items', result.items),
+                                         ('seconds', result.seconds),
+                                         ('throughput', result.throughput),
+                                         ('peak_memory',
+                                          result.peak_memory)))
+                            for result in self._results]}
+
+    @staticmethod
+    def from_dict(data):
+        """
+        Creates a report from the dictionary created by to_dict.
+
+        :param data: dict with the report
+        :return: the BenchmarkReport
+        """
+        results = [BenchmarkResult(result['name'], result['size'],
+                                   result['items'], result['seconds'],
+                                   result.get('peak_memory'))
+                   for result in data['results']]
+        return BenchmarkReport(results, data.get('max_rss'),
+                               data.get('environment'))
+
+
+def save_report(report, path):
+    """
+    Stores a report as JSON.
+
+    :param report: the BenchmarkReport
+    :param path: path to the JSON file
+    """
+    with open(path, 'wt') as out:
+        json.dump(report.to_dict(), out, indent=2)
+        out.write('\n')
+
+
+def load_report(path):
+    """
+    Reads a report stored with save_report.
+
+    :param path: path to the JSON file
+    :return: the BenchmarkReport
+    """
+    with open(path, 'rt') as source:
+        return BenchmarkReport.from_dict(json.load(source))
+
+
+class BenchmarkSuite(object):
+    """
+    Runs the benchmarks on synthetic files of several sizes.
+    """
+
+    def __init__(self, sizes=(1000,), repeat=3, seed=1, memory=True,
+                 names=None, out=None):
+        """
+        Constructs a BenchmarkSuite.
+
+        :param sizes: number of transactions for each file
+        :param repeat: times each benchmark is run, keeping the best time
+        :param seed: seed for the synthetic files
+        :param memory: indicates if the memory allocations are traced
+        :param names: prefixes of the benchmarks to run, by default all of
+        them
+        :param out: text stream where each result is written as it is
+        measured
+        """
+        self._sizes = sizes
+        self._repeat = repeat
+        self._seed = seed
+        self._memory = memory
+        self._names = names
+        self._out = out
+
+        self._factory = None
+        self._record_rules = None
+        self._encoder_factory = None
+
+    def run(self):
+        """
+        Runs the benchmarks.
+
+        :return: a BenchmarkReport
+        """
+        report = BenchmarkReport()
+
+        self._run_cases(report, None, self._fixed_cases())
+        for size in self._sizes:
+            self._run_cases(report, size, self._sized_cases(size))
+
+        report.max_rss = max_rss()
+
+        return report
+
+    def _selected(self, name):
+        if not self._names:
+            return True
+        return any(name.startswith(prefix) for prefix in self._names)
+
+    def _run_cases(self, report, size, cases):
+        for name, items, function in cases:
+            if not self._selected(name):
+                continue
+
+            seconds, peak = measure(function, self._repeat, self._memory)
+            result = BenchmarkResult(name, size, items, seconds, peak)
+            report.add(result)
+
+            if self._out is not None:
+                self._out.write('%s\n' % result)
+                self._out.flush()
+
+    def _fixed_cases(self):
+        """
+        Benchmarks which don't depend on the file size.
+        """
+        yield 'grammar_build', 1, default_grammar_factory
+        yield 'import', 1, _import
+
+        names = ['CW%02d%04d%s_TST.V21' % (year, sequence_n, sender)
+                 for year in range(10, 20)
+                 for sequence_n in range(100)
+                 for sender in ('PUB', 'SOC', 'AB')]
+        decoder = default_filename_decoder()
+
+        def decode_names():
+            for name in names:
+                decoder.decode(name)
+
+        yield 'filename_decode', len(names), decode_names
+
+        if self._selected('rule_lookup'):
+            factory = default_grammar_factory()
+            yield 'rule_lookup', _LOOKUPS, lambda: _lookup(factory,
+                                                           'transmission')
+
+        field_factory = FieldRuleFactory(
+            {'test_field': {'type': 'numeric', 'name': 'Test Field',
+                            'size': 3}},
+            {'numeric': NumericAdapter()})
+        yield 'field_rule_lookup', _LOOKUPS, lambda: _lookup(field_factory,
+                                                             'test_field')
+
+        if self._selected('tis_validate'):
+            config = CWRConfiguration().load_acknowledge_config('example')
+            acknowledge = AcknowledgeFile(config, 1, 'TST')
+            transactions = _territory_transactions(config, 1000)
+
+            def validate_tis():
+                for transaction in transactions:
+                    acknowledge.validate_tis(transaction)
+
+            yield 'tis_validate', len(transactions), validate_tis
+
+    def _sized_cases(self, size):
+        """
+        Benchmarks on a synthetic file with the received number of
+        transactions.
+        """
+        if not any(self._selected(name) for name in
+                   ('record_decode', 'file_decode', 'stream_decode',
+                    'ack') + _DECODED_CASES):
+            return
+
+        contents = self._contents(size)
+        data = {'filename': _FILENAME, 'contents': contents}
+
+        for record_type, lines in sorted(_lines_by_type(contents).items()):
+            name = 'record_decode.%s' % record_type
+            if self._selected(name):
+                yield name, len(lines), _parse_lines(
+                    self._record_rule(record_type), lines)
+
+        decoder = default_file_decoder()
+        yield 'file_decode', size, lambda: decoder.decode(dict(data))
+
+        stream_decoder = default_file_stream_decoder()
+        yield 'stream_decode', size, lambda: list(
+            stream_decoder.decode(dict(data)))
+
+        if any(self._selected(name) for name in _DECODED_CASES):
+            cwr_file = decoder.decode(dict(data))
+
+            dictionary_encoder = FileDictionaryEncoder()
+            dictionary_decoder = FileDictionaryDecoder()
+            yield 'dictionary_round_trip', size, lambda: \
+                dictionary_decoder.decode(
+                    dictionary_encoder.encode(cwr_file))
+
+            json_encoder = JSONEncoder()
+            json_decoder = JSONDecoder()
+            yield 'json_round_trip', size, lambda: json_decoder.decode(
+                json_encoder.encode(cwr_file))
+
+            file_encoder = default_file_encoder()
+            yield 'cwr_round_trip', size, lambda: decoder.decode(
+                {'filename': _FILENAME,
+                 'contents': file_encoder.encode(cwr_file.transmission)})
+
+            transactions = [transaction
+                            for group in cwr_file.transmission.groups
+                            for transaction in group.transactions]
+            yield 'index_build', size, lambda: _build_index(transactions)
+
+            for case in self._validation_cases(transactions):
+                yield case
+
+        config = CWRConfiguration().load_acknowledge_config('example')
+        encoder_factory = self._record_encoder_factory()
+
+        def acknowledge():
+            writer = default_stream_writer(io.StringIO(), encoder_factory)
+            AcknowledgeFile(config, 1, 'TST').acknowledge_stream(
+                stream_decoder.decode(dict(data)), writer)
+
+        yield 'ack', size, acknowledge
+
+    def _validation_cases(self, transactions):
+        """
+        Benchmarks for validating the transactions with the edit rules.
+        """
+        if not self._selected('validate'):
+            return
+
+        config = dict(CWRConfiguration().load_acknowledge_config('example'))
+        config['validation_rules'] = 'common'
+        size = len(transactions)
+
+        with ParallelValidation(config, jobs=1) as validation:
+            yield 'validate', size, lambda: validation.validate(transactions)
+
+        if self._selected('validate_parallel'):
+            jobs = max(2, os.cpu_count() or 1)
+            with ParallelValidation(config, jobs=jobs,
+                                    chunk_size=_CHUNK_SIZE) as validation:
+                # Starts the workers, which is not measured
+                validation.validate(transactions[:_CHUNK_SIZE * jobs])
+                yield 'validate_parallel', size, lambda: \
+                    validation.validate(transactions)
+
+        record_types = AcknowledgeFile(config, 0, '').record_types
+        projected = [project(transaction, record_types)
+                     for transaction in transactions]
+        yield 'validate_ipc', size, lambda: _pickle_chunks(
+            config, projected)
+
+    def _contents(self, size):
+        out = io.StringIO()
+        generator = default_generator(
+            self._seed, encoder_factory=self._record_encoder_factory())
+        generator.write(out, size - size // 10, size // 10)
+        return out.getvalue()
+
+    def _record_encoder_factory(self):
+        if self._encoder_factory is None:
+            self._encoder_factory = default_record_encoder_factory()
+        return self._encoder_factory
+
+    def _record_rule(self, record_type):
+        if self._record_rules is None:
+            factory = default_grammar_factory()
+            rule_ids = record_rule_ids(
+                CWRConfiguration().load_record_config('common'))
+            self._record_rules = {}
+            for rt, ids in rule_ids.items():
+                rules = [factory.get_rule(rule_id) for rule_id in ids]
+                if len(rules) == 1:
+                    self._record_rules[rt] = rules[0]
+                else:
+                    self._record_rules[rt] = pp.MatchFirst(rules)
+        return self._record_rules[record_type]
+
+
+def measure(function, repeat=3, memory=True):
+    """
+    Measures the time and memory required by a function.
+
+    The time is the best of several runs. The memory is measured on an
+    additional run, as tracing the allocations slows down the function.
+
+    :param function: the function to measure, without arguments
+    :param repeat: number of runs to time
+    :param memory: indicates if the memory allocations are traced
+    :return: tuple with the best time in seconds and the peak memory in
+    bytes, which is None if not traced
+    """
+    best = None
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return best, peak
+
+
+def _lines_by_type(contents):
+    lines = {}
+    for line in contents.splitlines():
+        if line:
+            lines.setdefault(line[:3], []).append(line)
+    return lines
+
+
+def _parse_lines(rule, lines):
+    def parse():
+        for line in lines:
+            rule.parseString(line, parseAll=True)
+
+    return parse
+
+
+def _territory_transactions(config, count):
+    """
+    Creates transactions with 300 territories outside the configuration,
+    half of them also including a configured one.
+    """
+    configured = set(int(code) for code in config['tis'].values())
+    codes = [int(code) for code in CWRTables().get_data('tis_code')]
+    codes = [code for code in codes
+             if code not in configured and code < 2100][:300]
+
+    transactions = []
+    for transaction_n in range(count):
+        records = []
+        for i, code in enumerate(codes):
+            if i % 2 == 0:
+                record_type, ip_n = 'SPT', 'P%d' % (i % 10)
+            else:
+                record_type, ip_n = 'SWT', 'W%d' % (i % 10)
+            records.append(IPTerritoryOfControlRecord(
+                record_type=record_type, ip_n=ip_n,
+                inclusion_exclusion_indicator='I', tis_numeric_code=code))
+        if transaction_n % 2 == 0:
+            records.append(IPTerritoryOfControlRecord(
+                record_type='SPT', ip_n='P0',
+                inclusion_exclusion_indicator='I',
+                tis_numeric_code=min(configured)))
+        transactions.append(records)
+    return transactions
+
+
+def _lookup(factory, rule_id):
+    for _ in range(_LOOKUPS):
+        factory.get_rule(rule_id)
+
+
+def _pickle_chunks(config, transactions):
+    """
+    Pickles and unpickles the chunks sent to the validation workers, along
+    with the configuration.
+    """
+    for chunk in chunks(transactions, _CHUNK_SIZE):
+        pickle.loads(pickle.dumps((config, chunk), pickle.HIGHEST_PROTOCOL))
+
+
+def _build_index(transactions):
+    index = TransmissionIndex()
+    for transaction in transactions:
+        index.add_transaction(transaction)
+    return index
+
+
+def _import():
+    """
+    Imports the decoders on a new interpreter.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        path for path in (_ROOT, env.get('PYTHONPATH')) if path)
+    subprocess.check_call([sys.executable, '-c',
+                           'import cwr.parser.decoder.file'], env=env)
+
+
+def _environment():
+    return OrderedDict((('python', platform.python_version()),
+                        ('implementation',
+                         platform.python_implementation()),
+                        ('pyparsing', pp.__version__),
+                        ('platform', platform.platform())))
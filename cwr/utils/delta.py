@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import tempfile
+
+from cwr.parser.decoder.stream import read_blocks, read_lines, TRANSACTION
+from cwr.parser.encoder.stream import default_stream_writer
+from cwr.utils.layout import default_record_layouts
+
+"""
+Generation of CWR files containing only the works which changed since a
+previous submission.
+
+Each work transaction, made up of the work record and all its detail records,
+is summarized into a fingerprint computed from its encoded lines, ignoring the
+sequence numbers and whether it was sent as a new work or a revision.
+
+Comparing the fingerprints of the current catalogue with those of the previous
+submission allows creating a transmission with:
+- A NWR transaction for each new work
+- A REV transaction for each work whose fingerprint changed
+
+The fingerprints of the previous submission can be taken from its file, from
+the decoded file, or stored in any other place as a dictionary mapping the
+submitter work number to the fingerprint.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_WORK_TRANSACTIONS = ('NWR', 'REV')
+
+# First column after the record prefix
+_PREFIX_END = 19
+
+
+def default_delta_generator(out, previous):
+    """
+    Creates a generator which writes the delta between the previous
+    submission and the current catalogue to the received file object.
+
+    The previous submission can be a CWRFile, a Transmission, or a dictionary
+    with the fingerprints.
+
+    :param out: text file object where the lines will be written
+    :param previous: the previous submission
+    :return: a delta generator for the default standard
+    """
+    writer = default_stream_writer(out)
+
+    if hasattr(previous, 'transmission'):
+        previous = previous.transmission
+    if hasattr(previous, 'groups'):
+        previous = transmission_fingerprints(previous, writer)
+
+    return DeltaGenerator(writer, previous)
+
+
+def transaction_fingerprint(lines):
+    """
+    Computes the fingerprint for the encoded lines of a transaction.
+
+    The sequence numbers, the type of the first record and the trailing
+    spaces are ignored.
+
+    :param lines: the transaction lines
+    :return: the fingerprint, as bytes
+    """
+    digest = hashlib.md5()
+    for line_n, line in enumerate(lines):
+        if line_n > 0:
+            digest.update(line[:3].encode('utf-8'))
+        digest.update(line[_PREFIX_END:].rstrip().encode('utf-8'))
+        digest.update(b'\n')
+    return digest.digest()
+
+
+def transmission_fingerprints(transmission, writer):
+    """
+    Computes the fingerprints for the work transactions of a Transmission.
+
+    :param transmission: the Transmission to read
+    :param writer: CwrStreamWriter used to encode the transactions
+    :return: a dict mapping submitter work numbers to fingerprints
+    """
+    fingerprints = {}
+    for group in transmission.groups:
+        for transaction in group.transactions:
+            head = transaction[0]
+            if head.record_type in _WORK_TRANSACTIONS:
+                lines = writer.encode_transaction(transaction)
+                fingerprints[_key(head.submitter_work_n)] = \
+                    transaction_fingerprint(lines)
+    return fingerprints
+
+
+def file_fingerprints(contents, layouts=None):
+    """
+    Computes the fingerprints for the work transactions of a CWR file,
+    without decoding it.
+
+    This gives the same fingerprints as the decoded transactions, as long as
+    the file was created by this library.
+
+    :param contents: the file contents, as a string or lines iterable
+    :param layouts: dict mapping each record type to its RecordLayout
+    :return: a dict mapping submitter work numbers to fingerprints
+    """
+    if layouts is None:
+        layouts = default_record_layouts()
+
+    fingerprints = {}
+    for block in read_blocks(read_lines(contents)):
+        if block.block_type != TRANSACTION:
+            continue
+
+        record_type = block.lines[0][:3]
+        if record_type in _WORK_TRANSACTIONS:
+            work_n = layouts[record_type].slice(block.lines[0],
+                                                'submitter_work_n')
+            fingerprints[_key(work_n)] = transaction_fingerprint(block.lines)
+    return fingerprints
+
+
+class DeltaReport(object):
+    """
+    Number of works found on each state.
+    """
+
+    def __init__(self):
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+
+    def __repr__(self):
+        return '<class %s>(new=%r, changed=%r, unchanged=%r)' % (
+            self.__class__.__name__, self.new, self.changed, self.unchanged)
+
+
+class DeltaGenerator(object):
+    """
+    Writes a transmission containing only the new and changed works.
+
+    New works are written as they are received, on a NWR group. Revisions are
+    stored on a temporary file, and written on a REV group after all the works
+    have been received. This way the memory used does not depend on the size
+    of the catalogue.
+    """
+
+    def __init__(self, writer, fingerprints):
+        """
+        Constructs a DeltaGenerator.
+
+        :param writer: CwrStreamWriter for the new transmission
+        :param fingerprints: dict mapping submitter work numbers to the
+        fingerprints of the previous submission
+        """
+        self._writer = writer
+        self._fingerprints = fingerprints
+
+    def write(self, header, transactions):
+        """
+        Compares the current works with the previous submission, writing the
+        full transmission for the delta.
+
+        The transactions can contain model records or record dictionaries, as
+        accepted by the CwrStreamWriter, and should begin with the work
+        record.
+
+        :param header: TransmissionHeader or dictionary for it
+        :param transactions: iterable with the current work transactions
+        :return: a DeltaReport with the number of works on each state
+        """
+        report = DeltaReport()
+
+        self._writer.write_header(header)
+
+        with tempfile.TemporaryFile('w+', encoding='utf-8',
+                                    newline='') as revisions:
+            new_group = False
+            for transaction in transactions:
+                lines = self._writer.encode_transaction(transaction)
+                fingerprint = transaction_fingerprint(lines)
+                previous = self._fingerprints.get(
+                    _key(_work_n(transaction[0])))
+
+                if previous is None:
+                    if not new_group:
+                        self._writer.open_group('NWR')
+                        new_group = True
+                    self._writer.write_encoded_transaction(lines, 'NWR')
+                    report.new += 1
+                elif previous != fingerprint:
+                    # Each revision is stored as a line with its line count
+                    revisions.write('%d\n' % len(lines))
+                    revisions.writelines(line[:-2] + '\n' for line in lines)
+                    report.changed += 1
+                else:
+                    report.unchanged += 1
+
+            if new_group:
+                self._writer.close_group()
+
+            if report.changed > 0:
+                revisions.seek(0)
+                self._writer.open_group('REV')
+                for lines in _read_revisions(revisions):
+                    self._writer.write_encoded_transaction(lines, 'REV')
+                self._writer.close_group()
+
+        self._writer.close()
+
+        return report
+
+
+def _read_revisions(revisions):
+    """
+    Reads the transactions stored on the temporary file.
+    """
+    while True:
+        count = revisions.readline()
+        if not count:
+            break
+        yield [revisions.readline()[:-1] + '\r\n'
+               for _ in range(int(count))]
+
+
+def _work_n(record):
+    if isinstance(record, dict):
+        return record.get('submitter_work_n')
+    return record.submitter_work_n
+
+
+def _key(value):
+    if isinstance(value, str):
+        return value.strip()
+    return value
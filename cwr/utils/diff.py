@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+import hashlib
+
+from cwr.parser.decoder.stream import default_file_stream_decoder, \
+    LineBlock, TRANSACTION
+from cwr.parser.encoder.tabular import TabularRecordEncoder
+from cwr.utils.layout import default_record_layouts
+
+"""
+Keyed comparison of two CWR files.
+
+Transactions are matched by the work's submitter work number, the agreement's
+submitter agreement number or, for acknowledgements, the submitter creation
+number. This allows comparing a resubmission to the previous file, even if
+the transactions appear in a different order or their sequence numbers
+changed.
+
+The files are read at line level, without applying the grammar. For each
+transaction a fingerprint is computed from its lines, ignoring the sequence
+numbers, and only the transactions with different fingerprints are decoded to
+find which fields changed.
+
+Only the key, fingerprint and position of each transaction of the previous
+file are kept in memory.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+# Field used as key for each transaction type
+_KEY_FIELDS = {
+    'AGR': 'submitter_agreement_n',
+    'NWR': 'submitter_work_n',
+    'REV': 'submitter_work_n',
+    'ISW': 'submitter_work_n',
+    'EXC': 'submitter_work_n',
+    'ACK': 'submitter_creation_n'
+}
+
+# Work transactions are matched even if their transaction type changes
+_KEY_KINDS = {
+    'AGR': 'agreement',
+    'ACK': 'acknowledgement'
+}
+
+_CONTROL_RECORDS = ('HDR', 'GRH', 'GRT', 'TRL')
+
+# Columns of the sequence numbers, which are ignored
+_SEQUENCE_START = 3
+_SEQUENCE_END = 19
+
+
+def default_file_differ():
+    """
+    Creates a differ for files following the default CWR standard.
+
+    :return: a differ for the default standard
+    """
+    layouts = default_record_layouts()
+    return CWRFileDiffer(layouts, default_file_stream_decoder(),
+                         TabularRecordEncoder(layouts))
+
+
+class FieldDifference(object):
+    """
+    A field with different values on both files.
+
+    Records are identified by their type and their position among the records
+    of the same type in the transaction. A missing record has None as value
+    for all its fields.
+    """
+
+    def __init__(self, record_type, record_n, field, old_value, new_value):
+        """
+        Constructs a FieldDifference.
+
+        :param record_type: the record type
+        :param record_n: position among the records of that type, from zero
+        :param field: name of the field
+        :param old_value: value on the previous file
+        :param new_value: value on the new file
+        """
+        self._record_type = record_type
+        self._record_n = record_n
+        self._field = field
+        self._old_value = old_value
+        self._new_value = new_value
+
+    def __repr__(self):
+        return '<class %s>(record_type=%r, record_n=%r, field=%r, ' \
+               'old_value=%r, new_value=%r)' % (
+                   self.__class__.__name__, self._record_type,
+                   self._record_n, self._field, self._old_value,
+                   self._new_value)
+
+    @property
+    def record_type(self):
+        """
+        Type of the record containing the field.
+
+        :return: the record type
+        """
+        return self._record_type
+
+    @property
+    def record_n(self):
+        """
+        Position of the record among the records of the same type.
+
+        :return: the record position
+        """
+        return self._record_n
+
+    @property
+    def field(self):
+        """
+        Name of the field.
+
+        :return: the field name
+        """
+        return self._field
+
+    @property
+    def old_value(self):
+        """
+        Value on the previous file.
+
+        :return: the old value
+        """
+        return self._old_value
+
+    @property
+    def new_value(self):
+        """
+        Value on the new file.
+
+        :return: the new value
+        """
+        return self._new_value
+
+
+class TransactionDifference(object):
+    """
+    A transaction which was added, removed or changed.
+    """
+
+    def __init__(self, status, key, transaction_type, differences=None):
+        """
+        Constructs a TransactionDifference.
+
+        :param status: 'added', 'removed' or 'changed'
+        :param key: the value identifying the transaction
+        :param transaction_type: the transaction type, on the new file if
+        it exists there
+        :param differences: the FieldDifference list, for changes
+        """
+        self._status = status
+        self._key = key
+        self._transaction_type = transaction_type
+        if differences is None:
+            self._differences = []
+        else:
+            self._differences = differences
+
+    def __repr__(self):
+        return '<class %s>(status=%r, key=%r, transaction_type=%r, ' \
+               'differences=%r)' % (self.__class__.__name__, self._status,
+                                    self._key, self._transaction_type,
+                                    len(self._differences))
+
+    @property
+    def status(self):
+        """
+        Indicates if the transaction was added, removed or changed.
+
+        :return: 'added', 'removed' or 'changed'
+        """
+        return self._status
+
+    @property
+    def key(self):
+        """
+        Value identifying the transaction, such as the submitter work number.
+
+        :return: the transaction key
+        """
+        return self._key
+
+    @property
+    def transaction_type(self):
+        """
+        Transaction type, such as 'NWR'.
+
+        :return: the transaction type
+        """
+        return self._transaction_type
+
+    @property
+    def differences(self):
+        """
+        Fields which changed, for changed transactions.
+
+        :return: list of FieldDifference
+        """
+        return self._differences
+
+
+class _TransactionEntry(object):
+    """
+    Position and fingerprint of a transaction on a file.
+    """
+
+    __slots__ = ('key', 'transaction_type', 'fingerprint', 'offset',
+                 'lines')
+
+    def __init__(self, key, transaction_type, offset):
+        self.key = key
+        self.transaction_type = transaction_type
+        self.fingerprint = None
+        self.offset = offset
+        self.lines = None
+
+
+class CWRFileDiffer(object):
+    """
+    Compares two CWR files, returning the transactions which differ.
+    """
+
+    def __init__(self, layouts, decoder, encoder, encoding='latin-1'):
+        """
+        Constructs a CWRFileDiffer.
+
+        :param layouts: dict mapping each record type to its RecordLayout
+        :param decoder: FileStreamDecoder used on the changed transactions
+        :param encoder: TabularRecordEncoder for reading the record fields
+        :param encoding: encoding of the files
+        """
+        self._layouts = layouts
+        self._decoder = decoder
+        self._encoder = encoder
+        self._encoding = encoding
+
+    def diff(self, old_path, new_path):
+        """
+        Compares two files.
+
+        The added and changed transactions are returned in the order they
+        appear on the new file, followed by the removed ones.
+
+        :param old_path: path to the previous file
+        :param new_path: path to the new file
+        :return: an iterator over TransactionDifference instances
+        """
+        entries = {}
+        with open(old_path, 'rb') as old_file:
+            for entry in self._read_transactions(old_file):
+                entries[entry.key] = entry
+
+            with open(new_path, 'rb') as new_file:
+                for entry in self._read_transactions(new_file, True):
+                    old = entries.pop(entry.key, None)
+                    if old is None:
+                        yield TransactionDifference(ADDED, entry.key[1],
+                                                    entry.transaction_type)
+                    elif old.fingerprint != entry.fingerprint:
+                        old_lines = self._read_lines(old_file, old.offset,
+                                                     old.lines)
+                        differences = self._compare(old_lines, entry.lines)
+                        yield TransactionDifference(CHANGED, entry.key[1],
+                                                    entry.transaction_type,
+                                                    differences)
+
+        for entry in entries.values():
+            yield TransactionDifference(REMOVED, entry.key[1],
+                                        entry.transaction_type)
+
+    def _read_transactions(self, data, keep_lines=False):
+        """
+        Reads the transactions of a file, computing their fingerprints.
+
+        The lines of each transaction are kept only if asked for, otherwise
+        only their number is stored.
+        """
+        transaction_type = None
+        entry = None
+        digest = None
+        lines = None
+
+        offset = 0
+        for raw in data:
+            line_offset = offset
+            offset += len(raw)
+
+            line = raw.decode(self._encoding).rstrip('\n')
+            if line_offset == 0:
+                # Skips any byte order mark
+                line = line[max(line.find('HDR'), 0):]
+            record_type = line[:3]
+
+            if record_type in _CONTROL_RECORDS or not line.strip():
+                if record_type == 'GRH':
+                    transaction_type = line[3:6]
+                if entry is not None:
+                    yield self._close_entry(entry, digest, lines, keep_lines)
+                    entry = None
+                continue
+
+            if entry is None or record_type == transaction_type:
+                if entry is not None:
+                    yield self._close_entry(entry, digest, lines, keep_lines)
+                entry = _TransactionEntry(self._key(record_type, line),
+                                          record_type, line_offset)
+                digest = hashlib.md5()
+                lines = []
+
+            # The sequence numbers and trailing spaces are ignored
+            masked = line[:_SEQUENCE_START] + line[_SEQUENCE_END:].rstrip()
+            digest.update(masked.encode('utf-8'))
+            digest.update(b'\n')
+            lines.append(line)
+
+        if entry is not None:
+            yield self._close_entry(entry, digest, lines, keep_lines)
+
+    @staticmethod
+    def _close_entry(entry, digest, lines, keep_lines):
+        entry.fingerprint = digest.digest()
+        if keep_lines:
+            entry.lines = lines
+        else:
+            entry.lines = len(lines)
+        return entry
+
+    def _key(self, record_type, line):
+        """
+        Creates the key for a transaction from its first line.
+        """
+        kind = _KEY_KINDS.get(record_type, 'work')
+        value = None
+        if record_type in _KEY_FIELDS:
+            layout = self._layouts[record_type]
+            value = layout.slice(line, _KEY_FIELDS[record_type]).strip()
+
+        if not value:
+            # Without a key the whole first line is used
+            value = line[_SEQUENCE_END:].rstrip()
+
+        return kind, value
+
+    def _read_lines(self, data, offset, count):
+        """
+        Reads again the lines of a transaction from the previous file.
+        """
+        position = data.tell()
+        data.seek(offset)
+        lines = []
+        for _ in range(count):
+            lines.append(data.readline().decode(self._encoding).rstrip('\n'))
+        data.seek(position)
+        return lines
+
+    def _compare(self, old_lines, new_lines):
+        """
+        Decodes two versions of a transaction, returning the fields which
+        differ.
+        """
+        old_records = self._decode_records(old_lines)
+        new_records = self._decode_records(new_lines)
+
+        differences = []
+        keys = list(new_records.keys())
+        keys.extend(key for key in old_records if key not in new_records)
+
+        for key in keys:
+            record_type, record_n = key
+            old_values = old_records.get(key)
+            new_values = new_records.get(key)
+
+            for i, column in enumerate(self._encoder.columns(record_type)):
+                if column.name in ('transaction_sequence_n',
+                                   'record_sequence_n'):
+                    continue
+
+                old_value = old_values[i] if old_values else None
+                new_value = new_values[i] if new_values else None
+                if old_value != new_value:
+                    differences.append(FieldDifference(record_type, record_n,
+                                                       column.name, old_value,
+                                                       new_value))
+
+        return differences
+
+    def _decode_records(self, lines):
+        block = LineBlock(TRANSACTION, 0)
+        block.lines = lines
+
+        records = {}
+        counts = {}
+        for record in self._decoder.decode_block(block):
+            record_type = record.record_type
+            record_n = counts.get(record_type, 0)
+            counts[record_type] = record_n + 1
+            records[(record_type, record_n)] = self._encoder.encode(record)
+
+        return records
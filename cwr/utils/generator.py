@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import io
+import random
+
+from cwr.parser.encoder.stream import default_record_encoder_factory, \
+    default_stream_writer
+from data_cwr.accessor import CWRTables
+
+"""
+Generation of synthetic CWR files, for load testing.
+
+The CWRGenerator creates random, but valid, agreements and works, and writes
+them through the CwrStreamWriter, so the files are encoded the same way as
+any other file, and can be of any size without keeping them in memory.
+
+Works contain publishers with their territories, writers with their
+territories and publishers, alternate titles, performers and recordings, and
+optionally the non-Roman alphabet records for the publisher and writer
+names, title and performers. Agreements contain territories and interested
+parties. The number of each record is chosen from a range, and the lookup
+values from the tables on data_cwr.
+
+The same seed always generates the same file.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_WORDS = ('LOVE', 'NIGHT', 'BLUE', 'SONG', 'HEART', 'RIVER', 'DANCE', 'LIGHT',
+          'RAIN', 'SUMMER', 'ROAD', 'FIRE', 'DREAM', 'CITY', 'MOON', 'HOME',
+          'WILD', 'GOLD', 'SILENT', 'STAR')
+
+_LAST_NAMES = ('SMITH', 'GARCIA', 'MULLER', 'ROSSI', 'DUBOIS', 'SILVA',
+               'NOVAK', 'JENSEN', 'TANAKA', 'KOWALSKI', 'MARTIN', 'BROWN')
+
+_FIRST_NAMES = ('ANNA', 'JOHN', 'MARIA', 'PAUL', 'LAURA', 'PETER', 'ELENA',
+                'DAVID', 'SARA', 'JAMES', 'LUCIA', 'MARK')
+
+_COMPANY_SUFFIXES = ('MUSIC', 'PUBLISHING', 'SONGS', 'EDITIONS', 'RECORDS')
+
+# Territories used by default, as most agreements and works cover a few
+# countries or the whole world
+_TERRITORIES = (2136, 724, 826, 250, 276, 380, 840, 76, 392, 36)
+
+# Publisher types for original publishers, administrators and subpublishers
+_ORIGINAL_PUBLISHER = 'E'
+_SUBPUBLISHER = 'SE'
+
+
+def default_generator(seed=None, **kwargs):
+    """
+    Creates a generator using the tables for the default standard.
+
+    :param seed: seed for the random values
+    :param kwargs: any other parameter for the CWRGenerator
+    :return: a CWRGenerator
+    """
+    return CWRGenerator(CWRTables(), seed=seed, **kwargs)
+
+
+def generate_contents(works, agreements=0, seed=None, **kwargs):
+    """
+    Creates the contents of a synthetic CWR file.
+
+    The whole file is kept in memory, for large files CWRGenerator.write
+    should be used instead.
+
+    :param works: number of work transactions
+    :param agreements: number of agreement transactions
+    :param seed: seed for the random values
+    :param kwargs: any other parameter for the CWRGenerator
+    :return: the file contents
+    """
+    out = io.StringIO()
+    default_generator(seed, **kwargs).write(out, works, agreements)
+    return out.getvalue()
+
+
+class CWRGenerator(object):
+    """
+    Creates synthetic CWR transactions and files.
+
+    The size of each transaction is controlled with (minimum, maximum)
+    ranges for the number of records, and probabilities for the optional
+    records.
+    """
+
+    def __init__(self, tables, seed=None, publishers=(1, 2), writers=(1, 3),
+                 territories=(1, 3), alternate_titles=(0, 2),
+                 performers=(0, 2), recordings=(0, 1), nra=0.1,
+                 agreement_territories=(1, 2), encoder_factory=None):
+        """
+        Constructs a CWRGenerator.
+
+        :param tables: the CWRTables with the lookup values
+        :param seed: seed for the random values
+        :param publishers: range for the original publishers of each work,
+        each of them with a subpublisher
+        :param writers: range for the writers of each work
+        :param territories: range for the territories of each interested party
+        :param alternate_titles: range for the alternate titles of each work
+        :param performers: range for the performers of each work
+        :param recordings: range for the recordings of each work
+        :param nra: probability of a work including the non-Roman alphabet
+        records
+        :param agreement_territories: range for the territories on each
+        agreement
+        :param encoder_factory: CwrRecordEncoderFactory used when writing, by
+        default one is created the first time a file is written
+        """
+        self._random = random.Random(seed)
+        self._publishers = publishers
+        self._writers = writers
+        self._territories = territories
+        self._alternate_titles = alternate_titles
+        self._performers = performers
+        self._recordings = recordings
+        self._nra = nra
+        self._agreement_territories = agreement_territories
+        self._encoder_factory = encoder_factory
+
+        self._languages = _lookup(tables, 'language_code')
+        self._categories = _lookup(tables,
+                                   'musical_work_distribution_category')
+        self._designations = [value for value in
+                              _lookup(tables, 'writer_designation_code')
+                              if value in ('A', 'C', 'CA')]
+        self._societies = [value for value in _lookup(tables, 'society_code')
+                           if len(value) == 3]
+        self._title_types = [value for value in _lookup(tables, 'title_type')
+                             if value not in ('OT', 'OL')]
+        self._agreement_types = _lookup(tables, 'agreement_type')
+        self._territory_codes = [int(value) for value in
+                                 _lookup(tables, 'tis_code')]
+
+        # Interested party numbers are not repeated across the file
+        self._ip_n = 0
+        # Original publisher for the writers of the current work
+        self._last_publisher = None
+
+    def header(self):
+        """
+        Creates the transmission header.
+
+        :return: dictionary for the HDR record
+        """
+        created = datetime.datetime(2015, 1, 1) + datetime.timedelta(
+            seconds=self._random.randrange(365 * 24 * 3600))
+        return {'record_type': 'HDR',
+                'sender_type': 'PB',
+                'sender_id': self._random.randrange(1, 10 ** 9),
+                'sender_name': self._company(),
+                'edi_standard': '01.10',
+                'creation_date_time': created,
+                'transmission_date': created.date(),
+                'character_set': None}
+
+    def work(self, work_n):
+        """
+        Creates a work transaction.
+
+        The writers own half of the performing rights, and the publishers the
+        other half along with all the mechanical and synchronization rights.
+
+        :param work_n: number of the work, used for its submitter work number
+        :return: list with the record dictionaries
+        """
+        rand = self._random
+        title = self._title()
+        nra = rand.random() < self._nra
+
+        records = [{'record_type': 'NWR',
+                    'submitter_work_n': 'W%09d' % work_n,
+                    'title': title,
+                    'iswc': _iswc(work_n),
+                    'language_code': rand.choice(self._languages),
+                    'musical_work_distribution_category': rand.choice(
+                        self._categories),
+                    'duration': datetime.time(0, rand.randrange(1, 10),
+                                              rand.randrange(60)),
+                    'recorded_indicator': 'Y',
+                    'text_music_relationship': 'MTX',
+                    'version_type': 'ORI'}]
+
+        publishers = self._count(self._publishers)
+        pr_shares = _split(50, publishers)
+        mr_shares = _split(100, publishers)
+        for i in range(publishers):
+            records.extend(self._publisher_chain(2 * i + 1, pr_shares[i],
+                                                 mr_shares[i], nra))
+
+        writers = self._count(self._writers)
+        pr_shares = _split(50 if publishers else 100, writers)
+        for share in pr_shares:
+            records.extend(self._writer(share, publishers, nra))
+
+        for _ in range(self._count(self._alternate_titles)):
+            records.append({'record_type': 'ALT',
+                            'alternate_title': self._title(),
+                            'title_type': rand.choice(self._title_types),
+                            'language_code': rand.choice(self._languages)})
+        if nra:
+            records.append({'record_type': 'NAT',
+                            'title': title,
+                            'title_type': 'OT',
+                            'language_code': rand.choice(self._languages)})
+
+        performers = [self._person() for _ in
+                      range(self._count(self._performers))]
+        for last_name, first_name in performers:
+            records.append({'record_type': 'PER',
+                            'performing_artist_last_name': last_name,
+                            'performing_artist_first_name': first_name})
+        if nra:
+            for last_name, first_name in performers:
+                records.append({'record_type': 'NPR',
+                                'performing_artist_name': last_name,
+                                'performing_artist_first_name': first_name,
+                                'language_code': rand.choice(self._languages)})
+
+        for _ in range(self._count(self._recordings)):
+            records.append({'record_type': 'REC',
+                            'first_release_date': self._date(),
+                            'first_release_duration': records[0]['duration'],
+                            'first_album_title': self._title(),
+                            'first_album_label': self._company(),
+                            'first_release_catalog_n': 'CAT%06d' %
+                                                       rand.randrange(10 ** 6),
+                            'recording_format': 'A',
+                            'recording_technique': 'D'})
+
+        return records
+
+    def agreement(self, agreement_n):
+        """
+        Creates an agreement transaction, between an assignor and an
+        acquirer.
+
+        :param agreement_n: number of the agreement, used for its submitter
+        agreement number
+        :return: list with the record dictionaries
+        """
+        rand = self._random
+        start = self._date()
+
+        records = [{'record_type': 'AGR',
+                    'submitter_agreement_n': 'A%09d' % agreement_n,
+                    'agreement_type': rand.choice(self._agreement_types),
+                    'agreement_start_date': start,
+                    'agreement_end_date': start + datetime.timedelta(
+                        days=365 * rand.randrange(1, 10)),
+                    'prior_royalty_status': 'N',
+                    'post_term_collection_status': 'N',
+                    'date_of_signature': start,
+                    'number_of_works': rand.randrange(1, 1000),
+                    'sales_manufacture_clause': rand.choice(('M', 'S')),
+                    'shares_change': False,
+                    'advance_given': False}]
+
+        assignor = self._next_ip_n()
+        acquirer = self._next_ip_n()
+        share = rand.choice((25, 50, 75))
+        for _ in range(self._count(self._agreement_territories)):
+            for tis in self._territory_list(1, 2):
+                records.append({'record_type': 'TER',
+                                'inclusion_exclusion_indicator': 'I',
+                                'tis_numeric_code': tis})
+            records.append(self._party('AS', assignor, 100 - share))
+            records.append(self._party('AC', acquirer, share))
+
+        return records
+
+    def transactions(self, works, agreements=0):
+        """
+        Creates the transactions for a file, grouped by transaction type.
+
+        :param works: number of work transactions
+        :param agreements: number of agreement transactions
+        :return: list of (transaction type, transactions iterator) tuples
+        """
+        groups = []
+        if agreements:
+            groups.append(('AGR', (self.agreement(i + 1)
+                                   for i in range(agreements))))
+        if works:
+            groups.append(('NWR', (self.work(i + 1) for i in range(works))))
+        return groups
+
+    def write(self, out, works, agreements=0):
+        """
+        Writes a CWR file, with a group for the agreements and another for
+        the works.
+
+        The transactions are created as they are written, so only one of
+        them is kept in memory.
+
+        :param out: text file object where the lines will be written
+        :param works: number of work transactions
+        :param agreements: number of agreement transactions
+        :return: the CwrStreamWriter used, with the counts of the file
+        """
+        if self._encoder_factory is None:
+            self._encoder_factory = default_record_encoder_factory()
+
+        writer = default_stream_writer(out, self._encoder_factory)
+        writer.write_header(self.header())
+        for transaction_type, transactions in self.transactions(works,
+                                                                agreements):
+            writer.write_group(transaction_type, transactions)
+        writer.close()
+
+        return writer
+
+    def _publisher_chain(self, sequence_n, pr_share, mr_share, nra):
+        """
+        Creates an original publisher and its subpublisher, with their
+        territories.
+        """
+        rand = self._random
+        territories = self._territory_list(*self._territories)
+
+        records = []
+        for publisher_type, offset in ((_ORIGINAL_PUBLISHER, 0),
+                                       (_SUBPUBLISHER, 1)):
+            ip_n = self._next_ip_n()
+            name = self._company()
+            records.append({'record_type': 'SPU',
+                            'publisher_sequence_n': sequence_n + offset,
+                            'ip_n': ip_n,
+                            'publisher_name': name,
+                            'publisher_type': publisher_type,
+                            'ipi_name_n': self._ipi_name_n(),
+                            'pr_society': rand.choice(self._societies),
+                            'pr_ownership_share': pr_share if not offset
+                            else 0,
+                            'mr_society': rand.choice(self._societies),
+                            'mr_ownership_share': mr_share if not offset
+                            else 0,
+                            'sr_ownership_share': mr_share if not offset
+                            else 0})
+            if nra:
+                records.append({'record_type': 'NPN',
+                                'publisher_sequence_n': sequence_n + offset,
+                                'ip_n': ip_n,
+                                'publisher_name': name,
+                                'language_code': rand.choice(
+                                    self._languages)})
+            for i, tis in enumerate(territories):
+                records.append({'record_type': 'SPT',
+                                'ip_n': ip_n,
+                                'pr_collection_share': pr_share,
+                                'mr_collection_share': mr_share,
+                                'sr_collection_share': mr_share,
+                                'inclusion_exclusion_indicator': 'I',
+                                'tis_numeric_code': tis,
+                                'shares_change': False,
+                                'sequence_n': i + 1})
+
+        self._last_publisher = records[0]
+        return records
+
+    def _writer(self, pr_share, publishers, nra):
+        """
+        Creates a controlled writer, with its territories and the original
+        publisher of the last chain.
+        """
+        rand = self._random
+        ip_n = self._next_ip_n()
+        last_name, first_name = self._person()
+
+        records = [{'record_type': 'SWR',
+                    'ip_n': ip_n,
+                    'writer_last_name': last_name,
+                    'writer_first_name': first_name,
+                    'writer_designation': rand.choice(self._designations),
+                    'ipi_name_n': self._ipi_name_n(),
+                    'pr_society': rand.choice(self._societies),
+                    'pr_ownership_share': pr_share,
+                    'mr_ownership_share': 0,
+                    'sr_ownership_share': 0}]
+        if nra:
+            records.append({'record_type': 'NWN',
+                            'ip_n': ip_n,
+                            'writer_last_name': last_name,
+                            'writer_first_name': first_name,
+                            'language_code': rand.choice(self._languages)})
+        for i, tis in enumerate(self._territory_list(*self._territories)):
+            records.append({'record_type': 'SWT',
+                            'ip_n': ip_n,
+                            'pr_collection_share': pr_share,
+                            'mr_collection_share': 0,
+                            'sr_collection_share': 0,
+                            'inclusion_exclusion_indicator': 'I',
+                            'tis_numeric_code': tis,
+                            'shares_change': False,
+                            'sequence_n': i + 1})
+        if publishers:
+            publisher = self._last_publisher
+            records.append({'record_type': 'PWR',
+                            'publisher_ip_n': publisher['ip_n'],
+                            'publisher_name': publisher['publisher_name'],
+                            'writer_ip_n': ip_n})
+
+        return records
+
+    def _party(self, role, ip_n, share):
+        rand = self._random
+        last_name, first_name = self._person()
+        return {'record_type': 'IPA',
+                'agreement_role_code': role,
+                'ipi_name_n': self._ipi_name_n(),
+                'ip_n': ip_n,
+                'ip_last_name': last_name,
+                'ip_writer_first_name': first_name,
+                'pr_society': rand.choice(self._societies),
+                'pr_share': share,
+                'mr_society': rand.choice(self._societies),
+                'mr_share': share,
+                'sr_society': rand.choice(self._societies),
+                'sr_share': share}
+
+    def _count(self, limits):
+        return self._random.randint(*limits)
+
+    def _territory_list(self, minimum, maximum):
+        """
+        Chooses distinct territories, mostly from the common ones.
+        """
+        count = self._random.randint(minimum, maximum)
+        if self._random.random() < 0.8:
+            codes = _TERRITORIES
+        else:
+            codes = self._territory_codes
+        return self._random.sample(codes, min(count, len(codes)))
+
+    def _next_ip_n(self):
+        self._ip_n += 1
+        return 'IP%07d' % self._ip_n
+
+    def _ipi_name_n(self):
+        return '%011d' % self._random.randrange(10 ** 8, 10 ** 11)
+
+    def _title(self):
+        return ' '.join(self._random.choice(_WORDS) for _ in
+                        range(self._random.randint(1, 4)))
+
+    def _person(self):
+        return self._random.choice(_LAST_NAMES), \
+               self._random.choice(_FIRST_NAMES)
+
+    def _company(self):
+        return '%s %s' % (self._random.choice(_LAST_NAMES),
+                          self._random.choice(_COMPANY_SUFFIXES))
+
+    def _date(self):
+        return datetime.date(1990, 1, 1) + datetime.timedelta(
+            days=self._random.randrange(25 * 365))
+
+
+def _lookup(tables, table_id):
+    """
+    Reads the values of a table, without padding or repetitions.
+
+    Some tables contain the same value both with and without its padding.
+    """
+    return sorted(set(value.strip() for value in tables.get_data(table_id)
+                      if value.strip()))
+
+
+def _split(total, parts):
+    """
+    Splits a share into whole parts, the first one taking the remainder.
+    """
+    if not parts:
+        return []
+    share = total // parts
+    return [total - share * (parts - 1)] + [share] * (parts - 1)
+
+
+def _iswc(work_n):
+    """
+    Creates a valid ISWC, including its check digit.
+    """
+    digits = '%09d' % (work_n % 10 ** 9)
+    total = 1 + sum((i + 1) * int(digit) for i, digit in enumerate(digits))
+    return 'T%s%d' % (digits, (10 - total % 10) % 10)
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+from cwr.parser.decoder.stream import TRANSACTION, GROUP_HEADER
+
+"""
+Secondary indexes for the transactions of a CWR transmission.
+
+A TransmissionIndex maps the codes found on the records to the transactions
+containing them, so a transaction can be found without walking through all
+the groups and records.
+
+The following lookups are supported:
+- Works, by submitter work number or ISWC
+- Agreements, by submitter or society assigned agreement number
+- Any transaction, by IPI name number, IPI base number or interested party
+  number, found on any of its records
+
+The index can be built from a decoded Transmission, or while decoding a file
+with the FileStreamDecoder.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Records identifying a work
+_WORK_RECORDS = ('NWR', 'REV', 'ISW', 'EXC')
+
+# Attributes with interested party numbers, on records and sub-entities
+_IP_ATTRIBUTES = ('ip_n', 'publisher_ip_n', 'writer_ip_n')
+
+_PARTY_ATTRIBUTES = ('publisher', 'writer')
+
+
+def index_transmission(transmission):
+    """
+    Creates the index for all the transactions on a Transmission.
+
+    :param transmission: the Transmission to index
+    :return: a TransmissionIndex for the transmission
+    """
+    index = TransmissionIndex()
+    for group in transmission.groups:
+        for transaction in group.transactions:
+            index.add_transaction(transaction, group.group_header.group_id)
+    return index
+
+
+def index_events(index, events):
+    """
+    Adds the transactions received from a FileStreamDecoder to an index,
+    returning the same events.
+
+    This allows building the index while the events are being consumed.
+
+    :param index: the TransmissionIndex to fill
+    :param events: iterable of (event type, value) tuples
+    :return: an iterator over the same events
+    """
+    group_id = None
+    for event, value in events:
+        if event == GROUP_HEADER:
+            group_id = value.group_id
+        elif event == TRANSACTION:
+            index.add_transaction(value, group_id)
+        yield event, value
+
+
+class TransmissionIndex(object):
+    """
+    Lookup tables from the codes on the records to their transactions.
+
+    Works and agreements are expected to appear on a single transaction, and
+    when they are repeated the first one is kept. The interested party
+    lookups return all the transactions where the party appears, in the order
+    they were added.
+    """
+
+    def __init__(self):
+        self._works = {}
+        self._iswcs = {}
+        self._agreements = {}
+        self._ipi_names = {}
+        self._ipi_bases = {}
+        self._ips = {}
+        self._groups = {}
+
+    def __len__(self):
+        return len(self._groups)
+
+    def add_transaction(self, transaction, group_id=None):
+        """
+        Adds a transaction to the index.
+
+        :param transaction: list with the records of the transaction
+        :param group_id: id of the group containing the transaction
+        """
+        self._groups[id(transaction)] = (transaction, group_id)
+
+        for record in transaction:
+            record_type = record.record_type
+
+            if record_type in _WORK_RECORDS:
+                self._add_unique(self._works,
+                                 getattr(record, 'submitter_work_n', None),
+                                 transaction)
+                self._add_unique(self._iswcs, getattr(record, 'iswc', None),
+                                 transaction)
+            elif record_type == 'AGR':
+                self._add_unique(self._agreements,
+                                 record.submitter_agreement_n, transaction)
+                self._add_unique(self._agreements,
+                                 record.society_assigned_agreement_n,
+                                 transaction)
+
+            self._add_parties(record, transaction)
+            for name in _PARTY_ATTRIBUTES:
+                party = getattr(record, name, None)
+                if party is not None:
+                    self._add_parties(party, transaction)
+
+    def group_id(self, transaction):
+        """
+        Returns the id of the group containing an indexed transaction.
+
+        :param transaction: the transaction
+        :return: the group id, or None if it is not known
+        """
+        entry = self._groups.get(id(transaction))
+        if entry is None:
+            return None
+        return entry[1]
+
+    def find_work(self, submitter_work_n):
+        """
+        Finds a work transaction by its submitter work number.
+
+        :param submitter_work_n: the submitter work number
+        :return: the transaction, or None if there is none
+        """
+        return self._works.get(_key(submitter_work_n))
+
+    def find_iswc(self, iswc):
+        """
+        Finds a work transaction by its ISWC.
+
+        :param iswc: the ISWC
+        :return: the transaction, or None if there is none
+        """
+        return self._iswcs.get(_key(iswc))
+
+    def find_agreement(self, agreement_n):
+        """
+        Finds an agreement transaction by its submitter or society assigned
+        agreement number.
+
+        :param agreement_n: the agreement number
+        :return: the transaction, or None if there is none
+        """
+        return self._agreements.get(_key(agreement_n))
+
+    def find_ipi_name(self, ipi_name_n):
+        """
+        Finds the transactions containing an IPI name number.
+
+        :param ipi_name_n: the IPI name number
+        :return: list with the transactions
+        """
+        return list(self._ipi_names.get(_key(ipi_name_n), {}).values())
+
+    def find_ipi_base(self, ipi_base_n):
+        """
+        Finds the transactions containing an IPI base number.
+
+        :param ipi_base_n: the IPI base number
+        :return: list with the transactions
+        """
+        return list(self._ipi_bases.get(_key(ipi_base_n), {}).values())
+
+    def find_ip(self, ip_n):
+        """
+        Finds the transactions containing an interested party number, which
+        is the submitter's id for a publisher or writer.
+
+        :param ip_n: the interested party number
+        :return: list with the transactions
+        """
+        return list(self._ips.get(_key(ip_n), {}).values())
+
+    def _add_parties(self, entity, transaction):
+        self._add_multiple(self._ipi_names,
+                           getattr(entity, 'ipi_name_n', None), transaction)
+        self._add_multiple(self._ipi_bases,
+                           getattr(entity, 'ipi_base_n', None), transaction)
+        for name in _IP_ATTRIBUTES:
+            self._add_multiple(self._ips, getattr(entity, name, None),
+                               transaction)
+
+    @staticmethod
+    def _add_unique(table, value, transaction):
+        value = _key(value)
+        if value is not None and value not in table:
+            table[value] = transaction
+
+    @staticmethod
+    def _add_multiple(table, value, transaction):
+        value = _key(value)
+        if value is None:
+            return
+
+        # Ordered dicts keep the insertion order, and avoid repeating a
+        # transaction which contains the same party on several records
+        transactions = table.get(value)
+        if transactions is None:
+            transactions = OrderedDict()
+            table[value] = transactions
+        transactions[id(transaction)] = transaction
+
+
+def _key(value):
+    """
+    Normalizes a code used as key, removing the padding spaces.
+
+    Numeric codes, such as the IPI name numbers, are decoded as integers, so
+    codes made only of digits are turned into integers, and can be found both
+    by their number and by their text.
+
+    :param value: the code
+    :return: the key for the code, or None if it is empty
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        if value.isdigit():
+            value = int(value)
+    if value == 0:
+        return None
+    return value
@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from cwr.parser.decoder.archive import open_text
+from cwr.parser.decoder.stream import read_lines
+from cwr.utils.layout import default_record_layouts
+
+"""
+Structural integrity check for CWR files.
+
+The file is read line by line, without applying the grammar nor creating any
+model instance, verifying that:
+- The file begins with a HDR record, ends with a TRL record, and each group
+  begins with a GRH and ends with a GRT
+- The group, transaction and record counts on the trailers match the file
+- Group ids begin at 1 and are consecutive, and the GRT has the same id as
+  its GRH
+- Transaction sequence numbers begin at 0 on each group and are
+  consecutive, and record sequence numbers begin at 0 on each transaction
+  and are consecutive
+- All the record types are known, and each line has a valid length for its
+  record type
+
+This only takes a few string operations for each line, so corrupt files can
+be rejected before spending time decoding them.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Issue codes
+STRUCTURE = 'structure'
+RECORD_TYPE = 'record_type'
+LINE_LENGTH = 'line_length'
+NUMBER = 'number'
+GROUP_ID = 'group_id'
+TRANSACTION_SEQUENCE = 'transaction_sequence'
+RECORD_SEQUENCE = 'record_sequence'
+GROUP_COUNT = 'group_count'
+TRANSACTION_COUNT = 'transaction_count'
+RECORD_COUNT = 'record_count'
+
+
+def default_integrity_checker():
+    """
+    Creates a checker for files following the default CWR standard.
+
+    :return: an IntegrityChecker for the default standard
+    """
+    return IntegrityChecker(default_record_layouts())
+
+
+class IntegrityIssue(object):
+    """
+    A problem found on a line.
+    """
+
+    def __init__(self, line_n, record_type, code, message, expected=None,
+                 found=None):
+        """
+        Constructs an IntegrityIssue.
+
+        :param line_n: number of the line, from 1
+        :param record_type: type of the record on the line
+        :param code: code for the kind of issue
+        :param message: description of the issue
+        :param expected: expected value, if there is one
+        :param found: value found on the file, if there is one
+        """
+        self._line_n = line_n
+        self._record_type = record_type
+        self._code = code
+        self._message = message
+        self._expected = expected
+        self._found = found
+
+    def __repr__(self):
+        return '<class %s>(line_n=%r, record_type=%r, code=%r, ' \
+               'expected=%r, found=%r)' % (
+                   self.__class__.__name__, self._line_n, self._record_type,
+                   self._code, self._expected, self._found)
+
+    def __str__(self):
+        return 'Line %d (%s): %s' % (self._line_n, self._record_type,
+                                     self._message)
+
+    @property
+    def line_n(self):
+        """
+        Number of the line, beginning at 1.
+
+        :return: the line number
+        """
+        return self._line_n
+
+    @property
+    def record_type(self):
+        """
+        Type of the record on the line.
+
+        :return: the record type
+        """
+        return self._record_type
+
+    @property
+    def code(self):
+        """
+        Code for the kind of issue, such as 'record_count'.
+
+        :return: the issue code
+        """
+        return self._code
+
+    @property
+    def message(self):
+        """
+        Description of the issue.
+
+        :return: the issue message
+        """
+        return self._message
+
+    @property
+    def expected(self):
+        """
+        Value which should be on the file.
+
+        :return: the expected value
+        """
+        return self._expected
+
+    @property
+    def found(self):
+        """
+        Value on the file.
+
+        :return: the value found
+        """
+        return self._found
+
+
+class IntegrityReport(object):
+    """
+    Issues found on a file, along with the totals counted on it.
+    """
+
+    def __init__(self, max_issues=None):
+        """
+        Constructs an IntegrityReport.
+
+        :param max_issues: maximum number of issues to keep, None to keep all
+        """
+        self._max_issues = max_issues
+        self._issues = []
+        self._issue_count = 0
+        self.lines = 0
+        self.groups = 0
+        self.transactions = 0
+        self.records = 0
+        self.seconds = 0
+
+    def __str__(self):
+        lines = [str(issue) for issue in self._issues]
+        if self._issue_count > len(self._issues):
+            lines.append('%d more issues' % (self._issue_count -
+                                             len(self._issues)))
+        lines.append('%d groups, %d transactions, %d records, %d issues, '
+                     '%.3f sec' % (self.groups, self.transactions,
+                                   self.records, self._issue_count,
+                                   self.seconds))
+        return '\n'.join(lines)
+
+    @property
+    def valid(self):
+        """
+        Indicates if no issue was found.
+
+        :return: True if the file is valid, False otherwise
+        """
+        return self._issue_count == 0
+
+    @property
+    def issues(self):
+        """
+        The issues found, in the order of the lines.
+
+        :return: list of IntegrityIssue
+        """
+        return self._issues
+
+    @property
+    def issue_count(self):
+        """
+        Number of issues found, including those not kept.
+
+        :return: the number of issues
+        """
+        return self._issue_count
+
+    def add(self, issue):
+        """
+        Adds an issue.
+
+        :param issue: the IntegrityIssue
+        """
+        self._issue_count += 1
+        if self._max_issues is None or len(self._issues) < self._max_issues:
+            self._issues.append(issue)
+
+
+class _Counts(object):
+    """
+    Groups, transactions and records found since a header.
+    """
+
+    __slots__ = ('groups', 'transactions', 'records')
+
+    def __init__(self):
+        self.groups = 0
+        self.transactions = 0
+        self.records = 0
+
+
+class IntegrityChecker(object):
+    """
+    Checks the structure of CWR files at line level.
+    """
+
+    def __init__(self, layouts, max_issues=1000):
+        """
+        Constructs an IntegrityChecker.
+
+        :param layouts: dict mapping each record type to its RecordLayout
+        :param max_issues: maximum number of issues kept on each report
+        """
+        self._layouts = layouts
+        self._max_issues = max_issues
+
+        # Slices for the numeric fields of the control records
+        self._numbers = {}
+        for record_type in ('GRH', 'GRT', 'TRL'):
+            layout = layouts[record_type]
+            self._numbers[record_type] = dict(
+                (field.name, (field.start, field.end))
+                for field in layout.fields
+                if field.name in ('group_id', 'group_count',
+                                  'transaction_count', 'record_count'))
+
+    def check_file(self, path, encoding='latin-1'):
+        """
+        Checks a file on disk, which may be compressed, or a zip archive with
+        a single file.
+
+        :param path: path to the file
+        :param encoding: encoding of the file
+        :return: an IntegrityReport
+        """
+        data = open_text(path, encoding)[1]
+        with data:
+            return self.check(data)
+
+    def check(self, contents):
+        """
+        Checks the contents of a file.
+
+        :param contents: the file contents, as a string or lines iterable
+        :return: an IntegrityReport
+        """
+        start = time.perf_counter()
+        report = IntegrityReport(self._max_issues)
+
+        layouts = self._layouts
+        transmission = None
+        group = None
+        group_id = 0
+        header_id = None
+        transaction_type = None
+        transaction_n = -1
+        record_n = -1
+        finished = False
+
+        line_n = 0
+        for line in read_lines(contents):
+            line_n += 1
+            if not line.strip():
+                continue
+
+            record_type = line[:3]
+            report.records += 1
+
+            layout = layouts.get(record_type)
+            if layout is None:
+                report.add(IntegrityIssue(line_n, record_type, RECORD_TYPE,
+                                          'Unknown record type'))
+                # It is still a record for the trailer counts
+                if transmission is not None:
+                    transmission.records += 1
+                if group is not None:
+                    group.records += 1
+                continue
+
+            length = len(line.rstrip('\r'))
+            if not layout.min_size <= length <= layout.max_size:
+                report.add(IntegrityIssue(
+                    line_n, record_type, LINE_LENGTH,
+                    'Line length %d out of %d to %d' % (
+                        length, layout.min_size, layout.max_size),
+                    (layout.min_size, layout.max_size), length))
+
+            if finished:
+                report.add(IntegrityIssue(line_n, record_type, STRUCTURE,
+                                          'Record after the TRL'))
+
+            if record_type == 'HDR':
+                if transmission is not None:
+                    report.add(IntegrityIssue(line_n, record_type, STRUCTURE,
+                                              'Repeated HDR'))
+                transmission = _Counts()
+                transmission.records = 1
+                continue
+
+            if transmission is None:
+                report.add(IntegrityIssue(line_n, record_type, STRUCTURE,
+                                          'The file does not begin with a '
+                                          'HDR'))
+                transmission = _Counts()
+
+            transmission.records += 1
+
+            if record_type == 'GRH':
+                if group is not None:
+                    report.add(IntegrityIssue(line_n, record_type, STRUCTURE,
+                                              'GRH before the GRT of the '
+                                              'previous group'))
+                    self._close_group(report, transmission, group)
+
+                group = _Counts()
+                group.records = 1
+                transaction_type = line[3:6]
+                transaction_n = -1
+                record_n = -1
+
+                group_id += 1
+                header_id = self._number(report, line_n, line, 'GRH',
+                                         'group_id')
+                if header_id is not None and header_id != group_id:
+                    report.add(IntegrityIssue(
+                        line_n, record_type, GROUP_ID,
+                        'Group id %d, expected %d' % (header_id, group_id),
+                        group_id, header_id))
+            elif record_type == 'GRT':
+                if group is None:
+                    report.add(IntegrityIssue(line_n, record_type, STRUCTURE,
+                                              'GRT without a GRH'))
+                    group = _Counts()
+                group.records += 1
+
+                found = self._number(report, line_n, line, 'GRT', 'group_id')
+                if None not in (found, header_id) and found != header_id:
+                    report.add(IntegrityIssue(
+                        line_n, record_type, GROUP_ID,
+                        'Group id %d, but the GRH has %d' % (found,
+                                                             header_id),
+                        header_id, found))
+                header_id = None
+
+                self._compare(report, line_n, line, 'GRT',
+                              'transaction_count', group.transactions)
+                self._compare(report, line_n, line, 'GRT', 'record_count',
+                              group.records)
+
+                self._close_group(report, transmission, group)
+                group = None
+                transaction_type = None
+            elif record_type == 'TRL':
+                if group is not None:
+                    report.add(IntegrityIssue(line_n, record_type, STRUCTURE,
+                                              'TRL before the GRT of the '
+                                              'last group'))
+                    self._close_group(report, transmission, group)
+                    group = None
+
+                self._compare(report, line_n, line, 'TRL', 'group_count',
+                              transmission.groups)
+                self._compare(report, line_n, line, 'TRL',
+                              'transaction_count', transmission.transactions)
+                self._compare(report, line_n, line, 'TRL', 'record_count',
+                              transmission.records)
+                finished = True
+            else:
+                if group is None:
+                    report.add(IntegrityIssue(line_n, record_type, STRUCTURE,
+                                              'Transaction record outside a '
+                                              'group'))
+                    continue
+                group.records += 1
+
+                found_transaction = _to_int(line[3:11])
+                found_record = _to_int(line[11:19])
+                if found_transaction is None or found_record is None:
+                    report.add(IntegrityIssue(line_n, record_type, NUMBER,
+                                              'Invalid sequence numbers',
+                                              found=line[3:19]))
+                    continue
+
+                if record_type == transaction_type or transaction_n < 0:
+                    group.transactions += 1
+                    transaction_n += 1
+                    record_n = 0
+                else:
+                    record_n += 1
+
+                if found_transaction != transaction_n:
+                    report.add(IntegrityIssue(
+                        line_n, record_type, TRANSACTION_SEQUENCE,
+                        'Transaction sequence %d, expected %d' % (
+                            found_transaction, transaction_n),
+                        transaction_n, found_transaction))
+                    # Following records are compared with the file's number
+                    transaction_n = found_transaction
+                if found_record != record_n:
+                    report.add(IntegrityIssue(
+                        line_n, record_type, RECORD_SEQUENCE,
+                        'Record sequence %d, expected %d' % (found_record,
+                                                             record_n),
+                        record_n, found_record))
+                    record_n = found_record
+
+        report.lines = line_n
+
+        if transmission is None:
+            report.add(IntegrityIssue(line_n, None, STRUCTURE,
+                                      'The file is empty'))
+        elif not finished:
+            if group is not None:
+                self._close_group(report, transmission, group)
+            report.add(IntegrityIssue(line_n, None, STRUCTURE,
+                                      'The file does not end with a TRL'))
+
+        if transmission is not None:
+            report.groups = transmission.groups
+            report.transactions = transmission.transactions
+
+        report.seconds = time.perf_counter() - start
+
+        return report
+
+    @staticmethod
+    def _close_group(report, transmission, group):
+        transmission.groups += 1
+        transmission.transactions += group.transactions
+
+    def _number(self, report, line_n, line, record_type, name):
+        """
+        Reads a numeric field from a control record, adding an issue if it is
+        not a number.
+        """
+        start, end = self._numbers[record_type][name]
+        value = _to_int(line[start:end])
+        if value is None:
+            report.add(IntegrityIssue(line_n, record_type, NUMBER,
+                                      'Invalid %s' % name,
+                                      found=line[start:end]))
+        return value
+
+    def _compare(self, report, line_n, line, record_type, name, counted):
+        """
+        Compares a count on a trailer with the value counted on the file.
+        """
+        found = self._number(report, line_n, line, record_type, name)
+        if found is not None and found != counted:
+            report.add(IntegrityIssue(
+                line_n, record_type, name,
+                '%s %d, but the file has %d' % (
+                    name.replace('_', ' ').capitalize(), found, counted),
+                counted, found))
+
+
+def _to_int(text):
+    if text.isdigit():
+        return int(text)
+    return None
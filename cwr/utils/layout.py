@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+
+from config_cwr.accessor import CWRConfiguration
+from data_cwr.accessor import CWRTables
+
+"""
+Fixed-width layout of the CWR records.
+
+The layouts are built from the same configuration files used to create the
+grammar, and tell for each record type which fields it contains, which type
+they have, and in which columns they are stored.
+
+This allows working with the records at line level, without applying the
+grammar rules, and to know which columns can be created from each record.
+
+Only fields following a fixed prefix of the record have a known position. If a
+record contains an option between alternatives of different lengths, the
+fields after it will have an unknown position.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Sizes of the field types whose grammar rule does not use the configured size
+_GRAMMAR_SIZES = {'time': 6, 'date_time': 14}
+
+
+def default_record_layouts():
+    """
+    Creates the layouts for all the records in the CWR standard, indexed by
+    the record type.
+
+    :return: a dict mapping each record type to its RecordLayout
+    """
+    config = CWRConfiguration()
+    factory = RecordLayoutFactory(config.load_record_config('common'),
+                                  default_field_configs(config))
+
+    return factory.get_layouts()
+
+
+def default_field_configs(config=None):
+    """
+    Loads the configuration for all the fields in the CWR standard, including
+    the values accepted by the lookup fields.
+
+    This is the configuration shared by the grammar, the encoders and the
+    record layouts.
+
+    :param config: the CWRConfiguration to read, by default a new one
+    :return: a dict mapping each field id to its configuration
+    """
+    if config is None:
+        config = CWRConfiguration()
+
+    field_configs = config.load_field_config('table')
+    field_configs.update(config.load_field_config('common'))
+
+    field_values = CWRTables()
+
+    for entry in field_configs.values():
+        if 'source' in entry:
+            values_id = entry['source']
+            entry['values'] = field_values.get_data(values_id)
+
+    return field_configs
+
+
+class FieldLayout(object):
+    """
+    Position and type of a field inside a record.
+
+    The name is the one used for the field on the model dictionaries, which is
+    the field's results name when it has one.
+    """
+
+    def __init__(self, field_id, name, field_type, size, start=None,
+                 optional=False, values=None):
+        """
+        Constructs a FieldLayout.
+
+        :param field_id: id of the field on the configuration
+        :param name: name of the field on the dictionaries
+        :param field_type: type of the field, as on the configuration
+        :param size: number of columns taken by the field
+        :param start: first column of the field, None if it is not fixed
+        :param optional: indicates if the field may be missing from the line
+        :param values: accepted values, for lookup fields
+        """
+        self._field_id = field_id
+        self._name = name
+        self._field_type = field_type
+        self._size = size
+        self._start = start
+        self._optional = optional
+        self._values = values
+
+    def __repr__(self):
+        return '<class %s>(name=%r, type=%r, start=%r, size=%r)' % (
+            self.__class__.__name__, self._name, self._field_type,
+            self._start, self._size)
+
+    @property
+    def field_id(self):
+        """
+        Id of the field on the configuration files.
+
+        :return: the field id
+        """
+        return self._field_id
+
+    @property
+    def name(self):
+        """
+        Name of the field on the model dictionaries.
+
+        :return: the field name
+        """
+        return self._name
+
+    @property
+    def field_type(self):
+        """
+        Type of the field, as indicated on the configuration files.
+
+        :return: the field type
+        """
+        return self._field_type
+
+    @property
+    def size(self):
+        """
+        Number of columns taken by the field.
+
+        :return: the field size
+        """
+        return self._size
+
+    @property
+    def start(self):
+        """
+        First column of the field on the line, counting from zero.
+
+        This will be None if the position can't be known before parsing the
+        line.
+
+        :return: the field's first column
+        """
+        return self._start
+
+    @start.setter
+    def start(self, value):
+        self._start = value
+
+    @property
+    def end(self):
+        """
+        Column following the last one of the field.
+
+        :return: the field's end column, or None if it is not fixed
+        """
+        if self._start is None:
+            return None
+        return self._start + self._size
+
+    @property
+    def optional(self):
+        """
+        Indicates if the field may be missing from the line.
+
+        :return: True if the field may be missing, False otherwise
+        """
+        return self._optional
+
+    @property
+    def values(self):
+        """
+        Values accepted by the field, if it is a lookup field.
+
+        :return: the accepted values, or None
+        """
+        return self._values
+
+
+class RecordLayout(object):
+    """
+    Fields and size of a CWR record type.
+
+    Transaction records begin with a prefix made up of the record type and the
+    transaction and record sequence numbers, while the control records begin
+    only with the record type. These prefix fields are included in the layout.
+    """
+
+    def __init__(self, record_type, fields, min_size, max_size,
+                 transaction=True):
+        """
+        Constructs a RecordLayout.
+
+        :param record_type: the record type code, such as 'NWR'
+        :param fields: the record fields, on the order they appear
+        :param min_size: minimum valid length of a line
+        :param max_size: maximum valid length of a line
+        :param transaction: indicates if this is a transaction record
+        """
+        self._record_type = record_type
+        self._fields = fields
+        self._min_size = min_size
+        self._max_size = max_size
+        self._transaction = transaction
+
+        self._fields_map = {}
+        for field in fields:
+            self._fields_map[field.name] = field
+
+    def __repr__(self):
+        return '<class %s>(record_type=%r, fields=%r)' % (
+            self.__class__.__name__, self._record_type,
+            [field.name for field in self._fields])
+
+    @property
+    def record_type(self):
+        """
+        The record type code.
+
+        :return: the record type
+        """
+        return self._record_type
+
+    @property
+    def fields(self):
+        """
+        The fields of the record, on the order in which they appear.
+
+        :return: the record fields
+        """
+        return self._fields
+
+    @property
+    def min_size(self):
+        """
+        Minimum length of a line containing this record.
+
+        :return: the minimum line length
+        """
+        return self._min_size
+
+    @property
+    def max_size(self):
+        """
+        Maximum length of a line containing this record.
+
+        :return: the maximum line length
+        """
+        return self._max_size
+
+    @property
+    def transaction(self):
+        """
+        Indicates if this is a transaction or detail record, and so it contains
+        the sequence numbers on its prefix.
+
+        :return: True for transaction records, False for control records
+        """
+        return self._transaction
+
+    def field(self, name):
+        """
+        Returns the layout for the field with the specified name.
+
+        :param name: name of the field
+        :return: the field's layout
+        """
+        return self._fields_map[name]
+
+    def has_field(self, name):
+        """
+        Indicates if the record contains a field with the specified name.
+
+        :param name: name of the field
+        :return: True if the field exists, False otherwise
+        """
+        return name in self._fields_map
+
+    def slice(self, line, name):
+        """
+        Returns the raw text of a field from a line.
+
+        The field should have a fixed position, otherwise a ValueError is
+        raised.
+
+        :param line: line containing the record
+        :param name: name of the field
+        :return: the text of the field, without removing spaces
+        """
+        field = self._fields_map[name]
+        if field.start is None:
+            raise ValueError('The field %s does not have a fixed position '
+                             'on %s records' % (name, self._record_type))
+        return line[field.start:field.end]
+
+
+class RecordLayoutFactory(object):
+    """
+    Creates the record layouts from the record and field configurations.
+    """
+
+    def __init__(self, record_configs, field_configs):
+        super(RecordLayoutFactory, self).__init__()
+        self._record_configs = record_configs
+        self._field_configs = field_configs
+
+    def get_layouts(self):
+        """
+        Creates the layouts for all the record types on the configuration.
+
+        When several configurations exist for the same record type, such as
+        for the GRT record, they are merged into a single layout.
+
+        :return: a dict mapping each record type to its RecordLayout
+        """
+        configs = {}
+        for record_config in self._record_configs:
+            if 'head' not in record_config:
+                continue
+            for record_type in record_config.head:
+                if record_type in configs:
+                    configs[record_type].append(record_config)
+                else:
+                    configs[record_type] = [record_config]
+
+        layouts = {}
+        for record_type, record_configs in configs.items():
+            layouts[record_type] = self._build_layout(record_type,
+                                                      record_configs)
+
+        return layouts
+
+    def _build_layout(self, record_type, record_configs):
+        fields = []
+        min_size = None
+        max_size = None
+        transaction = record_configs[0].rule_type == 'transaction_record'
+
+        for record_config in record_configs:
+            prefix = self._build_prefix(transaction)
+            start = prefix[-1].end
+
+            found = list(prefix)
+            _, min_l, max_l = self._walk(record_config.rules, start, False,
+                                         found)
+            min_l += start
+            max_l += start
+
+            if min_size is None or min_l < min_size:
+                min_size = min_l
+            if max_size is None or max_l > max_size:
+                max_size = max_l
+
+            self._merge_fields(fields, found)
+
+        return RecordLayout(record_type, fields, min_size, max_size,
+                            transaction)
+
+    @staticmethod
+    def _build_prefix(transaction):
+        prefix = [FieldLayout('record_type', 'record_type', 'alphanum', 3, 0)]
+
+        if transaction:
+            prefix.append(FieldLayout('transaction_sequence_n',
+                                      'transaction_sequence_n', 'numeric', 8,
+                                      3))
+            prefix.append(FieldLayout('record_sequence_n', 'record_sequence_n',
+                                      'numeric', 8, 11))
+
+        return prefix
+
+    @staticmethod
+    def _merge_fields(fields, found):
+        """
+        Adds the found fields to the list, avoiding repeated names.
+
+        If a name appears twice with different positions, the position is
+        unset, as it can't be known before parsing the line.
+        """
+        names = {}
+        for field in fields:
+            names[field.name] = field
+
+        for field in found:
+            if field.name in names:
+                if names[field.name].start != field.start:
+                    names[field.name].start = None
+            else:
+                names[field.name] = field
+                fields.append(field)
+
+    def _walk(self, rules, start, optional, fields):
+        """
+        Walks through a sequence of rules, storing the fields found.
+
+        Returns a tuple with the column after the sequence, which is None if it
+        is not fixed, and the minimum and maximum lengths of the sequence.
+        """
+        min_l = 0
+        max_l = 0
+        for rule in rules:
+            if rule.rule_type == 'field':
+                start, rule_min, rule_max = self._walk_field(rule.rule_name,
+                                                             start, optional,
+                                                             fields)
+            elif rule.list_type == 'optional':
+                _, _, rule_max = self._walk(rule.rules, start, True, fields)
+                rule_min = 0
+                if rule_max > 0:
+                    start = None
+            elif rule.list_type == 'option':
+                start, rule_min, rule_max = self._walk_option(rule.rules,
+                                                              start, optional,
+                                                              fields)
+            else:
+                start, rule_min, rule_max = self._walk(rule.rules, start,
+                                                       optional, fields)
+
+            min_l += rule_min
+            max_l += rule_max
+
+        return start, min_l, max_l
+
+    def _walk_field(self, field_id, start, optional, fields):
+        config = self._field_configs[field_id]
+        size = _GRAMMAR_SIZES.get(config['type'], config['size'])
+
+        if 'results_name' in config:
+            name = config['results_name']
+        else:
+            name = field_id
+
+        if 'values' in config:
+            values = config['values']
+        else:
+            values = None
+
+        fields.append(FieldLayout(field_id, name, config['type'], size, start,
+                                  optional, values))
+
+        if start is not None:
+            start += size
+
+        if optional:
+            return start, 0, size
+        elif config['type'] == 'alphanum_end':
+            # These fields may be cut when they are at the end of the line
+            return start, 1, size
+        else:
+            return start, size, size
+
+    def _walk_option(self, rules, start, optional, fields):
+        ends = set()
+        min_l = None
+        max_l = 0
+
+        for rule in rules:
+            found = []
+            if rule.rule_type == 'field':
+                end, rule_min, rule_max = self._walk_field(rule.rule_name,
+                                                           start, optional,
+                                                           found)
+            else:
+                end, rule_min, rule_max = self._walk(rule.rules, start,
+                                                     optional, found)
+            self._merge_fields(fields, found)
+
+            ends.add(end)
+            if min_l is None or rule_min < min_l:
+                min_l = rule_min
+            if rule_max > max_l:
+                max_l = rule_max
+
+        if len(ends) == 1:
+            end = ends.pop()
+        else:
+            end = None
+
+        return end, min_l or 0, max_l
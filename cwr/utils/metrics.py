@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import pyparsing as pp
+
+from cwr.utils.progress import ProgressHook
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+"""
+Metrics for the workers decoding CWR files, in the Prometheus text format.
+
+The MetricsCollector decodes files with any FileDecoder, measuring:
+- files decoded, records decoded by type and characters processed
+- parse errors, by the type of the record where the parsing stopped
+- histograms of the time spent decoding each file and each transaction
+- hits and misses of the pyparsing packrat cache, which is used only if
+  enabled with pyparsing.ParserElement.enablePackrat()
+- peak memory of the process
+
+The metrics are written in the Prometheus text exposition format, to stdout
+or to a file, which may be read by the node exporter textfile collector.
+Files are replaced atomically, so they are never read half written.
+
+Only the standard library is used.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Upper bounds, in seconds, for the histogram buckets
+DEFAULT_FILE_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800)
+DEFAULT_TRANSACTION_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5,
+                               1, 5)
+
+# Label used when the record type is unknown
+UNKNOWN = 'unknown'
+
+
+class Metric(object):
+    """
+    Base for the metrics, which keep a value for each set of labels.
+    """
+
+    _type = 'untyped'
+
+    def __init__(self, name, description, label_names=()):
+        """
+        Constructs a Metric.
+
+        :param name: name of the metric
+        :param description: help text for the metric
+        :param label_names: names of the labels for the values
+        """
+        self._name = name
+        self._description = description
+        self._label_names = tuple(label_names)
+        self._values = {}
+
+    @property
+    def name(self):
+        """
+        Name of the metric.
+
+        :return: the name
+        """
+        return self._name
+
+    def value(self, *labels):
+        """
+        Current value for a set of labels.
+
+        :param labels: values of the labels, in order
+        :return: the value
+        """
+        return self._values.get(labels, 0)
+
+    def exposition(self):
+        """
+        Creates the lines for the metric in the Prometheus text format.
+
+        :return: list of lines
+        """
+        lines = ['# HELP %s %s' % (self._name, _escape_help(
+            self._description)),
+                 '# TYPE %s %s' % (self._name, self._type)]
+        for labels, value in sorted(self._values.items()):
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels, value):
+        return ['%s%s %s' % (self._name,
+                             _labels(self._label_names, labels),
+                             _format_value(value))]
+
+
+class Counter(Metric):
+    """
+    Value which only increases.
+    """
+
+    _type = 'counter'
+
+    def inc(self, amount=1, *labels):
+        """
+        Increases the value for a set of labels.
+
+        :param amount: amount to add
+        :param labels: values of the labels, in order
+        """
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Value which may go up and down.
+    """
+
+    _type = 'gauge'
+
+    def set(self, value, *labels):
+        """
+        Sets the value for a set of labels.
+
+        :param value: the new value
+        :param labels: values of the labels, in order
+        """
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, counted on cumulative buckets.
+    """
+
+    _type = 'histogram'
+
+    def __init__(self, name, description, buckets, label_names=()):
+        """
+        Constructs a Histogram.
+
+        :param name: name of the metric
+        :param description: help text for the metric
+        :param buckets: upper bounds of the buckets, in ascending order
+        :param label_names: names of the labels for the values
+        """
+        super(Histogram, self).__init__(name, description, label_names)
+        self._buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    @property
+    def buckets(self):
+        """
+        Upper bounds of the buckets, ending with infinity.
+
+        :return: tuple with the bounds
+        """
+        return self._buckets
+
+    def observe(self, value, *labels):
+        """
+        Registers a value.
+
+        :param value: the observed value
+        :param labels: values of the labels, in order
+        """
+        data = self._values.get(labels)
+        if data is None:
+            # Count on each bucket, sum and count
+            data = [[0] * len(self._buckets), 0.0, 0]
+            self._values[labels] = data
+
+        counts = data[0]
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        data[1] += value
+        data[2] += 1
+
+    def value(self, *labels):
+        """
+        Number of observed values for a set of labels.
+
+        :param labels: values of the labels, in order
+        :return: the count
+        """
+        data = self._values.get(labels)
+        if data is None:
+            return 0
+        return data[2]
+
+    def _samples(self, labels, data):
+        counts, total, count = data
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self._buckets, counts):
+            cumulative += bucket_count
+            samples.append('%s_bucket%s %d' % (
+                self._name,
+                _labels(self._label_names + ('le',),
+                        labels + (_format_value(bound),)),
+                cumulative))
+        label_text = _labels(self._label_names, labels)
+        samples.append('%s_sum%s %s' % (self._name, label_text,
+                                        _format_value(total)))
+        samples.append('%s_count%s %d' % (self._name, label_text, count))
+        return samples
+
+
+class MetricsCollector(ProgressHook):
+    """
+    Measures the files decoded by a worker.
+
+    Files are decoded through the collector, which is added as a hook to the
+    decoder for measuring each transaction.
+    """
+
+    def __init__(self, namespace='cwr', file_buckets=DEFAULT_FILE_BUCKETS,
+                 transaction_buckets=DEFAULT_TRANSACTION_BUCKETS):
+        """
+        Constructs a MetricsCollector.
+
+        :param namespace: prefix for the names of the metrics
+        :param file_buckets: bucket bounds, in seconds, for the files
+        :param transaction_buckets: bucket bounds, in seconds, for the
+        transactions
+        """
+        super(MetricsCollector, self).__init__()
+        prefix = namespace + '_' if namespace else ''
+
+        self.files = Counter(prefix + 'files_decoded_total',
+                             'Files decoded.')
+        self.records = Counter(prefix + 'records_decoded_total',
+                               'Records decoded.', ('record_type',))
+        self.processed_bytes = Counter(prefix + 'processed_bytes_total',
+                                       'Characters of the files processed.')
+        self.parse_errors = Counter(prefix + 'parse_errors_total',
+                                    'Files which could not be parsed.',
+                                    ('record_type',))
+        self.file_latency = Histogram(prefix + 'file_decode_seconds',
+                                      'Time spent decoding each file.',
+                                      file_buckets)
+        self.transaction_latency = Histogram(
+            prefix + 'transaction_decode_seconds',
+            'Time spent decoding each transaction.', transaction_buckets)
+        self.cache_hits = Counter(prefix + 'grammar_cache_hits_total',
+                                  'Hits on the grammar packrat cache.')
+        self.cache_misses = Counter(prefix + 'grammar_cache_misses_total',
+                                    'Misses on the grammar packrat cache.')
+        self.peak_memory = Gauge(prefix + 'peak_memory_bytes',
+                                 'Peak memory used by the process.')
+
+        # Time of the last transaction parsed
+        self._last = None
+
+    @property
+    def metrics(self):
+        """
+        All the metrics, in the order they are written.
+
+        :return: list of Metric
+        """
+        return [self.files, self.records, self.processed_bytes,
+                self.parse_errors, self.file_latency,
+                self.transaction_latency, self.cache_hits,
+                self.cache_misses, self.peak_memory]
+
+    def decode(self, decoder, data):
+        """
+        Decodes a file, measuring it.
+
+        Parse errors are counted and raised again.
+
+        :param decoder: the FileDecoder to use
+        :param data: dictionary with the filename and the contents
+        :return: the CWRFile
+        """
+        size = len(data['contents'])
+        hits, misses = pp.ParserElement.packrat_cache_stats
+
+        instrumented = hasattr(decoder, 'add_hook')
+        if instrumented:
+            decoder.add_hook(self)
+        start = time.perf_counter()
+        try:
+            cwr_file = decoder.decode(data)
+        except pp.ParseBaseException as error:
+            self.parse_errors.inc(1, _record_type(error))
+            raise
+        finally:
+            if instrumented:
+                decoder.remove_hook(self)
+            self._last = None
+            self.processed_bytes.inc(size)
+            self.cache_hits.inc(pp.ParserElement.packrat_cache_stats[0] -
+                                hits)
+            self.cache_misses.inc(pp.ParserElement.packrat_cache_stats[1] -
+                                  misses)
+            self.update_memory()
+
+        self.file_latency.observe(time.perf_counter() - start)
+        self.files.inc()
+        self.observe_file(cwr_file)
+
+        return cwr_file
+
+    def observe_file(self, cwr_file):
+        """
+        Counts the records of a decoded file by type.
+
+        :param cwr_file: the CWRFile
+        """
+        transmission = cwr_file.transmission
+        records = self.records
+        records.inc(1, transmission.header.record_type)
+        for group in transmission.groups:
+            records.inc(1, group.group_header.record_type)
+            for transaction in group.transactions:
+                for record in transaction:
+                    records.inc(1, record.record_type)
+            records.inc(1, group.group_trailer.record_type)
+        records.inc(1, transmission.trailer.record_type)
+
+    def update_memory(self):
+        """
+        Stores the peak memory of the process.
+
+        The peak resident set size is used when it is available, otherwise
+        the peak traced by tracemalloc, if tracing.
+        """
+        peak = max_rss()
+        if peak is None and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+        if peak is not None:
+            self.peak_memory.set(max(peak, self.peak_memory.value()))
+
+    def on_start(self, progress):
+        self._last = time.perf_counter()
+
+    def on_transaction(self, progress):
+        now = time.perf_counter()
+        if self._last is not None:
+            self.transaction_latency.observe(now - self._last)
+        self._last = now
+
+    def on_group(self, progress):
+        # Group headers and trailers are not counted on the transactions
+        self._last = time.perf_counter()
+
+    def exposition(self):
+        """
+        Creates the text with all the metrics in the Prometheus format.
+
+        :return: the metrics text
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.exposition())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, target=None):
+        """
+        Writes the metrics in the Prometheus text format.
+
+        :param target: path of the file, or a text stream, if None they are
+        written to stdout
+        """
+        text = self.exposition()
+        if target is None:
+            sys.stdout.write(text)
+        elif hasattr(target, 'write'):
+            target.write(text)
+        else:
+            temporary = target + '.tmp'
+            with open(temporary, 'wt', encoding='utf-8') as output:
+                output.write(text)
+            os.replace(temporary, target)
+
+
+def max_rss():
+    """
+    Peak resident set size of the process, in bytes.
+
+    :return: the size, or None if it can't be read
+    """
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # macOS returns bytes, other systems kilobytes
+        return rss
+    return rss * 1024
+
+
+def _record_type(error):
+    """
+    Type of the record on the line where the parsing stopped.
+    """
+    try:
+        record_type = error.line[:3]
+    except Exception:
+        return UNKNOWN
+
+    if len(record_type) == 3 and record_type.isalpha() and \
+            record_type.isupper():
+        return record_type
+    return UNKNOWN
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape_label(value))
+                             for name, value in zip(names, values))
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 
+import csv
+import io
 import sys
+import threading
 
 from cwr.agreement import InterestedPartyForAgreementRecord, AgreementRecord, \
     AgreementTerritoryRecord
 from cwr.info import AdditionalRelatedInfoRecord
 from cwr.interested_party import IPTerritoryOfControlRecord, PublisherRecord, \
     PublisherForWriterRecord, WriterRecord
+from cwr.parser.decoder.stream import FILE_TAG, TRANSMISSION_HEADER, \
+    GROUP_HEADER, TRANSACTION, GROUP_TRAILER, TRANSMISSION_TRAILER, \
+    file_events
 from cwr.work import WorkRecord, ComponentRecord, AuthoredWorkRecord, \
     AlternateTitleRecord, RecordingDetailRecord, InstrumentationDetailRecord, \
     WorkOriginRecord, InstrumentationSummaryRecord, PerformingArtistRecord
@@ -20,426 +26,913 @@ A small tool to print the contents of a CWR on the console.
 
 It is meant to be used mostly as a testing tool, to check if a file can be
 parsed correctly, and to visually check at least part of it's contents.
+
+The contents can be printed as human readable text, or as CSV or TSV tables,
+with one table for each record type. Each table begins with a header row,
+containing the names of the fields.
+
+The printer writes to the output received, which should be buffered, each
+control record or transaction at once. Besides a CWRFile, it can print the
+events from a FileStreamDecoder, so the file doesn't need to be kept in
+memory.
+
+Single records can also be printed as text, with a method for each control
+record and record type, which writes to the console unless an output is
+given.
+
+Printers keep no state between calls, so they can be used from several
+threads at the same time. Writes to the output are done while holding a lock,
+so even when several threads share the same output the lines of a
+transaction are never mixed with those of other transactions.
 """
 
 __author__ = 'Bernardo Martínez Garrido'
 __license__ = 'MIT'
 __status__ = 'Development'
 
+# Output formats
+TEXT = 'text'
+CSV = 'csv'
+TSV = 'tsv'
+
+_DELIMITERS = {CSV: ',', TSV: '\t'}
+
+_SEPARATOR = '------------------------------'
+_STARS = '******************************'
+
 
 class CWRPrinter(object):
     """
-    Prints the contents of a CWR file on the console.
+    Prints the contents of a CWR file.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, output_format=TEXT):
+        """
+        Constructs a CWRPrinter.
+
+        :param output_format: 'text', 'csv' or 'tsv'
+        """
+        if output_format != TEXT and output_format not in _DELIMITERS:
+            raise ValueError('Unknown output format %s' % output_format)
+
+        self._format = output_format
+        self._lock = threading.Lock()
+
+        # Title and fields for each control record
+        self._control_records = {
+            TRANSMISSION_HEADER: ('CWR Transmission Header',
+                                  self._hdr_fields),
+            TRANSMISSION_TRAILER: ('CWR Transmission Trailer',
+                                   self._trl_fields),
+            GROUP_HEADER: ('CWR Group Header', self._grh_fields),
+            GROUP_TRAILER: ('CWR Group Trailer', self._grt_fields)}
+
+        # Fields for each record class, in the order they are checked
+        self._record_fields = [
+            (InterestedPartyForAgreementRecord, self._ipa_fields),
+            (NonRomanAlphabetAgreementPartyRecord, self._npa_fields),
+            (AgreementRecord, self._agr_fields),
+            (AgreementTerritoryRecord, self._ter_fields),
+            (AdditionalRelatedInfoRecord, self._ari_fields),
+            (NonRomanAlphabetPublisherNameRecord, self._npn_fields),
+            (IPTerritoryOfControlRecord, self._ipter_fields),
+            (PublisherRecord, self._pubr_fields),
+            (PublisherForWriterRecord, self._pwr_fields),
+            (WriterRecord, self._writr_fields),
+            (NonRomanAlphabetWriterNameRecord, self._nwn_fields),
+            (WorkRecord, self._workr_fields),
+            (ComponentRecord, self._com_fields),
+            (AuthoredWorkRecord, self._authr_fields),
+            (AlternateTitleRecord, self._alt_fields),
+            (NonRomanAlphabetTitleRecord, self._nat_fields),
+            (RecordingDetailRecord, self._rec_fields),
+            (InstrumentationDetailRecord, self._ind_fields),
+            (WorkOriginRecord, self._orn_fields),
+            (InstrumentationSummaryRecord, self._ins_fields),
+            (PerformingArtistRecord, self._per_fields),
+            (NonRomanAlphabetOtherWriterRecord, self._now_fields),
+            (NonRomanAlphabetPerformanceDataRecord, self._npr_fields),
+            (NonRomanAlphabetWorkRecord, self._nra_fields)]
+
+    @property
+    def output_format(self):
+        """
+        The output format: 'text', 'csv' or 'tsv'.
+
+        :return: the output format
+        """
+        return self._format
 
     def print_file(self, cwrfile, file_print):
-        out_old = sys.stdout
-        sys.stdout = file_print
-
-        self._print_tag(cwrfile.tag)
-        print(' ')
-        print('------------------------------')
-        print('******************************')
-        print('------------------------------')
-        print(' ')
-        self._print_transmission(cwrfile.transmission)
-
-        sys.stdout = out_old
-
-    def _print_tag(self, tag):
-        print('CWR Filename Tag information')
-        print('------------------------------')
-        print('Year: %s' % tag.year)
-        print('Sender: %s' % tag.sender)
-        print('Receiver: %s' % tag.receiver)
-        print('Sequence Number: %s' % tag.sequence_n)
-        print('Version: %s' % tag.version)
-
-    def _print_transmission(self, transmission):
-        # TODO: Add support for Acknowledgement
-
-        print('CWR Transmission begins')
-        print('------------------------------')
-        print('Contains %s groups' % len(transmission.groups))
-        print('------------------------------')
-        self.print_transmission_header(transmission.header)
-        print('------------------------------')
-        self.print_transmission_trailer(transmission.trailer)
+        """
+        Prints a CWRFile.
+
+        For text, the transmission and group trailers are printed along with
+        their headers. For CSV and TSV the output can also be a function
+        receiving the record type and returning the output for its table.
+
+        :param cwrfile: the CWRFile to print
+        :param file_print: the output, or function returning the output for
+        each record type
+        """
+        if self._format != TEXT:
+            self.print_events(file_events(cwrfile), file_print)
+            return
+
+        self._write(file_print, self._tag_lines(cwrfile.tag) +
+                    [' ', _SEPARATOR, _STARS, _SEPARATOR, ' '])
+
+        transmission = cwrfile.transmission
+        lines = ['CWR Transmission begins', _SEPARATOR,
+                 'Contains %s groups' % len(transmission.groups), _SEPARATOR]
+        lines.extend(self._control_lines(TRANSMISSION_HEADER,
+                                         transmission.header))
+        lines.append(_SEPARATOR)
+        lines.extend(self._control_lines(TRANSMISSION_TRAILER,
+                                         transmission.trailer))
+        self._write(file_print, lines)
+
         i = 1
         for group in transmission.groups:
-            print(' ')
-            print('------------------------------')
-            print('******************************')
-            print('*           GROUP            *')
-            print('******************************')
-            print('------------------------------')
-            print(' ')
-            print('------------------------------')
-            print('Group %s' % i)
-            print('Contains %s transactions' % len(group.transactions))
-            print('------------------------------')
-            self.print_group_header(group.group_header)
-            print('------------------------------')
-            self.print_group_trailer(group.group_trailer)
+            lines = self._group_banner()
+            lines.extend([_SEPARATOR, 'Group %s' % i,
+                          'Contains %s transactions' %
+                          len(group.transactions), _SEPARATOR])
+            lines.extend(self._control_lines(GROUP_HEADER,
+                                             group.group_header))
+            lines.append(_SEPARATOR)
+            lines.extend(self._control_lines(GROUP_TRAILER,
+                                             group.group_trailer))
+            self._write(file_print, lines)
 
             for transaction in group.transactions:
-                print(' ')
-                print('------------------------------')
-                print('******************************')
-                print('*        TRANSACTION         *')
-                print('******************************')
-                print('------------------------------')
-                for record in transaction:
-                    print(' ')
-                    self.print_transaction_record(record)
+                self._write(file_print, self._transaction_lines(transaction))
             i += 1
 
-    def print_transmission_header(self, header):
-        print('CWR Transmission Header')
-        print('Record Type: %s' % header.record_type)
-        print('Sender ID: %s' % header.sender_id)
-        print('Sender Name: %s' % header.sender_name)
-        print('Sender Type: %s' % header.sender_type)
-        print('Created on: %s' % header.creation_date_time)
-        print('Sent on: %s' % header.transmission_date)
-        print('EDI standard: %s' % header.edi_standard)
-        print('Character set: %s' % header.character_set)
-
-    def print_transmission_trailer(self, trailer):
-        print('CWR Transmission Trailer')
-        print('Record Type: %s' % trailer.record_type)
-        print('Group Count: %s' % trailer.group_count)
-        print('Transaction Count: %s' % trailer.transaction_count)
-        print('Record Count: %s' % trailer.record_count)
-
-    def print_group_header(self, header):
-        print('CWR Group Header')
-        print('Record Type: %s' % header.record_type)
-        print('Group ID: %s' % header.group_id)
-        print('Transaction Type: %s' % header.transaction_type)
-        print('Version Number: %s' % header.version_number)
-        print('Batch Request ID: %s' % header.batch_request_id)
-
-    def print_group_trailer(self, trailer):
-        print('CWR Group Trailer')
-        print('Record Type: %s' % trailer.record_type)
-        print('Group ID: %s' % trailer.group_id)
-        print('Transaction Count: %s' % trailer.transaction_count)
-        print('Record Count: %s' % trailer.record_count)
-
-    def print_transaction_record(self, record):
-        print('Record Type: %s' % record.record_type)
-        print('Transaction Sequence Number: %s' % record.transaction_sequence_n)
-        print('Record Sequence Number: %s' % record.record_sequence_n)
-
-        if isinstance(record, InterestedPartyForAgreementRecord):
-            self.print_ipa(record)
-        elif isinstance(record, NonRomanAlphabetAgreementPartyRecord):
-            self.print_npa(record)
-        elif isinstance(record, AgreementRecord):
-            self.print_agr(record)
-        elif isinstance(record, AgreementTerritoryRecord):
-            self.print_ter(record)
-        elif isinstance(record, AdditionalRelatedInfoRecord):
-            self.print_ari(record)
-        elif isinstance(record, NonRomanAlphabetPublisherNameRecord):
-            self.print_npn(record)
-        elif isinstance(record, IPTerritoryOfControlRecord):
-            self.print_ipter(record)
-        elif isinstance(record, PublisherRecord):
-            self.print_pubr(record)
-        elif isinstance(record, PublisherForWriterRecord):
-            self.print_pwr(record)
-        elif isinstance(record, WriterRecord):
-            self.print_writr(record)
-        elif isinstance(record, NonRomanAlphabetWriterNameRecord):
-            self.print_nwn(record)
-        elif isinstance(record, WorkRecord):
-            self.print_workr(record)
-        elif isinstance(record, ComponentRecord):
-            self.print_com(record)
-        elif isinstance(record, AuthoredWorkRecord):
-            self.print_authr(record)
-        elif isinstance(record, AlternateTitleRecord):
-            self.print_alt(record)
-        elif isinstance(record, NonRomanAlphabetTitleRecord):
-            self.print_nat(record)
-        elif isinstance(record, RecordingDetailRecord):
-            self.print_rec(record)
-        elif isinstance(record, InstrumentationDetailRecord):
-            self.print_ind(record)
-        elif isinstance(record, WorkOriginRecord):
-            self.print_orn(record)
-        elif isinstance(record, InstrumentationSummaryRecord):
-            self.print_ins(record)
-        elif isinstance(record, PerformingArtistRecord):
-            self.print_per(record)
-        elif isinstance(record, NonRomanAlphabetOtherWriterRecord):
-            self.print_now(record)
-        elif isinstance(record, NonRomanAlphabetPerformanceDataRecord):
-            self.print_npr(record)
-        elif isinstance(record, NonRomanAlphabetWorkRecord):
-            self.print_nra(record)
-
-    def print_ipa(self, record):
-        print('IP Number: %s' % record.ip_n)
-        print('Writer Name: %s' % record.ip_writer_first_name)
-        print('Last Name: %s' % record.ip_last_name)
-        print('Agreement Role Code: %s' % record.agreement_role_code)
-        print('IPI Name Number: %s' % record.ipi_name_n)
-        print('IPI Base Number: %s' % record.ipi_base_n)
-        print('PR Society: %s' % record.pr_society)
-        print('PR Shares: %s' % record.pr_share)
-        print('MR Shares: %s' % record.mr_society)
-        print('MR Shares: %s' % record.mr_share)
-        print('SR Shares: %s' % record.sr_society)
-        print('SR Shares: %s' % record.sr_share)
-
-    def print_npa(self, record):
-        print('IP Number: %s' % record.ip_n)
-        print('Writer Name: %s' % record.ip_writer_name)
-        print('Name: %s' % record.ip_name)
-        print('Language: %s' % record.language_code)
-
-    def print_agr(self, record):
-        print('Agreement Number: %s' % record.submitter_agreement_n)
-        print('Society Assigned Agreement Number: %s' %
-              record.society_assigned_agreement_n)
-        print('International Standard Code: %s' %
-              record.international_standard_code)
-        print('Agreement Type: %s' % record.agreement_type)
-        print('Start Date: %s' % record.agreement_start_date)
-        print('End Date: %s' % record.agreement_end_date)
-        print('Signature Date: %s' % record.date_of_signature)
-        print('Works Number: %s' % record.number_of_works)
-        print('Prior Royalty Status: %s' % record.prior_royalty_status)
-        print('Prior Royalty Start Date: %s' % record.prior_royalty_start_date)
-        print('Post-Term Collection Status: %s' %
-              record.post_term_collection_status)
-        print('Post-Term Collection End Date: %s' %
-              record.post_term_collection_end_date)
-        print('Retention End Date: %s' % record.retention_end_date)
-        print('Sales/Manufacture Clause: %s' % record.sales_manufacture_clause)
-        print('Shares Change: %s' % record.shares_change)
-        print('Advance Given: %s' % record.advance_given)
-
-    def print_ter(self, record):
-        print('TIS Code: %s' % record.tis_numeric_code)
-        print('Inclusion/Exclusion Indicator: %s' %
-              record.inclusion_exclusion_indicator)
-
-    def print_ari(self, record):
-        print('Work Number: %s' % record.work_n)
-        print('Society Number: %s' % record.society_n)
-        print('Subject Code: %s' % record.subject_code)
-        print('Type of Right: %s' % record.type_of_right)
-        print('Note: %s' % record.note)
-
-    def print_npn(self, record):
-        print('Interested Party Number: %s' % record.ip_n)
-        print('Publisher Sequence Number: %s' % record.publisher_sequence_n)
-        print('Name: %s' % record.publisher_name)
-        print('Language: %s' % record.language_code)
-
-    def print_ipter(self, record):
-        print('Interested Party Number: %s' % record.ip_n)
-        print('Inclusion/Exclusion Indicator: %s' %
-              record.inclusion_exclusion_indicator)
-        print('TIS: %s' % record.tis_numeric_code)
-        print('Sequence Number: %s' % record.sequence_n)
-        print('PR collection share: %s' % record.pr_collection_share)
-        print('MR collection share: %s' % record.mr_collection_share)
-        print('SR collection share: %s' % record.sr_collection_share)
-        print('Shares Change: %s' % record.shares_change)
-
-    def print_pubr(self, record):
-        print('Publisher Number: %s' % record.publisher.ip_n)
-        print('Name: %s' % record.publisher.publisher_name)
-        print('Unknown: %s' % record.publisher_unknown)
-        print('IPI Base: %s' % record.publisher.ipi_base_n)
-        print('IPI Name: %s' % record.publisher.ipi_name_n)
-        print('Tax ID: %s' % record.publisher.tax_id)
-        print('Sequence Number: %s' % record.publisher_sequence_n)
-        print('Publisher Type: %s' % record.publisher_type)
-        print('Agreement Number: %s' % record.submitter_agreement_n)
-        print('Society Agreement Number: %s' %
-              record.society_assigned_agreement_n)
-        print('Agreement Type: %s' % record.agreement_type)
-        print('ISAC: %s' % record.international_standard_code)
-        print('Special Agreements Indicator: %s' % record.special_agreements)
-        print('First Record Refusal Indicator: %s' %
-              record.first_recording_refusal)
-        print('USA License: %s' % record.usa_license)
-        print('PR Society: %s' % record.pr_society)
-        print('PR Owner Share: %s' % record.pr_ownership_share)
-        print('MR Society: %s' % record.mr_society)
-        print('MR Owner Share: %s' % record.mr_ownership_share)
-        print('SR Society: %s' % record.sr_society)
-        print('SR Owner Share: %s' % record.sr_ownership_share)
-
-    def print_pwr(self, record):
-        print('Publisher IP Number: %s' % record.publisher_ip_n)
-        print('Writer IP Number: %s' % record.writer_ip_n)
-        print('Submitter Agreement Number: %s' % record.submitter_agreement_n)
-        print('Society-Assigned Agreement Number: %s' %
-              record.society_assigned_agreement_n)
-
-    def print_writr(self, record):
-        print('Writer Number: %s' % record.writer.ip_n)
-        print('Personal Number: %s' % record.writer.personal_number)
-        print('First Name: %s' % record.writer.writer_first_name)
-        print('Last Name: %s' % record.writer.writer_last_name)
-        print('Unknown: %s' % record.writer_unknown)
-        print('IPI Base: %s' % record.writer.ipi_base_n)
-        print('IPI Name: %s' % record.writer.ipi_name_n)
-        print('Tax ID: %s' % record.writer.tax_id)
-        print('Writer Designation Code: %s' % record.writer_designation)
-        print('Work For Hire Indicator: %s' % record.work_for_hire)
-        print('Reversionary Indicator: %s' % record.reversionary)
-        print('First Record Refusal Indicator: %s' %
-              record.first_recording_refusal)
-        print('USA License: %s' % record.usa_license)
-        print('PR Society: %s' % record.pr_society)
-        print('PR Owner Share: %s' % record.pr_ownership_share)
-        print('MR Society: %s' % record.mr_society)
-        print('MR Owner Share: %s' % record.mr_ownership_share)
-        print('SR Society: %s' % record.sr_society)
-        print('SR Owner Share: %s' % record.sr_ownership_share)
-
-    def print_nwn(self, record):
-        print('Interested Party Number: %s' % record.ip_n)
-        print('First Name: %s' % record.writer_first_name)
-        print('Last Name: %s' % record.writer_last_name)
-        print('Language: %s' % record.language_code)
-
-    def print_workr(self, record):
-        print('Submitter Work Number: %s' % record.submitter_work_n)
-        print('ISWC: %s' % record.iswc)
-        print('Title: %s' % record.title)
-        print('CWR Work Type: %s' % record.work_type)
-        print('Catalogue Number: %s' % record.catalogue_number)
-        print('Opus Number: %s' % record.opus_number)
-        print('Duration: %s' % record.duration)
-        print('Printed Edition Publication Date: %s' %
-              record.date_publication_printed_edition)
-        print('Language: %s' % record.language_code)
-        print('Copyright Number: %s' % record.copyright_number)
-        print('Copyright Date: %s' % record.copyright_date)
-        print('Musical Distribution Category: %s' %
-              record.musical_work_distribution_category)
-        print('Version Type: %s' % record.version_type)
-        print('Text-Music Relationship: %s' % record.text_music_relationship)
-        print('Music Arrangement: %s' % record.music_arrangement)
-        print('Lyric Adaptation: %s' % record.lyric_adaptation)
-        print('Excerpt Type: %s' % record.excerpt_type)
-        print('Composite Type: %s' % record.composite_type)
-        print(
-            'Composite Component Count: %s' % record.composite_component_count)
-        print('Recorded Indicator: %s' % record.recorded_indicator)
-        print('Priority Flag: %s' % record.priority_flag)
-        print('Exceptional Clause: %s' % record.exceptional_clause)
-        print('Grand Rights Indicator: %s' % record.grand_rights_indicator)
-        print('Contact ID: %s' % record.contact_id)
-        print('Contact Name: %s' % record.contact_name)
-
-    def print_com(self, record):
-        print('Submitter Given Number: %s' % record.submitter_work_n)
-        print('ISWC: %s' % record.iswc)
-        print('Title: %s' % record.title)
-        print('Duration: %s' % record.duration)
-        print('First Name Writer 1: %s' % record.writer_1_first_name)
-        print('Last Name Writer 1: %s' % record.writer_1_last_name)
-        print('IPI Base Writer 1: %s' % record.writer_1_ipi_base_n)
-        print('IPI Name Writer 1: %s' % record.writer_1_ipi_name_n)
-        print('First Name Writer 2: %s' % record.writer_2_first_name)
-        print('Last Name Writer 2: %s' % record.writer_2_last_name)
-        print('IPI Base Writer 2: %s' % record.writer_2_ipi_base_n)
-        print('IPI Name Writer 2: %s' % record.writer_2_ipi_name_n)
-
-    def print_authr(self, record):
-        print('Work Number: %s' % record.submitter_work_n)
-        print('ISWC: %s' % record.iswc)
-        print('Title: %s' % record.title)
-        print('Language: %s' % record.language_code)
-        print('Source: %s' % record.source)
-        print('First Name Writer 1: %s' % record.writer_1_first_name)
-        print('Last Name Writer 1: %s' % record.writer_1_last_name)
-        print('IPI Base Writer 1: %s' % record.writer_1_ipi_base_n)
-        print('IPI Name Writer 1: %s' % record.writer_1_ipi_name_n)
-        print('First Name Writer 2: %s' % record.writer_2_first_name)
-        print('Last Name Writer 2: %s' % record.writer_2_last_name)
-        print('IPI Base Writer 2: %s' % record.writer_2_ipi_base_n)
-        print('IPI Name Writer 2: %s' % record.writer_2_ipi_name_n)
-
-    def print_alt(self, record):
-        print('Alternate Title: %s' % record.alternate_title)
-        print('Title Type: %s' % record.title_type)
-        print('Language: %s' % record.language_code)
-
-    def print_nat(self, record):
-        print('Title: %s' % record.title)
-        print('Title Type: %s' % record.title_type)
-        print('Language: %s' % record.language_code)
-
-    def print_rec(self, record):
-        print('EAN: %s' % record.ean)
-        print('ISRC: %s' % record.isrc)
-        print('First Album Title: %s' % record.first_album_title)
-        print('First Album Label: %s' % record.first_album_label)
-        print('First Release Catalog ID: %s' % record.first_release_catalog_n)
-        print('First Release Date: %s' % record.first_release_date)
-        print('First Release Duration: %s' % record.first_release_duration)
-        print('Recording Format: %s' % record.recording_format)
-        print('Recording Technique: %s' % record.recording_technique)
-        print('Media Type: %s' % record.media_type)
-
-    def print_ins(self, record):
-        print('Number of Voices: %s' % record.number_voices)
-        print('Instrumentation Type: %s' % record.standard_instrumentation_type)
-        print('Description: %s' % record.instrumentation_description)
-
-    def print_ind(self, record):
-        print('Instrument Code: %s' % record.instrument_code)
-        print('Players: %s' % record.number_players)
-
-    def print_orn(self, record):
-        print('Production Number: %s' % record.production_n)
-        print('Production Title: %s' % record.production_title)
-        print('Production Year: %s' % record.year_production)
-        print('Intended Purpose: %s' % record.intended_purpose)
-        print('CD Identifier: %s' % record.cd_identifier)
-        print('Cut Number: %s' % record.cut_number)
-        print('Episode Number: %s' % record.episode_n)
-        print('Episode Title: %s' % record.episode_title)
-        print('Library: %s' % record.library)
-        print('BLTVR: %s' % record.bltvr)
-        print('AVI: %s' % record.audio_visual_key)
-        print('V-ISAN: %s' % record.visan)
-
-    def print_per(self, record):
-        print('IPI Name: %s' % record.performing_artist_ipi_name_n)
-        print('IPI Base: %s' % record.performing_artist_ipi_base_n)
-        print('First Name: %s' % record.performing_artist_first_name)
-        print('Last Name: %s' % record.performing_artist_last_name)
-
-    def print_nra(self, record):
-        print('Title: %s' % record.title)
-        print('Language: %s' % record.language_code)
-
-    def print_now(self, record):
-        print('First Name: %s' % record.writer_first_name)
-        print('Name: %s' % record.writer_name)
-        print('Position: %s' % record.position)
-        print('Language: %s' % record.language_code)
-
-    def print_npr(self, record):
-        print('First Name: %s' % record.performing_artist_first_name)
-        print('Name: %s' % record.performing_artist_name)
-        print('IPI Name: %s' % record.performing_artist_ipi_name_n)
-        print('IPI Base: %s' % record.performing_artist_ipi_base_n)
-        print('Language: %s' % record.language_code)
-        print('Performance Language: %s' % record.performance_language)
-        print('Performance Dialect: %s' % record.performance_dialect)
+    def print_events(self, events, file_print):
+        """
+        Prints the events from a FileStreamDecoder, as they are received.
+
+        As the counts are not known in advance, the text doesn't include
+        them, and the trailers are printed at the position they have on the
+        file.
+
+        :param events: iterable of (event type, value) tuples
+        :param file_print: the output, or function returning the output for
+        each record type
+        """
+        if self._format == TEXT:
+            self._print_text_events(events, file_print)
+        else:
+            self._print_table_events(events, file_print)
+
+    def record_fields(self, record):
+        """
+        Returns the names and values of the fields of a transaction record.
+
+        :param record: the record
+        :return: list of (name, value) tuples
+        """
+        fields = [
+            ('Record Type', record.record_type),
+            ('Transaction Sequence Number', record.transaction_sequence_n),
+            ('Record Sequence Number', record.record_sequence_n)]
+
+        for record_class, record_fields in self._record_fields:
+            if isinstance(record, record_class):
+                fields.extend(record_fields(record))
+                break
+
+        return fields
+
+    def print_transmission_header(self, record, file_print=None):
+        """
+        Prints a transmission header as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_control(TRANSMISSION_HEADER, record, file_print)
+
+    def print_transmission_trailer(self, record, file_print=None):
+        """
+        Prints a transmission trailer as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_control(TRANSMISSION_TRAILER, record, file_print)
+
+    def print_group_header(self, record, file_print=None):
+        """
+        Prints a group header as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_control(GROUP_HEADER, record, file_print)
+
+    def print_group_trailer(self, record, file_print=None):
+        """
+        Prints a group trailer as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_control(GROUP_TRAILER, record, file_print)
+
+    def print_transaction_record(self, record, file_print=None):
+        """
+        Prints all the fields of a transaction record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self.record_fields(record), file_print)
+
+    def print_ipa(self, record, file_print=None):
+        """
+        Prints the fields specific to an interested party for agreement
+        record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._ipa_fields(record), file_print)
+
+    def print_npa(self, record, file_print=None):
+        """
+        Prints the fields specific to a non-roman alphabet agreement
+        party record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._npa_fields(record), file_print)
+
+    def print_agr(self, record, file_print=None):
+        """
+        Prints the fields specific to an agreement record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._agr_fields(record), file_print)
+
+    def print_ter(self, record, file_print=None):
+        """
+        Prints the fields specific to an agreement territory record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._ter_fields(record), file_print)
+
+    def print_ari(self, record, file_print=None):
+        """
+        Prints the fields specific to an additional related information
+        record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._ari_fields(record), file_print)
+
+    def print_npn(self, record, file_print=None):
+        """
+        Prints the fields specific to a non-roman alphabet publisher
+        name record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._npn_fields(record), file_print)
+
+    def print_ipter(self, record, file_print=None):
+        """
+        Prints the fields specific to an interested party territory of
+        control record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._ipter_fields(record), file_print)
+
+    def print_pubr(self, record, file_print=None):
+        """
+        Prints the fields specific to a publisher record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._pubr_fields(record), file_print)
+
+    def print_pwr(self, record, file_print=None):
+        """
+        Prints the fields specific to a publisher for writer record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._pwr_fields(record), file_print)
+
+    def print_writr(self, record, file_print=None):
+        """
+        Prints the fields specific to a writer record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._writr_fields(record), file_print)
+
+    def print_nwn(self, record, file_print=None):
+        """
+        Prints the fields specific to a non-roman alphabet writer name
+        record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._nwn_fields(record), file_print)
+
+    def print_workr(self, record, file_print=None):
+        """
+        Prints the fields specific to a work record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._workr_fields(record), file_print)
+
+    def print_com(self, record, file_print=None):
+        """
+        Prints the fields specific to a component record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._com_fields(record), file_print)
+
+    def print_authr(self, record, file_print=None):
+        """
+        Prints the fields specific to an authored work record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._authr_fields(record), file_print)
+
+    def print_alt(self, record, file_print=None):
+        """
+        Prints the fields specific to an alternate title record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._alt_fields(record), file_print)
+
+    def print_nat(self, record, file_print=None):
+        """
+        Prints the fields specific to a non-roman alphabet title record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._nat_fields(record), file_print)
+
+    def print_rec(self, record, file_print=None):
+        """
+        Prints the fields specific to a recording detail record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._rec_fields(record), file_print)
+
+    def print_ins(self, record, file_print=None):
+        """
+        Prints the fields specific to an instrumentation summary record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._ins_fields(record), file_print)
+
+    def print_ind(self, record, file_print=None):
+        """
+        Prints the fields specific to an instrumentation detail record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._ind_fields(record), file_print)
+
+    def print_orn(self, record, file_print=None):
+        """
+        Prints the fields specific to a work origin record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._orn_fields(record), file_print)
+
+    def print_per(self, record, file_print=None):
+        """
+        Prints the fields specific to a performing artist record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._per_fields(record), file_print)
+
+    def print_nra(self, record, file_print=None):
+        """
+        Prints the fields specific to a non-roman alphabet work record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._nra_fields(record), file_print)
+
+    def print_now(self, record, file_print=None):
+        """
+        Prints the fields specific to a non-roman alphabet other writer
+        record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._now_fields(record), file_print)
+
+    def print_npr(self, record, file_print=None):
+        """
+        Prints the fields specific to a non-roman alphabet performance
+        data record as text.
+
+        :param record: the record to print
+        :param file_print: the output, by default the console
+        """
+        self._print_fields(self._npr_fields(record), file_print)
+
+    def _print_text_events(self, events, file_print):
+        group_n = 0
+        for event, value in events:
+            if event == FILE_TAG:
+                lines = self._tag_lines(value) + [' ', _SEPARATOR, _STARS,
+                                                  _SEPARATOR, ' ']
+            elif event == TRANSMISSION_HEADER:
+                lines = ['CWR Transmission begins', _SEPARATOR]
+                lines.extend(self._control_lines(event, value))
+            elif event == GROUP_HEADER:
+                group_n += 1
+                lines = self._group_banner()
+                lines.extend([_SEPARATOR, 'Group %s' % group_n, _SEPARATOR])
+                lines.extend(self._control_lines(event, value))
+            elif event == TRANSACTION:
+                lines = self._transaction_lines(value)
+            elif event in (GROUP_TRAILER, TRANSMISSION_TRAILER):
+                lines = [' ', _SEPARATOR]
+                lines.extend(self._control_lines(event, value))
+            else:
+                continue
+            self._write(file_print, lines)
+
+    def _print_table_events(self, events, file_print):
+        if callable(file_print):
+            output_for = file_print
+        else:
+            def output_for(record_type):
+                return file_print
+
+        delimiter = _DELIMITERS[self._format]
+        # Outputs which already received the header for each record type
+        headers = set()
+
+        for event, value in events:
+            if event == FILE_TAG:
+                continue
+            elif event == TRANSACTION:
+                records = [(record.record_type, self.record_fields(record))
+                           for record in value]
+            elif event in self._control_records:
+                _, control_fields = self._control_records[event]
+                records = [(value.record_type, control_fields(value))]
+            else:
+                continue
+
+            # The rows for each output are written together
+            buffers = {}
+            for record_type, fields in records:
+                out = output_for(record_type)
+                key = id(out)
+                if key not in buffers:
+                    buffer = io.StringIO()
+                    buffers[key] = (out, buffer,
+                                    csv.writer(buffer, delimiter=delimiter,
+                                               lineterminator='\n'))
+                _, _, writer = buffers[key]
+
+                if (key, record_type) not in headers:
+                    headers.add((key, record_type))
+                    writer.writerow([name for name, _ in fields])
+                writer.writerow([_cell(field) for _, field in fields])
+
+            for out, buffer, _ in buffers.values():
+                with self._lock:
+                    out.write(buffer.getvalue())
+
+    def _write(self, file_print, lines):
+        text = '\n'.join(lines) + '\n'
+        with self._lock:
+            file_print.write(text)
+
+    def _print_control(self, event, record, file_print):
+        self._write(_console(file_print), self._control_lines(event, record))
+
+    def _print_fields(self, fields, file_print):
+        self._write(_console(file_print),
+                    ['%s: %s' % field for field in fields])
+
+    @staticmethod
+    def _tag_lines(tag):
+        return ['CWR Filename Tag information',
+                _SEPARATOR,
+                'Year: %s' % tag.year,
+                'Sender: %s' % tag.sender,
+                'Receiver: %s' % tag.receiver,
+                'Sequence Number: %s' % tag.sequence_n,
+                'Version: %s' % tag.version]
+
+    @staticmethod
+    def _group_banner():
+        return [' ', _SEPARATOR, _STARS, '*           GROUP            *',
+                _STARS, _SEPARATOR, ' ']
+
+    def _control_lines(self, event, record):
+        title, control_fields = self._control_records[event]
+        return [title] + ['%s: %s' % field for field in control_fields(record)]
+
+    def _transaction_lines(self, transaction):
+        lines = [' ', _SEPARATOR, _STARS, '*        TRANSACTION         *',
+                 _STARS, _SEPARATOR]
+        for record in transaction:
+            lines.append(' ')
+            lines.extend('%s: %s' % field
+                         for field in self.record_fields(record))
+        return lines
+
+    @staticmethod
+    def _hdr_fields(record):
+        return [
+            ('Record Type', record.record_type),
+            ('Sender ID', record.sender_id),
+            ('Sender Name', record.sender_name),
+            ('Sender Type', record.sender_type),
+            ('Created on', record.creation_date_time),
+            ('Sent on', record.transmission_date),
+            ('EDI standard', record.edi_standard),
+            ('Character set', record.character_set)]
+
+    @staticmethod
+    def _trl_fields(record):
+        return [
+            ('Record Type', record.record_type),
+            ('Group Count', record.group_count),
+            ('Transaction Count', record.transaction_count),
+            ('Record Count', record.record_count)]
+
+    @staticmethod
+    def _grh_fields(record):
+        return [
+            ('Record Type', record.record_type),
+            ('Group ID', record.group_id),
+            ('Transaction Type', record.transaction_type),
+            ('Version Number', record.version_number),
+            ('Batch Request ID', record.batch_request_id)]
+
+    @staticmethod
+    def _grt_fields(record):
+        return [
+            ('Record Type', record.record_type),
+            ('Group ID', record.group_id),
+            ('Transaction Count', record.transaction_count),
+            ('Record Count', record.record_count)]
+
+    @staticmethod
+    def _ipa_fields(record):
+        return [
+            ('IP Number', record.ip_n),
+            ('Writer Name', record.ip_writer_first_name),
+            ('Last Name', record.ip_last_name),
+            ('Agreement Role Code', record.agreement_role_code),
+            ('IPI Name Number', record.ipi_name_n),
+            ('IPI Base Number', record.ipi_base_n),
+            ('PR Society', record.pr_society),
+            ('PR Shares', record.pr_share),
+            ('MR Shares', record.mr_society),
+            ('MR Shares', record.mr_share),
+            ('SR Shares', record.sr_society),
+            ('SR Shares', record.sr_share)]
+
+    @staticmethod
+    def _npa_fields(record):
+        return [
+            ('IP Number', record.ip_n),
+            ('Writer Name', record.ip_writer_name),
+            ('Name', record.ip_name),
+            ('Language', record.language_code)]
+
+    @staticmethod
+    def _agr_fields(record):
+        return [
+            ('Agreement Number', record.submitter_agreement_n),
+            ('Society Assigned Agreement Number',
+             record.society_assigned_agreement_n),
+            ('International Standard Code',
+             record.international_standard_code),
+            ('Agreement Type', record.agreement_type),
+            ('Start Date', record.agreement_start_date),
+            ('End Date', record.agreement_end_date),
+            ('Signature Date', record.date_of_signature),
+            ('Works Number', record.number_of_works),
+            ('Prior Royalty Status', record.prior_royalty_status),
+            ('Prior Royalty Start Date', record.prior_royalty_start_date),
+            ('Post-Term Collection Status',
+             record.post_term_collection_status),
+            ('Post-Term Collection End Date',
+             record.post_term_collection_end_date),
+            ('Retention End Date', record.retention_end_date),
+            ('Sales/Manufacture Clause', record.sales_manufacture_clause),
+            ('Shares Change', record.shares_change),
+            ('Advance Given', record.advance_given)]
+
+    @staticmethod
+    def _ter_fields(record):
+        return [
+            ('TIS Code', record.tis_numeric_code),
+            ('Inclusion/Exclusion Indicator',
+             record.inclusion_exclusion_indicator)]
+
+    @staticmethod
+    def _ari_fields(record):
+        return [
+            ('Work Number', record.work_n),
+            ('Society Number', record.society_n),
+            ('Subject Code', record.subject_code),
+            ('Type of Right', record.type_of_right),
+            ('Note', record.note)]
+
+    @staticmethod
+    def _npn_fields(record):
+        return [
+            ('Interested Party Number', record.ip_n),
+            ('Publisher Sequence Number', record.publisher_sequence_n),
+            ('Name', record.publisher_name),
+            ('Language', record.language_code)]
+
+    @staticmethod
+    def _ipter_fields(record):
+        return [
+            ('Interested Party Number', record.ip_n),
+            ('Inclusion/Exclusion Indicator',
+             record.inclusion_exclusion_indicator),
+            ('TIS', record.tis_numeric_code),
+            ('Sequence Number', record.sequence_n),
+            ('PR collection share', record.pr_collection_share),
+            ('MR collection share', record.mr_collection_share),
+            ('SR collection share', record.sr_collection_share),
+            ('Shares Change', record.shares_change)]
+
+    @staticmethod
+    def _pubr_fields(record):
+        return [
+            ('Publisher Number', record.publisher.ip_n),
+            ('Name', record.publisher.publisher_name),
+            ('Unknown', record.publisher_unknown),
+            ('IPI Base', record.publisher.ipi_base_n),
+            ('IPI Name', record.publisher.ipi_name_n),
+            ('Tax ID', record.publisher.tax_id),
+            ('Sequence Number', record.publisher_sequence_n),
+            ('Publisher Type', record.publisher_type),
+            ('Agreement Number', record.submitter_agreement_n),
+            ('Society Agreement Number', record.society_assigned_agreement_n),
+            ('Agreement Type', record.agreement_type),
+            ('ISAC', record.international_standard_code),
+            ('Special Agreements Indicator', record.special_agreements),
+            ('First Record Refusal Indicator', record.first_recording_refusal),
+            ('USA License', record.usa_license),
+            ('PR Society', record.pr_society),
+            ('PR Owner Share', record.pr_ownership_share),
+            ('MR Society', record.mr_society),
+            ('MR Owner Share', record.mr_ownership_share),
+            ('SR Society', record.sr_society),
+            ('SR Owner Share', record.sr_ownership_share)]
+
+    @staticmethod
+    def _pwr_fields(record):
+        return [
+            ('Publisher IP Number', record.publisher_ip_n),
+            ('Writer IP Number', record.writer_ip_n),
+            ('Submitter Agreement Number', record.submitter_agreement_n),
+            ('Society-Assigned Agreement Number',
+             record.society_assigned_agreement_n)]
+
+    @staticmethod
+    def _writr_fields(record):
+        return [
+            ('Writer Number', record.writer.ip_n),
+            ('Personal Number', record.writer.personal_number),
+            ('First Name', record.writer.writer_first_name),
+            ('Last Name', record.writer.writer_last_name),
+            ('Unknown', record.writer_unknown),
+            ('IPI Base', record.writer.ipi_base_n),
+            ('IPI Name', record.writer.ipi_name_n),
+            ('Tax ID', record.writer.tax_id),
+            ('Writer Designation Code', record.writer_designation),
+            ('Work For Hire Indicator', record.work_for_hire),
+            ('Reversionary Indicator', record.reversionary),
+            ('First Record Refusal Indicator', record.first_recording_refusal),
+            ('USA License', record.usa_license),
+            ('PR Society', record.pr_society),
+            ('PR Owner Share', record.pr_ownership_share),
+            ('MR Society', record.mr_society),
+            ('MR Owner Share', record.mr_ownership_share),
+            ('SR Society', record.sr_society),
+            ('SR Owner Share', record.sr_ownership_share)]
+
+    @staticmethod
+    def _nwn_fields(record):
+        return [
+            ('Interested Party Number', record.ip_n),
+            ('First Name', record.writer_first_name),
+            ('Last Name', record.writer_last_name),
+            ('Language', record.language_code)]
+
+    @staticmethod
+    def _workr_fields(record):
+        return [
+            ('Submitter Work Number', record.submitter_work_n),
+            ('ISWC', record.iswc),
+            ('Title', record.title),
+            ('CWR Work Type', record.work_type),
+            ('Catalogue Number', record.catalogue_number),
+            ('Opus Number', record.opus_number),
+            ('Duration', record.duration),
+            ('Printed Edition Publication Date',
+             record.date_publication_printed_edition),
+            ('Language', record.language_code),
+            ('Copyright Number', record.copyright_number),
+            ('Copyright Date', record.copyright_date),
+            ('Musical Distribution Category',
+             record.musical_work_distribution_category),
+            ('Version Type', record.version_type),
+            ('Text-Music Relationship', record.text_music_relationship),
+            ('Music Arrangement', record.music_arrangement),
+            ('Lyric Adaptation', record.lyric_adaptation),
+            ('Excerpt Type', record.excerpt_type),
+            ('Composite Type', record.composite_type),
+            ('Composite Component Count', record.composite_component_count),
+            ('Recorded Indicator', record.recorded_indicator),
+            ('Priority Flag', record.priority_flag),
+            ('Exceptional Clause', record.exceptional_clause),
+            ('Grand Rights Indicator', record.grand_rights_indicator),
+            ('Contact ID', record.contact_id),
+            ('Contact Name', record.contact_name)]
+
+    @staticmethod
+    def _com_fields(record):
+        return [
+            ('Submitter Given Number', record.submitter_work_n),
+            ('ISWC', record.iswc),
+            ('Title', record.title),
+            ('Duration', record.duration),
+            ('First Name Writer 1', record.writer_1_first_name),
+            ('Last Name Writer 1', record.writer_1_last_name),
+            ('IPI Base Writer 1', record.writer_1_ipi_base_n),
+            ('IPI Name Writer 1', record.writer_1_ipi_name_n),
+            ('First Name Writer 2', record.writer_2_first_name),
+            ('Last Name Writer 2', record.writer_2_last_name),
+            ('IPI Base Writer 2', record.writer_2_ipi_base_n),
+            ('IPI Name Writer 2', record.writer_2_ipi_name_n)]
+
+    @staticmethod
+    def _authr_fields(record):
+        return [
+            ('Work Number', record.submitter_work_n),
+            ('ISWC', record.iswc),
+            ('Title', record.title),
+            ('Language', record.language_code),
+            ('Source', record.source),
+            ('First Name Writer 1', record.writer_1_first_name),
+            ('Last Name Writer 1', record.writer_1_last_name),
+            ('IPI Base Writer 1', record.writer_1_ipi_base_n),
+            ('IPI Name Writer 1', record.writer_1_ipi_name_n),
+            ('First Name Writer 2', record.writer_2_first_name),
+            ('Last Name Writer 2', record.writer_2_last_name),
+            ('IPI Base Writer 2', record.writer_2_ipi_base_n),
+            ('IPI Name Writer 2', record.writer_2_ipi_name_n)]
+
+    @staticmethod
+    def _alt_fields(record):
+        return [
+            ('Alternate Title', record.alternate_title),
+            ('Title Type', record.title_type),
+            ('Language', record.language_code)]
+
+    @staticmethod
+    def _nat_fields(record):
+        return [
+            ('Title', record.title),
+            ('Title Type', record.title_type),
+            ('Language', record.language_code)]
+
+    @staticmethod
+    def _rec_fields(record):
+        return [
+            ('EAN', record.ean),
+            ('ISRC', record.isrc),
+            ('First Album Title', record.first_album_title),
+            ('First Album Label', record.first_album_label),
+            ('First Release Catalog ID', record.first_release_catalog_n),
+            ('First Release Date', record.first_release_date),
+            ('First Release Duration', record.first_release_duration),
+            ('Recording Format', record.recording_format),
+            ('Recording Technique', record.recording_technique),
+            ('Media Type', record.media_type)]
+
+    @staticmethod
+    def _ins_fields(record):
+        return [
+            ('Number of Voices', record.number_voices),
+            ('Instrumentation Type', record.standard_instrumentation_type),
+            ('Description', record.instrumentation_description)]
+
+    @staticmethod
+    def _ind_fields(record):
+        return [
+            ('Instrument Code', record.instrument_code),
+            ('Players', record.number_players)]
+
+    @staticmethod
+    def _orn_fields(record):
+        return [
+            ('Production Number', record.production_n),
+            ('Production Title', record.production_title),
+            ('Production Year', record.year_production),
+            ('Intended Purpose', record.intended_purpose),
+            ('CD Identifier', record.cd_identifier),
+            ('Cut Number', record.cut_number),
+            ('Episode Number', record.episode_n),
+            ('Episode Title', record.episode_title),
+            ('Library', record.library),
+            ('BLTVR', record.bltvr),
+            ('AVI', record.audio_visual_key),
+            ('V-ISAN', record.visan)]
+
+    @staticmethod
+    def _per_fields(record):
+        return [
+            ('IPI Name', record.performing_artist_ipi_name_n),
+            ('IPI Base', record.performing_artist_ipi_base_n),
+            ('First Name', record.performing_artist_first_name),
+            ('Last Name', record.performing_artist_last_name)]
+
+    @staticmethod
+    def _nra_fields(record):
+        return [
+            ('Title', record.title),
+            ('Language', record.language_code)]
+
+    @staticmethod
+    def _now_fields(record):
+        return [
+            ('First Name', record.writer_first_name),
+            ('Name', record.writer_name),
+            ('Position', record.position),
+            ('Language', record.language_code)]
+
+    @staticmethod
+    def _npr_fields(record):
+        return [
+            ('First Name', record.performing_artist_first_name),
+            ('Name', record.performing_artist_name),
+            ('IPI Name', record.performing_artist_ipi_name_n),
+            ('IPI Base', record.performing_artist_ipi_base_n),
+            ('Language', record.language_code),
+            ('Performance Language', record.performance_language),
+            ('Performance Dialect', record.performance_dialect)]
+
+
+def _console(file_print):
+    """
+    Returns the output received, or the console if there is none.
+    """
+    if file_print is None:
+        return sys.stdout
+    return file_print
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    return str(value)
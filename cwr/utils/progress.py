@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+
+import time
+from contextlib import contextmanager
+
+"""
+Progress reporting for the decoders, encoders and acknowledgements.
+
+Long operations, such as decoding a large file, can notify their progress to
+any number of hooks. A hook is an instance of ProgressHook, or of a subclass
+of it, whose methods are called:
+- when the operation starts
+- after each group
+- after each transaction
+- every time the number of records set on the hook is processed
+- when the operation ends
+
+Each call receives a Progress, a snapshot with the groups, transactions and
+records processed, the characters read or written, the time elapsed and the
+time spent on each stage of the operation. This allows creating progress
+bars, estimating the time left or exporting metrics.
+
+The classes reporting their progress extend Instrumented, which offers the
+add_hook and remove_hook methods. When no hook is added no ProgressTracker
+is created, and so nothing is measured.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+# Operations being tracked
+DECODE = 'decode'
+ENCODE = 'encode'
+JSON = 'json'
+ACKNOWLEDGE = 'acknowledge'
+
+
+class Progress(object):
+    """
+    Snapshot of the progress of an operation.
+    """
+
+    def __init__(self, operation, groups=0, transactions=0, records=0,
+                 processed_bytes=0, total_bytes=None, seconds=0.0,
+                 stages=None):
+        """
+        Constructs a Progress.
+
+        :param operation: operation being tracked, such as 'decode'
+        :param groups: groups processed
+        :param transactions: transactions processed
+        :param records: records processed
+        :param processed_bytes: characters read or written
+        :param total_bytes: characters to read, if known
+        :param seconds: seconds elapsed since the operation started
+        :param stages: dict with the seconds spent on each stage
+        """
+        self._operation = operation
+        self._groups = groups
+        self._transactions = transactions
+        self._records = records
+        self._processed_bytes = processed_bytes
+        self._total_bytes = total_bytes
+        self._seconds = seconds
+        if stages is None:
+            stages = {}
+        self._stages = stages
+
+    def __str__(self):
+        text = '%s: %d groups, %d transactions, %d records in %.2f s ' \
+               '(%.1f records/s)' % (self._operation, self._groups,
+                                     self._transactions, self._records,
+                                     self._seconds, self.records_per_second)
+        if self.fraction is not None:
+            text += ' %.1f%%' % (self.fraction * 100)
+        return text
+
+    @property
+    def operation(self):
+        """
+        Operation being tracked, such as 'decode' or 'encode'.
+
+        :return: the operation
+        """
+        return self._operation
+
+    @property
+    def groups(self):
+        """
+        Groups processed.
+
+        :return: the number of groups
+        """
+        return self._groups
+
+    @property
+    def transactions(self):
+        """
+        Transactions processed.
+
+        :return: the number of transactions
+        """
+        return self._transactions
+
+    @property
+    def records(self):
+        """
+        Records processed, including only those in the transactions.
+
+        :return: the number of records
+        """
+        return self._records
+
+    @property
+    def processed_bytes(self):
+        """
+        Characters read from the contents, when decoding, or written, when
+        encoding.
+
+        :return: the number of characters
+        """
+        return self._processed_bytes
+
+    @property
+    def total_bytes(self):
+        """
+        Characters to read, which are only known when decoding.
+
+        :return: the number of characters, or None if unknown
+        """
+        return self._total_bytes
+
+    @property
+    def seconds(self):
+        """
+        Seconds elapsed since the operation started.
+
+        :return: the elapsed time
+        """
+        return self._seconds
+
+    @property
+    def stages(self):
+        """
+        Seconds spent on each stage of the operation, such as 'parse' or
+        'validate', including the one in progress.
+
+        :return: dict mapping stage names to seconds
+        """
+        return self._stages
+
+    @property
+    def records_per_second(self):
+        """
+        Records processed for each second elapsed.
+
+        :return: the throughput
+        """
+        if not self._seconds:
+            return 0.0
+        return self._records / self._seconds
+
+    @property
+    def transactions_per_second(self):
+        """
+        Transactions processed for each second elapsed.
+
+        :return: the throughput
+        """
+        if not self._seconds:
+            return 0.0
+        return self._transactions / self._seconds
+
+    @property
+    def fraction(self):
+        """
+        Fraction of the contents processed, between 0 and 1.
+
+        :return: the fraction, or None if the total is unknown
+        """
+        if not self._total_bytes:
+            return None
+        return min(1.0, self._processed_bytes / self._total_bytes)
+
+    @property
+    def eta(self):
+        """
+        Estimated seconds left, assuming the current pace.
+
+        :return: the seconds left, or None if the total is unknown
+        """
+        fraction = self.fraction
+        if not fraction:
+            return None
+        return self._seconds * (1 - fraction) / fraction
+
+
+class ProgressHook(object):
+    """
+    Receives the progress of an operation.
+
+    All the methods do nothing, subclasses should override those they need.
+    """
+
+    def __init__(self, every=None):
+        """
+        Constructs a ProgressHook.
+
+        :param every: records between calls to on_records, if None it is not
+        called
+        """
+        self._every = every
+
+    @property
+    def every(self):
+        """
+        Records between calls to on_records.
+
+        :return: the number of records, or None
+        """
+        return self._every
+
+    def on_start(self, progress):
+        """
+        Called when the operation starts.
+
+        :param progress: the Progress
+        """
+        pass
+
+    def on_group(self, progress):
+        """
+        Called after each group.
+
+        :param progress: the Progress
+        """
+        pass
+
+    def on_transaction(self, progress):
+        """
+        Called after each transaction.
+
+        :param progress: the Progress
+        """
+        pass
+
+    def on_records(self, progress):
+        """
+        Called each time the number of records set on the hook is processed.
+
+        :param progress: the Progress
+        """
+        pass
+
+    def on_end(self, progress):
+        """
+        Called when the operation ends.
+
+        :param progress: the Progress
+        """
+        pass
+
+
+class CallbackHook(ProgressHook):
+    """
+    Hook sending all the notifications to a function.
+
+    The function receives the event, which is 'start', 'group',
+    'transaction', 'records' or 'end', and the Progress.
+    """
+
+    def __init__(self, callback, every=None, transactions=True):
+        """
+        Constructs a CallbackHook.
+
+        :param callback: function receiving the event and the Progress
+        :param every: records between 'records' events
+        :param transactions: if False the 'transaction' events are not sent
+        """
+        super(CallbackHook, self).__init__(every)
+        self._callback = callback
+        self._transactions = transactions
+
+    def on_start(self, progress):
+        self._callback('start', progress)
+
+    def on_group(self, progress):
+        self._callback('group', progress)
+
+    def on_transaction(self, progress):
+        if self._transactions:
+            self._callback('transaction', progress)
+
+    def on_records(self, progress):
+        self._callback('records', progress)
+
+    def on_end(self, progress):
+        self._callback('end', progress)
+
+
+class ProgressTracker(object):
+    """
+    Keeps the progress of an operation, notifying it to the hooks.
+
+    It is created by the instrumented classes for each operation, and only
+    when there are hooks.
+    """
+
+    def __init__(self, operation, hooks, total_bytes=None):
+        """
+        Constructs a ProgressTracker.
+
+        :param operation: operation being tracked, such as 'decode'
+        :param hooks: list of ProgressHook
+        :param total_bytes: characters to read, if known
+        """
+        self._operation = operation
+        self._hooks = list(hooks)
+        self._total_bytes = total_bytes
+        self._start = None
+        self.groups = 0
+        self.transactions = 0
+        self.records = 0
+        self.processed_bytes = 0
+        # Seconds spent on each finished stage
+        self._stages = {}
+        # Stage in progress, and the time it started
+        self._stage = None
+        self._stage_start = None
+        # Records count for the next call to on_records on each hook
+        self._next_records = [hook.every if hook.every else None
+                              for hook in self._hooks]
+
+    def progress(self):
+        """
+        Creates a snapshot of the current progress.
+
+        :return: a Progress
+        """
+        now = time.perf_counter()
+        stages = dict(self._stages)
+        if self._stage is not None:
+            stages[self._stage] = stages.get(self._stage, 0.0) + \
+                                  now - self._stage_start
+        if self._start is None:
+            seconds = 0.0
+        else:
+            seconds = now - self._start
+
+        return Progress(self._operation, self.groups, self.transactions,
+                        self.records, self.processed_bytes, self._total_bytes,
+                        seconds, stages)
+
+    def start(self):
+        """
+        Marks the start of the operation.
+        """
+        self._start = time.perf_counter()
+        progress = self.progress()
+        for hook in self._hooks:
+            hook.on_start(progress)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures the time spent on a stage of the operation.
+
+        Stages are added up, so the same one can be measured several times,
+        such as once for each transaction.
+
+        :param name: name of the stage
+        """
+        previous = self._stage
+        if previous is not None:
+            self._stop_stage()
+
+        self._stage = name
+        self._stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stop_stage()
+            if previous is not None:
+                self._stage = previous
+                self._stage_start = time.perf_counter()
+
+    def group(self, processed_bytes=None):
+        """
+        Registers a processed group.
+
+        :param processed_bytes: characters processed up to now, if known
+        """
+        self.groups += 1
+        if processed_bytes is not None:
+            self.processed_bytes = processed_bytes
+
+        progress = self.progress()
+        for hook in self._hooks:
+            hook.on_group(progress)
+
+    def transaction(self, records, processed_bytes=None):
+        """
+        Registers a processed transaction.
+
+        :param records: records in the transaction
+        :param processed_bytes: characters processed up to now, if known
+        """
+        self.transactions += 1
+        self.records += records
+        if processed_bytes is not None:
+            self.processed_bytes = processed_bytes
+
+        progress = self.progress()
+        for hook in self._hooks:
+            hook.on_transaction(progress)
+
+        for i, hook in enumerate(self._hooks):
+            next_records = self._next_records[i]
+            if next_records is not None and self.records >= next_records:
+                while next_records <= self.records:
+                    next_records += hook.every
+                self._next_records[i] = next_records
+                hook.on_records(progress)
+
+    def end(self, processed_bytes=None):
+        """
+        Marks the end of the operation.
+
+        :param processed_bytes: characters processed, if known
+        """
+        if processed_bytes is not None:
+            self.processed_bytes = processed_bytes
+
+        progress = self.progress()
+        for hook in self._hooks:
+            hook.on_end(progress)
+
+    def _stop_stage(self):
+        elapsed = time.perf_counter() - self._stage_start
+        self._stages[self._stage] = \
+            self._stages.get(self._stage, 0.0) + elapsed
+        self._stage = None
+        self._stage_start = None
+
+
+class Instrumented(object):
+    """
+    Base for the classes reporting their progress to hooks.
+    """
+
+    _hooks = ()
+
+    @property
+    def hooks(self):
+        """
+        The hooks receiving the progress.
+
+        :return: tuple of ProgressHook
+        """
+        return tuple(self._hooks)
+
+    def add_hook(self, hook):
+        """
+        Adds a hook, which will receive the progress of the following
+        operations.
+
+        :param hook: the ProgressHook
+        :return: the same hook
+        """
+        self._hooks = tuple(self._hooks) + (hook,)
+        return hook
+
+    def remove_hook(self, hook):
+        """
+        Removes a hook.
+
+        :param hook: the ProgressHook to remove
+        """
+        self._hooks = tuple(h for h in self._hooks if h is not hook)
+
+    def _tracker(self, operation, total_bytes=None):
+        """
+        Creates the tracker for an operation.
+
+        :param operation: operation being tracked, such as 'decode'
+        :param total_bytes: characters to read, if known
+        :return: a ProgressTracker, or None if there are no hooks
+        """
+        if not self._hooks:
+            return None
+        return ProgressTracker(operation, self._hooks, total_bytes)
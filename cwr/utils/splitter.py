@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+import os
+
+from cwr.file import FileTag
+from cwr.parser.decoder.archive import open_text
+from cwr.parser.decoder.file import default_filename_decoder
+from cwr.parser.decoder.stream import GROUP_HEADER, GROUP_TRAILER, \
+    TRANSACTION, TRANSMISSION_HEADER, read_blocks, read_lines
+from cwr.parser.encoder.file import default_filename_encoder
+from cwr.parser.encoder.stream import CwrStreamWriter, \
+    default_record_encoder_factory
+from cwr.utils.layout import default_record_layouts
+
+"""
+Splitting of a CWR file into several smaller files.
+
+Some receivers limit the size of the files they accept. The CwrSplitter reads
+a file line by line, without decoding it, and writes its transactions into a
+sequence of files, each of them with at most a number of transactions or a
+number of bytes.
+
+Each output is a complete transmission:
+- The HDR record is copied from the original file
+- Each group is opened again on the output with its original GRH, numbering
+  the groups from 1, and a group cut between two files is continued on the
+  next one
+- The transactions are numbered again on each group
+- The GRT and TRL records are created with the counts of the output file
+
+The files are read and written as latin-1, which maps each byte to a single
+character, so the lines are copied byte for byte whatever the character set
+declared on the header, and the sizes are counted in bytes.
+
+The outputs are named after the original file, with consecutive sequence
+numbers.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_ENCODING = 'latin-1'
+
+_NEWLINE = '\r\n'
+
+
+def default_splitter(max_transactions=None, max_bytes=None):
+    """
+    Creates a splitter for the files of the default standard.
+
+    :param max_transactions: maximum number of transactions on each file
+    :param max_bytes: maximum size in bytes of each file
+    :return: a CwrSplitter for the default standard
+    """
+    return CwrSplitter(default_filename_decoder(), default_filename_encoder(),
+                       default_record_encoder_factory(),
+                       default_record_layouts(),
+                       max_transactions=max_transactions,
+                       max_bytes=max_bytes)
+
+
+class SplitFile(object):
+    """
+    A file created by the CwrSplitter, with its counts.
+    """
+
+    def __init__(self, path, tag):
+        """
+        Constructs a SplitFile.
+
+        :param path: path to the file
+        :param tag: FileTag of the file
+        """
+        self.path = path
+        self.tag = tag
+        self.group_count = 0
+        self.transaction_count = 0
+        self.record_count = 0
+        # Size in bytes
+        self.size = 0
+
+    def __repr__(self):
+        return '<class %s>(path=%r, transaction_count=%r, size=%r)' % (
+            self.__class__.__name__, self.path, self.transaction_count,
+            self.size)
+
+
+class CwrSplitter(object):
+    """
+    Splits a CWR file into smaller files.
+
+    A file is closed before the transaction which would take it over any of
+    the limits. Transactions are never cut, so a file always receives at
+    least one transaction, even if it alone is bigger than the size limit.
+
+    Groups without transactions are not copied.
+    """
+
+    def __init__(self, filename_decoder, filename_encoder, encoder_factory,
+                 layouts, max_transactions=None, max_bytes=None):
+        """
+        Constructs a CwrSplitter.
+
+        :param filename_decoder: decoder for the name of the original file
+        :param filename_encoder: encoder for the names of the new files
+        :param encoder_factory: CwrRecordEncoderFactory for the control
+        records
+        :param layouts: dict mapping each record type to its RecordLayout
+        :param max_transactions: maximum number of transactions on each file,
+        if None there is no limit
+        :param max_bytes: maximum size in bytes of each file, if None there is
+        no limit
+        """
+        if max_transactions is not None and max_transactions < 1:
+            raise ValueError('The files should allow at least one '
+                             'transaction')
+
+        self._filename_decoder = filename_decoder
+        self._filename_encoder = filename_encoder
+        self._encoder_factory = encoder_factory
+        self._layouts = layouts
+        self._max_transactions = max_transactions
+        self._max_bytes = max_bytes
+
+        # Sizes of the control records created by the stream writer, which
+        # writes the short group trailer
+        self._header_size = layouts['GRH'].max_size + len(_NEWLINE)
+        self._trailer_size = layouts['GRT'].min_size + len(_NEWLINE)
+        self._closing_size = self._trailer_size + \
+            layouts['TRL'].max_size + len(_NEWLINE)
+
+    @property
+    def max_transactions(self):
+        """
+        Maximum number of transactions on each file.
+
+        :return: the transactions limit, or None
+        """
+        return self._max_transactions
+
+    @property
+    def max_bytes(self):
+        """
+        Maximum size in bytes of each file.
+
+        :return: the size limit, or None
+        """
+        return self._max_bytes
+
+    def split(self, path, directory, first_sequence_n=None):
+        """
+        Splits a file, which may be compressed.
+
+        :param path: path to the file
+        :param directory: folder where the new files are written
+        :param first_sequence_n: sequence number of the first new file, by
+        default the one of the original file
+        :return: list with a SplitFile for each new file
+        """
+        source, contents = open_text(path, _ENCODING)
+        with contents:
+            tag = self._filename_decoder.decode(source.filename)
+            return self._split(contents, tag, directory, first_sequence_n,
+                               os.path.abspath(path))
+
+    def split_contents(self, contents, tag, directory, first_sequence_n=None):
+        """
+        Splits the contents of a file.
+
+        The contents should have been read as latin-1, otherwise the size of
+        the files may be different from the one computed.
+
+        :param contents: the file contents, as a string or lines iterable
+        :param tag: FileTag of the original file
+        :param directory: folder where the new files are written
+        :param first_sequence_n: sequence number of the first new file, by
+        default the one of the original file
+        :return: list with a SplitFile for each new file
+        """
+        return self._split(contents, tag, directory, first_sequence_n, None)
+
+    def _split(self, contents, tag, directory, first_sequence_n, original):
+        if first_sequence_n is None:
+            first_sequence_n = tag.sequence_n
+
+        files = []
+        header = None
+        # Line number and GRH line for the group being read
+        group = None
+        output = None
+        for block in read_blocks(read_lines(contents)):
+            if block.block_type == TRANSMISSION_HEADER:
+                header = _line(block.lines[0])
+            elif block.block_type == GROUP_HEADER:
+                group = (block.line_n, block.lines[0])
+            elif block.block_type == GROUP_TRAILER:
+                group = None
+                if output is not None:
+                    output.close_group()
+            elif block.block_type == TRANSACTION:
+                if header is None:
+                    raise ValueError('The transaction on line %d comes '
+                                     'before the transmission header' %
+                                     block.line_n)
+                if group is None:
+                    raise ValueError('The transaction on line %d is not '
+                                     'inside a group' % block.line_n)
+
+                lines = [_line(line) for line in block.lines]
+                if output is not None and not self._fits(output, group,
+                                                         lines):
+                    output.close()
+                    output = None
+
+                if output is None:
+                    output = self._open(tag, first_sequence_n + len(files),
+                                        directory, header, original)
+                    files.append(output.report)
+
+                output.write_transaction(group, lines)
+
+        if output is None:
+            if header is None:
+                raise ValueError('The file has no transmission header')
+            # A file without transactions is copied with its header
+            output = self._open(tag, first_sequence_n, directory, header,
+                                original)
+            files.append(output.report)
+        output.close()
+
+        return files
+
+    def _fits(self, output, group, lines):
+        """
+        Indicates if a transaction can be added to the current file, leaving
+        room for its trailers.
+        """
+        writer = output.writer
+        if writer.transaction_count == 0:
+            return True
+
+        if self._max_transactions is not None and \
+                writer.transaction_count >= self._max_transactions:
+            return False
+
+        if self._max_bytes is None:
+            return True
+
+        size = output.size + sum(len(line) for line in lines) + \
+            self._closing_size
+        if output.group != group:
+            size += self._header_size
+            if output.group is not None:
+                size += self._trailer_size
+        return size <= self._max_bytes
+
+    def _open(self, tag, sequence_n, directory, header, original):
+        new_tag = FileTag(tag.year, sequence_n, tag.sender, tag.receiver,
+                          tag.version)
+        path = os.path.join(directory, self._filename_encoder.encode(new_tag))
+        if original is not None and os.path.abspath(path) == original:
+            raise ValueError('The file %s would replace the original file' %
+                             path)
+
+        output = _Output(SplitFile(path, new_tag), self._layouts['GRH'])
+        output.writer = CwrStreamWriter(output, self._encoder_factory,
+                                        self._layouts)
+        output.writer.write_encoded_header(header)
+        return output
+
+
+class _Output(object):
+    """
+    A file being written by the splitter.
+
+    It is the file object given to the stream writer, counting the size of
+    the lines written.
+    """
+
+    def __init__(self, report, group_layout):
+        self.report = report
+        self.writer = None
+        self.size = 0
+        # Group of the original file which is open on this one
+        self.group = None
+        self._group_layout = group_layout
+        self._file = open(report.path, 'w', encoding=_ENCODING, newline='')
+
+    def write(self, text):
+        self._file.write(text)
+        self.size += len(text)
+
+    def write_transaction(self, group, lines):
+        if self.group != group:
+            self.close_group()
+            self._open_group(group[1])
+            self.group = group
+
+        self.writer.write_encoded_transaction(lines)
+
+    def close_group(self):
+        if self.group is not None:
+            self.writer.close_group()
+            self.group = None
+
+    def close(self):
+        try:
+            self.close_group()
+            self.writer.close()
+        finally:
+            self._file.close()
+
+        self.report.group_count = self.writer.group_count
+        self.report.transaction_count = self.writer.transaction_count
+        self.report.record_count = self.writer.record_count
+        self.report.size = self.size
+
+    def _open_group(self, line):
+        layout = self._group_layout
+        batch_request_id = layout.slice(line, 'batch_request_id').strip()
+        self.writer.open_group(
+            layout.slice(line, 'transaction_type'),
+            version_number=layout.slice(line, 'version_number'),
+            batch_request_id=int(batch_request_id)
+            if batch_request_id.isdigit() else 0)
+
+
+def _line(line):
+    """
+    Ends a line read from the file with the standard line break.
+    """
+    return line.rstrip('\r') + _NEWLINE
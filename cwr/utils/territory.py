@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+from cwr.interested_party import IPTerritoryOfControlRecord
+from data_cwr.accessor import CWRTables
+
+"""
+Territory matching for the TIS codes of the territory of control records.
+
+Each TIS territory is given a bit, and any set of territories is stored as an
+integer with the bits of the territories it contains. This way the territories
+covered by a transaction can be matched against a set of territories with a
+single operation.
+
+Territories may contain other territories, such as World containing all the
+others. Including a territory includes all the territories it contains, while
+excluding it also removes the territories containing it, as they are no longer
+fully covered.
+
+The TIS table only lists the codes, without the countries in each region, so
+the default hierarchy just places all the territories inside World. Regions
+are then matched only by their own code. Hierarchies with the region
+memberships can be created with the TerritoryHierarchy.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_EXCLUDE = 'E'
+
+# TIS code for World
+WORLD = 2136
+
+
+def default_territory_hierarchy():
+    """
+    Creates the hierarchy for the territories in the TIS table, all of them
+    contained in World.
+
+    :return: a TerritoryHierarchy for the TIS codes
+    """
+    return TerritoryHierarchy(CWRTables().get_data('tis_code'), {}, WORLD)
+
+
+class TerritoryHierarchy(object):
+    """
+    Bitsets for the TIS territories, taking into account which territories
+    contain other territories.
+
+    Any territory not contained by another is part of the root territory.
+    Codes which are not known can't be covered, and so they are ignored.
+
+    The hierarchy is not modified once created, so it can be used from
+    several threads.
+    """
+
+    def __init__(self, codes, children, root):
+        """
+        Constructs a TerritoryHierarchy.
+
+        :param codes: the TIS codes
+        :param children: dict mapping a code to the codes it directly contains
+        :param root: code of the territory containing all the others
+        """
+        self._bits = {}
+        self._parents = {}
+        # Each territory with all it contains, and with all containing it
+        self._contents = {}
+        self._containers = {}
+
+        root = int(root)
+        for code in codes:
+            self._bit(int(code))
+        for parent, contained in children.items():
+            for code in contained:
+                self._bit(int(code))
+                self._parents[int(code)] = int(parent)
+        self._bit(root)
+
+        for code in self._bits:
+            if code != root and code not in self._parents:
+                self._parents[code] = root
+
+        for code, bit in self._bits.items():
+            parent = self._parents.get(code)
+            while parent is not None:
+                self._contents[parent] |= bit
+                self._containers[code] |= self._bits[parent]
+                parent = self._parents.get(parent)
+
+    def mask(self, codes):
+        """
+        Creates the bitset for a collection of territories.
+
+        The territories they contain are not added, and unknown codes are
+        ignored.
+
+        :param codes: the TIS codes
+        :return: the bitset for the codes
+        """
+        result = 0
+        for code in codes:
+            result |= self._bits.get(int(code), 0)
+        return result
+
+    def coverage(self, transaction):
+        """
+        Creates the bitset for the territories covered by the territory of
+        control records of a transaction.
+
+        The records for each interested party are applied in order, and then
+        the territories of all the parties are joined.
+
+        :param transaction: list with the records of the transaction
+        :return: the bitset for the covered territories
+        """
+        parties = {}
+        for record in transaction:
+            if not isinstance(record, IPTerritoryOfControlRecord):
+                continue
+
+            code = record.tis_numeric_code
+            if code is None:
+                continue
+            code = int(code)
+            if code not in self._bits:
+                # Unknown territories can't be on any bitset
+                continue
+
+            covered = parties.get(record.ip_n, 0)
+            if record.inclusion_exclusion_indicator == _EXCLUDE:
+                covered &= ~(self._contents[code] | self._containers[code])
+            else:
+                covered |= self._contents[code]
+            parties[record.ip_n] = covered
+
+        result = 0
+        for covered in parties.values():
+            result |= covered
+        return result
+
+    def covers(self, transaction, mask):
+        """
+        Indicates if a transaction covers any of the territories in a bitset.
+
+        :param transaction: list with the records of the transaction
+        :param mask: bitset created with the mask method
+        :return: True if any of the territories is covered, False otherwise
+        """
+        return (self.coverage(transaction) & mask) != 0
+
+    def _bit(self, code):
+        bit = self._bits.get(code)
+        if bit is None:
+            bit = 1 << len(self._bits)
+            self._bits[code] = bit
+            self._contents[code] = bit
+            self._containers[code] = bit
+        return bit
@@ -25,15 +25,14 @@ class ValidationStatus(object):
 
 class ASValidationStatus(ValidationStatus):
 
-    def __init__(self, message = None):
-        super().__init__()
-        self.code = 'AS'
+    def __init__(self, message=''):
+        super(ASValidationStatus, self).__init__('AS', message)
+
 
 class NPValidationStatus(ValidationStatus):
 
-    def __init__(self, message = None):
-        super().__init__()
-        self.code = 'NP'
+    def __init__(self, message=''):
+        super(NPValidationStatus, self).__init__('NP', message)
 
 
 class Validation(object):
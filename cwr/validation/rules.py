@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+
+import re
+import time
+from collections import OrderedDict
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.validation.common import Validation, ValidationStatus, \
+    ASValidationStatus
+
+"""
+Edit rules validation for transactions.
+
+The rules are declared on the configuration, and compiled into a list of
+checks for each record type. This way each transaction is validated on a
+single pass over its records, running only the checks for each record type,
+while the records needed by the transaction level rules are collected.
+
+There are three levels of rules:
+- Field rules, which check a single value of a record
+- Record rules, which check several values of the same record
+- Transaction rules, which check the records of a transaction together
+
+Each rule keeps the number of times it was run, the number of failures and
+the time spent on it, so the slowest rules can be found. The statistics of
+validations on other processes can be merged into them.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+FIELD = 'field'
+RECORD = 'record'
+TRANSACTION = 'transaction'
+
+# Transaction status codes, from the most to the least severe
+_SEVERITY = ('RJ', 'CO', 'DU', 'RA', 'RC', 'AC', 'AS')
+
+
+def default_rule_validation(file_id='common'):
+    """
+    Creates the validation for the rules on the configuration.
+
+    :param file_id: the id for the rules file
+    :return: a RuleValidation for the rules
+    """
+    return RuleValidation(CWRConfiguration().load_validation_rules(file_id))
+
+
+def field_getter(field):
+    """
+    Creates a function returning the value of a field from a record.
+
+    Fields of the entities contained in a record are accessed with dots, such
+    as 'publisher.publisher_name'. Missing values are returned as None.
+
+    :param field: name of the field
+    :return: function receiving a record and returning the value
+    """
+    names = field.split('.')
+
+    def getter(record):
+        value = record
+        for name in names:
+            value = getattr(value, name, None)
+            if value is None:
+                break
+        return value
+
+    return getter
+
+
+def _has_value(value):
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return len(value.strip()) > 0
+    return True
+
+
+def _field_required(config):
+    return _has_value
+
+
+def _field_max_length(config):
+    length = config['length']
+    return lambda value: value is None or len(str(value).strip()) <= length
+
+
+def _field_values(config):
+    values = frozenset(config['values'])
+    return lambda value: not _has_value(value) or value in values
+
+
+def _field_pattern(config):
+    pattern = re.compile(config['pattern'])
+    return lambda value: not _has_value(value) or \
+        pattern.match(str(value)) is not None
+
+
+def _field_range(config):
+    minimum = config.get('min')
+    maximum = config.get('max')
+
+    def check(value):
+        if value is None:
+            return True
+        if minimum is not None and value < minimum:
+            return False
+        return maximum is None or value <= maximum
+
+    return check
+
+
+def _record_required_one(config):
+    getters = [field_getter(field) for field in config['fields']]
+    return lambda record: any(_has_value(getter(record))
+                              for getter in getters)
+
+
+def _record_ordered(config):
+    getters = [field_getter(field) for field in config['fields']]
+
+    def check(record):
+        values = [getter(record) for getter in getters]
+        values = [value for value in values if value is not None]
+        return all(a <= b for a, b in zip(values, values[1:]))
+
+    return check
+
+
+def _transaction_requires_record(config):
+    record_types = config['record_types']
+    return lambda records: any(records.get(record_type)
+                               for record_type in record_types)
+
+
+def _transaction_sum_max(config):
+    record_types = config['record_types']
+    getter = field_getter(config['field'])
+    limit = config['max'] + config.get('tolerance', 0)
+
+    def check(records):
+        total = 0
+        for record_type in record_types:
+            for record in records.get(record_type, ()):
+                value = getter(record)
+                if value is not None:
+                    total += value
+        return total <= limit
+
+    return check
+
+
+_CHECKS = {
+    FIELD: {
+        'required': _field_required,
+        'max_length': _field_max_length,
+        'values': _field_values,
+        'pattern': _field_pattern,
+        'range': _field_range
+    },
+    RECORD: {
+        'required_one': _record_required_one,
+        'ordered': _record_ordered
+    },
+    TRANSACTION: {
+        'requires_record': _transaction_requires_record,
+        'sum_max': _transaction_sum_max
+    }
+}
+
+
+class Rule(object):
+    """
+    A compiled rule, along with its statistics.
+    """
+
+    def __init__(self, rule_id, level, check, status, message,
+                 getter=None):
+        """
+        Constructs a Rule.
+
+        :param rule_id: identifier for the rule
+        :param level: 'field', 'record' or 'transaction'
+        :param check: function returning False when the rule fails
+        :param status: transaction status code when the rule fails
+        :param message: description of the error
+        :param getter: function reading the field checked, for field rules
+        """
+        self._rule_id = rule_id
+        self._level = level
+        self._check = check
+        self._status = status
+        self._message = message
+        self._getter = getter
+
+        self._count = 0
+        self._failures = 0
+        self._seconds = 0
+
+    def __repr__(self):
+        return '<class %s>(rule_id=%r, level=%r, count=%r, failures=%r, ' \
+               'seconds=%r)' % (self.__class__.__name__, self._rule_id,
+                                self._level, self._count, self._failures,
+                                self._seconds)
+
+    @property
+    def rule_id(self):
+        """
+        Identifier for the rule.
+
+        :return: the rule id
+        """
+        return self._rule_id
+
+    @property
+    def level(self):
+        """
+        Level of the rule: 'field', 'record' or 'transaction'.
+
+        :return: the rule level
+        """
+        return self._level
+
+    @property
+    def status(self):
+        """
+        Transaction status code given when the rule fails.
+
+        :return: the status code
+        """
+        return self._status
+
+    @property
+    def message(self):
+        """
+        Description of the error.
+
+        :return: the error message
+        """
+        return self._message
+
+    @property
+    def count(self):
+        """
+        Number of times the rule was run.
+
+        :return: the number of executions
+        """
+        return self._count
+
+    @property
+    def failures(self):
+        """
+        Number of times the rule failed.
+
+        :return: the number of failures
+        """
+        return self._failures
+
+    @property
+    def seconds(self):
+        """
+        Time spent running the rule.
+
+        :return: the time in seconds
+        """
+        return self._seconds
+
+    def apply(self, value):
+        """
+        Runs the rule, updating its statistics.
+
+        The value is a record for field and record rules, and a dict mapping
+        each record type to its records for transaction rules.
+
+        :param value: the value to check
+        :return: True if the rule passed, False otherwise
+        """
+        start = time.perf_counter()
+        if self._getter is not None:
+            value = self._getter(value)
+        passed = self._check(value)
+        self._seconds += time.perf_counter() - start
+
+        self._count += 1
+        if not passed:
+            self._failures += 1
+        return passed
+
+    def merge(self, count, failures, seconds):
+        """
+        Adds the statistics of the same rule run somewhere else, such as on
+        another process.
+
+        :param count: number of executions
+        :param failures: number of failures
+        :param seconds: time spent running the rule
+        """
+        self._count += count
+        self._failures += failures
+        self._seconds += seconds
+
+    def reset(self):
+        """
+        Clears the statistics.
+        """
+        self._count = 0
+        self._failures = 0
+        self._seconds = 0
+
+
+def compile_rule(config):
+    """
+    Creates a Rule from its configuration.
+
+    :param config: dict with the rule configuration
+    :return: the Rule
+    """
+    level = config['level']
+    checks = _CHECKS.get(level)
+    if checks is None:
+        raise ValueError('Unknown level %s for rule %s' % (level,
+                                                           config['id']))
+
+    factory = checks.get(config['check'])
+    if factory is None:
+        raise ValueError('Unknown check %s for rule %s' % (config['check'],
+                                                           config['id']))
+
+    getter = None
+    if level == FIELD:
+        getter = field_getter(config['field'])
+
+    return Rule(config['id'], level, factory(config), config['status'],
+                config['message'], getter)
+
+
+class RuleValidation(Validation):
+    """
+    Validates transactions with a set of edit rules.
+
+    The status of the most severe failed rule is returned, with the messages
+    of all the failed rules. If all the rules pass, the transaction is
+    accepted.
+
+    The statistics are updated without any lock, so each thread should use
+    its own instance.
+    """
+
+    def __init__(self, rules):
+        """
+        Constructs a RuleValidation.
+
+        :param rules: list with the rules configurations
+        """
+        super(RuleValidation, self).__init__(rules)
+
+        self._rules = []
+        self._record_rules = {}
+        self._transaction_rules = {}
+        self._general_rules = []
+        self._collected = set()
+
+        for config in rules:
+            rule = compile_rule(config)
+            self._rules.append(rule)
+
+            if rule.level == TRANSACTION:
+                transaction_types = config.get('transaction_types')
+                if transaction_types is None:
+                    self._general_rules.append(rule)
+                else:
+                    for transaction_type in transaction_types:
+                        self._transaction_rules.setdefault(
+                            transaction_type, []).append(rule)
+                self._collected.update(config['record_types'])
+            else:
+                for record_type in config['record_types']:
+                    self._record_rules.setdefault(record_type, []).append(
+                        rule)
+
+        # Rules without transaction types apply to all of them
+        for rules in self._transaction_rules.values():
+            rules.extend(self._general_rules)
+
+    @property
+    def rules(self):
+        """
+        The compiled rules, in the order they were declared.
+
+        :return: list of Rule
+        """
+        return self._rules
+
+    @property
+    def record_types(self):
+        """
+        Types of the records read by the rules.
+
+        :return: set with the record types
+        """
+        return frozenset(self._record_rules) | frozenset(self._collected)
+
+    def validate(self, transaction):
+        """
+        Validates a transaction.
+
+        :param transaction: list with the records of the transaction
+        :return: the ValidationStatus
+        """
+        failed = []
+        records = {}
+
+        for record in transaction:
+            record_type = record.record_type
+
+            for rule in self._record_rules.get(record_type, ()):
+                if not rule.apply(record):
+                    failed.append(rule)
+
+            if record_type in self._collected:
+                records.setdefault(record_type, []).append(record)
+
+        if transaction:
+            transaction_type = transaction[0].record_type
+            for rule in self._transaction_rules.get(transaction_type,
+                                                    self._general_rules):
+                if not rule.apply(records):
+                    failed.append(rule)
+
+        if not failed:
+            return ASValidationStatus()
+
+        # Each rule is reported once, even if it failed on several records
+        failed = list(OrderedDict.fromkeys(failed))
+
+        status = min((rule.status for rule in failed), key=_severity)
+        message = '; '.join('%s: %s' % (rule.rule_id, rule.message)
+                            for rule in failed)
+        return ValidationStatus(status, message)
+
+    def statistics(self):
+        """
+        Returns the rules sorted by the time spent on them, from the slowest.
+
+        :return: list of Rule
+        """
+        return sorted(self._rules, key=lambda rule: -rule.seconds)
+
+    def report(self):
+        """
+        Creates a text table with the statistics for each rule, from the
+        slowest.
+
+        :return: the statistics, as a string
+        """
+        lines = []
+        for rule in self.statistics():
+            lines.append('%s: %d runs, %d failures, %.6f sec' % (
+                rule.rule_id, rule.count, rule.failures, rule.seconds))
+        return '\n'.join(lines)
+
+    def counters(self):
+        """
+        Returns the statistics of each rule, in the order they were declared,
+        so they can be sent to another process.
+
+        :return: list of (count, failures, seconds) tuples
+        """
+        return [(rule.count, rule.failures, rule.seconds)
+                for rule in self._rules]
+
+    def merge(self, counters):
+        """
+        Adds the statistics of a validation with the same rules, such as one
+        on a worker process.
+
+        :param counters: the statistics, as returned by counters()
+        """
+        for rule, (count, failures, seconds) in zip(self._rules, counters):
+            rule.merge(count, failures, seconds)
+
+    def reset(self):
+        """
+        Clears the statistics of all the rules.
+        """
+        for rule in self._rules:
+            rule.reset()
+
+
+def _severity(status):
+    if status in _SEVERITY:
+        return _SEVERITY.index(status)
+    return len(_SEVERITY)
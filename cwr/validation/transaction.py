@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
-from apt_pkg import __init__
 
 from cwr.validation.common import Validation, ValidationStatus, ASValidationStatus
+from cwr.validation.rules import default_rule_validation
 
 """
 Base classes for implementing validation rules.
@@ -19,8 +19,23 @@ class ValidationTransaction(Validation):
 
     def __init__(self, config):
         self.config = config
+        self._rules = None
+        if config and config.get('validation_rules'):
+            self._rules = default_rule_validation(config['validation_rules'])
+
+    @property
+    def rules(self):
+        """
+        The edit rules validation, if the configuration has a
+        'validation_rules' entry with the rules file id.
+
+        :return: the RuleValidation, or None if there are no rules
+        """
+        return self._rules
 
     def validate(self, transaction):
-        return ASValidationStatus()
+        if self._rules is None:
+            return ASValidationStatus()
+        return self._rules.validate(transaction)
 
 
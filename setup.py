@@ -84,11 +84,15 @@ setup(
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
     long_description=read('README.rst'),
+    entry_points={
+        'console_scripts': ['cwr = cwr.cli:main'],
+    },
     install_requires=[
         'setuptools',
         'twine',
     ],
     tests_require=_tests_require,
-    extras_require={'test': _tests_require},
+    extras_require={'test': _tests_require,
+                    'arrow': ['pyarrow']},
     cmdclass={'test': _ToxTester},
 )
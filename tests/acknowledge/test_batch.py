@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.acknowledge.batch import BatchAcknowledger, batch_paths
+from cwr.parser.decoder.file import default_file_decoder
+from tests.utils.submission import three_works
+
+"""
+Batch acknowledgement tests.
+
+The following cases are tested:
+- The files on a directory are acknowledged
+- Files which can't be decoded are reported, without an acknowledgement
+- Files already acknowledged are skipped
+- With a state file, files keep their sequence number when new files are
+  added to the batch
+- The files can be acknowledged on a process pool
+- The files inside a zip archive are acknowledged
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestBatchAcknowledger(unittest.TestCase):
+    def setUp(self):
+        self._config = CWRConfiguration().load_acknowledge_config('example')
+        self._dir = tempfile.mkdtemp()
+
+        for name in ('CW060001DEB_TST.V21', 'CW060002DEB_TST.V21'):
+            with open(os.path.join(self._dir, name), 'w', encoding='latin-1',
+                      newline='') as out:
+                out.write(three_works())
+        with open(os.path.join(self._dir, 'CW060003DEB_TST.V21'),
+                  'w') as out:
+            out.write('HDR\r\nNOT A CWR FILE\r\n')
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_batch_paths(self):
+        open(os.path.join(self._dir, 'CW060001DEB_TST.V21.ack'), 'w').close()
+
+        names = [os.path.basename(path) for path in batch_paths(self._dir)]
+        self.assertEqual(['CW060001DEB_TST.V21', 'CW060002DEB_TST.V21',
+                          'CW060003DEB_TST.V21'], names)
+
+        names = [os.path.basename(path) for path in
+                 batch_paths(os.path.join(self._dir, '*2DEB_TST.V21'))]
+        self.assertEqual(['CW060002DEB_TST.V21'], names)
+
+    def test_run(self):
+        report = BatchAcknowledger(self._config, 'TST', workers=1).run(
+            self._dir)
+
+        self.assertEqual(2, len(report.acknowledged))
+        self.assertEqual(1, len(report.failed))
+        self.assertEqual(6, report.transactions)
+        self.assertTrue(report.failed[0].path.endswith('CW060003DEB_TST.V21'))
+        self.assertIn('ParseException', report.failed[0].error)
+        self.assertIn('2 files acknowledged, 1 failed, 0 skipped',
+                      str(report))
+
+        names = sorted(os.listdir(self._dir))
+        self.assertEqual(['CW060001DEB_TST.V21', 'CW060001DEB_TST.V21.ack',
+                          'CW060002DEB_TST.V21', 'CW060002DEB_TST.V21.ack',
+                          'CW060003DEB_TST.V21'], names)
+
+        path = os.path.join(self._dir, 'CW060002DEB_TST.V21.ack')
+        with open(path, 'rt', encoding='latin-1', newline='') as ack:
+            contents = ack.read()
+        decoded = default_file_decoder().decode(
+            {'filename': 'CW060002DEB_TST.V21', 'contents': contents})
+        transactions = decoded.transmission.groups[0].transactions
+        self.assertEqual(['AS', 'NP', 'NP'],
+                         [transaction[0].transaction_status
+                          for transaction in transactions])
+
+    def test_restart(self):
+        acknowledger = BatchAcknowledger(self._config, 'TST', workers=1)
+        acknowledger.run(self._dir)
+        report = acknowledger.run(self._dir)
+
+        self.assertEqual(0, len(report.acknowledged))
+        self.assertEqual(1, len(report.failed))
+        self.assertEqual(2, len(report.skipped))
+
+    def test_state(self):
+        state = os.path.join(self._dir, 'sequences.json')
+        acknowledger = BatchAcknowledger(self._config, 'TST', workers=1,
+                                         state_path=state)
+
+        report = acknowledger.run(self._dir, first_sequence_n=10)
+        sequences = dict((os.path.basename(result.path), result.sequence_n)
+                         for result in report.results)
+        self.assertEqual({'CW060001DEB_TST.V21': 10,
+                          'CW060002DEB_TST.V21': 11,
+                          'CW060003DEB_TST.V21': 12}, sequences)
+
+        # A new file sorted before the others, and the failed file retried
+        with open(os.path.join(self._dir, 'CW060000DEB_TST.V21'), 'w',
+                  encoding='latin-1', newline='') as out:
+            out.write(three_works())
+        report = acknowledger.run(self._dir, first_sequence_n=10)
+
+        sequences = dict((os.path.basename(result.path), result.sequence_n)
+                         for result in report.results)
+        self.assertEqual({'CW060000DEB_TST.V21': 13,
+                          'CW060003DEB_TST.V21': 12}, sequences)
+        self.assertEqual(2, len(report.skipped))
+
+    def test_pool(self):
+        report = BatchAcknowledger(self._config, 'TST', workers=2).run(
+            batch_paths(self._dir))
+
+        self.assertEqual(2, len(report.acknowledged))
+        self.assertEqual(1, len(report.failed))
+        for result in report.acknowledged:
+            self.assertTrue(os.path.exists(result.output))
+            self.assertEqual(3, result.transactions)
+
+    def test_archive(self):
+        path = os.path.join(self._dir, 'batch.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('CW060004DEB_TST.V21', three_works())
+            archive.writestr('CW060005DEB_TST.V21', three_works())
+
+        report = BatchAcknowledger(self._config, 'TST', workers=1).run(
+            [path])
+
+        self.assertEqual(2, len(report.acknowledged))
+        self.assertEqual(path + ':CW060004DEB_TST.V21',
+                         report.acknowledged[0].path)
+        for name in ('CW060004DEB_TST.V21.ack', 'CW060005DEB_TST.V21.ack'):
+            self.assertTrue(os.path.exists(os.path.join(self._dir, name)))
+
+        report = BatchAcknowledger(self._config, 'TST', workers=1).run(
+            [path])
+        self.assertEqual(2, len(report.skipped))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.acknowledge.file import AcknowledgeFile
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.parser.encoder.dictionary import FileDictionaryEncoder
+from cwr.parser.encoder.file import default_file_encoder
+from cwr.parser.encoder.stream import default_stream_writer
+from tests.utils.submission import two_groups
+
+"""
+Stress test for acknowledging files concurrently.
+
+Many files are acknowledged at the same time from a thread pool, checking
+that each one gets its own sequence numbers.
+
+The records are numbered the same when acknowledging a decoded file and a
+stream, with the ACK record first, and the records of the decoded file are
+not changed.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_FILES = 16
+_WORKERS = 8
+
+
+class TestAcknowledgeConcurrency(unittest.TestCase):
+    def setUp(self):
+        self._config = CWRConfiguration().load_acknowledge_config('example')
+        self._data = two_groups()
+
+    def test_acknowledge_cwr_file(self):
+        # The acknowledgement doesn't change the original records, so all the
+        # threads share the same file
+        cwr_file = default_file_decoder().decode(self._data)
+        files = [cwr_file] * _FILES
+
+        def acknowledge(cwr_file):
+            acknowledge_file = AcknowledgeFile(self._config, 1, 'TST')
+            acknowledge_file.acknowledge_cwr_file(cwr_file)
+            return acknowledge_file._acknowledge.transmission
+
+        with ThreadPoolExecutor(_WORKERS) as executor:
+            transmissions = list(executor.map(acknowledge, files))
+
+        for transmission in transmissions:
+            self.assertEqual(2, transmission.trailer.group_count)
+            self.assertEqual(8, transmission.trailer.transaction_count)
+            self.assertEqual([1, 2], [group.group_header.group_id
+                                      for group in transmission.groups])
+            self.assertEqual([1, 2], [group.group_trailer.group_id
+                                      for group in transmission.groups])
+
+            for group, size in zip(transmission.groups, (5, 3)):
+                self.assertEqual(list(range(size)),
+                                 [transaction[0].transaction_sequence_n
+                                  for transaction in group.transactions])
+                for transaction in group.transactions:
+                    self.assertEqual('ACK', transaction[0].record_type)
+                    self.assertEqual(list(range(len(transaction))),
+                                     [record.record_sequence_n
+                                      for record in transaction])
+
+    def test_original_unchanged(self):
+        cwr_file = default_file_decoder().decode(self._data)
+        expected = FileDictionaryEncoder().encode(cwr_file)
+
+        AcknowledgeFile(self._config, 1, 'TST').acknowledge_cwr_file(cwr_file)
+
+        self.assertEqual(expected, FileDictionaryEncoder().encode(cwr_file))
+        transaction = cwr_file.transmission.groups[1].transactions[2]
+        self.assertEqual([2, 2, 2], [record.transaction_sequence_n
+                                     for record in transaction])
+        self.assertEqual([0, 1, 2], [record.record_sequence_n
+                                     for record in transaction])
+
+    def test_acknowledge_stream(self):
+        file_events = list(default_file_stream_decoder().decode(self._data))
+        events = [file_events] * _FILES
+
+        def acknowledge(events):
+            out = io.StringIO()
+            acknowledge_file = AcknowledgeFile(self._config, 1, 'TST')
+            acknowledge_file.acknowledge_stream(events,
+                                                default_stream_writer(out))
+            return out.getvalue()
+
+        with ThreadPoolExecutor(_WORKERS) as executor:
+            results = list(executor.map(acknowledge, events))
+
+        # All the files have the same contents, so the results must match
+        self.assertEqual(1, len(set(results)))
+
+        lines = results[0].split('\r\n')[:-1]
+        self.assertEqual(['GRHACK00001', 'GRHACK00002'],
+                         [line[:11] for line in lines
+                          if line.startswith('GRH')])
+        self.assertEqual(['%08d' % i for i in (0, 1, 2, 3, 4, 0, 1, 2)],
+                         [line[3:11] for line in lines
+                          if line.startswith('ACK')])
+
+    def test_same_numbering(self):
+        acknowledge_file = AcknowledgeFile(self._config, 1, 'TST')
+        acknowledge_file.acknowledge_cwr_file(
+            default_file_decoder().decode(self._data))
+        encoded = default_file_encoder().encode(
+            acknowledge_file._acknowledge.transmission)
+
+        out = io.StringIO()
+        AcknowledgeFile(self._config, 1, 'TST').acknowledge_stream(
+            default_file_stream_decoder().decode(self._data),
+            default_stream_writer(out))
+
+        def prefixes(contents):
+            return [line[:19] for line in contents.splitlines()
+                    if line[:3] not in ('HDR', 'GRH', 'GRT', 'TRL')]
+
+        self.assertEqual(prefixes(out.getvalue()), prefixes(encoded))
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.acknowledge.file import AcknowledgeFile
+from cwr.acknowledge.parallel import ParallelValidation, chunks, \
+    file_transactions, project, validate_file
+from cwr.parser.decoder.dictionary import FileDictionaryDecoder
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.encoder.dictionary import FileDictionaryEncoder
+from tests.utils.submission import two_groups
+
+"""
+Parallel validation tests.
+
+The following cases are tested:
+- Lists are split into consecutive chunks
+- Only the records read by the validation are sent to the workers
+- The statuses from the pool are in the same order as the transactions
+- The statistics of the rules on the workers are merged
+- The statuses can be used to acknowledge the file
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestChunks(unittest.TestCase):
+    def test_chunks(self):
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6]],
+                         list(chunks(list(range(7)), 3)))
+
+    def test_empty(self):
+        self.assertEqual([], list(chunks([], 3)))
+
+
+class TestParallelValidation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._data = FileDictionaryEncoder().encode(
+            default_file_decoder().decode(two_groups()))
+
+    def setUp(self):
+        self._config = dict(
+            CWRConfiguration().load_acknowledge_config('example'))
+        self._config['validation_rules'] = 'common'
+
+        self._file = FileDictionaryDecoder().decode(self._data)
+        # The works have no writers, and one of them has no title either
+        self._file.transmission.groups[0].transactions[1][0].title = ''
+
+    def test_transactions(self):
+        self.assertEqual(['NWR'] * 5 + ['REV'] * 3,
+                         [transaction[0].record_type for transaction in
+                          file_transactions(self._file)])
+
+    def test_project(self):
+        transaction = file_transactions(self._file)[0]
+
+        self.assertEqual(['NWR', 'SPT'],
+                         [record.record_type for record in
+                          project(transaction, {'SPT', 'SWT'})])
+
+        record_types = AcknowledgeFile(self._config, 0, '').record_types
+        self.assertEqual(['NWR', 'SPU', 'SPT'],
+                         [record.record_type for record in
+                          project(transaction, record_types)])
+
+    def test_validate_file(self):
+        acknowledge = AcknowledgeFile(self._config, 1, 'TST')
+        expected = [acknowledge.validate_transaction(transaction)
+                    for transaction in file_transactions(self._file)]
+        expected = [(status.code, status.message) for status in expected]
+
+        # Small chunks, so the transactions are spread over several messages
+        statuses = validate_file(self._file, self._config, jobs=2,
+                                 chunk_size=3)
+
+        self.assertEqual(['RJ'] * 5 + ['NP'] * 3,
+                         [code for code, _ in expected])
+        self.assertEqual(expected, [(status.code, status.message)
+                                    for status in statuses])
+        self.assertTrue(statuses[1].message.startswith('work_title'))
+        self.assertTrue(statuses[2].message.startswith('work_writers'))
+
+    def test_single_job(self):
+        with ParallelValidation(self._config, jobs=1) as validation:
+            statuses = validation.validate_file(self._file)
+
+        self.assertEqual(['RJ'] * 5 + ['NP'] * 3,
+                         [status.code for status in statuses])
+        self.assertTrue(statuses[1].message.startswith('work_title'))
+
+    def test_statistics(self):
+        with ParallelValidation(self._config, jobs=1) as validation:
+            validation.validate_file(self._file)
+            expected = [(rule.rule_id, rule.count, rule.failures)
+                        for rule in validation.rules.rules]
+
+        with ParallelValidation(self._config, jobs=2,
+                                chunk_size=3) as validation:
+            validation.validate_file(self._file)
+            validation.validate_file(self._file)
+            rules = validation.rules.rules
+
+        self.assertTrue(any(count for _, count, _ in expected))
+        self.assertEqual([(rule_id, count * 2, failures * 2)
+                          for rule_id, count, failures in expected],
+                         [(rule.rule_id, rule.count, rule.failures)
+                          for rule in rules])
+
+    def test_acknowledge(self):
+        statuses = validate_file(self._file, self._config, jobs=2,
+                                 chunk_size=3)
+
+        acknowledge = AcknowledgeFile(self._config, 1, 'TST')
+        acknowledge.acknowledge_cwr_file(self._file, statuses)
+
+        groups = acknowledge._acknowledge.transmission.groups
+        self.assertEqual([['RJ'] * 5, ['NP'] * 3],
+                         [[transaction[0].transaction_status
+                           for transaction in group.transactions]
+                          for group in groups])
+        self.assertEqual(8, acknowledge._acknowledge.transmission.trailer.
+                         transaction_count)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import io
+import unittest
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.acknowledge.file import AcknowledgeFile
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.parser.encoder.stream import default_stream_writer
+from tests.utils.submission import three_works
+
+"""
+Streaming acknowledgement tests.
+
+The following cases are tested:
+- Each transaction is echoed after its ACK record
+- The status depends on the territories of the transaction
+- The acknowledgement file can be decoded
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestAcknowledgeStream(unittest.TestCase):
+    def setUp(self):
+        config = CWRConfiguration().load_acknowledge_config('example')
+        self._acknowledge = AcknowledgeFile(config, 1, 'TST')
+
+    def test_acknowledge(self):
+        events = default_file_stream_decoder().decode(
+            {'filename': 'CW060001DEB_TST.V21', 'contents': three_works()})
+
+        out = io.StringIO()
+        self._acknowledge.acknowledge_stream(events,
+                                             default_stream_writer(out))
+
+        lines = out.getvalue().split('\r\n')[:-1]
+        self.assertEqual(['HDR', 'GRH', 'ACK', 'NWR', 'SPU', 'SPT',
+                          'ACK', 'NWR', 'SPU', 'SPT',
+                          'ACK', 'NWR', 'SPU', 'GRT', 'TRL'],
+                         [line[:3] for line in lines])
+        self.assertEqual('GRHACK', lines[1][:6])
+
+        decoded = default_file_decoder().decode(
+            {'filename': 'CW060001DEB_TST.V21', 'contents': out.getvalue()})
+        transactions = decoded.transmission.groups[0].transactions
+
+        self.assertEqual(3, len(transactions))
+        self.assertEqual(['AS', 'NP', 'NP'],
+                         [transaction[0].transaction_status
+                          for transaction in transactions])
+        self.assertEqual('FIRST', transactions[0][0].creation_title)
+        self.assertEqual(1, transactions[0][0].original_group_id)
+        self.assertEqual(2, transactions[2][0]
+                         .original_transaction_sequence_n)
+        self.assertEqual('W1', transactions[0][1].submitter_work_n)
+
+    def test_acknowledge_rules(self):
+        config = CWRConfiguration().load_acknowledge_config('example')
+        config['validation_rules'] = 'common'
+        acknowledge = AcknowledgeFile(config, 1, 'TST')
+
+        events = default_file_stream_decoder().decode(
+            {'filename': 'CW060001DEB_TST.V21', 'contents': three_works()})
+
+        out = io.StringIO()
+        acknowledge.acknowledge_stream(events, default_stream_writer(out))
+
+        decoded = default_file_decoder().decode(
+            {'filename': 'CW060001DEB_TST.V21', 'contents': out.getvalue()})
+        transactions = decoded.transmission.groups[0].transactions
+
+        # The first work is covered, but it has no writers
+        self.assertEqual(['RJ', 'NP', 'NP'],
+                         [transaction[0].transaction_status
+                          for transaction in transactions])
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import pstats
+import unittest
+
+from cwr.grammar.factory.profiler import RuleProfiler
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from tests.utils.submission import three_works
+
+"""
+Grammar rules profiler tests.
+
+The following cases are tested:
+- Records, groups, fields and options are measured
+- Failed alternatives are counted
+- The report is sorted, and can be filtered by kind
+- The statistics can be loaded by pstats
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestRuleProfiler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._profiler = RuleProfiler()
+        decoder = default_file_stream_decoder(cls._profiler)
+        cls._events = list(decoder.decode({'filename': 'CW060001DEB_TST.V21',
+                                           'contents': three_works()}))
+
+    def test_rules(self):
+        rules = self._profiler.rules
+
+        work = rules[('transaction_record', 'work')]
+        self.assertEqual(3, work.successes)
+        self.assertTrue(work.cumulative_time >= work.own_time > 0)
+
+        publisher = rules[('transaction_record', 'publisher')]
+        self.assertEqual(3, publisher.successes)
+        # Tried after the last publisher of each work, and failing
+        self.assertTrue(publisher.failures > 0)
+
+        self.assertEqual(1, rules[('record', 'transmission_header')].calls)
+        self.assertEqual(3, rules[('group', 'work_transaction')].successes)
+        self.assertTrue(rules[('field', 'submitter_work_n')].calls >= 3)
+
+        options = [stats for (kind, name), stats in rules.items()
+                   if kind == 'option' and stats.calls]
+        self.assertTrue(options)
+
+    def test_report(self):
+        rules = self._profiler.sorted_rules()
+        times = [stats.cumulative_time for stats in rules]
+        self.assertEqual(sorted(times, reverse=True), times)
+
+        report = self._profiler.report(limit=5, kind='field').split('\n')
+        self.assertEqual(6, len(report))
+        for line in report[1:]:
+            self.assertIn(' field ', line)
+
+        self.assertRaises(ValueError, self._profiler.report, 'name')
+
+    def test_pstats(self):
+        stats = pstats.Stats(self._profiler)
+
+        work = stats.stats[('transaction_record', 0, 'work')]
+        self.assertEqual(self._profiler.rules[('transaction_record',
+                                                'work')].calls, work[1])
+        # Called from the work transaction
+        self.assertIn(('group', 0, 'work_transaction'), work[4])
+
+    def test_reset(self):
+        profiler = RuleProfiler()
+        decoder = default_file_stream_decoder(profiler)
+        list(decoder.decode({'filename': 'CW060001DEB_TST.V21',
+                             'contents': three_works()}))
+
+        profiler.reset()
+
+        self.assertEqual([], profiler.sorted_rules())
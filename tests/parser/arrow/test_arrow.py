@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import codecs
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.parser.encoder.arrow import default_arrow_exporter
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+"""
+Arrow export tests.
+
+The following cases are tested:
+- A table is created for each record type found
+- The columns are typed, and lookup columns are dictionary encoded
+- Parquet and Arrow IPC files are supported
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_events():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', '..', 'examples',
+                                'ackexample.V21')
+    data = {}
+    data['filename'] = os.path.basename(example_path)
+    data['contents'] = codecs.open(example_path, 'r', 'latin-1').read()
+
+    return default_file_stream_decoder().decode(data)
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestArrowExport(unittest.TestCase):
+    def setUp(self):
+        self._path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._path)
+
+    def test_parquet(self):
+        exporter = default_arrow_exporter(self._path)
+        exporter.export(_example_events())
+
+        self.assertTrue(os.path.isfile(os.path.join(self._path,
+                                                    'HDR.parquet')))
+
+        table = pyarrow.parquet.read_table(
+            os.path.join(self._path, 'ACK.parquet'))
+
+        self.assertEqual(20, table.num_rows)
+        self.assertEqual(pyarrow.int64(), table.schema.field('group_id').type)
+        self.assertTrue(pyarrow.types.is_timestamp(
+            table.schema.field('creation_date_time').type))
+        self.assertEqual(pyarrow.date32(),
+                         table.schema.field('processing_date').type)
+
+        dates = table.column('creation_date_time').to_pylist()
+        self.assertTrue(isinstance(dates[0], datetime.datetime))
+
+    def test_ipc_small_batches(self):
+        exporter = default_arrow_exporter(self._path, file_format='ipc')
+        exporter._batch_size = 3
+        exporter.export(_example_events())
+
+        reader = pyarrow.ipc.open_file(os.path.join(self._path, 'SPU.arrow'))
+        table = reader.read_all()
+
+        self.assertTrue(reader.num_record_batches > 1)
+
+        field = table.schema.field('publisher_type')
+        self.assertTrue(pyarrow.types.is_dictionary(field.type))
+
+        types = set(table.column('publisher_type').to_pylist())
+        self.assertTrue(types.issubset({'AQ', 'AM', 'PA', 'E', 'SE', 'ES',
+                                        'SA', None}))
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, default_arrow_exporter, self._path,
+                          'csv')
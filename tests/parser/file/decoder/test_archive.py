@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from cwr.parser.decoder.archive import CWRSource, map_members, open_text, \
+    path_sources, read_path
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import FILE_TAG, TRANSACTION, \
+    default_file_stream_decoder
+from cwr.utils.integrity import default_integrity_checker
+from tests.utils.submission import three_works
+
+"""
+Compressed files and zip archives tests.
+
+The following cases are tested:
+- Files compressed with gzip, bzip2 and xz are decoded as streams
+- The compression suffix is removed from the filename
+- Each file in a zip archive is decoded, with the member name as filename
+- The files in an archive can be decoded on a process pool
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_NAMES = ('CW060001DEB_TST.V21', 'CW060002DEB_TST.V21')
+
+
+def _count_transactions(source, events):
+    """
+    Counts the transactions of a file, run on the worker processes.
+    """
+    tag = None
+    transactions = 0
+    for event, value in events:
+        if event == FILE_TAG:
+            tag = value
+        elif event == TRANSACTION:
+            transactions += 1
+    return source.filename, tag.sequence_n, transactions
+
+
+class TestArchive(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._decoder = default_file_stream_decoder()
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._contents = three_works().encode('latin-1')
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _zip(self, names):
+        path = os.path.join(self._dir, 'batch.zip')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('inner/', b'')
+            for name in names:
+                archive.writestr('inner/' + name, self._contents)
+        return path
+
+    def test_compressed(self):
+        for suffix, opener in (('.gz', gzip.open), ('.bz2', bz2.open),
+                               ('.xz', lzma.open)):
+            path = os.path.join(self._dir, _NAMES[0] + suffix)
+            with opener(path, 'wb') as out:
+                out.write(self._contents)
+
+            events = list(self._decoder.decode_path(path))
+
+            self.assertEqual(1, events[0][1].sequence_n)
+            self.assertEqual(3, len([event for event, value in events
+                                     if event == TRANSACTION]))
+            self.assertEqual(_NAMES[0], CWRSource(path).filename)
+
+    def test_plain(self):
+        path = os.path.join(self._dir, _NAMES[1])
+        with open(path, 'wb') as out:
+            out.write(self._contents)
+
+        source, contents = open_text(path)
+        with contents:
+            self.assertEqual(three_works(), contents.read())
+        self.assertEqual(path, source.extracted_path)
+
+        data = list(read_path(path))
+        self.assertEqual([_NAMES[1]], [entry['filename'] for entry in data])
+
+    def test_zip(self):
+        path = self._zip(_NAMES)
+
+        sources = path_sources(path)
+        self.assertEqual(list(_NAMES), [source.filename
+                                        for source in sources])
+        self.assertEqual(os.path.join(self._dir, _NAMES[0]),
+                         sources[0].extracted_path)
+
+        tags = [value.sequence_n for event, value in
+                self._decoder.decode_path(path) if event == FILE_TAG]
+        self.assertEqual([1, 2], tags)
+
+        decoder = default_file_decoder()
+        files = [decoder.decode(data) for data in read_path(path)]
+        self.assertEqual([3, 3], [len(cwr_file.transmission.groups[0]
+                                      .transactions) for cwr_file in files])
+
+        self.assertRaises(ValueError, open_text, path)
+
+    def test_integrity(self):
+        path = os.path.join(self._dir, _NAMES[0] + '.gz')
+        with gzip.open(path, 'wb') as out:
+            out.write(self._contents)
+
+        report = default_integrity_checker().check_file(path)
+
+        self.assertEqual(0, report.issue_count)
+
+    def test_map_members(self):
+        path = self._zip(_NAMES)
+
+        expected = [(_NAMES[0], 1, 3), (_NAMES[1], 2, 3)]
+        self.assertEqual(expected, map_members(_count_transactions, path,
+                                               jobs=1))
+        self.assertEqual(expected, map_members(_count_transactions, path,
+                                               jobs=2))
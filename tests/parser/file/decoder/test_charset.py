@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from config_cwr.accessor import CWRConfiguration
+from cwr.acknowledge.file import AcknowledgeFile
+from cwr.parser.decoder.archive import open_text
+from cwr.parser.decoder.charset import CharsetReader, charset_encoding, \
+    decode_contents, default_transcoder, detect_encoding
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import TRANSACTION, TRANSMISSION_HEADER, \
+    default_file_stream_decoder
+from tests.utils.submission import UTF8_NAME, utf8_file
+
+"""
+Character set decoding tests.
+
+The following cases are tested:
+- The codec is read from the HDR character set
+- Multi-byte text is decoded keeping the fields on their byte columns
+- Files without character set are read as latin-1
+- UTF-8 files can be decoded by the file and stream decoders
+- The acknowledgement keeps the character set of the original file
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_FILENAME = 'CW060001DEB_TST.V22'
+
+
+class TestCharsetEncoding(unittest.TestCase):
+    def test_charset_encoding(self):
+        self.assertEqual('utf-8', charset_encoding('          UTF-8'))
+        self.assertEqual('big5', charset_encoding('Big5'))
+        self.assertEqual('utf-8', charset_encoding('U+0400'))
+        self.assertEqual('latin-1', charset_encoding(''))
+        self.assertEqual('latin-1', charset_encoding(None))
+
+    def test_detect(self):
+        contents = utf8_file()
+        header = contents.split(b'\r\n')[0]
+
+        self.assertEqual('utf-8', detect_encoding(header))
+        self.assertEqual('latin-1', detect_encoding(header[:86]))
+        self.assertEqual('utf-8', detect_encoding(b'\xef\xbb\xbf' + header))
+
+
+class TestFieldTranscoder(unittest.TestCase):
+    def test_columns(self):
+        line = [line for line in utf8_file().split(b'\r\n')
+                if line.startswith(b'NPN')][0]
+
+        decoded = default_transcoder().decode(line, 'utf-8')
+
+        self.assertEqual(len(line), len(decoded))
+        self.assertEqual(UTF8_NAME, decoded[30:510].strip())
+        self.assertEqual(line[510:].decode('ascii'), decoded[510:])
+
+    def test_ascii(self):
+        line = b'NWN0000000100000001'
+        self.assertEqual('NWN0000000100000001',
+                         default_transcoder().decode(line, 'utf-8'))
+
+
+class TestCharsetReader(unittest.TestCase):
+    def test_lines(self):
+        contents = utf8_file()
+        reader = CharsetReader(io.BytesIO(contents))
+
+        lines = list(reader)
+
+        self.assertEqual('utf-8', reader.encoding)
+        self.assertEqual(contents.count(b'\n'), len(lines))
+        self.assertTrue(lines[0].endswith('UTF-8\r\n'))
+
+    def test_latin(self):
+        contents = utf8_file('')
+        self.assertEqual(contents.decode('latin-1'),
+                         decode_contents(contents))
+
+    def test_decode(self):
+        contents = decode_contents(utf8_file())
+
+        cwr_file = default_file_decoder().decode({'filename': _FILENAME,
+                                                  'contents': contents})
+
+        transmission = cwr_file.transmission
+        self.assertEqual('UTF-8', transmission.header.character_set)
+        names = [record.publisher_name for transaction in
+                 transmission.groups[0].transactions
+                 for record in transaction if record.record_type == 'NPN']
+        self.assertTrue(names)
+        for name in names:
+            self.assertEqual(UTF8_NAME, name)
+
+    def test_stream(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, _FILENAME)
+            with open(path, 'wb') as out:
+                out.write(utf8_file())
+
+            source, contents = open_text(path, None)
+            with contents:
+                events = list(default_file_stream_decoder().decode(
+                    source.data(contents)))
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual('UTF-8', events[1][1].character_set)
+        self.assertEqual(TRANSMISSION_HEADER, events[1][0])
+        transactions = [value for event, value in events
+                        if event == TRANSACTION]
+        self.assertEqual(3, len(transactions))
+
+    def test_acknowledge(self):
+        contents = decode_contents(utf8_file())
+        cwr_file = default_file_decoder().decode({'filename': _FILENAME,
+                                                  'contents': contents})
+        config = CWRConfiguration().load_acknowledge_config('example')
+
+        acknowledge = AcknowledgeFile(config, 1, 'TST')
+        self.assertEqual('latin-1', acknowledge.encoding)
+        acknowledge.acknowledge_cwr_file(cwr_file)
+
+        self.assertEqual('utf-8', acknowledge.encoding)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import codecs
+import os
+import unittest
+
+from pyparsing import ParseBaseException
+
+from cwr.parser.decoder.diagnosis import FailureLocator, locate_failures
+from cwr.parser.decoder.file import default_file_decoder
+
+"""
+Failure localization tests.
+
+The following cases are tested:
+- A valid file has no issues
+- The records and fields which fail are found, in the order of the file,
+  on the current process and on a pool
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_lines():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', '..', '..', 'examples',
+                                'ackexample.V21')
+    with codecs.open(example_path, 'r', 'latin-1') as example:
+        return example.read().split('\n')
+
+
+def _corrupt(lines):
+    """
+    Corrupts the PR share of the first SPU and the publisher type of the
+    last one, returning their line numbers.
+    """
+    spu = [i for i, line in enumerate(lines) if line.startswith('SPU')]
+    first = spu[0]
+    last = spu[-1]
+
+    lines[first] = lines[first][:115] + 'XXXXX' + lines[first][120:]
+    lines[last] = lines[last][:76] + '??' + lines[last][78:]
+
+    return first + 1, last + 1
+
+
+class TestFailureLocator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._lines = _example_lines()
+        cls._locator = FailureLocator(jobs=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._locator.close()
+
+    def test_valid(self):
+        report = self._locator.locate('\n'.join(self._lines))
+
+        self.assertTrue(report.valid)
+        self.assertEqual(20, report.transactions)
+        self.assertEqual(26, report.blocks)
+
+    def test_locate(self):
+        lines = list(self._lines)
+        first, last = _corrupt(lines)
+        contents = '\n'.join(lines)
+
+        self.assertRaises(ParseBaseException, default_file_decoder().decode,
+                          {'filename': 'ackexample.V21',
+                           'contents': contents})
+
+        report = self._locator.locate(contents)
+
+        self.assertEqual([(first, 'SPU', 'pr_ownership_share'),
+                          (last, 'SPU', 'publisher_type')],
+                         [(issue.line_n, issue.record_type, issue.field)
+                          for issue in report.issues])
+        self.assertEqual(20, report.transactions)
+
+    def test_pool(self):
+        lines = list(self._lines)
+        first, last = _corrupt(lines)
+
+        # Small chunks, so the blocks are spread over several messages
+        report = locate_failures({'filename': 'ackexample.V21',
+                                  'contents': '\n'.join(lines)},
+                                 jobs=2, chunk_size=3)
+
+        self.assertEqual([first, last],
+                         [issue.line_n for issue in report.issues])
+        self.assertEqual(20, report.transactions)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import codecs
+import os
+import unittest
+
+from pyparsing import ParseException
+
+from cwr.group import GroupHeader, GroupTrailer
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import default_file_stream_decoder, \
+    read_blocks, read_lines
+from cwr.transmission import TransmissionHeader, TransmissionTrailer
+
+"""
+CWR file stream decoder tests.
+
+The following cases are tested:
+- The lines are split into control and transaction blocks
+- The events are the same as the ones from the file decoder
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_data():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', '..', '..', 'examples',
+                                'ackexample.V21')
+    data = {}
+    data['filename'] = os.path.basename(example_path)
+    data['contents'] = codecs.open(example_path, 'r', 'latin-1').read()
+    return data
+
+
+class TestReadBlocks(unittest.TestCase):
+    def test_blocks(self):
+        lines = ['HDR', 'GRHAGR', 'AGR1', 'IPA1', 'AGR2', '', 'GRT', 'TRL']
+
+        blocks = list(read_blocks(lines))
+
+        self.assertEqual(['transmission_header', 'group_header',
+                          'transaction', 'transaction', 'group_trailer',
+                          'transmission_trailer'],
+                         [block.block_type for block in blocks])
+        self.assertEqual(['AGR1', 'IPA1'], blocks[2].lines)
+        self.assertEqual(3, blocks[2].line_n)
+        self.assertEqual(7, blocks[4].line_n)
+
+    def test_lines_keep_carriage_return(self):
+        lines = list(read_lines(u'\ufeffHDR\r\nTRL\r\n'))
+
+        self.assertEqual(['HDR\r', 'TRL\r'], lines)
+
+
+class TestFileStreamDecoder(unittest.TestCase):
+    def setUp(self):
+        self._decoder = default_file_stream_decoder()
+
+    def test_example(self):
+        data = _example_data()
+
+        events = list(self._decoder.decode(data))
+        expected = default_file_decoder().decode(data).transmission
+
+        self.assertEqual('file_tag', events[0][0])
+
+        header = events[1][1]
+        self.assertTrue(isinstance(header, TransmissionHeader))
+        self.assertTrue(isinstance(events[-1][1], TransmissionTrailer))
+
+        group_headers = [value for event, value in events
+                         if event == 'group_header']
+        group_trailers = [value for event, value in events
+                          if event == 'group_trailer']
+        transactions = [value for event, value in events
+                        if event == 'transaction']
+
+        self.assertEqual(len(expected.groups), len(group_headers))
+        self.assertTrue(isinstance(group_headers[0], GroupHeader))
+        self.assertTrue(isinstance(group_trailers[0], GroupTrailer))
+
+        expected_transactions = []
+        for group in expected.groups:
+            expected_transactions.extend(group.transactions)
+
+        self.assertEqual(len(expected_transactions), len(transactions))
+        for decoded, original in zip(transactions, expected_transactions):
+            self.assertEqual([record.record_type for record in original],
+                             [record.record_type for record in decoded])
+
+    def test_invalid_block(self):
+        data = {'filename': 'CW060001DEB_TST.V21',
+                'contents': 'HDR_invalid\r\n'}
+
+        events = self._decoder.decode(data)
+        next(events)
+
+        self.assertRaises(ParseException, next, events)
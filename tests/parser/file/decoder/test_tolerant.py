@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from cwr.parser.decoder.stream import GROUP_HEADER, TRANSACTION
+from cwr.parser.decoder.tolerant import ERROR, \
+    default_tolerant_file_decoder
+from tests.utils.submission import three_works
+
+"""
+Error tolerant decoder tests.
+
+The following cases are tested:
+- A valid file is decoded without issues
+- A record with a wrong field is reported with its line and field
+- Transactions missing records are reported on their first line
+- Decoding resumes after each error, keeping the valid transactions
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_FILENAME = 'CW060001DEB_TST.V21'
+
+
+def _lines():
+    # The submission has one group with three NWR transactions:
+    # line 3 NWR, 4 SPU, 5 SPT, 6 NWR, 7 SPU, 8 SPT, 9 NWR, 10 SPU
+    return three_works().split('\r\n')
+
+
+def _replace(line, start, end, value):
+    return line[:start] + value + line[end:]
+
+
+class TestTolerantFileDecoder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._decoder = default_tolerant_file_decoder()
+
+    def _decode(self, lines):
+        return self._decoder.decode({'filename': _FILENAME,
+                                     'contents': '\r\n'.join(lines)})
+
+    def test_valid(self):
+        result = self._decode(_lines())
+
+        self.assertTrue(result.valid)
+        self.assertEqual('AGENCY',
+                         result.cwr_file.transmission.header.sender_name)
+        self.assertEqual([3], [len(group.transactions) for group in
+                               result.cwr_file.transmission.groups])
+
+    def test_wrong_field(self):
+        lines = _lines()
+        lines[3] = _replace(lines[3], 115, 120, 'XXXXX')
+
+        result = self._decode(lines)
+
+        self.assertFalse(result.valid)
+        self.assertEqual(1, len(result.issues))
+
+        issue = result.issues[0]
+        self.assertEqual(4, issue.line_n)
+        self.assertEqual('SPU', issue.record_type)
+        self.assertEqual('pr_ownership_share', issue.field)
+        self.assertEqual(lines[3].rstrip('\r'), issue.text)
+
+        transactions = result.cwr_file.transmission.groups[0].transactions
+        self.assertEqual(['W2', 'W3'], [transaction[0].submitter_work_n
+                                        for transaction in transactions])
+        self.assertEqual(3, result.cwr_file.transmission.groups[0].
+                         group_trailer.transaction_count)
+
+    def test_missing_record(self):
+        lines = _lines()
+        del lines[6]
+
+        result = self._decode(lines)
+
+        self.assertEqual(1, len(result.issues))
+
+        issue = result.issues[0]
+        self.assertEqual(6, issue.line_n)
+        self.assertEqual('NWR', issue.record_type)
+        self.assertIsNone(issue.field)
+
+    def test_several_errors(self):
+        lines = _lines()
+        lines[3] = _replace(lines[3], 115, 120, 'XXXXX')
+        lines[6] = _replace(lines[6], 0, 3, 'XXX')
+        lines[1] = _replace(lines[1], 6, 11, 'ABCDE')
+
+        result = self._decode(lines)
+
+        self.assertEqual([(2, 'GRH', 'group_id'),
+                          (4, 'SPU', 'pr_ownership_share'),
+                          (7, 'XXX', None)],
+                         [(issue.line_n, issue.record_type, issue.field)
+                          for issue in result.issues])
+
+        # The group is kept, without its header
+        group = result.cwr_file.transmission.groups[0]
+        self.assertIsNone(group.group_header)
+        self.assertIsNotNone(group.group_trailer)
+        self.assertEqual(['W3'], [transaction[0].submitter_work_n
+                                  for transaction in group.transactions])
+        self.assertIsNotNone(result.cwr_file.transmission.trailer)
+
+    def test_events(self):
+        lines = _lines()
+        lines[3] = _replace(lines[3], 115, 120, 'XXXXX')
+
+        events = list(self._decoder.decode_events(
+            {'filename': _FILENAME, 'contents': '\r\n'.join(lines)}))
+
+        self.assertEqual([GROUP_HEADER, ERROR, TRANSACTION, TRANSACTION],
+                         [event for event, _ in events[2:6]])
+        self.assertEqual('pr_ownership_share', events[3][1][0].field)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import codecs
+import datetime
+import io
+import os
+import sqlite3
+import unittest
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.encoder.stream import default_stream_writer, merge_rows, \
+    cursor_rows
+
+"""
+CWR stream writer tests.
+
+The following cases are tested:
+- The example file is written again with the same records
+- Transactions are created from database rows
+- Unsorted and orphan rows are rejected
+- Transactions can only contain transaction records
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_data():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', '..', '..', 'examples',
+                                'ackexample.V21')
+    data = {}
+    data['filename'] = os.path.basename(example_path)
+    data['contents'] = codecs.open(example_path, 'r', 'latin-1').read()
+    return data
+
+
+def _header():
+    return {'record_type': 'HDR',
+            'sender_type': 'PB',
+            'sender_id': 226144593,
+            'sender_name': 'AGENCY',
+            'edi_standard': '01.10',
+            'creation_date_time': '2015-02-16 12:06:02',
+            'transmission_date': '2015-02-16',
+            'character_set': None}
+
+
+class TestStreamWriterExample(unittest.TestCase):
+    def test_example(self):
+        data = _example_data()
+        transmission = default_file_decoder().decode(data).transmission
+
+        out = io.StringIO()
+        writer = default_stream_writer(out)
+        writer.write_header(transmission.header)
+        for group in transmission.groups:
+            writer.write_group(group.group_header.transaction_type,
+                               group.transactions)
+        writer.close()
+
+        original = data['contents'].split('\r\n')
+        written = out.getvalue().split('\r\n')
+
+        self.assertEqual(len(original), len(written))
+        self.assertEqual(writer.record_count, len(written) - 1)
+        self.assertEqual(20, writer.transaction_count)
+
+        # The sequence numbers and counts are created again
+        for original_line, line in zip(original[:-3], written[:-3]):
+            self.assertEqual(original_line[:3], line[:3])
+            self.assertEqual(original_line[19:].strip(), line[19:].strip())
+
+
+class TestStreamWriterRows(unittest.TestCase):
+    def setUp(self):
+        self._connection = sqlite3.connect(':memory:')
+        self._connection.execute('CREATE TABLE work (submitter_work_n TEXT, '
+                                 'title TEXT, language_code TEXT, '
+                                 'iswc TEXT, copyright_date TEXT, '
+                                 'musical_work_distribution_category TEXT, '
+                                 'duration TEXT, recorded_indicator TEXT, '
+                                 'version_type TEXT)')
+        self._connection.execute('CREATE TABLE title (submitter_work_n TEXT, '
+                                 'alternate_title TEXT, title_type TEXT)')
+        self._connection.executemany(
+            'INSERT INTO work VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [('W1', 'FIRST WORK', 'EN', None, '2003-02-10', 'POP',
+              '00:03:20', 'Y', 'ORI'),
+             ('W2', 'SECOND WORK', 'EN', None, None, 'POP', None, 'U',
+              'ORI')])
+        self._connection.executemany(
+            'INSERT INTO title VALUES (?, ?, ?)',
+            [('W1', 'THE FIRST', 'AT'), ('W1', 'OTHER FIRST', 'AT')])
+
+    def tearDown(self):
+        self._connection.close()
+
+    def _cursor(self, query):
+        return cursor_rows(self._connection.execute(query))
+
+    def test_rows(self):
+        transactions = merge_rows('submitter_work_n', [
+            ('NWR', self._cursor('SELECT * FROM work '
+                                 'ORDER BY submitter_work_n')),
+            ('ALT', self._cursor('SELECT * FROM title '
+                                 'ORDER BY submitter_work_n'))])
+
+        out = io.StringIO()
+        writer = default_stream_writer(out)
+        writer.write_header(_header())
+        writer.write_group('NWR', transactions)
+        writer.close()
+
+        lines = out.getvalue().split('\r\n')[:-1]
+
+        self.assertEqual(['HDR', 'GRH', 'NWR', 'ALT', 'ALT', 'NWR', 'GRT',
+                          'TRL'], [line[:3] for line in lines])
+        self.assertEqual('ALT0000000000000001THE FIRST', lines[3][:28])
+        self.assertEqual('NWR0000000100000000SECOND WORK', lines[5][:30])
+        self.assertEqual('GRT000010000000200000006', lines[6][:24])
+        self.assertEqual('TRL000010000000200000008', lines[7])
+
+        decoded = default_file_decoder().decode(
+            {'filename': 'CW060001DEB_TST.V21',
+             'contents': out.getvalue()})
+        work = decoded.transmission.groups[0].transactions[0][0]
+        self.assertEqual(datetime.date(2003, 2, 10), work.copyright_date)
+
+    def test_orphan_rows(self):
+        transactions = merge_rows('submitter_work_n', [
+            ('NWR', [{'submitter_work_n': 'W2'}]),
+            ('ALT', [{'submitter_work_n': 'W1'}])])
+
+        self.assertRaises(ValueError, list, transactions)
+
+    def test_unsorted_rows(self):
+        transactions = merge_rows('submitter_work_n', [
+            ('NWR', [{'submitter_work_n': 'W2'},
+                     {'submitter_work_n': 'W1'}])])
+
+        self.assertRaises(ValueError, list, transactions)
+
+    def test_invalid_record(self):
+        writer = default_stream_writer(io.StringIO())
+
+        with self.assertRaises(ValueError) as context:
+            writer.encode_transaction([{'record_type': 'NWR'}, 'ALT'])
+        self.assertIn('found str', str(context.exception))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import codecs
+import os
+import sqlite3
+import unittest
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.parser.encoder.sqlite import default_sqlite_loader
+
+"""
+SQLite loader tests.
+
+The following cases are tested:
+- A table is created for each record type
+- The records are linked to their groups and transactions
+- Loading a CWRFile gives the same rows as loading the stream
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_data():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', '..', 'examples',
+                                'ackexample.V21')
+    data = {}
+    data['filename'] = os.path.basename(example_path)
+    data['contents'] = codecs.open(example_path, 'r', 'latin-1').read()
+    return data
+
+
+class TestSQLiteLoader(unittest.TestCase):
+    def setUp(self):
+        self._connection = sqlite3.connect(':memory:')
+
+    def tearDown(self):
+        self._connection.close()
+
+    def _count(self, query):
+        return self._connection.execute(query).fetchone()[0]
+
+    def test_stream(self):
+        loader = default_sqlite_loader(self._connection)
+        loader._batch_size = 7
+        loader.load(default_file_stream_decoder().decode(_example_data()))
+        loader.close()
+
+        self.assertEqual(1, self._count('SELECT COUNT(*) FROM HDR'))
+        self.assertEqual(2, self._count('SELECT COUNT(*) FROM cwr_group'))
+        self.assertEqual(20,
+                         self._count('SELECT COUNT(*) FROM cwr_transaction'))
+        self.assertEqual(0, self._count('SELECT COUNT(*) FROM AGR'))
+
+        # Every ACK is the first record of its transaction
+        self.assertEqual(20, self._count(
+            'SELECT COUNT(*) FROM ACK JOIN cwr_transaction '
+            'USING (cwr_transaction_id) '
+            'WHERE cwr_transaction.transaction_type = \'ACK\''))
+
+        self.assertEqual(20, loader.report.rows('ACK'))
+        self.assertTrue(loader.report.rows_per_second('ACK') > 0)
+
+        date = self._count('SELECT creation_date_time FROM HDR')
+        self.assertEqual(19, len(date))
+
+    def test_file(self):
+        loader = default_sqlite_loader(self._connection)
+        loader.load_file(default_file_decoder().decode(_example_data()))
+        loader.close()
+
+        self.assertEqual(20, self._count('SELECT COUNT(*) FROM ACK'))
+
+    def test_several_files(self):
+        for _ in range(2):
+            loader = default_sqlite_loader(self._connection)
+            loader.load(default_file_stream_decoder().decode(_example_data()))
+            loader.close()
+
+        self.assertEqual(40, self._count(
+            'SELECT COUNT(DISTINCT cwr_transaction_id) FROM ACK'))
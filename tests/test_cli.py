@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cwr import cli
+from tests.utils.submission import UTF8_NAME, two_groups, utf8_file
+
+"""
+Command line tool tests.
+
+The following cases are tested:
+- Files are decoded to JSON, JSON lines and CSV tables with each engine
+- A JSON file is encoded back into a CWR file
+- Validation exits with an error code when issues are found
+- Stats count the file contents
+- Compressed files are read without extracting them
+- Transactions are found through the index
+- Files are acknowledged, exiting with an error code when one fails
+- Synthetic files are generated
+- Files are split into smaller ones
+- Wrong arguments and unreadable files have their own exit codes
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestCommandLine(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+        data = two_groups()
+        self._path = os.path.join(self._dir, data['filename'])
+        with open(self._path, 'wt', encoding='latin-1', newline='') as out:
+            out.write(data['contents'])
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _run(self, *argv):
+        out = io.StringIO()
+        err = io.StringIO()
+        code = cli.main(list(argv), out, err)
+        return code, out.getvalue(), err.getvalue()
+
+    def test_decode_json(self):
+        for engine in (cli.PYPARSING, cli.STREAM, cli.TOLERANT):
+            code, out, err = self._run('decode', self._path, '--engine',
+                                       engine)
+
+            self.assertEqual(cli.EXIT_OK, code)
+            transmission = json.loads(out)['transmission']
+            self.assertEqual([5, 3], [len(group['transactions'])
+                                      for group in transmission['groups']])
+
+    def test_decode_jsonl(self):
+        code, out, err = self._run('decode', self._path, '--format', 'jsonl',
+                                   '--engine', cli.STREAM)
+
+        self.assertEqual(cli.EXIT_OK, code)
+        events = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(15, len(events))
+        self.assertEqual('file_tag', events[0]['event'])
+        self.assertEqual('transmission_trailer', events[-1]['event'])
+        self.assertEqual('W0', events[3]['value'][0]['submitter_work_n'])
+
+    def test_decode_csv_tables(self):
+        code, out, err = self._run('decode', self._path, '--format', 'csv',
+                                   '--output', self._dir)
+
+        self.assertEqual(cli.EXIT_OK, code)
+        for record_type in ('HDR', 'GRH', 'NWR', 'REV', 'SPU', 'SPT'):
+            self.assertTrue(os.path.isfile(
+                os.path.join(self._dir, record_type + '.csv')))
+        with open(os.path.join(self._dir, 'NWR.csv')) as table:
+            self.assertEqual(6, len(table.read().splitlines()))
+
+    def test_encode(self):
+        json_path = os.path.join(self._dir, 'file.json')
+        cwr_path = os.path.join(self._dir, 'encoded.V21')
+
+        self._run('decode', self._path, '--output', json_path)
+        code, out, err = self._run('encode', json_path, '--output', cwr_path)
+
+        self.assertEqual(cli.EXIT_OK, code)
+        code, out, err = self._run('stats', cwr_path, '--json')
+        self.assertEqual(8, json.loads(out)['transactions'])
+
+    def test_validate(self):
+        code, out, err = self._run('validate', self._path, '--jobs', '1')
+        self.assertEqual(cli.EXIT_OK, code)
+
+        code, out, err = self._run('validate', self._path, '--rules',
+                                   'common')
+        self.assertEqual(cli.EXIT_INVALID, code)
+        self.assertEqual(8, out.count('work_writers'))
+
+        with open(self._path, 'rt', encoding='latin-1', newline='') as source:
+            lines = source.read().split('\n')
+        spu = [i for i, line in enumerate(lines) if line.startswith('SPU')][0]
+        lines[spu] = lines[spu][:115] + 'XXXXX' + lines[spu][120:]
+        with open(self._path, 'wt', encoding='latin-1', newline='') as out:
+            out.write('\n'.join(lines))
+
+        code, out, err = self._run('validate', self._path)
+        self.assertEqual(cli.EXIT_INVALID, code)
+        self.assertIn('pr_ownership_share', out)
+
+        # The records which can't be decoded are errors of the file
+        code, out, err = self._run('validate', self._path, '--rules',
+                                   'common')
+        self.assertEqual(cli.EXIT_INVALID, code)
+        self.assertIn('SPU', err)
+        self.assertEqual(7, out.count('work_writers'))
+
+        code, out, err = self._run('validate', self._path, '--rules',
+                                   'common', '--jobs', '2')
+        self.assertEqual(cli.EXIT_USAGE, code)
+
+        code, out, err = self._run('stats', self._path, '--jobs', '2')
+        self.assertEqual(cli.EXIT_USAGE, code)
+
+    def test_stats(self):
+        code, out, err = self._run('stats', self._path, '--json')
+
+        self.assertEqual(cli.EXIT_OK, code)
+        stats = json.loads(out)
+        self.assertEqual(2, stats['groups'])
+        self.assertEqual({'NWR': 5, 'REV': 3}, stats['transaction_types'])
+        self.assertEqual(8, stats['record_types']['SPU'])
+
+    def test_compressed(self):
+        path = self._path + '.gz'
+        with open(self._path, 'rb') as source, gzip.open(path, 'wb') as out:
+            out.write(source.read())
+
+        code, out, err = self._run('stats', path, '--json')
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertEqual(8, json.loads(out)['transactions'])
+
+        code, out, err = self._run('decode', path, '--format', 'jsonl')
+        self.assertEqual(cli.EXIT_OK, code)
+        events = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(15, len(events))
+        # The filename is read without the compression suffix
+        self.assertNotEqual(0, events[0]['value']['sequence_n'])
+
+    def test_index(self):
+        code, out, err = self._run('index', self._path, '--work', 'R1')
+
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertIn('Group 2, transaction 1: REV TITLE', out)
+
+        code, out, err = self._run('index', self._path, '--work', 'X')
+        self.assertEqual(cli.EXIT_INVALID, code)
+
+    def test_index_parties(self):
+        example = os.path.join(os.path.dirname(__file__), 'examples',
+                               'ackexample.V21')
+        with open(example, 'rt', encoding='latin-1', newline='') as source:
+            lines = source.read().split('\n')
+        # The example has no IPI base numbers, one is added to a publisher
+        lines[6] = lines[6][:139] + 'I-000000229-7' + lines[6][152:]
+        path = os.path.join(self._dir, 'CW060001DEB_TST.V21')
+        with open(path, 'wt', encoding='latin-1', newline='') as out:
+            out.write('\n'.join(lines))
+
+        code, out, err = self._run('index', path, '--ipi-name', '130046332')
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertIn('Group 1, transaction 0: ACK', out)
+
+        code, out, err = self._run('index', path, '--ipi-base',
+                                   'I-000000229-7')
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertEqual(1, out.count('Group 1, transaction'))
+
+    def test_ack(self):
+        code, out, err = self._run('ack', self._dir, '--receiver', 'TST')
+
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertTrue(os.path.isfile(self._path + '.ack'))
+
+        broken = os.path.join(self._dir, 'broken.V21')
+        with open(broken, 'wt') as out:
+            out.write('HDR\n')
+        code, out, err = self._run('ack', self._dir, '--receiver', 'TST',
+                                   '--jobs', '1')
+        self.assertEqual(cli.EXIT_INVALID, code)
+        self.assertIn('broken.V21', err)
+
+    def test_auto_encoding(self):
+        path = os.path.join(self._dir, 'CW060002DEB_TST.V22')
+        with open(path, 'wb') as out:
+            out.write(utf8_file())
+
+        code, out, err = self._run('decode', path, '--encoding', 'auto',
+                                   '--format', 'jsonl')
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertIn(UTF8_NAME, out)
+
+        code, out, err = self._run('ack', path, '--receiver', 'TST',
+                                   '--encoding', 'auto')
+        self.assertEqual(cli.EXIT_OK, code)
+        with open(path + '.ack', 'rb') as ack:
+            contents = ack.read().decode('utf-8')
+        self.assertEqual('UTF-8', contents.split('\r\n')[0][86:101].strip())
+        self.assertIn(UTF8_NAME, contents)
+
+    def test_errors(self):
+        code, out, err = self._run('decode', self._path, '--format', 'xml')
+        self.assertEqual(cli.EXIT_USAGE, code)
+
+        code, out, err = self._run('decode',
+                                   os.path.join(self._dir, 'missing.V21'))
+        self.assertEqual(cli.EXIT_ERROR, code)
+        self.assertIn('FileNotFoundError', err)
+
+    def test_generate(self):
+        path = os.path.join(self._dir, 'generated.V21')
+        code, out, err = self._run('generate', '--works', '20',
+                                   '--agreements', '5', '--seed', '1',
+                                   '--output', path)
+
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertTrue(out.startswith('25 transactions'))
+        code, out, err = self._run('validate', path)
+        self.assertEqual(cli.EXIT_OK, code)
+
+    def test_split(self):
+        output = os.path.join(self._dir, 'split')
+        os.mkdir(output)
+        code, out, err = self._run('split', self._path, '--output', output,
+                                   '--max-transactions', '3',
+                                   '--first-sequence', '7')
+
+        self.assertEqual(cli.EXIT_OK, code)
+        lines = out.splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].startswith('CW060007'))
+        for name in os.listdir(output):
+            code, out, err = self._run('validate',
+                                       os.path.join(output, name))
+            self.assertEqual(cli.EXIT_OK, code)
+
+    def test_profile(self):
+        stats_path = os.path.join(self._dir, 'decode.prof')
+        code, out, err = self._run('stats', self._path, '--profile',
+                                   stats_path, '--timings')
+
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertTrue(os.path.isfile(stats_path))
+        self.assertIn('read: ', err)
+
+        code, out, err = self._run('decode', self._path, '--engine',
+                                   cli.STREAM, '--profile-rules')
+        self.assertEqual(cli.EXIT_OK, code)
+        self.assertIn('transaction_record work', err)
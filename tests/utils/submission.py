@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import io
+
+from cwr.parser.encoder.stream import default_stream_writer
+from cwr.utils.generator import default_generator
+
+"""
+Submission files for the test classes.
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+FILENAME = 'CW060001DEB_TST.V21'
+
+# Publisher name on the UTF-8 file
+UTF8_NAME = 'ÑANDÚ 出版社 ΕΚΔΟΣΕΙΣ'
+
+
+def header():
+    return {'record_type': 'HDR',
+            'sender_type': 'PB',
+            'sender_id': 226144593,
+            'sender_name': 'AGENCY',
+            'edi_standard': '01.10',
+            'creation_date_time': '2015-02-16 12:06:02',
+            'transmission_date': '2015-02-16',
+            'character_set': None}
+
+
+def work(work_n, title, tis=None):
+    transaction = [{'record_type': 'NWR',
+                    'submitter_work_n': work_n,
+                    'title': title,
+                    'language_code': 'EN',
+                    'musical_work_distribution_category': 'POP',
+                    'recorded_indicator': 'U',
+                    'version_type': 'ORI'},
+                   {'record_type': 'SPU',
+                    'publisher_sequence_n': 1,
+                    'ip_n': 'P1',
+                    'publisher_name': 'PUBLISHER',
+                    'publisher_type': 'E',
+                    'pr_ownership_share': 50,
+                    'mr_ownership_share': 100,
+                    'sr_ownership_share': 100}]
+    if tis:
+        transaction.append({'record_type': 'SPT',
+                            'ip_n': 'P1',
+                            'pr_collection_share': 50,
+                            'mr_collection_share': 100,
+                            'sr_collection_share': 100,
+                            'inclusion_exclusion_indicator': 'I',
+                            'tis_numeric_code': tis,
+                            'shares_change': False,
+                            'sequence_n': 1})
+    return transaction
+
+
+def revision(work_n, title, tis):
+    transaction = work(work_n, title, tis)
+    transaction[0]['record_type'] = 'REV'
+    return transaction
+
+
+def three_works():
+    """
+    Contents of a file with a NWR group of three works: one for the world,
+    one for Spain and one without territories.
+    """
+    out = io.StringIO()
+    writer = default_stream_writer(out)
+    writer.write_header(header())
+    writer.write_group('NWR', [work('W1', 'FIRST', 2136),
+                               work('W2', 'SECOND', 724),
+                               work('W3', 'THIRD')])
+    writer.close()
+    return out.getvalue()
+
+
+def two_groups():
+    """
+    File with a NWR group of five works for the world and a REV group of
+    three works for Spain.
+    """
+    out = io.StringIO()
+    writer = default_stream_writer(out)
+    writer.write_header(header())
+    writer.write_group('NWR', [work('W%d' % i, 'TITLE', 2136)
+                               for i in range(5)])
+    writer.write_group('REV', [revision('R%d' % i, 'TITLE', 724)
+                               for i in range(3)])
+    writer.close()
+    return {'filename': FILENAME, 'contents': out.getvalue()}
+
+
+def utf8_file(character_set='UTF-8'):
+    """
+    Contents, as bytes, of a file with an UTF-8 publisher name on each NPN
+    record.
+    """
+    out = io.StringIO()
+    default_generator(1, nra=1).write(out, 3)
+
+    lines = []
+    for line in out.getvalue().encode('ascii').split(b'\r\n'):
+        if line.startswith(b'HDR'):
+            line = line[:86] + character_set.rjust(15).encode('ascii')
+        elif line.startswith(b'NPN'):
+            name = UTF8_NAME.encode('utf-8')
+            line = line[:30] + name + b' ' * (480 - len(name)) + line[510:]
+        lines.append(line)
+    return b'\r\n'.join(lines)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from cwr.utils.benchmark import BenchmarkReport, BenchmarkResult, \
+    BenchmarkSuite, load_report, measure, save_report
+
+"""
+Benchmark suite tests.
+
+The following cases are tested:
+- The selected benchmarks are run for each size
+- Rules are got from the grammar and field rules factories
+- The index is built from the transactions of the decoded file
+- The transactions of the decoded file are validated on the current process
+  and on the pool
+- Reports are stored and read as JSON
+- Drops in throughput and growths in memory beyond the threshold are
+  reported as regressions
+- The stored baseline can be read
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _report(throughput, peak_memory):
+    return BenchmarkReport([
+        BenchmarkResult('file_decode', 1000, 1000, 1000.0 / throughput,
+                        peak_memory),
+        BenchmarkResult('grammar_build', None, 1, 0.001, peak_memory)])
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_run(self):
+        out = io.StringIO()
+        suite = BenchmarkSuite(sizes=(5, 10), repeat=1,
+                               names=['filename_decode', 'record_decode.NWR',
+                                      'stream_decode'], out=out)
+        report = suite.run()
+
+        self.assertEqual(['filename_decode', 'record_decode.NWR@5',
+                          'stream_decode@5', 'record_decode.NWR@10',
+                          'stream_decode@10'],
+                         [result.key for result in report.results])
+        self.assertEqual(10, report.results[-1].items)
+        for result in report.results:
+            self.assertTrue(result.throughput > 0)
+            self.assertTrue(result.peak_memory > 0)
+        self.assertEqual(5, len(out.getvalue().splitlines()))
+
+    def test_index(self):
+        report = BenchmarkSuite(sizes=(10,), repeat=1,
+                                names=['index_build']).run()
+
+        self.assertEqual(['index_build@10'],
+                         [result.key for result in report.results])
+        self.assertEqual(10, report.results[0].items)
+        self.assertTrue(report.results[0].peak_memory > 0)
+
+    def test_validate(self):
+        report = BenchmarkSuite(sizes=(10,), repeat=1, memory=False,
+                                names=['validate']).run()
+
+        self.assertEqual(['validate@10', 'validate_parallel@10',
+                          'validate_ipc@10'],
+                         [result.key for result in report.results])
+        for result in report.results:
+            self.assertEqual(10, result.items)
+
+    def test_rule_lookup(self):
+        report = BenchmarkSuite(sizes=(), repeat=1, memory=False,
+                                names=['rule_lookup',
+                                       'field_rule_lookup']).run()
+
+        self.assertEqual(['rule_lookup', 'field_rule_lookup'],
+                         [result.key for result in report.results])
+        self.assertEqual(10000, report.results[0].items)
+
+    def test_territories(self):
+        report = BenchmarkSuite(sizes=(), repeat=1, memory=False,
+                                names=['tis_validate']).run()
+
+        self.assertEqual(['tis_validate'],
+                         [result.key for result in report.results])
+        self.assertEqual(1000, report.results[0].items)
+
+    def test_measure(self):
+        seconds, peak = measure(lambda: [0] * 100000, repeat=2)
+
+        self.assertTrue(seconds > 0)
+        self.assertTrue(peak >= 800000)
+
+        seconds, peak = measure(lambda: None, memory=False)
+        self.assertIsNone(peak)
+
+
+class TestBenchmarkReport(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_save(self):
+        path = os.path.join(self._dir, 'baseline.json')
+        report = _report(500, 1024)
+        report.max_rss = 4096
+        save_report(report, path)
+
+        loaded = load_report(path)
+
+        self.assertEqual(4096, loaded.max_rss)
+        self.assertEqual(report.environment, loaded.environment)
+        self.assertEqual([(result.key, result.items, result.seconds,
+                           result.peak_memory)
+                          for result in report.results],
+                         [(result.key, result.items, result.seconds,
+                           result.peak_memory)
+                          for result in loaded.results])
+
+    def test_compare(self):
+        baseline = _report(500, 1000)
+
+        self.assertEqual([], _report(400, 1200).compare(baseline))
+        self.assertEqual([], _report(1000, 100).compare(baseline))
+
+        regressions = _report(300, 2000).compare(baseline)
+        self.assertEqual([('file_decode@1000', 'throughput'),
+                          ('file_decode@1000', 'peak_memory'),
+                          ('grammar_build', 'peak_memory')],
+                         [(regression.key, regression.metric)
+                          for regression in regressions])
+        self.assertAlmostEqual(-0.4, regressions[0].change)
+
+        regressions = _report(400, 1000).compare(baseline, threshold=0.1)
+        self.assertEqual(['throughput'], [regression.metric
+                                          for regression in regressions])
+
+    def test_baseline(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'benchmarks',
+                            'baseline.json')
+        baseline = load_report(path)
+
+        keys = [result.key for result in baseline.results]
+        for key in ('grammar_build', 'import', 'filename_decode',
+                    'rule_lookup', 'field_rule_lookup', 'tis_validate',
+                    'record_decode.NWR@1000', 'file_decode@1000',
+                    'dictionary_round_trip@1000', 'json_round_trip@1000',
+                    'cwr_round_trip@1000', 'index_build@1000',
+                    'validate@1000', 'validate_parallel@1000',
+                    'validate_ipc@1000', 'ack@1000'):
+            self.assertIn(key, keys)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import io
+import unittest
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.encoder.stream import default_stream_writer
+from cwr.utils.delta import default_delta_generator, file_fingerprints
+
+"""
+Delta generation tests.
+
+The following cases are tested:
+- Unchanged works are not written
+- Changed works are written as REV transactions
+- New works are written as NWR transactions
+- The previous submission can be a file or a decoded file
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _header():
+    return {'record_type': 'HDR',
+            'sender_type': 'PB',
+            'sender_id': 226144593,
+            'sender_name': 'AGENCY',
+            'edi_standard': '01.10',
+            'creation_date_time': '2015-02-16 12:06:02',
+            'transmission_date': '2015-02-16',
+            'character_set': None}
+
+
+def _work(work_n, title, alternate_title=None):
+    transaction = [{'record_type': 'NWR',
+                    'submitter_work_n': work_n,
+                    'title': title,
+                    'language_code': 'EN',
+                    'musical_work_distribution_category': 'POP',
+                    'recorded_indicator': 'U',
+                    'version_type': 'ORI'}]
+    if alternate_title:
+        transaction.append({'record_type': 'ALT',
+                            'alternate_title': alternate_title,
+                            'title_type': 'AT'})
+    return transaction
+
+
+def _previous():
+    out = io.StringIO()
+    writer = default_stream_writer(out)
+    writer.write_header(_header())
+    writer.write_group('NWR', [_work('W1', 'FIRST', 'THE FIRST'),
+                               _work('W2', 'SECOND')])
+    writer.close()
+    return out.getvalue()
+
+
+def _current():
+    return [_work('W1', 'FIRST', 'THE FIRST'),
+            _work('W2', 'SECOND', 'THE SECOND'),
+            _work('W3', 'THIRD')]
+
+
+class TestDeltaGenerator(unittest.TestCase):
+    def _assert_delta(self, previous):
+        out = io.StringIO()
+        generator = default_delta_generator(out, previous)
+        report = generator.write(_header(), _current())
+
+        self.assertEqual(1, report.new)
+        self.assertEqual(1, report.changed)
+        self.assertEqual(1, report.unchanged)
+
+        lines = out.getvalue().split('\r\n')[:-1]
+        self.assertEqual(['HDR', 'GRH', 'NWR', 'GRT', 'GRH', 'REV', 'ALT',
+                          'GRT', 'TRL'], [line[:3] for line in lines])
+        self.assertEqual('GRHREV00002', lines[4][:11])
+        self.assertEqual('REV0000000000000000SECOND', lines[5][:25])
+        self.assertEqual('ALT0000000000000001THE SECOND', lines[6][:29])
+        self.assertEqual('TRL000020000000200000009', lines[8])
+
+        decoded = default_file_decoder().decode(
+            {'filename': 'CW060001DEB_TST.V21', 'contents': out.getvalue()})
+        groups = decoded.transmission.groups
+        self.assertEqual('W3', groups[0].transactions[0][0].submitter_work_n)
+        self.assertEqual('W2', groups[1].transactions[0][0].submitter_work_n)
+
+    def test_file_fingerprints(self):
+        self._assert_delta(file_fingerprints(_previous()))
+
+    def test_decoded_file(self):
+        decoded = default_file_decoder().decode(
+            {'filename': 'CW060001DEB_TST.V21', 'contents': _previous()})
+
+        self._assert_delta(decoded)
+
+    def test_no_changes(self):
+        out = io.StringIO()
+        generator = default_delta_generator(out,
+                                            file_fingerprints(_previous()))
+        report = generator.write(_header(), _current()[:1])
+
+        self.assertEqual(1, report.unchanged)
+        self.assertEqual(['HDR', 'TRL'],
+                         [line[:3] for line in
+                          out.getvalue().split('\r\n')[:-1]])
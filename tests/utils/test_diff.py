@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import codecs
+import os
+import shutil
+import tempfile
+import unittest
+
+from cwr.utils.diff import default_file_differ
+
+"""
+CWR file diff tests.
+
+The following cases are tested:
+- Equal files have no differences
+- Changed fields are found, ignoring the sequence numbers
+- Added and removed transactions are found
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_lines():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', 'examples',
+                                'ackexample.V21')
+    with codecs.open(example_path, 'r', 'latin-1') as example:
+        return example.read().split('\r\n')
+
+
+class TestFileDiff(unittest.TestCase):
+    def setUp(self):
+        self._path = tempfile.mkdtemp()
+        self._differ = default_file_differ()
+        self._lines = _example_lines()
+        self._old = self._write('old.V21', self._lines)
+
+    def tearDown(self):
+        shutil.rmtree(self._path)
+
+    def _write(self, name, lines):
+        path = os.path.join(self._path, name)
+        with codecs.open(path, 'w', 'latin-1') as output:
+            output.write('\r\n'.join(lines))
+        return path
+
+    def _ack_lines(self):
+        return [i for i, line in enumerate(self._lines)
+                if line.startswith('ACK')]
+
+    def test_equal(self):
+        new = self._write('new.V21', self._lines)
+
+        self.assertEqual([], list(self._differ.diff(self._old, new)))
+
+    def test_sequence_numbers_ignored(self):
+        lines = list(self._lines)
+        i = self._ack_lines()[1]
+        lines[i] = lines[i][:3] + '00000099' + lines[i][11:]
+
+        new = self._write('new.V21', lines)
+
+        self.assertEqual([], list(self._differ.diff(self._old, new)))
+
+    def test_changed_field(self):
+        lines = list(self._lines)
+        # Changes the title of the first NWR
+        i = [i for i, line in enumerate(lines) if line.startswith('NWR')][0]
+        title = 'A CHANGED TITLE'.ljust(60)
+        lines[i] = lines[i][:19] + title + lines[i][79:]
+
+        new = self._write('new.V21', lines)
+        result = list(self._differ.diff(self._old, new))
+
+        self.assertEqual(1, len(result))
+        self.assertEqual('changed', result[0].status)
+        self.assertEqual('ACK', result[0].transaction_type)
+
+        differences = result[0].differences
+        self.assertEqual(1, len(differences))
+        self.assertEqual('NWR', differences[0].record_type)
+        self.assertEqual(0, differences[0].record_n)
+        self.assertEqual('title', differences[0].field)
+        self.assertEqual('A CHANGED TITLE', differences[0].new_value)
+
+    def test_added_removed(self):
+        acks = self._ack_lines()
+        # Removes the second transaction
+        lines = self._lines[:acks[1]] + self._lines[acks[2]:]
+
+        new = self._write('new.V21', lines)
+
+        result = list(self._differ.diff(self._old, new))
+        self.assertEqual(['removed'], [diff.status for diff in result])
+
+        result = list(self._differ.diff(new, self._old))
+        self.assertEqual(['added'], [diff.status for diff in result])
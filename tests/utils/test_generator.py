@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import io
+import unittest
+from collections import Counter
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.encoder.stream import default_record_encoder_factory
+from cwr.utils.generator import default_generator
+from cwr.validation.rules import default_rule_validation
+
+"""
+Synthetic file generator tests.
+
+The following cases are tested:
+- The same seed creates the same file, and a different one another file
+- The files can be decoded, and contain the requested transactions
+- The optional records are created when requested
+- The transactions pass the edit rules
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestCWRGenerator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._encoder_factory = default_record_encoder_factory()
+        cls._decoder = default_file_decoder()
+
+    def _generate(self, works, agreements=0, seed=1, **kwargs):
+        out = io.StringIO()
+        generator = default_generator(
+            seed, encoder_factory=self._encoder_factory, **kwargs)
+        generator.write(out, works, agreements)
+        return out.getvalue()
+
+    def _decode(self, contents):
+        return self._decoder.decode({'filename': 'CW150001PUB_TST.V21',
+                                     'contents': contents})
+
+    def test_seed(self):
+        self.assertEqual(self._generate(20, 5), self._generate(20, 5))
+        self.assertNotEqual(self._generate(20, 5),
+                            self._generate(20, 5, seed=2))
+
+    def test_decode(self):
+        transmission = self._decode(self._generate(30, 10)).transmission
+
+        self.assertEqual(['AGR', 'NWR'], [group.group_header.transaction_type
+                                          for group in transmission.groups])
+        self.assertEqual([10, 30], [len(group.transactions)
+                                    for group in transmission.groups])
+        self.assertEqual(40, transmission.trailer.transaction_count)
+
+        works = transmission.groups[1].transactions
+        self.assertEqual('W000000001', works[0][0].submitter_work_n)
+        self.assertEqual('W000000030', works[-1][0].submitter_work_n)
+
+    def test_record_mix(self):
+        contents = self._generate(10, nra=1, publishers=(2, 2),
+                                  writers=(3, 3), territories=(2, 2),
+                                  alternate_titles=(1, 1),
+                                  performers=(1, 1), recordings=(1, 1))
+        counts = Counter(line[:3] for line in contents.splitlines())
+
+        self.assertEqual(10, counts['NWR'])
+        # Each publisher has a subpublisher
+        self.assertEqual(40, counts['SPU'])
+        self.assertEqual(40, counts['NPN'])
+        self.assertEqual(80, counts['SPT'])
+        self.assertEqual(30, counts['SWR'])
+        self.assertEqual(30, counts['NWN'])
+        self.assertEqual(60, counts['SWT'])
+        self.assertEqual(30, counts['PWR'])
+        self.assertEqual(10, counts['ALT'])
+        self.assertEqual(10, counts['NAT'])
+        self.assertEqual(10, counts['PER'])
+        self.assertEqual(10, counts['NPR'])
+        self.assertEqual(10, counts['REC'])
+
+        self._decode(contents)
+
+    def test_rules(self):
+        transmission = self._decode(self._generate(50, 10, nra=0.5)) \
+            .transmission
+        validation = default_rule_validation()
+
+        for group in transmission.groups:
+            for transaction in group.transactions:
+                self.assertEqual('AS', validation.validate(transaction).code)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import codecs
+import os
+import unittest
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.utils.index import TransmissionIndex, index_transmission, \
+    index_events
+
+"""
+Transmission index tests.
+
+The following cases are tested:
+- Works are found by submitter work number and ISWC
+- Transactions are found by interested party numbers
+- Numeric codes are found by their number or their text
+- The index can be built while streaming a file
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_data():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', 'examples',
+                                'ackexample.V21')
+    data = {}
+    data['filename'] = os.path.basename(example_path)
+    data['contents'] = codecs.open(example_path, 'r', 'latin-1').read()
+    return data
+
+
+class TestTransmissionIndex(unittest.TestCase):
+    def setUp(self):
+        self._transmission = default_file_decoder().decode(
+            _example_data()).transmission
+        self._index = index_transmission(self._transmission)
+
+    def test_size(self):
+        self.assertEqual(20, len(self._index))
+
+    def test_work(self):
+        transaction = self._index.find_work('256599')
+
+        self.assertTrue(transaction is self._transmission.groups[0]
+                        .transactions[0])
+        self.assertEqual(1, self._index.group_id(transaction))
+        self.assertTrue(transaction is self._index.find_iswc('T9110536293'))
+
+    def test_padded_code(self):
+        self.assertTrue(self._index.find_work('256599   ') is not None)
+
+    def test_missing(self):
+        self.assertEqual(None, self._index.find_work('XXX'))
+        self.assertEqual(None, self._index.find_agreement('XXX'))
+        self.assertEqual([], self._index.find_ipi_name(123))
+
+    def test_interested_party(self):
+        transactions = self._index.find_ip('01283329')
+
+        self.assertEqual(7, len(transactions))
+        for transaction in transactions:
+            ips = [record.publisher.ip_n for record in transaction
+                   if record.record_type == 'SPU']
+            self.assertTrue('01283329' in ips)
+
+        transactions = self._index.find_ipi_name(130046332)
+        self.assertTrue(len(transactions) > 0)
+
+    def test_numeric_text(self):
+        transactions = self._index.find_ipi_name(130046332)
+
+        self.assertEqual(transactions,
+                         self._index.find_ipi_name('130046332'))
+        self.assertEqual(transactions,
+                         self._index.find_ipi_name('00130046332 '))
+
+    def test_stream(self):
+        index = TransmissionIndex()
+        events = index_events(index, default_file_stream_decoder().decode(
+            _example_data()))
+
+        count = len([event for event in events])
+
+        self.assertEqual(27, count)
+        self.assertEqual(20, len(index))
+        self.assertEqual(1, index.group_id(index.find_work('256599')))
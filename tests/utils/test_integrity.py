@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+from cwr.utils.integrity import IntegrityChecker, \
+    default_integrity_checker
+from cwr.utils.layout import default_record_layouts
+
+"""
+Structural integrity checker tests.
+
+The following cases are tested:
+- Counts on the trailers are compared with the file
+- Sequence numbers and group ids are checked
+- Line lengths and record types are checked
+- Missing control records are reported
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _file(*transactions):
+    lines = ['HDRPB226144593AGENCY                                       '
+             '01.102015021612060220150216               ',
+             'GRHNWR0000102.100000000000']
+    records = 2
+    for transaction_n, transaction in enumerate(transactions):
+        for record_n, record_type in enumerate(transaction):
+            if record_type == 'NWR':
+                line = 'NWR%08d%08dTITLE' % (transaction_n, record_n)
+                line = line.ljust(260)
+            else:
+                line = 'ALT%08d%08dALTERNATE' % (transaction_n, record_n)
+                line = line.ljust(83)
+            lines.append(line)
+            records += 1
+    lines.append('GRT00001%08d%08d' % (len(transactions), records))
+    lines.append('TRL00001%08d%08d' % (len(transactions), records + 2))
+    return lines
+
+
+class TestIntegrityChecker(unittest.TestCase):
+    def setUp(self):
+        self._checker = default_integrity_checker()
+
+    def test_valid(self):
+        lines = _file(['NWR', 'ALT'], ['NWR'], ['NWR', 'ALT', 'ALT'])
+
+        report = self._checker.check('\r\n'.join(lines) + '\r\n')
+
+        self.assertTrue(report.valid, str(report))
+        self.assertEqual(1, report.groups)
+        self.assertEqual(3, report.transactions)
+        self.assertEqual(10, report.records)
+
+    def test_example(self):
+        current_dir = os.path.dirname(__file__)
+        example_path = os.path.join(current_dir, '..', 'examples',
+                                    'ackexample.V21')
+
+        report = self._checker.check_file(example_path)
+
+        # A record was removed from the second group
+        self.assertFalse(report.valid)
+        self.assertEqual([(2123, 'record_sequence', 68, 69),
+                          (2573, 'record_count', 520, 521),
+                          (2574, 'record_count', 2574, 2575)],
+                         [(issue.line_n, issue.code, issue.expected,
+                           issue.found) for issue in report.issues])
+        self.assertEqual(2, report.groups)
+        self.assertEqual(20, report.transactions)
+
+    def test_counts(self):
+        lines = _file(['NWR', 'ALT'], ['NWR'])
+        lines[-2] = 'GRT000010000000300000006'
+        lines[-1] = 'TRL000020000000200000008'
+
+        report = self._checker.check(lines)
+
+        self.assertEqual(['transaction_count', 'record_count', 'group_count',
+                          'record_count'],
+                         [issue.code for issue in report.issues])
+
+    def test_sequences(self):
+        lines = _file(['NWR', 'ALT'], ['NWR', 'ALT'], ['NWR'])
+        lines[5] = lines[5][:3] + '00000001' + '00000002' + lines[5][19:]
+        lines[6] = lines[6][:3] + '00000003' + lines[6][11:]
+
+        report = self._checker.check(lines)
+
+        self.assertEqual([(6, 'record_sequence', 1, 2),
+                          (7, 'transaction_sequence', 2, 3)],
+                         [(issue.line_n, issue.code, issue.expected,
+                           issue.found) for issue in report.issues])
+
+    def test_group_id(self):
+        lines = _file(['NWR'])
+        lines[1] = 'GRHNWR0000202.100000000000'
+
+        report = self._checker.check(lines)
+
+        self.assertEqual([(2, 'group_id', 1, 2), (4, 'group_id', 2, 1)],
+                         [(issue.line_n, issue.code, issue.expected,
+                           issue.found) for issue in report.issues])
+
+    def test_line_length(self):
+        lines = _file(['NWR', 'ALT'])
+        lines[3] = lines[3][:50]
+        lines.insert(3, 'XXX0000000000000002')
+
+        report = self._checker.check(lines)
+
+        self.assertEqual(['record_type', 'line_length', 'record_count',
+                          'record_count'],
+                         [issue.code for issue in report.issues])
+        self.assertEqual((83, 83), report.issues[1].expected)
+        self.assertEqual(50, report.issues[1].found)
+
+    def test_structure(self):
+        lines = _file(['NWR'])
+
+        report = self._checker.check(lines[1:-1])
+
+        self.assertEqual(['structure', 'structure'],
+                         [issue.code for issue in report.issues])
+        self.assertIn('HDR', report.issues[0].message)
+        self.assertIn('TRL', report.issues[1].message)
+
+    def test_max_issues(self):
+        lines = _file(*[['NWR']] * 10)
+        lines = [line[:3] + 'X' + line[4:] if line.startswith('NWR')
+                 else line for line in lines]
+
+        # The invalid sequence numbers and the two transaction counts
+        report = self._checker.check(lines)
+        self.assertEqual(12, report.issue_count)
+
+        checker = IntegrityChecker(default_record_layouts(), max_issues=3)
+        report = checker.check(lines)
+        self.assertEqual(12, report.issue_count)
+        self.assertEqual(3, len(report.issues))
+        self.assertIn('9 more issues', str(report))
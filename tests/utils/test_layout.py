@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from cwr.utils.layout import default_record_layouts
+
+"""
+Record layouts tests.
+
+The following cases are tested:
+- The prefix fields are included on the layouts
+- The fields have the columns used by the grammar
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestRecordLayouts(unittest.TestCase):
+    def setUp(self):
+        self._layouts = default_record_layouts()
+
+    def test_control_records(self):
+        layout = self._layouts['HDR']
+
+        self.assertFalse(layout.transaction)
+        self.assertEqual(0, layout.field('record_type').start)
+        self.assertFalse(layout.has_field('transaction_sequence_n'))
+
+        trailer = self._layouts['TRL']
+        self.assertEqual(24, trailer.field('record_count').end)
+
+    def test_transaction_record(self):
+        layout = self._layouts['NWR']
+
+        self.assertTrue(layout.transaction)
+        self.assertEqual(3, layout.field('transaction_sequence_n').start)
+        self.assertEqual(11, layout.field('record_sequence_n').start)
+
+        field = layout.field('title')
+        self.assertEqual(19, field.start)
+        self.assertEqual(60, field.size)
+
+    def test_slice(self):
+        layout = self._layouts['NWR']
+        line = 'NWR0000123400000023' + 'TITLE OF THE WORK'.ljust(60)
+
+        self.assertEqual('00001234',
+                         layout.slice(line, 'transaction_sequence_n'))
+        self.assertEqual('TITLE OF THE WORK',
+                         layout.slice(line, 'title').strip())
+
+    def test_lookup_values(self):
+        field = self._layouts['SPU'].field('publisher_type')
+
+        self.assertTrue('AQ' in field.values)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import pyparsing as pp
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.utils.metrics import Counter, Histogram, MetricsCollector
+from tests.utils.submission import three_works
+
+"""
+Prometheus metrics tests.
+
+The following cases are tested:
+- Decoded files, records by type and processed characters are counted
+- Parse errors are counted by record type
+- The latency histograms count each file and transaction
+- The metrics are written in the Prometheus text format
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_FILENAME = 'CW060001DEB_TST.V21'
+
+
+class TestMetricsCollector(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._decoder = default_file_decoder()
+
+    def setUp(self):
+        self._collector = MetricsCollector()
+
+    def _decode(self, contents):
+        return self._collector.decode(self._decoder,
+                                      {'filename': _FILENAME,
+                                       'contents': contents})
+
+    def test_decode(self):
+        contents = three_works()
+        self._decode(contents)
+        self._decode(contents)
+
+        collector = self._collector
+        self.assertEqual(2, collector.files.value())
+        self.assertEqual(2 * len(contents), collector.processed_bytes.value())
+        self.assertEqual(6, collector.records.value('NWR'))
+        self.assertEqual(2, collector.records.value('HDR'))
+        self.assertEqual(2, collector.file_latency.value())
+        self.assertEqual(6, collector.transaction_latency.value())
+        self.assertTrue(collector.peak_memory.value() > 0)
+        # The collector is only attached while decoding
+        self.assertEqual((), self._decoder.hooks)
+
+    def test_parse_error(self):
+        lines = three_works().split('\r\n')
+        lines[3] = 'SPU' + 'X' * 20
+        contents = '\r\n'.join(lines)
+
+        self.assertRaises(pp.ParseBaseException, self._decode, contents)
+
+        collector = self._collector
+        self.assertEqual(0, collector.files.value())
+        self.assertEqual(1, collector.parse_errors.value('SPU'))
+        self.assertEqual(len(contents), collector.processed_bytes.value())
+
+    def test_exposition(self):
+        self._decode(three_works())
+
+        lines = self._collector.exposition().splitlines()
+
+        self.assertIn('# TYPE cwr_files_decoded_total counter', lines)
+        self.assertIn('cwr_files_decoded_total 1', lines)
+        self.assertIn('cwr_records_decoded_total{record_type="NWR"} 3',
+                      lines)
+        self.assertIn('# TYPE cwr_file_decode_seconds histogram', lines)
+        self.assertIn('cwr_file_decode_seconds_bucket{le="+Inf"} 1', lines)
+        self.assertIn('cwr_file_decode_seconds_count 1', lines)
+        self.assertIn('cwr_transaction_decode_seconds_count 3', lines)
+        self.assertIn('cwr_grammar_cache_hits_total 0', lines)
+        for line in lines:
+            if not line.startswith('#'):
+                float(line.rsplit(' ', 1)[1])
+
+    def test_write(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'cwr.prom')
+            self._collector.write(path)
+
+            with open(path, 'rt', encoding='utf-8') as metrics:
+                self.assertEqual(self._collector.exposition(), metrics.read())
+            self.assertEqual(['cwr.prom'], os.listdir(directory))
+        finally:
+            shutil.rmtree(directory)
+
+        out = io.StringIO()
+        self._collector.write(out)
+        self.assertEqual(self._collector.exposition(), out.getvalue())
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram('latency', 'Latency.', (1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(['# HELP latency Latency.',
+                          '# TYPE latency histogram',
+                          'latency_bucket{le="1"} 2',
+                          'latency_bucket{le="5"} 3',
+                          'latency_bucket{le="+Inf"} 4',
+                          'latency_sum 14.5',
+                          'latency_count 4'], histogram.exposition())
+
+    def test_labels(self):
+        counter = Counter('errors', 'Errors.', ('record_type',))
+        counter.inc(2, 'a"b\\')
+
+        self.assertEqual('errors{record_type="a\\"b\\\\"} 2',
+                         counter.exposition()[-1])
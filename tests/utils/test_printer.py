@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.utils.printer import CWRPrinter
+from tests.utils.submission import two_groups
+
+"""
+CWR printer tests.
+
+The following cases are tested:
+- The text contains all the records, along with the counts
+- The events from the stream decoder are printed as they are received
+- CSV and TSV tables are created for each record type
+- Single records are printed as text, on the console by default
+- Transactions printed from several threads to the same output are not mixed
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+class TestCWRPrinter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._data = two_groups()
+        cls._file = default_file_decoder().decode(dict(cls._data))
+
+    def test_text(self):
+        out = io.StringIO()
+        CWRPrinter().print_file(self._file, out)
+        lines = out.getvalue().split('\n')
+
+        self.assertEqual('CWR Filename Tag information', lines[0])
+        self.assertIn('Contains 2 groups', lines)
+        self.assertIn('Contains 5 transactions', lines)
+        self.assertEqual(8, lines.count('*        TRANSACTION         *'))
+        self.assertEqual(5, lines.count('Record Type: NWR'))
+        self.assertEqual(3, lines.count('Record Type: REV'))
+        self.assertIn('Title: TITLE', lines)
+
+    def test_events(self):
+        events = default_file_stream_decoder().decode(dict(self._data))
+
+        out = io.StringIO()
+        CWRPrinter().print_events(events, out)
+        lines = out.getvalue().split('\n')
+
+        self.assertEqual(8, lines.count('*        TRANSACTION         *'))
+        self.assertEqual(['Group 1', 'Group 2'],
+                         [line for line in lines
+                          if line.startswith('Group ') and ':' not in line])
+        self.assertNotIn('Contains 2 groups', lines)
+
+        # The trailer is printed last
+        self.assertEqual('CWR Transmission Trailer', lines[-6])
+        self.assertEqual('Transaction Count: 8', lines[-3])
+
+    def test_csv(self):
+        outputs = {}
+
+        def output(record_type):
+            return outputs.setdefault(record_type, io.StringIO())
+
+        CWRPrinter('csv').print_file(self._file, output)
+
+        self.assertEqual({'HDR', 'GRH', 'NWR', 'REV', 'SPU', 'SPT', 'GRT',
+                          'TRL'}, set(outputs))
+
+        rows = list(csv.reader(io.StringIO(outputs['NWR'].getvalue())))
+        self.assertEqual(6, len(rows))
+        self.assertEqual(['Record Type', 'Transaction Sequence Number',
+                          'Record Sequence Number', 'Submitter Work Number'],
+                         rows[0][:4])
+        self.assertEqual(['NWR', '0', '0', 'W0'], rows[1][:4])
+
+        rows = list(csv.reader(io.StringIO(outputs['GRH'].getvalue())))
+        self.assertEqual(['GRH', '1', 'NWR'], rows[1][:3])
+        self.assertEqual(['GRH', '2', 'REV'], rows[2][:3])
+
+    def test_tsv(self):
+        out = io.StringIO()
+        CWRPrinter('tsv').print_file(self._file, out)
+        lines = out.getvalue().split('\n')
+
+        # A single output has a header before the first row of each type
+        self.assertEqual(8, sum(1 for line in lines
+                                if line.startswith('Record Type\t')))
+        self.assertTrue(lines[1].startswith('HDR\t'))
+
+    def test_records(self):
+        printer = CWRPrinter()
+        transmission = self._file.transmission
+        work = transmission.groups[0].transactions[0][0]
+
+        out = io.StringIO()
+        printer.print_group_header(transmission.groups[0].group_header, out)
+        printer.print_transaction_record(work, out)
+        printer.print_workr(work, out)
+        lines = out.getvalue().split('\n')
+
+        self.assertEqual(['CWR Group Header', 'Record Type: GRH',
+                          'Group ID: 1', 'Transaction Type: NWR'], lines[:4])
+        self.assertEqual(1, lines.count('Record Type: NWR'))
+        self.assertEqual(2, lines.count('Title: TITLE'))
+
+        console = io.StringIO()
+        with redirect_stdout(console):
+            printer.print_transmission_trailer(transmission.trailer)
+        self.assertEqual(['CWR Transmission Trailer', 'Record Type: TRL',
+                          'Group Count: 2'],
+                         console.getvalue().split('\n')[:3])
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, CWRPrinter, 'xml')
+
+    def test_threads(self):
+        printer = CWRPrinter()
+        out = io.StringIO()
+
+        def print_file(_):
+            printer.print_file(self._file, out)
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(print_file, range(8)))
+
+        # Each transaction is written at once, so after each banner come the
+        # records of a single transaction
+        blocks = out.getvalue().split('*        TRANSACTION         *')
+        self.assertEqual(65, len(blocks))
+        for block in blocks[1:]:
+            types = [line for line in block.split('\n')
+                     if line.startswith('Record Type: ')]
+            self.assertIn(types[0], ('Record Type: NWR', 'Record Type: REV'))
+            self.assertEqual(['Record Type: SPU', 'Record Type: SPT'],
+                             types[1:3])
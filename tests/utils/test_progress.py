@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import io
+import unittest
+
+from cwr.acknowledge.file import example_acknowledge_file
+from cwr.parser.decoder.file import FileDecoder, _find_rules, \
+    default_file_decoder, default_filename_decoder, default_grammar_factory
+from cwr.parser.decoder.stream import default_file_stream_decoder
+from cwr.parser.encoder.cwrjson import JSONEncoder
+from cwr.parser.encoder.file import default_file_encoder
+from cwr.parser.encoder.stream import default_record_encoder_factory, \
+    default_stream_writer
+from cwr.utils.generator import default_generator
+from cwr.utils.progress import CallbackHook, Progress, ProgressHook, \
+    ProgressTracker
+
+"""
+Progress hooks tests.
+
+The following cases are tested:
+- The decoder, the encoders and the acknowledgement notify each group and
+  transaction
+- Records are notified at the requested intervals
+- Stage times and throughput are measured
+- Removed hooks are not notified
+- Decoders sharing a grammar report each group and transaction once
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_FILENAME = 'CW060001DEB_TST.V21'
+
+
+def _contents(works, agreements):
+    out = io.StringIO()
+    default_generator(1).write(out, works, agreements)
+    return out.getvalue()
+
+
+class _Recorder(object):
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event, progress):
+        self.events.append((event, progress))
+
+    def of(self, event):
+        return [progress for name, progress in self.events if name == event]
+
+
+class TestProgressHooks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._contents = _contents(6, 4)
+        cls._file = default_file_decoder().decode({'filename': _FILENAME,
+                                                   'contents': cls._contents})
+        cls._records = sum(len(transaction)
+                           for group in cls._file.transmission.groups
+                           for transaction in group.transactions)
+
+    def _check_events(self, recorder):
+        names = [name for name, progress in recorder.events]
+        self.assertEqual('start', names[0])
+        self.assertEqual('end', names[-1])
+        self.assertEqual(10, names.count('transaction'))
+        self.assertEqual(2, names.count('group'))
+
+        groups = recorder.of('group')
+        self.assertEqual([4, 10], [progress.transactions
+                                   for progress in groups])
+
+        end = recorder.of('end')[0]
+        self.assertEqual(self._records, end.records)
+        self.assertTrue(end.records_per_second > 0)
+
+        return end
+
+    def test_decode(self):
+        decoder = default_file_decoder()
+        recorder = _Recorder()
+        decoder.add_hook(CallbackHook(recorder))
+
+        decoder.decode({'filename': _FILENAME, 'contents': self._contents})
+
+        end = self._check_events(recorder)
+        self.assertEqual(len(self._contents), end.total_bytes)
+        self.assertEqual(1.0, end.fraction)
+        self.assertEqual(['filename', 'parse'], sorted(end.stages))
+
+        # The position is at the end of each transaction
+        lines = self._contents.splitlines(True)
+        ends = set()
+        position = 0
+        for line in lines:
+            position += len(line)
+            ends.add(position)
+        positions = [progress.processed_bytes
+                     for progress in recorder.of('transaction')]
+        self.assertEqual(sorted(positions), positions)
+        for position in positions:
+            self.assertIn(position, ends)
+        self.assertTrue(0 < recorder.of('transaction')[0].fraction < 1)
+
+    def test_decode_shared_grammar(self):
+        grammar = default_grammar_factory().get_rule('transmission')
+        rules = ('agreement_transaction', 'work_transaction')
+        decoders = []
+        actions = []
+        for _ in range(2):
+            decoders.append(FileDecoder(grammar, default_filename_decoder(),
+                                        'group_info', rules))
+            actions.append([len(rule.parseAction)
+                            for rule in _find_rules(grammar, rules)])
+        # The callbacks are not stacked on the grammar
+        self.assertEqual(actions[0], actions[1])
+
+        recorders = []
+        for decoder in decoders:
+            recorder = _Recorder()
+            decoder.add_hook(CallbackHook(recorder))
+            recorders.append(recorder)
+
+        decoders[0].decode({'filename': _FILENAME,
+                            'contents': self._contents})
+        self._check_events(recorders[0])
+        self.assertEqual([], recorders[1].events)
+
+        decoders[1].decode({'filename': _FILENAME,
+                            'contents': self._contents})
+        self._check_events(recorders[1])
+        self.assertEqual(len(recorders[1].events), len(recorders[0].events))
+
+    def test_decode_without_hooks(self):
+        decoder = default_file_decoder()
+        hook = decoder.add_hook(CallbackHook(_Recorder()))
+        decoder.remove_hook(hook)
+
+        self.assertEqual((), decoder.hooks)
+        self.assertIsNone(decoder._tracker('decode'))
+        decoder.decode({'filename': _FILENAME, 'contents': self._contents})
+
+    def test_encode(self):
+        encoder = default_file_encoder()
+        recorder = _Recorder()
+        encoder.add_hook(CallbackHook(recorder))
+
+        data = encoder.encode(self._file.transmission)
+
+        end = self._check_events(recorder)
+        self.assertEqual(len(data), end.processed_bytes)
+        self.assertIsNone(end.total_bytes)
+
+    def test_json(self):
+        encoder = JSONEncoder()
+        expected = encoder.encode(self._file)
+        recorder = _Recorder()
+        encoder.add_hook(CallbackHook(recorder))
+
+        self.assertEqual(expected, encoder.encode(self._file))
+
+        end = self._check_events(recorder)
+        self.assertEqual(['dictionary', 'dump'], sorted(end.stages))
+
+    def test_acknowledge(self):
+        recorder = _Recorder()
+        acknowledge = example_acknowledge_file(1, 'TST')
+        acknowledge.add_hook(CallbackHook(recorder))
+
+        acknowledge.acknowledge_cwr_file(self._file)
+
+        end = self._check_events(recorder)
+        self.assertEqual(['validate'], list(end.stages))
+
+    def test_acknowledge_stream(self):
+        recorder = _Recorder()
+        acknowledge = example_acknowledge_file(1, 'TST')
+        acknowledge.add_hook(CallbackHook(recorder))
+        events = default_file_stream_decoder().decode(
+            {'filename': _FILENAME, 'contents': self._contents})
+        writer = default_stream_writer(io.StringIO(),
+                                       default_record_encoder_factory())
+
+        acknowledge.acknowledge_stream(events, writer)
+
+        end = self._check_events(recorder)
+        self.assertEqual(['validate', 'write'], sorted(end.stages))
+
+
+class TestProgressTracker(unittest.TestCase):
+    def test_records(self):
+        calls = []
+
+        class Hook(ProgressHook):
+            def on_records(self, progress):
+                calls.append(progress.records)
+
+        tracker = ProgressTracker('decode', [Hook(every=10)])
+        tracker.start()
+        for records in (4, 4, 4, 25, 1):
+            tracker.transaction(records)
+
+        self.assertEqual([12, 37], calls)
+
+    def test_stages(self):
+        tracker = ProgressTracker('decode', [ProgressHook()])
+        tracker.start()
+        with tracker.stage('parse'):
+            with tracker.stage('validate'):
+                pass
+            progress = tracker.progress()
+
+        self.assertEqual(['parse', 'validate'], sorted(progress.stages))
+        self.assertTrue(progress.seconds >= progress.stages['parse'])
+
+    def test_progress(self):
+        progress = Progress('decode', 1, 10, 100, 250, 1000, 2.0)
+
+        self.assertEqual(50, progress.records_per_second)
+        self.assertEqual(5, progress.transactions_per_second)
+        self.assertEqual(0.25, progress.fraction)
+        self.assertEqual(6.0, progress.eta)
+        self.assertIn('25.0%', str(progress))
+
+        progress = Progress('encode')
+        self.assertEqual(0, progress.records_per_second)
+        self.assertIsNone(progress.eta)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.parser.decoder.stream import read_lines
+from cwr.utils.generator import default_generator
+from cwr.utils.integrity import default_integrity_checker
+from cwr.utils.splitter import default_splitter
+
+"""
+CWR file splitter tests.
+
+The following cases are tested:
+- Each file has at most the maximum number of transactions
+- Each file has at most the maximum number of bytes
+- The new files are valid, with their groups, transactions and trailers
+  numbered again
+- The header and the transaction lines are copied
+- The files are named with consecutive sequence numbers
+- Compressed files can be split
+- The original file is never replaced
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+_FILENAME = 'CW060001DEB_TST.V21'
+
+
+class TestSplitter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        out = io.StringIO()
+        default_generator(1).write(out, 25, 5)
+        cls._contents = out.getvalue()
+        cls._checker = default_integrity_checker()
+        cls._decoder = default_file_decoder()
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._output = os.path.join(self._dir, 'split')
+        os.mkdir(self._output)
+
+        self._path = os.path.join(self._dir, _FILENAME)
+        with open(self._path, 'w', encoding='latin-1', newline='') as out:
+            out.write(self._contents)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _read(self, split_file):
+        with open(split_file.path, encoding='latin-1', newline='') as text:
+            return text.read()
+
+    def _check(self, files):
+        """
+        Checks the files are valid and contain all the transactions, in the
+        original order.
+        """
+        transactions = []
+        for split_file in files:
+            contents = self._read(split_file)
+            self.assertEqual(0, self._checker.check(contents).issue_count)
+            self.assertEqual(len(contents), split_file.size)
+
+            transmission = self._decoder.decode(
+                {'filename': os.path.basename(split_file.path),
+                 'contents': contents}).transmission
+            self.assertEqual(split_file.group_count,
+                             len(transmission.groups))
+            for group_n, group in enumerate(transmission.groups):
+                self.assertEqual(group_n + 1, group.group_header.group_id)
+                for transaction_n, transaction in enumerate(
+                        group.transactions):
+                    self.assertEqual(transaction_n,
+                                     transaction[0].transaction_sequence_n)
+                    transactions.append(transaction[0])
+            self.assertEqual(split_file.transaction_count,
+                             transmission.trailer.transaction_count)
+            self.assertEqual(split_file.record_count,
+                             transmission.trailer.record_count)
+
+        self.assertEqual(30, len(transactions))
+        expected = [line[19:] for line in read_lines(self._contents)
+                    if line[:3] in ('AGR', 'NWR')]
+        found = [line[19:] for split_file in files
+                 for line in read_lines(self._read(split_file))
+                 if line[:3] in ('AGR', 'NWR')]
+        self.assertEqual(expected, found)
+
+    def test_transactions(self):
+        files = default_splitter(max_transactions=7).split(self._path,
+                                                           self._output)
+
+        self.assertEqual([7, 7, 7, 7, 2], [split_file.transaction_count
+                                           for split_file in files])
+        self.assertEqual(2, files[0].group_count)
+        self._check(files)
+
+    def test_bytes(self):
+        max_bytes = len(self._contents) // 3
+        files = default_splitter(max_bytes=max_bytes).split(self._path,
+                                                            self._output)
+
+        self.assertTrue(len(files) > 3)
+        for split_file in files:
+            self.assertTrue(split_file.size <= max_bytes)
+            self.assertEqual(split_file.size,
+                             os.path.getsize(split_file.path))
+        self._check(files)
+
+    def test_big_transaction(self):
+        files = default_splitter(max_bytes=100).split(self._path,
+                                                      self._output)
+
+        self.assertEqual([1] * 30, [split_file.transaction_count
+                                    for split_file in files])
+        self._check(files)
+
+    def test_copied_lines(self):
+        files = default_splitter(max_transactions=10).split(self._path,
+                                                            self._output)
+
+        header = self._contents.split('\r\n')[0]
+        for split_file in files:
+            self.assertEqual(header, self._read(split_file).split('\r\n')[0])
+
+    def test_names(self):
+        files = default_splitter(max_transactions=10).split(
+            self._path, self._output, first_sequence_n=41)
+
+        self.assertEqual(['CW060041DEB_TST.V21', 'CW060042DEB_TST.V21',
+                          'CW060043DEB_TST.V21'],
+                         [os.path.basename(split_file.path)
+                          for split_file in files])
+        self.assertEqual([41, 42, 43], [split_file.tag.sequence_n
+                                        for split_file in files])
+
+    def test_compressed(self):
+        path = os.path.join(self._dir, _FILENAME + '.gz')
+        with gzip.open(path, 'wt', encoding='latin-1', newline='') as out:
+            out.write(self._contents)
+
+        files = default_splitter(max_transactions=20).split(path,
+                                                            self._output)
+
+        self.assertEqual(['CW060001DEB_TST.V21', 'CW060002DEB_TST.V21'],
+                         [os.path.basename(split_file.path)
+                          for split_file in files])
+        self._check(files)
+
+    def test_original(self):
+        splitter = default_splitter(max_transactions=10)
+
+        self.assertRaises(ValueError, splitter.split, self._path, self._dir)
+        with open(self._path, encoding='latin-1', newline='') as text:
+            self.assertEqual(self._contents, text.read())
+
+    def test_no_limits(self):
+        self.assertRaises(ValueError, default_splitter, max_transactions=0)
+
+        files = default_splitter().split(self._path, self._output)
+
+        self.assertEqual(1, len(files))
+        self._check(files)
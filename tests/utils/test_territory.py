@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from cwr.interested_party import IPTerritoryOfControlRecord
+from cwr.utils.territory import TerritoryHierarchy, \
+    default_territory_hierarchy
+
+"""
+Territory hierarchy tests.
+
+The following cases are tested:
+- Included territories cover the territories they contain
+- Excluded territories are removed, along with those containing them
+- The territories of each interested party are resolved separately
+- Unknown territories are ignored
+- The default hierarchy places every territory inside World
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _territory(tis, indicator='I', ip_n='P1', record_type='SPT'):
+    return IPTerritoryOfControlRecord(record_type=record_type, ip_n=ip_n,
+                                      inclusion_exclusion_indicator=indicator,
+                                      tis_numeric_code=tis)
+
+
+class TestTerritoryHierarchy(unittest.TestCase):
+    def setUp(self):
+        # World (1) contains Europe (10), which contains Spain (100) and
+        # France (101); Japan (200) is part of World
+        self._hierarchy = TerritoryHierarchy(['100', '101', '0200'],
+                                             {1: [10], 10: [100, 101]}, 1)
+
+    def test_included(self):
+        mask = self._hierarchy.mask([100])
+
+        self.assertTrue(self._hierarchy.covers([_territory(100)], mask))
+        self.assertTrue(self._hierarchy.covers([_territory(10)], mask))
+        self.assertTrue(self._hierarchy.covers([_territory(1)], mask))
+        self.assertFalse(self._hierarchy.covers([_territory(101)], mask))
+        self.assertFalse(self._hierarchy.covers([_territory(200)], mask))
+
+    def test_region_not_fully_covered(self):
+        mask = self._hierarchy.mask([10])
+
+        self.assertFalse(self._hierarchy.covers([_territory(100)], mask))
+        self.assertTrue(self._hierarchy.covers([_territory(1)], mask))
+
+    def test_excluded(self):
+        transaction = [_territory(1), _territory(10, 'E')]
+
+        self.assertFalse(self._hierarchy.covers(
+            transaction, self._hierarchy.mask([100])))
+        self.assertFalse(self._hierarchy.covers(
+            transaction, self._hierarchy.mask([1])))
+        self.assertTrue(self._hierarchy.covers(
+            transaction, self._hierarchy.mask([200])))
+
+    def test_excluded_then_included(self):
+        transaction = [_territory(1), _territory(10, 'E'), _territory(100)]
+
+        self.assertTrue(self._hierarchy.covers(
+            transaction, self._hierarchy.mask([100])))
+        self.assertFalse(self._hierarchy.covers(
+            transaction, self._hierarchy.mask([101])))
+
+    def test_parties(self):
+        transaction = [_territory(1, ip_n='P1'),
+                       _territory(100, 'E', ip_n='P1'),
+                       _territory(100, ip_n='W1', record_type='SWT')]
+
+        self.assertTrue(self._hierarchy.covers(
+            transaction, self._hierarchy.mask([100])))
+
+    def test_unknown(self):
+        self.assertEqual(0, self._hierarchy.mask([999]))
+        self.assertEqual(self._hierarchy.mask([100]),
+                         self._hierarchy.mask([100, 999]))
+
+        mask = self._hierarchy.mask([100])
+        self.assertFalse(self._hierarchy.covers([_territory(999)], mask))
+        self.assertEqual(0, self._hierarchy.coverage([_territory(999)]))
+
+    def test_no_territories(self):
+        mask = self._hierarchy.mask([1, 100])
+
+        self.assertFalse(self._hierarchy.covers([], mask))
+        self.assertFalse(self._hierarchy.covers([_territory(None)], mask))
+
+
+class TestDefaultTerritoryHierarchy(unittest.TestCase):
+    def setUp(self):
+        self._hierarchy = default_territory_hierarchy()
+
+    def test_world(self):
+        mask = self._hierarchy.mask([643])
+
+        self.assertTrue(self._hierarchy.covers([_territory(2136)], mask))
+        self.assertFalse(self._hierarchy.covers(
+            [_territory(2136), _territory(643, 'E')], mask))
+        self.assertFalse(self._hierarchy.covers([_territory(724)], mask))
+
+    def test_regions(self):
+        # Without memberships, regions only match themselves and World
+        mask = self._hierarchy.mask([2100])
+
+        self.assertTrue(self._hierarchy.covers([_territory(2100)], mask))
+        self.assertTrue(self._hierarchy.covers([_territory(2136)], mask))
+        self.assertFalse(self._hierarchy.covers([_territory(643)], mask))
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import codecs
+import os
+import unittest
+
+from cwr.parser.decoder.file import default_file_decoder
+from cwr.validation.rules import RuleValidation, compile_rule, \
+    default_rule_validation, field_getter
+from cwr.validation.transaction import ValidationTransaction
+
+"""
+Edit rules validation tests.
+
+The following cases are tested:
+- Valid transactions are accepted
+- Field, record and transaction rules reject invalid transactions
+- The most severe status is returned
+- Each rule keeps its statistics
+"""
+
+__author__ = 'Bernardo Martínez Garrido'
+__license__ = 'MIT'
+__status__ = 'Development'
+
+
+def _example_transactions():
+    current_dir = os.path.dirname(__file__)
+    example_path = os.path.join(current_dir, '..', 'examples',
+                                'ackexample.V21')
+    data = {}
+    data['filename'] = os.path.basename(example_path)
+    data['contents'] = codecs.open(example_path, 'r', 'latin-1').read()
+
+    transmission = default_file_decoder().decode(data).transmission
+
+    # The ACK and MSG records are removed, to get the original transactions
+    transactions = []
+    for group in transmission.groups:
+        for transaction in group.transactions:
+            transactions.append([record for record in transaction
+                                 if record.record_type not in ('ACK', 'MSG')])
+    return transactions
+
+
+class TestRuleValidation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._transactions = _example_transactions()
+
+    def setUp(self):
+        self._validation = default_rule_validation()
+        self._transaction = self._transactions[-1]
+
+    def test_accepted(self):
+        for transaction in self._transactions:
+            status = self._validation.validate(transaction)
+            self.assertEqual('AS', status.code)
+            self.assertEqual('', status.message)
+
+    def test_field(self):
+        self._transaction[0].title = ' '
+        try:
+            status = self._validation.validate(self._transaction)
+        finally:
+            self._transaction[0].title = 'TITLE'
+
+        self.assertEqual('RJ', status.code)
+        self.assertEqual('work_title: The work title is required',
+                         status.message)
+
+    def test_nested_field(self):
+        publishers = [record for record in self._transaction
+                      if record.record_type == 'SPU']
+        name = publishers[0].publisher.publisher_name
+        for publisher in publishers:
+            publisher.publisher.publisher_name = ''
+        try:
+            status = self._validation.validate(self._transaction)
+        finally:
+            for publisher in publishers:
+                publisher.publisher.publisher_name = name
+
+        self.assertEqual('RJ', status.code)
+        # Reported only once
+        self.assertEqual('publisher_name: The controlled publisher name is '
+                         'required', status.message)
+
+    def test_transaction(self):
+        transaction = [record for record in self._transaction
+                       if record.record_type not in ('SWR', 'OWR', 'PWR',
+                                                     'SWT')]
+
+        status = self._validation.validate(transaction)
+
+        self.assertEqual('RJ', status.code)
+        self.assertEqual('work_writers: The work has no writers',
+                         status.message)
+
+    def test_transaction_sum(self):
+        writer = [record for record in self._transaction
+                  if record.record_type == 'SWR'][0]
+        share = writer.pr_ownership_share
+        writer.pr_ownership_share = 99
+        try:
+            status = self._validation.validate(self._transaction)
+        finally:
+            writer.pr_ownership_share = share
+
+        self.assertEqual('RJ', status.code)
+        self.assertIn('work_pr_ownership_total', status.message)
+
+    def test_statistics(self):
+        self._validation.validate(self._transaction)
+
+        rules = dict((rule.rule_id, rule) for rule in self._validation.rules)
+        spu = [record for record in self._transaction
+               if record.record_type == 'SPU']
+
+        self.assertEqual(1, rules['work_title'].count)
+        self.assertEqual(len(spu), rules['publisher_name'].count)
+        self.assertEqual(1, rules['work_writers'].count)
+        self.assertEqual(0, rules['agreement_dates'].count)
+        self.assertEqual(0, rules['work_title'].failures)
+        self.assertTrue(rules['publisher_name'].seconds > 0)
+
+        statistics = self._validation.statistics()
+        self.assertEqual(len(self._validation.rules), len(statistics))
+        self.assertTrue(statistics[0].seconds >= statistics[-1].seconds)
+        self.assertIn('work_title: 1 runs, 0 failures',
+                      self._validation.report())
+
+        self._validation.reset()
+        self.assertEqual(0, rules['work_title'].count)
+
+
+class TestRuleValidationConfig(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._transaction = _example_transactions()[-1]
+
+    def test_severity(self):
+        validation = RuleValidation([
+            {'id': 'soft', 'level': 'field', 'record_types': ['REV'],
+             'field': 'title', 'check': 'max_length', 'length': 2,
+             'status': 'AC', 'message': 'Long title'},
+            {'id': 'hard', 'level': 'record', 'record_types': ['REV'],
+             'fields': ['missing', 'publisher.missing'],
+             'check': 'required_one',
+             'status': 'RJ', 'message': 'No codes'},
+            {'id': 'general', 'level': 'transaction',
+             'record_types': ['XXX'], 'check': 'requires_record',
+             'status': 'CO', 'message': 'No XXX'}])
+
+        status = validation.validate(self._transaction)
+
+        self.assertEqual('RJ', status.code)
+        self.assertEqual('soft: Long title; hard: No codes; general: No XXX',
+                         status.message)
+
+    def test_values_pattern_range(self):
+        validation = RuleValidation([
+            {'id': 'values', 'level': 'field', 'record_types': ['REV'],
+             'field': 'version_type', 'check': 'values', 'values': ['ORI'],
+             'status': 'RJ', 'message': 'Not original'},
+            {'id': 'pattern', 'level': 'field', 'record_types': ['REV'],
+             'field': 'title', 'check': 'pattern', 'pattern': '[A-Z ]+$',
+             'status': 'RJ', 'message': 'Bad title'},
+            {'id': 'range', 'level': 'field', 'record_types': ['SWR'],
+             'field': 'pr_ownership_share', 'check': 'range', 'min': 0,
+             'max': 1, 'status': 'RJ', 'message': 'Big share'}])
+
+        status = validation.validate(self._transaction)
+
+        self.assertEqual('range: Big share', status.message)
+
+    def test_unknown_check(self):
+        self.assertRaises(ValueError, compile_rule,
+                          {'id': 'wrong', 'level': 'field', 'field': 'title',
+                           'check': 'wrong', 'status': 'RJ', 'message': ''})
+        self.assertRaises(ValueError, compile_rule,
+                          {'id': 'wrong', 'level': 'group',
+                           'check': 'required', 'status': 'RJ',
+                           'message': ''})
+
+    def test_field_getter(self):
+        spu = [record for record in self._transaction
+               if record.record_type == 'SPU'][0]
+
+        self.assertEqual(spu.publisher.publisher_name,
+                         field_getter('publisher.publisher_name')(spu))
+        self.assertIsNone(field_getter('publisher.missing.name')(spu))
+
+    def test_validation_transaction(self):
+        self.assertIsNone(ValidationTransaction({}).rules)
+        self.assertEqual('AS', ValidationTransaction({}).validate([]).code)
+
+        validation = ValidationTransaction({'validation_rules': 'common'})
+        self.assertIsNotNone(validation.rules)
+        self.assertEqual('AS', validation.validate(self._transaction).code)
@@ -36,9 +36,9 @@ if __name__ == '__main__':
     data['contents'] = codecs.open(path, 'r', 'latin-1').read()
 
     print('Begins parsing CWR at %s' % time.ctime())
-    start = time.clock()
+    start = time.perf_counter()
     data = decoder.decode(data)
-    end = time.clock()
+    end = time.perf_counter()
     time_parse = (end - start)
 
     print('Parsed the file in %s seconds' % time_parse)
@@ -47,17 +47,17 @@ if __name__ == '__main__':
     encoder = JSONEncoder()
 
     print('Begins creating JSON at %s' % time.ctime())
-    start = time.clock()
+    start = time.perf_counter()
     result = encoder.encode(data)
-    end = time.clock()
+    end = time.perf_counter()
     time_parse = (end - start)
 
     print('Created the JSON in %s seconds' % time_parse)
     print('\n')
 
-    start = time.clock()
+    start = time.perf_counter()
     output = codecs.open(output, 'w', 'latin-1')
-    end = time.clock()
+    end = time.perf_counter()
     time_parse = (end - start)
 
     print('Saved the JSON in %s seconds' % time_parse)